@@ -1,13 +1,33 @@
 import streamlit as st
-import pickle
+import os
+import sys
 import time
 
-# Load the trained model and vectorizer
-with open("spam_model.pkl", "rb") as model_file:
-    model = pickle.load(model_file)
-
-with open("vectorizer.pkl", "rb") as vectorizer_file:
-    vectorizer = pickle.load(vectorizer_file)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "social_media_ai"))
+from src.spam_filter import SpamFilter
+from src.spam_metrics import SpamMetrics, model_version, start_exporters
+
+MODEL_PATH = "spam_model.pkl"
+VECTORIZER_PATH = "vectorizer.pkl"
+
+# Load the trained model and vectorizer once per server process (Streamlit reruns this
+# script on every interaction), with serving metrics in the Prometheus text format:
+#   SPAM_METRICS_PORT=9108            serve them at http://127.0.0.1:9108/metrics
+#   SPAM_METRICS_FILE=spam.prom       rewrite them to a file every SPAM_METRICS_INTERVAL seconds (default 15)
+#   SPAM_CACHE_SIZE=1024              reuse the scores of recently seen messages (0 disables)
+@st.cache_resource
+def load_spam_filter():
+    metrics = SpamMetrics(model_version(MODEL_PATH, VECTORIZER_PATH))
+    return SpamFilter.load(MODEL_PATH, VECTORIZER_PATH, metrics=metrics,
+                           cache_size=int(os.getenv("SPAM_CACHE_SIZE", "1024")))
+
+spam_filter = load_spam_filter()
+# The exporters start with the first run of the script; reruns (and a cleared cache)
+# only point them at the current metrics instead of binding the port again.
+start_exporters(spam_filter.metrics,
+                port=int(os.getenv("SPAM_METRICS_PORT")) if os.getenv("SPAM_METRICS_PORT") else None,
+                host=os.getenv("SPAM_METRICS_HOST", "127.0.0.1"), path=os.getenv("SPAM_METRICS_FILE"),
+                interval=float(os.getenv("SPAM_METRICS_INTERVAL", "15")))
 
 # --- STREAMLIT THEME SETTINGS ---
 st.set_page_config(page_title="Spam Email Detector", page_icon="📧", layout="centered")
@@ -108,9 +128,9 @@ user_input = st.text_area("Enter your email message:", "")
 
 # Function to Predict Spam
 def predict_spam(message):
-    input_features = vectorizer.transform([message])
-    prediction = model.predict(input_features)[0]
-    prediction_proba = model.predict_proba(input_features)[0][1] * 100
+    spam_probability = spam_filter.score([message])[0]
+    prediction = 1 if spam_probability > spam_filter.threshold else 0 # Same as model.predict
+    prediction_proba = spam_probability * 100
     return prediction, prediction_proba
 
 # Button to Check Spam
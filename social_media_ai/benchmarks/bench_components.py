@@ -0,0 +1,258 @@
+"""
+Component benchmarks on reproducible synthetic tweet corpora.
+
+Measures throughput, per-call latency percentiles (p50/p95/p99) and peak traced
+memory of each analysis component, and of the end-to-end batch path
+(src.batch.analyze_chunk), for several corpus sizes, text lengths and batch sizes:
+
+    vader           SentimentAnalyzer.analyze_sentiment, one call per text
+    keywords        ContentSuggestor._extract_keywords, one call per text
+    keywords_batch  ContentSuggestor.extract_keywords_batch, one call per batch
+    suggest         ContentSuggestor.suggest_content with precomputed keywords, one call per text
+    end_to_end      batch.analyze_chunk (sentiment, batch keywords, suggestions), one call per batch
+
+Corpora are generated from a seed, so the same arguments give the same texts on
+every machine and commit. Timing and memory are measured in separate passes
+(tracemalloc slows allocation-heavy code down), each after a warm-up call that
+loads the models.
+
+Results are written as JSON with the commit they were measured on. Given a
+--baseline from an earlier run, the script exits with status 1 if any case lost
+more than --threshold of its throughput, or gained that much p95 latency or peak memory.
+
+Usage (from the social_media_ai directory):
+    python benchmarks/bench_components.py --output bench.json
+    python benchmarks/bench_components.py --sizes 200,2000 --lengths short,long --batch-sizes 32,256
+    python benchmarks/bench_components.py --baseline bench.json --threshold 0.15
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tracemalloc
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_DIR)
+
+from src.profiling import Histogram
+
+COMPONENTS = ('vader', 'keywords', 'keywords_batch', 'suggest', 'end_to_end')
+
+# Words per text for each --lengths value (tweets are at most 280 characters, about 50 words).
+LENGTHS = {'short': (5, 12), 'medium': (15, 30), 'long': (35, 50)}
+
+_TOPICS = ["phone", "camera", "battery", "update", "release", "service", "pricing", "support", "app",
+           "conference", "keynote", "laptop", "delivery", "subscription", "game", "team", "weather", "coffee"]
+_POSITIVE = ["love", "great", "amazing", "fantastic", "happy", "excellent", "awesome", "impressive", "best"]
+_NEGATIVE = ["hate", "terrible", "worst", "broken", "disappointed", "awful", "slow", "annoying", "failing"]
+_FILLER = ["the", "a", "this", "my", "new", "today", "really", "just", "again", "with", "about", "is", "was",
+           "and", "but", "so", "after", "before", "everyone", "still", "finally", "our", "their", "week"]
+_EXTRAS = ["#tech", "#launch", "#python", "@support", "@friend", "https://t.co/abc123", "!!", "?", "lol", "😀", "🔥"]
+
+
+def generate_corpus(size: int, length: str = 'short', seed: int = 0) -> list[str]:
+    """
+    Returns `size` deterministic synthetic tweets of the given length class. Each
+    text mixes a topic, sentiment words (positive, negative or none, so all three
+    sentiment branches are exercised), filler words and hashtags/mentions/URLs.
+    """
+    low, high = LENGTHS[length]
+    rng = random.Random(f"{seed}:{length}:{size}")
+    texts = []
+    for _ in range(size):
+        words = [rng.choice(_FILLER) for _ in range(rng.randint(low, high))]
+        for _ in range(max(1, len(words) // 8)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(_TOPICS))
+        mood = rng.random()
+        if mood < 0.4:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(_POSITIVE))
+        elif mood < 0.7:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(_NEGATIVE))
+        if rng.random() < 0.5:
+            words.append(rng.choice(_EXTRAS))
+        text = " ".join(words)
+        texts.append(text[0].upper() + text[1:] + rng.choice([".", "!", "", "?"]))
+    return texts
+
+
+def _chunks(items: list, size: int) -> list[list]:
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _cases(components: tuple, texts: list[str], batch_sizes: list[int], noun_mode: str, keyword_mode: str) -> dict:
+    """{case name: (function called per unit, units, whether each unit is a batch of texts)} for one corpus."""
+    from src.main import get_worker_components
+    from src.document import Document
+    from src.batch import analyze_chunk
+
+    sentiment_analyzer, content_suggestor = get_worker_components(noun_mode)
+    documents = [Document(text) for text in texts]
+    cases = {}
+    if 'vader' in components:
+        cases['vader'] = (sentiment_analyzer.analyze_sentiment, texts, False)
+    if 'keywords' in components:
+        cases['keywords'] = (content_suggestor._extract_keywords, texts, False)
+    if 'suggest' in components:
+        analysed = [(sentiment_analyzer.analyze_sentiment(document), document) for document in documents]
+        keywords = content_suggestor.extract_keywords_batch(documents, mode=keyword_mode)
+        units = [(result, words, document) for (result, document), words in zip(analysed, keywords)]
+        cases['suggest'] = (lambda unit: content_suggestor.suggest_content(unit[0], keywords=unit[1], document=unit[2]), units, False)
+    for batch_size in batch_sizes:
+        if 'keywords_batch' in components:
+            cases[f'keywords_batch/batch{batch_size}'] = (
+                lambda chunk: content_suggestor.extract_keywords_batch([Document(text) for text in chunk], mode=keyword_mode),
+                _chunks(texts, batch_size), True,
+            )
+        if 'end_to_end' in components:
+            cases[f'end_to_end/batch{batch_size}'] = (
+                lambda chunk: analyze_chunk(chunk, noun_mode, keyword_mode), _chunks(texts, batch_size), True,
+            )
+    return cases
+
+
+def measure(function, units: list, batched: bool = False, memory: bool = True) -> dict:
+    """
+    Times `function` over every unit, then (if memory) runs it again under tracemalloc
+    for the peak traced memory. The first unit is called once beforehand as a warm-up.
+    """
+    if not units:
+        raise ValueError("Nothing to measure: the corpus is empty.")
+    function(units[0]) # Warm-up: loads models and fills caches outside the measurement
+
+    latencies = Histogram()
+    start = time.perf_counter()
+    for unit in units:
+        call_start = time.perf_counter()
+        function(unit)
+        latencies.add(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+
+    items = sum(map(len, units)) if batched else len(units)
+    summary = latencies.summary()
+    result = {
+        'items': items,
+        'calls': summary['count'],
+        'seconds': elapsed,
+        'throughput_per_second': items / elapsed if elapsed else 0.0,
+        'p50_ms': summary['p50_ms'],
+        'p95_ms': summary['p95_ms'],
+        'p99_ms': summary['p99_ms'],
+        'mean_ms': summary['mean_ms'],
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            for unit in units:
+                function(unit)
+            result['peak_memory_kib'] = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_benchmark(sizes: list[int], lengths: list[str], batch_sizes: list[int], components: tuple,
+                  noun_mode: str = 'lexicon', keyword_mode: str = 'tfidf', seed: int = 0, memory: bool = True) -> dict:
+    """Returns {case name: metrics}; case names are '<component>[/batchN]/<length>/n<size>'."""
+    results = {}
+    for length in lengths:
+        for size in sizes:
+            texts = generate_corpus(size, length, seed)
+            for name, (function, units, batched) in _cases(components, texts, batch_sizes, noun_mode, keyword_mode).items():
+                results[f"{name}/{length}/n{size}"] = measure(function, units, batched, memory)
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR, capture_output=True, text=True)
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+# Metrics compared against a baseline: (metric, True if higher is better).
+CHECKED_METRICS = (('throughput_per_second', True), ('p95_ms', False), ('peak_memory_kib', False))
+
+
+def check_regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Returns a message for every case present in both runs whose throughput fell, or
+    whose p95 latency or peak memory rose, by more than `threshold` (a fraction).
+    """
+    failures = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric, higher_is_better in CHECKED_METRICS:
+            if metric not in current or not previous.get(metric):
+                continue
+            change = (current[metric] - previous[metric]) / previous[metric]
+            if (-change if higher_is_better else change) > threshold:
+                failures.append(f"{name}: {metric} {previous[metric]:.2f} -> {current[metric]:.2f} "
+                                f"({change * 100:+.1f}%, threshold {threshold * 100:.0f}%)")
+    return failures
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(',') if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=_int_list, default=[500], help="Corpus sizes, comma-separated (default 500).")
+    parser.add_argument('--lengths', default='short,long', help=f"Text lengths, comma-separated, of {', '.join(LENGTHS)} (default short,long).")
+    parser.add_argument('--batch-sizes', type=_int_list, default=[32, 256], help="Batch sizes of the batch cases (default 32,256).")
+    parser.add_argument('--component', action='append', choices=COMPONENTS, help="Component to run (repeatable; default all).")
+    parser.add_argument('--noun-mode', default='lexicon', choices=['tagger', 'hybrid', 'lexicon'])
+    parser.add_argument('--keyword-mode', default='tfidf', choices=['tfidf', 'pos'])
+    parser.add_argument('--seed', type=int, default=0, help="Corpus seed (default 0).")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass (halves the run time).")
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    parser.add_argument('--baseline', help="JSON output of an earlier run to check for regressions against.")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Relative change counted as a regression (default 0.10 = 10%%).")
+    args = parser.parse_args(argv)
+
+    lengths = [length for length in args.lengths.split(',') if length]
+    unknown = set(lengths) - set(LENGTHS)
+    if unknown:
+        parser.error(f"Unknown lengths: {', '.join(sorted(unknown))}")
+
+    results = run_benchmark(args.sizes, lengths, args.batch_sizes, tuple(args.component or COMPONENTS),
+                            args.noun_mode, args.keyword_mode, args.seed, memory=not args.no_memory)
+
+    print(f"{'case':<36} {'items/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>10}")
+    for name, result in results.items():
+        peak = f"{result['peak_memory_kib']:10.0f}" if 'peak_memory_kib' in result else f"{'-':>10}"
+        print(f"{name:<36} {result['throughput_per_second']:10.0f} {result['p50_ms']:9.3f} "
+              f"{result['p95_ms']:9.3f} {result['p99_ms']:9.3f} {peak}")
+
+    if args.output:
+        meta = {
+            'commit': _git_commit(),
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'arguments': {'sizes': args.sizes, 'lengths': lengths, 'batch_sizes': args.batch_sizes, 'seed': args.seed,
+                          'noun_mode': args.noun_mode, 'keyword_mode': args.keyword_mode},
+        }
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({'meta': meta, 'results': results}, output_file, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)['results']
+    failures = check_regressions(results, baseline, args.threshold)
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+End-to-end throughput benchmark of the tweet pipeline against the local fake Twitter API.
+
+Starts src.fake_twitter_api in-process, fetches tweets with TwitterClient over HTTP,
+and runs sentiment analysis and batch keyword extraction on every page, as run_app
+option 2 does. No credentials or network access are needed.
+
+Usage (from the social_media_ai directory):
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --tweets 5000 --latency 0.05 --replay data/recorded_search.jsonl
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_DIR)
+
+from src.fake_twitter_api import FakeTwitterAPI, FakeTwitterServer
+
+
+def run_pipeline(base_url: str, query: str, tweets: int, page_size: int, noun_mode: str, keyword_mode: str) -> dict:
+    """Fetches, analyses and suggests for `tweets` tweets. Returns seconds spent per stage."""
+    import itertools
+    from src.main import load_core_components
+    from src.document import Document
+    from src.twitter_client import TwitterClient
+
+    components = load_core_components(noun_mode)
+    if components is None:
+        raise RuntimeError("Core components failed to load (see the log above).")
+    sentiment_analyzer, content_suggestor = components
+    client = TwitterClient(base_url=base_url)
+
+    timings = {'fetch': 0.0, 'analyze': 0.0, 'suggest': 0.0}
+    processed = 0
+    stream = client.iter_records(query, limit=tweets, page_size=page_size)
+    while True:
+        start = time.perf_counter()
+        page = list(itertools.islice(stream, page_size))
+        timings['fetch'] += time.perf_counter() - start
+        if not page:
+            break
+        documents = [Document(record.text) for record in page]
+
+        start = time.perf_counter()
+        results = [sentiment_analyzer.analyze_sentiment(document) for document in documents]
+        timings['analyze'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        keywords = content_suggestor.extract_keywords_batch(documents, mode=keyword_mode)
+        for result, document, document_keywords in zip(results, documents, keywords):
+            content_suggestor.suggest_content(result, keywords=document_keywords, document=document)
+        timings['suggest'] += time.perf_counter() - start
+        processed += len(page)
+
+    timings['tweets'] = processed
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tweets', type=int, default=2000, help="Tweets to process (default 2000).")
+    parser.add_argument('--query', default='#python')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0, help="Fake API latency per request in seconds.")
+    parser.add_argument('--rate-limit', type=int, default=0, help="Fake API requests per window (0 disables).")
+    parser.add_argument('--window', type=float, default=60.0, help="Fake API rate-limit window in seconds.")
+    parser.add_argument('--replay', help="Serve a recording made with TWITTER_RECORD_PATH instead of synthetic tweets.")
+    parser.add_argument('--noun-mode', default='lexicon', choices=['tagger', 'hybrid', 'lexicon'])
+    parser.add_argument('--keyword-mode', default='tfidf', choices=['tfidf', 'pos'])
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    options = dict(latency=args.latency, rate_limit=args.rate_limit or None, window_seconds=args.window)
+    if args.replay:
+        fake_api = FakeTwitterAPI.from_recording(args.replay, **options)
+    else:
+        fake_api = FakeTwitterAPI(tweets_per_query=args.tweets, **options)
+
+    # TwitterClient needs credentials to be set; the fake API accepts any.
+    for name in ('TWITTER_API_KEY', 'TWITTER_API_SECRET_KEY', 'TWITTER_ACCESS_TOKEN', 'TWITTER_ACCESS_TOKEN_SECRET'):
+        os.environ.setdefault(name, 'fake')
+
+    with FakeTwitterServer(fake_api) as server:
+        start = time.perf_counter()
+        timings = run_pipeline(server.base_url, args.query, args.tweets, args.page_size, args.noun_mode, args.keyword_mode)
+        timings['total'] = time.perf_counter() - start
+    timings['requests'] = fake_api.request_count
+    timings['rate_limited'] = fake_api.rejected_count
+
+    tweets = timings['tweets']
+    print(f"{tweets} tweets in {timings['total']:.2f}s ({tweets / timings['total']:.0f} tweets/s end to end, "
+          f"{timings['requests']} requests, {timings['rate_limited']} rate limited)")
+    for stage in ('fetch', 'analyze', 'suggest'):
+        rate = tweets / timings[stage] if timings[stage] else float('inf')
+        print(f"    {stage:<8} {timings[stage]:8.3f}s  {rate:10.0f} tweets/s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(timings, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
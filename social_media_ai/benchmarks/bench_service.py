@@ -0,0 +1,164 @@
+"""
+Load test of the async HTTP analysis service (src/service.py).
+
+Opens --connections keep-alive connections and sends requests back to back on
+each of them for --duration seconds, with texts from the synthetic corpus of
+bench_components.py. Reports requests/s and latency percentiles. Without --url, a
+service is started in a subprocess with the given --workers and batching options and
+stopped afterwards.
+
+Usage (from the social_media_ai directory):
+    python benchmarks/bench_service.py --endpoint suggest --connections 64 --duration 10 --workers 4
+    python benchmarks/bench_service.py --url http://127.0.0.1:8000 --endpoint bulk --bulk-size 100
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+from urllib.parse import urlsplit
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.profiling import Histogram
+from bench_components import generate_corpus
+
+
+async def _connection(host: str, port: int, path: str, bodies: list, deadline: float, latencies: Histogram, statuses: dict):
+    reader, writer = await asyncio.open_connection(host, port)
+    index = 0
+    try:
+        while time.perf_counter() < deadline:
+            body = bodies[index % len(bodies)]
+            index += 1
+            start = time.perf_counter()
+            writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.add(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load_test(url: str, endpoint: str, connections: int, duration: float, bulk_size: int = 50, seed: int = 0) -> dict:
+    """Runs the load test against a running service and returns its statistics."""
+    parts = urlsplit(url)
+    texts = generate_corpus(1000, 'medium', seed)
+    if endpoint == 'bulk':
+        bodies = [json.dumps({'texts': texts[start:start + bulk_size]}).encode('utf-8')
+                  for start in range(0, len(texts), bulk_size)]
+    else:
+        bodies = [json.dumps({'text': text}).encode('utf-8') for text in texts]
+
+    latencies = Histogram()
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _connection(parts.hostname, parts.port, f"/{endpoint}", bodies[offset:] + bodies[:offset], start + duration,
+                    latencies, statuses)
+        for offset in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+    summary = latencies.summary()
+    texts_per_request = bulk_size if endpoint == 'bulk' else 1
+    return {
+        'endpoint': endpoint,
+        'connections': connections,
+        'requests': summary['count'],
+        'seconds': elapsed,
+        'requests_per_second': summary['count'] / elapsed,
+        'texts_per_second': summary['count'] * texts_per_request / elapsed,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': summary['p50_ms'],
+        'p95_ms': summary['p95_ms'],
+        'p99_ms': summary['p99_ms'],
+        'max_ms': summary['max_ms'],
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_service(args) -> tuple:
+    """Starts src.service in a subprocess and waits until /health answers. Returns (process, url)."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'src.service', '--port', str(port), '--workers', str(args.workers),
+         '--max-batch-size', str(args.max_batch_size), '--max-wait-ms', str(args.max_wait_ms),
+         '--noun-mode', args.noun_mode],
+        cwd=PROJECT_DIR,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The service exited with status {process.returncode}.")
+        try:
+            with urllib.request.urlopen(url + '/health', timeout=1) as response:
+                if response.status == 200:
+                    return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The service did not become healthy within 120s.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="Base URL of a running service (default: start one).")
+    parser.add_argument('--endpoint', choices=['sentiment', 'suggest', 'bulk'], default='suggest')
+    parser.add_argument('--connections', type=int, default=32, help="Concurrent keep-alive connections (default 32).")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to send requests for (default 10).")
+    parser.add_argument('--bulk-size', type=int, default=50, help="Texts per /bulk request (default 50).")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Workers of a started service.")
+    parser.add_argument('--max-batch-size', type=int, default=64, help="Micro-batch size of a started service.")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help="Micro-batch wait of a started service.")
+    parser.add_argument('--noun-mode', default='lexicon', choices=['tagger', 'hybrid', 'lexicon'])
+    parser.add_argument('--output', help="Write the results (and the service's /metrics) as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    process, url = (None, args.url) if args.url else start_service(args)
+    try:
+        result = asyncio.run(load_test(url, args.endpoint, args.connections, args.duration, args.bulk_size))
+        with urllib.request.urlopen(url + '/metrics', timeout=10) as response:
+            result['service_metrics'] = json.loads(response.read())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    batches = result['service_metrics']['batches'].get('suggest' if args.endpoint == 'bulk' else args.endpoint, {})
+    print(f"{result['requests']} requests in {result['seconds']:.1f}s: {result['requests_per_second']:.0f} requests/s, "
+          f"{result['texts_per_second']:.0f} texts/s over {args.connections} connections")
+    print(f"latency p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, "
+          f"max {result['max_ms']:.1f} ms; statuses {result['statuses']}; "
+          f"mean micro-batch {batches.get('mean_batch_size', 0.0):.1f} texts")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(result, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
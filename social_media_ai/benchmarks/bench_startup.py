@@ -0,0 +1,150 @@
+"""
+Cold-start benchmark for the Social Media AI entry point.
+
+Each scenario runs in a fresh interpreter with `-X importtime`, so the numbers
+include everything a short-lived batch container pays on startup. The import-time
+breakdown groups cumulative import time by the package pulled in by the
+interpreter itself or by the project's own modules.
+
+Usage (from the social_media_ai directory):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --budget import_main=0.2 --output startup.json
+
+Exits with status 1 if the median time of any scenario exceeds its budget.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SCENARIOS = {
+    # Bare interpreter startup, for reference.
+    'python': "pass",
+    # Importing the entry point must not pull in NLTK, tweepy or scikit-learn.
+    'import_main': "import src.main",
+    # Everything needed before the first manual text can be analysed.
+    'core_components': "import src.main as m; assert m.load_core_components('lexicon') is not None",
+}
+
+# Default budgets in seconds (median wall time per scenario).
+DEFAULT_BUDGETS = {
+    'import_main': 0.5,
+    'core_components': 5.0,
+}
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Sums cumulative import time (in seconds) per root package from `-X importtime` output.
+
+    Imports made by the project's own 'src' modules are attributed to the package they
+    pull in (e.g. 'nltk'), not to 'src', so the breakdown shows which dependencies
+    the entry point drags in.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name_field = line.split('|', 2)
+        name = name_field[1:] # Drop the separator space; remaining indentation is the nesting level
+        level = (len(name) - len(name.lstrip())) // 2
+        entries.append((level, name.strip(), int(cumulative) / 1e6))
+
+    # importtime prints children before their parent; walking the lines in reverse
+    # visits every parent before its children, so the chain of ancestors is known.
+    totals = defaultdict(float)
+    ancestors = []
+    for level, name, cumulative in reversed(entries):
+        del ancestors[level:]
+        root = name.split('.')[0]
+        if root != 'src' and all(ancestor == 'src' for ancestor in ancestors):
+            totals[root] += cumulative
+        ancestors.append(root)
+    return dict(totals)
+
+
+def run_scenario(code: str) -> tuple:
+    """Runs one scenario in a fresh interpreter. Returns (wall seconds, import breakdown)."""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=PROJECT_DIR, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenario failed:\n{completed.stderr[-2000:]}")
+    return elapsed, parse_importtime(completed.stderr)
+
+
+def run_benchmark(scenarios, runs: int) -> dict:
+    results = {}
+    for name in scenarios:
+        timings = []
+        breakdowns = []
+        for _ in range(runs):
+            elapsed, breakdown = run_scenario(SCENARIOS[name])
+            timings.append(elapsed)
+            breakdowns.append(breakdown)
+        packages = {package for breakdown in breakdowns for package in breakdown}
+        results[name] = {
+            'median_seconds': statistics.median(timings),
+            'min_seconds': min(timings),
+            'max_seconds': max(timings),
+            'imports': dict(sorted(
+                ((package, statistics.median(b.get(package, 0.0) for b in breakdowns)) for package in packages),
+                key=lambda item: -item[1]
+            )),
+        }
+    return results
+
+
+def check_budgets(results: dict, budgets: dict) -> list[str]:
+    """Returns a message for every scenario whose median exceeds its budget."""
+    failures = []
+    for name, budget in budgets.items():
+        if name in results and results[name]['median_seconds'] > budget:
+            failures.append(f"{name}: {results[name]['median_seconds']:.3f}s exceeds budget of {budget:.3f}s")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help="Runs per scenario (default 5).")
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help="Scenario to run (repeatable; default all).")
+    parser.add_argument('--budget', action='append', default=[], metavar='SCENARIO=SECONDS', help="Override a scenario budget.")
+    parser.add_argument('--top', type=int, default=8, help="Packages to show in the import breakdown.")
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    budgets = dict(DEFAULT_BUDGETS)
+    for item in args.budget:
+        name, _, seconds = item.partition('=')
+        budgets[name] = float(seconds)
+
+    results = run_benchmark(args.scenario or list(SCENARIOS), args.runs)
+
+    for name, result in results.items():
+        budget = budgets.get(name)
+        budget_text = f" (budget {budget:.3f}s)" if budget is not None else ""
+        print(f"{name:<18} median {result['median_seconds']:.3f}s  min {result['min_seconds']:.3f}s  max {result['max_seconds']:.3f}s{budget_text}")
+        for package, seconds in list(result['imports'].items())[:args.top]:
+            print(f"    {package:<24} {seconds * 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({'results': results, 'budgets': budgets}, output_file, indent=2)
+
+    failures = check_budgets(results, budgets)
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,544 @@
+"""
+Non-interactive batch mode: reads texts or tweet records from JSONL or CSV files (or
+stdin), runs sentiment analysis and content suggestion on them in chunks, and writes
+one JSON result per input line (see main.analyze_and_suggest) in input order.
+
+Input formats:
+    jsonl   One object per line with at least "text" (see TweetRecord.from_dict), or a
+            bare JSON string.
+    csv     A header row with a "text" column; "id", "created_at", "author_id",
+            "retweet_of_id" and "lang" columns are used when present.
+The format is taken from the file extension unless --format is given; stdin ('-')
+defaults to jsonl.
+
+Keywords are extracted once per chunk (one TF-IDF pass over --batch-size texts). With
+--workers N > 1, chunks are analysed in N worker processes, each loading its own
+analyzers, and results are still written in input order.
+
+With --spam-threshold, each chunk is first scored by the spam model (spam_model.pkl,
+see src/spam_filter.py); spam is not analysed and is left out of the output, or
+written as {"id", "text", "spam": true, "spam_score"} with --spam-action tag.
+
+With --output to a JSONL or SQLite file, the run writes a checkpoint next to it
+(<output>.checkpoint.json) every --checkpoint-interval seconds: how many input
+records have been fully written, the sink position (byte offset or last rowid) and
+the running counts. After a crash or preemption, the same command with --resume
+discards output written after the last checkpoint, skips the records it covers and
+continues, so the output ends up exactly as from an uninterrupted run.
+
+With --shard i/N, only the records that hash into shard i of N are analysed, so N
+runs (on any machines) split the input between them; each also writes its counts
+to <output>.stats.json for `python -m src.sharding merge` (see src/sharding.py).
+
+--timings prints a latency table per analysis stage (tokenize, vader, pos_tag,
+keywords, suggest, ...) to stderr at the end, and --profile DIR also writes cProfile
+and tracemalloc data per stage to DIR (see src/profiling.py).
+
+--trending K counts the extracted keywords in a bounded, mergeable sketch (worker
+processes send theirs back with each chunk) and prints the top K at the end (see
+src/trending.py); --trending-output also writes them to a JSON file.
+
+Usage (from the social_media_ai directory):
+    python -m src.batch tweets.jsonl --output results.jsonl --batch-size 500 --workers 4
+    cat tweets.csv | python src/main.py --input - --format csv > results.jsonl
+    python -m src.batch tweets.jsonl --output results.jsonl --resume
+"""
+import os
+import sys
+import csv
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import tempfile
+import itertools
+from collections import deque
+
+if not __package__: # Allow direct execution (python src/batch.py)
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import profiling, trending
+
+FORMATS = ('jsonl', 'csv')
+
+CHECKPOINT_VERSION = 1
+# Options that change the results; a run can only be resumed with the same values.
+CHECKPOINT_OPTIONS = ('batch_size', 'noun_mode', 'keyword_mode', 'spam_threshold', 'spam_action', 'shard')
+_COUNTS = ('processed', 'errors', 'spam', 'chunks')
+
+_INT_FIELDS = ('id', 'author_id', 'retweet_of_id')
+
+def detect_format(path: str) -> str:
+    """Input format from the file extension (jsonl for stdin and unknown extensions)."""
+    return 'csv' if path != '-' and path.lower().endswith('.csv') else 'jsonl'
+
+
+def read_csv(path: str):
+    """
+    Yields a TweetRecord per row of a CSV file ('-' for stdin) with a "text" column.
+    Empty cells are read as missing values; rows with invalid values are logged and skipped.
+    """
+    from src.tweet_record import TweetRecord
+
+    stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+    try:
+        reader = csv.DictReader(stream)
+        if reader.fieldnames is None or 'text' not in reader.fieldnames:
+            raise ValueError(f"{path} has no 'text' column.")
+        for row_number, row in enumerate(reader, start=1):
+            data = {name: value for name, value in row.items() if name and value not in (None, '')}
+            data.setdefault('text', '')
+            try:
+                for name in _INT_FIELDS:
+                    if name in data:
+                        data[name] = int(data[name])
+                if 'created_at' in data:
+                    data['created_at'] = float(data['created_at'])
+            except ValueError as e:
+                logging.warning(f"Skipping invalid row {row_number} of {path}: {e}")
+                continue
+            yield TweetRecord.from_dict(data, default_id=row_number)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def read_records(path: str, input_format: str = None):
+    """Yields TweetRecords from a JSONL or CSV file ('-' for stdin)."""
+    input_format = input_format or detect_format(path)
+    if input_format == 'csv':
+        return read_csv(path)
+    if input_format == 'jsonl':
+        from src.streaming import tail_jsonl
+        return tail_jsonl(path)
+    raise ValueError(f"Unknown input format '{input_format}'. Expected one of {FORMATS}.")
+
+
+def analyze_chunk(records, noun_mode: str = 'tagger', keyword_mode: str = 'tfidf', spam_threshold: float = None,
+                  columnar: bool = False):
+    """
+    Analyses a chunk of records and returns one result dict per record, in order (in
+    the format of main.analyze_and_suggest). Keywords are extracted for the whole
+    chunk at once. A record that fails gets an {'id', 'text', 'error'} result instead
+    of failing the chunk.
+
+    If spam_threshold is set, the chunk is first scored by the spam model (see
+    src.spam_filter); records above the threshold are not analysed and get an
+    {'id', 'text', 'spam': True, 'spam_score'} result.
+
+    With columnar=True the results are returned as a BatchResult (see
+    src/batch_result.py), which holds the same results in a fraction of the memory
+    and renders each dict only when it is accessed.
+    """
+    from src.main import get_worker_components
+    from src.document import as_document
+    from src.tweet_record import record_text
+    from src.batch_result import BatchResult
+
+    sentiment_analyzer, content_suggestor = get_worker_components(noun_mode)
+
+    records = list(records)
+    spam_scores = {}
+    if spam_threshold is not None:
+        from src.spam_filter import get_worker_spam_filter
+        _, spam = get_worker_spam_filter(spam_threshold).split(records)
+        spam_scores = {id(record): score for record, score in spam}
+    analysed = [record for record in records if id(record) not in spam_scores]
+
+    documents = {id(record): as_document(record_text(record)) for record in analysed}
+    try:
+        batch_keywords = content_suggestor.extract_keywords_batch(list(documents.values()), num_keywords=1, mode=keyword_mode)
+    except Exception as e:
+        logging.error(f"Batch keyword extraction failed, extracting per text instead: {e}")
+        batch_keywords = [None] * len(documents)
+    batch_keywords = dict(zip(documents, batch_keywords))
+
+    results = BatchResult()
+    for record in records:
+        record_id = getattr(record, 'id', None)
+        if id(record) in spam_scores:
+            results.add_spam(record_id, as_document(record_text(record)).text, spam_scores[id(record)])
+            continue
+        document = documents[id(record)]
+        if not document.text.strip():
+            results.add_error(record_id, document.text, "Input text is empty.")
+            continue
+        try:
+            sentiment_result = sentiment_analyzer.analyze_sentiment(document)
+            if 'error' in sentiment_result:
+                results.add_error(record_id, document.text, sentiment_result['error'])
+                continue
+            keywords = batch_keywords[id(record)]
+            if keywords is None:
+                keywords = content_suggestor._extract_keywords(document, num_keywords=1)
+            results.add_analysis(record_id, document.text, sentiment_result['sentiment'],
+                                 sentiment_result['overall_sentiment'], keywords[0] if keywords else None)
+        except Exception as e:
+            results.add_error(record_id, document.text, str(e))
+    results.freeze()
+    return results if columnar else results.to_dicts()
+
+
+def _analyze_chunk_instrumented(chunk, noun_mode: str, keyword_mode: str, spam_threshold: float):
+    """analyze_chunk in a worker process, returning its stage timings and trending keyword sketch with the results."""
+    return analyze_chunk(chunk, noun_mode, keyword_mode, spam_threshold, columnar=True), profiling.drain(), trending.drain()
+
+
+def iter_chunks(iterable, size: int):
+    """Yields lists of up to `size` consecutive items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(records, sink, batch_size: int = 256, workers: int = 1, noun_mode: str = 'tagger',
+              keyword_mode: str = 'tfidf', spam_threshold: float = None, spam_action: str = 'drop',
+              on_chunk=None) -> dict:
+    """
+    Streams records through analyze_chunk and passes each result dict to `sink`, in input order.
+
+    Only a bounded number of chunks is read ahead (two per worker), so memory stays
+    constant for arbitrarily large or unbounded inputs.
+
+    Args:
+        records: Iterable of TweetRecords (or strings/Documents).
+        sink: Called with each result dict.
+        batch_size: Records per chunk.
+        workers: Worker processes; 1 analyses chunks in the calling process.
+        noun_mode: Passed to ContentSuggestor.
+        keyword_mode: Passed to extract_keywords_batch ('tfidf' or 'pos').
+        spam_threshold: If set, spam scored above it is not analysed (see analyze_chunk).
+        spam_action: 'drop' leaves spam out of the output, 'tag' passes its spam result to the sink.
+        on_chunk: Called with the running stats after each chunk's results have been passed to the sink
+            (e.g. a Checkpointer).
+
+    Returns:
+        {'processed', 'errors', 'spam', 'chunks', 'elapsed_seconds', 'throughput_per_second',
+        'spam_rate', 'estimated_seconds_saved'}. 'processed' includes spam; the time saved
+        is the spam count times the mean time per analysed text.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    from src.spam_filter import SPAM_ACTIONS
+    if spam_action not in SPAM_ACTIONS:
+        raise ValueError(f"Unknown spam action '{spam_action}'. Expected one of {SPAM_ACTIONS}.")
+
+    stats = {'processed': 0, 'errors': 0, 'spam': 0, 'chunks': 0}
+    start = time.monotonic()
+
+    def emit(results):
+        for result in results:
+            stats['processed'] += 1
+            if result.get('spam'):
+                stats['spam'] += 1
+                if spam_action == 'drop':
+                    continue
+            elif 'error' in result:
+                stats['errors'] += 1
+            sink(result)
+        stats['chunks'] += 1
+        if on_chunk is not None:
+            on_chunk(stats)
+
+    chunks = iter_chunks(records, batch_size)
+    instrumented = profiling.is_enabled() or trending.is_enabled()
+
+    def submit(executor, chunk):
+        if instrumented: # Bring the worker's stage timings and keyword counts back with its results
+            return executor.submit(_analyze_chunk_instrumented, chunk, noun_mode, keyword_mode, spam_threshold)
+        return executor.submit(analyze_chunk, chunk, noun_mode, keyword_mode, spam_threshold, True) # Columnar: cheap to send back
+
+    def collect(future):
+        if not instrumented:
+            return future.result()
+        results, timings, keywords = future.result()
+        profiling.merge(timings)
+        trending.merge(keywords)
+        return results
+
+    if workers == 1:
+        for chunk in chunks:
+            emit(analyze_chunk(chunk, noun_mode, keyword_mode, spam_threshold, columnar=True))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(submit(executor, chunk))
+                if len(pending) >= 2 * workers:
+                    emit(collect(pending.popleft()))
+            while pending:
+                emit(collect(pending.popleft()))
+
+    elapsed = time.monotonic() - start
+    stats['elapsed_seconds'] = elapsed
+    stats['throughput_per_second'] = stats['processed'] / elapsed if elapsed else 0.0
+    analysed = stats['processed'] - stats['spam']
+    stats['spam_rate'] = stats['spam'] / stats['processed'] if stats['processed'] else 0.0
+    stats['estimated_seconds_saved'] = stats['spam'] * elapsed / analysed if analysed else 0.0
+    return stats
+
+
+def write_json_atomic(path: str, state: dict):
+    """Atomically replaces the JSON file at `path` (written to a temporary file, fsynced and renamed)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def read_checkpoint(path: str):
+    """The checkpoint state at `path`, or None if there is none."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class Checkpointer:
+    """
+    Records how far a batch run has got, for run_batch's on_chunk.
+
+    At most every `interval` seconds (0: after every chunk), the sink is flushed and
+    a checkpoint is written with the number of input records whose results are all
+    in the sink, the sink's position after them and the running counts. Results of
+    chunks still in worker processes are not counted, so a checkpoint never claims
+    output that has not been written.
+    """
+
+    def __init__(self, path: str, sink, run: dict, interval: float = 30.0, resumed: dict = None):
+        """
+        Args:
+            path: Checkpoint file.
+            sink: Resumable ResultSink the results are written to.
+            run: What identifies the run (input, format, output and CHECKPOINT_OPTIONS), stored in each checkpoint.
+            interval: Minimum seconds between checkpoints.
+            resumed: The checkpoint this run resumes from, if any.
+        """
+        self.path = path
+        self.sink = sink
+        self.run = run
+        self.interval = interval
+        self.skipped = resumed['records_done'] if resumed else 0
+        self.base_counts = resumed['counts'] if resumed else dict.fromkeys(_COUNTS, 0)
+        self.saved = 0
+        self.save(dict.fromkeys(_COUNTS, 0)) # Marks where this run starts writing
+
+    def state(self, stats: dict, complete: bool = False) -> dict:
+        return {
+            'version': CHECKPOINT_VERSION,
+            **self.run,
+            'records_done': self.skipped + stats['processed'],
+            'sink_position': self.sink.position,
+            'counts': {name: self.base_counts[name] + stats[name] for name in _COUNTS},
+            'complete': complete,
+            'updated_at': time.time(),
+        }
+
+    def save(self, stats: dict, complete: bool = False):
+        if not complete:
+            self.sink.flush() # The position then covers every result passed to the sink
+        write_json_atomic(self.path, self.state(stats, complete))
+        self.saved += 1
+        self._last_save = time.monotonic()
+
+    def __call__(self, stats: dict):
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save(stats)
+
+    def finish(self, stats: dict):
+        """Marks the run complete; call after the sink is closed."""
+        self.save(stats, complete=True)
+
+
+def _checkpoint_mismatch(state: dict, run: dict) -> list:
+    """Names of the run settings that differ from the checkpoint's."""
+    mismatched = [name for name in ('input', 'format', 'output') if state.get(name) != run[name]]
+    options = state.get('options', {})
+    return mismatched + [name for name in CHECKPOINT_OPTIONS if options.get(name) != run['options'][name]]
+
+
+def _write_shard_stats(args, run: dict, shard, stats: dict, checkpointer: Checkpointer = None):
+    """Writes <output>.stats.json for src.sharding merge, with the counts over all resumed runs."""
+    from src.sharding import stats_path
+
+    counts = checkpointer.state(stats)['counts'] if checkpointer else {name: stats[name] for name in _COUNTS}
+    write_json_atomic(stats_path(args.output), {
+        **run,
+        'options': {name: value for name, value in run['options'].items() if name != 'shard'},
+        'shard': args.shard,
+        'index': shard.index,
+        'count': shard.count,
+        'input_records': shard.scanned,
+        'shard_records': shard.selected,
+        'counts': counts,
+        'rows': counts['processed'] - (counts['spam'] if args.spam_action == 'drop' else 0),
+        'elapsed_seconds': stats['elapsed_seconds'],
+        'complete': True,
+    })
+
+
+def build_parser(parser: argparse.ArgumentParser = None) -> argparse.ArgumentParser:
+    """Adds the batch options to `parser` (a new one if None)."""
+    if parser is None:
+        parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+        parser.add_argument('input', help="Input file ('-' for stdin).")
+    parser.add_argument('--format', choices=FORMATS, help="Input format (default: from the file extension).")
+    parser.add_argument('--output', help="Write results to this file: .sqlite/.db (SQLite), .parquet (needs pyarrow) "
+                                         "or JSONL for any other extension (default: JSONL to stdout).")
+    parser.add_argument('--flush-size', type=int, default=1000, help="Results per batched write to --output (default 1000).")
+    parser.add_argument('--flush-interval', type=float, default=1.0, help="Maximum seconds between writes to --output (default 1).")
+    parser.add_argument('--batch-size', type=int, default=256, help="Texts per chunk (default 256).")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes (default 1).")
+    parser.add_argument('--noun-mode', choices=['tagger', 'hybrid', 'lexicon'], default='tagger')
+    parser.add_argument('--keyword-mode', choices=['tfidf', 'pos'], default='tfidf')
+    parser.add_argument('--spam-threshold', type=float,
+                        help="Skip analysis of texts the spam model scores above this probability (e.g. 0.5).")
+    parser.add_argument('--spam-action', choices=['drop', 'tag'], default='drop',
+                        help="Leave spam out of the output (drop, default) or output it marked as spam (tag).")
+    parser.add_argument('--shard', metavar='I/N',
+                        help="Analyse only shard I (0-based) of N, by a stable hash of the record id or text; "
+                             "needs --output, next to which the shard's stats are written.")
+    parser.add_argument('--checkpoint', help="Checkpoint file (default: <output>.checkpoint.json).")
+    parser.add_argument('--checkpoint-interval', type=float, default=30.0,
+                        help="Seconds between checkpoints of a JSONL/SQLite --output (default 30; 0: every chunk).")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run from its checkpoint (same input, output and options).")
+    profiling.add_arguments(parser)
+    trending.add_arguments(parser)
+    return parser
+
+
+def run_from_args(args) -> int:
+    """Runs the batch mode for parsed arguments; returns the process exit code."""
+    try:
+        records = read_records(args.input, args.format)
+    except ValueError as e:
+        print(f"Cannot read {args.input}: {e}", file=sys.stderr)
+        return 1
+
+    shard = None
+    if args.shard:
+        from src.sharding import ShardFilter, parse_shard
+        try:
+            shard = ShardFilter(records, *parse_shard(args.shard))
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        if not args.output:
+            print("--shard needs --output.", file=sys.stderr)
+            return 1
+        records = shard
+
+    checkpoint_path = args.checkpoint or (args.output + '.checkpoint.json' if args.output else None)
+    run = {
+        'input': os.path.abspath(args.input) if args.input != '-' else '-',
+        'format': args.format or detect_format(args.input),
+        'output': os.path.abspath(args.output) if args.output else None,
+        'options': {name: getattr(args, name) for name in CHECKPOINT_OPTIONS},
+    }
+    resumed = None
+    if args.resume:
+        if not args.output or args.input == '-':
+            print("--resume needs an input file and --output.", file=sys.stderr)
+            return 1
+        try:
+            resumed = read_checkpoint(checkpoint_path)
+        except (OSError, ValueError) as e:
+            print(f"Cannot read the checkpoint {checkpoint_path}: {e}", file=sys.stderr)
+            return 1
+        if resumed is None:
+            print(f"No checkpoint at {checkpoint_path}; run without --resume to start over.", file=sys.stderr)
+            return 1
+        mismatched = _checkpoint_mismatch(resumed, run)
+        if mismatched:
+            print(f"Cannot resume: {', '.join(mismatched)} differ from the checkpointed run.", file=sys.stderr)
+            return 1
+        if resumed['complete']:
+            logging.info(f"{checkpoint_path}: the run is already complete ({resumed['records_done']} records).")
+            return 0
+
+    if shard is not None:
+        from src.sharding import stats_path
+        if os.path.exists(stats_path(args.output)): # Written again when this run completes
+            os.remove(stats_path(args.output))
+
+    checkpointer = None
+    if args.output:
+        from src.result_sink import open_result_sink
+        try:
+            sink = open_result_sink(args.output, flush_size=args.flush_size, flush_interval=args.flush_interval,
+                                    **({'resume_from': resumed['sink_position']} if resumed else {}))
+        except (ImportError, OSError, ValueError, sqlite3.Error) as e:
+            print(f"Cannot open {args.output}: {e}", file=sys.stderr)
+            return 1
+        if sink.resumable and args.input != '-':
+            try:
+                checkpointer = Checkpointer(checkpoint_path, sink, run, args.checkpoint_interval, resumed)
+            except (OSError, RuntimeError) as e:
+                sink.close()
+                print(f"Cannot write the checkpoint {checkpoint_path}: {e}", file=sys.stderr)
+                return 1
+        elif args.checkpoint:
+            sink.close()
+            print(f"{args.output} cannot be resumed, so it is not checkpointed.", file=sys.stderr)
+            return 1
+    else:
+        sink = lambda result: sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    if resumed:
+        logging.info(f"Resuming after {resumed['records_done']} records ({checkpoint_path}).")
+        records = itertools.islice(records, resumed['records_done'], None)
+
+    profiling.enable_from_args(args)
+    trending.enable_from_args(args)
+    try:
+        try:
+            stats = run_batch(records, sink, batch_size=args.batch_size, workers=args.workers,
+                              noun_mode=args.noun_mode, keyword_mode=args.keyword_mode,
+                              spam_threshold=args.spam_threshold, spam_action=args.spam_action,
+                              on_chunk=checkpointer)
+        finally:
+            if args.output:
+                sink.close() # Writes the last batch; raises if the writer failed
+            else:
+                sys.stdout.flush()
+            profiling.report_from_args(args)
+            trending.report_from_args(args)
+        if checkpointer is not None:
+            checkpointer.finish(stats)
+        if shard is not None:
+            _write_shard_stats(args, run, shard, stats, checkpointer)
+    except (OSError, RuntimeError, ValueError) as e: # Unreadable input, bad CSV header, analyzers not loaded, sink failed
+        print(f"Batch processing failed: {e}", file=sys.stderr)
+        return 1
+    logging.info(f"Processed {stats['processed']} texts ({stats['errors']} errors) in {stats['chunks']} chunks, "
+                 f"{stats['elapsed_seconds']:.2f}s ({stats['throughput_per_second']:.0f} texts/s).")
+    if args.spam_threshold is not None:
+        logging.info(f"Spam filter: {stats['spam']} texts flagged ({stats['spam_rate'] * 100:.1f}%), "
+                     f"estimated {stats['estimated_seconds_saved']:.2f}s of analysis saved.")
+    return 0
+
+
+def main(argv=None):
+    return run_from_args(build_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
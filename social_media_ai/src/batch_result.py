@@ -0,0 +1,171 @@
+# This file contains the columnar result type of batch analysis (a compact alternative to a list of result dicts).
+from array import array
+
+import numpy as np
+
+# Sentiment label codes; the negative codes mark results without a sentiment.
+LABELS = ('negative', 'neutral', 'positive')
+LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+ERROR = -1
+SPAM = -2
+# Range of the int64 id column; other ids (strings, larger ints) go to BatchResult.other_ids.
+_MIN_ID, _MAX_ID = -(1 << 63), (1 << 63) - 1
+# Columns of BatchResult.scores, in the key order of analyze_sentiment's 'sentiment' dict.
+SCORE_NAMES = ('compound', 'positive', 'negative', 'neutral')
+
+
+class BatchResult:
+    """
+    Sentiment results and suggestions of a batch of texts, stored column by column.
+
+    A list of analyze_and_suggest dicts costs well over a kilobyte per text (nested
+    dicts, float objects and a list of rendered suggestion strings). Here each text
+    takes a row of a float32 score matrix, an int8 label, an int32 keyword id into a
+    shared keyword table, an int64 id and its UTF-8 encoded text. Suggestions are not
+    stored: they are rendered from the label's templates and the keyword when a
+    result is accessed. Errors, spam scores and ids that are not int64 (e.g. the
+    string ids of the v2 API) are kept in small side tables.
+
+    Results are appended with add_analysis, add_error and add_spam, then the batch
+    is frozen into NumPy arrays. Indexing (or iterating) returns the same dicts as
+    main.analyze_and_suggest, built on access:
+
+        results = BatchResult()
+        results.add_analysis(7, "Great phone", {'compound': 0.6, ...}, 'positive', 'phone')
+        results.freeze()
+        results[0]['suggestions']
+    """
+
+    __slots__ = ('ids', 'has_id', 'scores', 'labels', 'keyword_ids', 'keywords', 'errors', 'spam_scores', 'other_ids',
+                 '_keyword_index', '_text_data', '_text_offsets', '_texts', '_frozen')
+
+    def __init__(self):
+        self.keywords = [] # Shared string table of keyword_ids
+        self._keyword_index = {}
+        self.errors = {} # index -> error message
+        self.spam_scores = {} # index -> spam score
+        self.other_ids = {} # index -> id that does not fit the int64 column
+        self._texts = []
+        self._frozen = False
+        # Columns are appended to compact arrays and become NumPy arrays in freeze().
+        self.ids = array('q')
+        self.has_id = array('b')
+        self.scores = array('f')
+        self.labels = array('b')
+        self.keyword_ids = array('i')
+
+    def _append(self, id, text: str, scores, label: int, keyword: str = None) -> int:
+        if self._frozen:
+            raise ValueError("Cannot add results to a frozen BatchResult.")
+        index = len(self.labels)
+        in_column = type(id) is int and _MIN_ID <= id <= _MAX_ID
+        if id is not None and not in_column:
+            self.other_ids[index] = id
+        self.ids.append(id if in_column else 0)
+        self.has_id.append(in_column)
+        self.scores.extend(scores)
+        self.labels.append(label)
+        if keyword is None:
+            self.keyword_ids.append(-1)
+        else:
+            keyword_id = self._keyword_index.get(keyword)
+            if keyword_id is None:
+                keyword_id = self._keyword_index[keyword] = len(self.keywords)
+                self.keywords.append(keyword)
+            self.keyword_ids.append(keyword_id)
+        self._texts.append(text.encode('utf-8'))
+        return index
+
+    def add_analysis(self, id, text: str, sentiment: dict, overall_sentiment: str, keyword: str = None):
+        """Appends an analysed text: its sentiment scores dict, label and top keyword (None if it has none)."""
+        self._append(id, text, [sentiment[name] for name in SCORE_NAMES], LABEL_CODES[overall_sentiment], keyword)
+
+    def add_error(self, id, text: str, error: str):
+        """Appends a text that could not be analysed."""
+        self.errors[self._append(id, text, (np.nan,) * len(SCORE_NAMES), ERROR)] = error
+
+    def add_spam(self, id, text: str, spam_score: float):
+        """Appends a text that was not analysed because it was scored as spam."""
+        self.spam_scores[self._append(id, text, (np.nan,) * len(SCORE_NAMES), SPAM)] = spam_score
+
+    def freeze(self):
+        """Converts the columns to NumPy arrays and packs the texts into one buffer. Returns self."""
+        if self._frozen:
+            return self
+        self.ids = np.frombuffer(self.ids, dtype=np.int64).copy()
+        self.has_id = np.frombuffer(self.has_id, dtype=np.int8).astype(bool)
+        self.scores = np.frombuffer(self.scores, dtype=np.float32).reshape(-1, len(SCORE_NAMES)).copy()
+        self.labels = np.frombuffer(self.labels, dtype=np.int8).copy()
+        self.keyword_ids = np.frombuffer(self.keyword_ids, dtype=np.int32).copy()
+        self._text_offsets = np.zeros(len(self._texts) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in self._texts], out=self._text_offsets[1:])
+        self._text_data = b''.join(self._texts)
+        self._texts = None
+        self._keyword_index = None
+        self._frozen = True
+        return self
+
+    def __len__(self):
+        return len(self.labels)
+
+    def text(self, index: int) -> str:
+        if not self._frozen:
+            return self._texts[index].decode('utf-8')
+        return self._text_data[self._text_offsets[index]:self._text_offsets[index + 1]].decode('utf-8')
+
+    def keyword(self, index: int):
+        keyword_id = self.keyword_ids[index]
+        return self.keywords[keyword_id] if keyword_id >= 0 else None
+
+    def suggestions(self, index: int) -> list[str]:
+        """The suggestions of an analysed text, rendered from its label's templates and keyword."""
+        from src.content_suggestion import render_suggestions
+
+        label = self.labels[index]
+        if label < 0:
+            return []
+        return render_suggestions(LABELS[label], self.keyword(index))
+
+    def __getitem__(self, index: int) -> dict:
+        """The result at `index` as an analyze_and_suggest dict."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("BatchResult index out of range")
+        result = {'id': int(self.ids[index]) if self.has_id[index] else self.other_ids.get(index), 'text': self.text(index)}
+        label = int(self.labels[index])
+        if label == ERROR:
+            result['error'] = self.errors[index]
+        elif label == SPAM:
+            result['spam'] = True
+            result['spam_score'] = self.spam_scores[index]
+        else:
+            result['overall_sentiment'] = LABELS[label]
+            # float32 keeps about 7 digits; VADER reports 4 decimals, which rounding restores exactly.
+            result['sentiment'] = {name: round(float(score), 4) for name, score in zip(SCORE_NAMES, self.scores[index])}
+            result['suggestions'] = self.suggestions(index)
+        return result
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def to_dicts(self) -> list[dict]:
+        return list(self)
+
+    def label_counts(self) -> dict:
+        """{'positive': n, 'negative': n, 'neutral': n, 'error': n, 'spam': n}, counted on the label column."""
+        labels = np.asarray(self.labels, dtype=np.int8)
+        counts = {label: int(np.count_nonzero(labels == code)) for code, label in enumerate(LABELS)}
+        counts['error'] = int(np.count_nonzero(labels == ERROR))
+        counts['spam'] = int(np.count_nonzero(labels == SPAM))
+        return counts
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory of the frozen columns, text buffer and keyword table, in bytes."""
+        self.freeze()
+        return (self.ids.nbytes + self.has_id.nbytes + self.scores.nbytes + self.labels.nbytes
+                + self.keyword_ids.nbytes + self._text_offsets.nbytes + len(self._text_data)
+                + sum(len(keyword) + 49 for keyword in self.keywords)
+                + sum(len(error) + 100 for error in self.errors.values()) + 60 * len(self.spam_scores)
+                + sum(len(str(id)) + 100 for id in self.other_ids.values()))
@@ -1,35 +1,58 @@
 # This file will contain the content suggestion module.
+import os
+import sys
 import nltk
 import string
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 from collections import Counter
 
-# Ensure necessary NLTK resources are available
-# These will be downloaded if not found when _extract_keywords is first called
-# or when the script is run directly (see if __name__ == "__main__")
-_NLTK_RESOURCES_DOWNLOADED = False
-
-def _ensure_nltk_resources():
-    global _NLTK_RESOURCES_DOWNLOADED
-    if _NLTK_RESOURCES_DOWNLOADED:
-        return
-    try:
-        nltk.data.find('corpora/stopwords')
-    except nltk.downloader.DownloadError:
-        print("Downloading NLTK stopwords...")
-        nltk.download('stopwords', quiet=True)
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except nltk.downloader.DownloadError:
-        print("Downloading NLTK punkt...")
-        nltk.download('punkt', quiet=True)
-    try:
-        nltk.data.find('taggers/averaged_perceptron_tagger')
-    except nltk.downloader.DownloadError:
-        print("Downloading NLTK averaged_perceptron_tagger...")
-        nltk.download('averaged_perceptron_tagger', quiet=True)
-    _NLTK_RESOURCES_DOWNLOADED = True
+if not __package__: # Allow direct execution (python src/content_suggestion.py)
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.document import Document
+from src.tweet_record import TweetBatch, record_text
+from src.nltk_resources import ensure_nltk_resources
+from src.noun_lexicon import DEFAULT_LEXICON_PATH, load_noun_lexicon
+from src import profiling, trending
+
+# Reply suggestions per overall sentiment. {topic} and {aspect} are filled with the
+# text's top keyword, or with generic words if it has none (see render_suggestions).
+SUGGESTION_TEMPLATES = {
+    'positive': (
+        "Amplify this! Try: 'This is great! Fully agree with the point about {aspect}.'",
+        "Share the positivity: 'Love this perspective! What does everyone else think?'",
+        "Engage further: 'Awesome point! Could you tell us more about {aspect}?'",
+        "Consider adding a relevant positive emoji to your response! e.g., 👍, 🎉, 😊",
+    ),
+    'negative': (
+        "Acknowledge and offer help: 'We're sorry to hear about your experience with {topic}. Please DM us your details so we can assist.'",
+        "Show understanding: 'Thanks for bringing this to our attention. We understand your frustration regarding {topic} and are looking into it.'",
+        "Offer to take it private: 'This is important. To resolve it, could you please contact our support at [support@example.com/link] or DM us?'",
+    ),
+    'neutral': (
+        "Spark discussion: 'Interesting point. What are your thoughts on how this impacts {topic} or a related area?'",
+        "Add a call to action: 'Good overview. For those interested, learn more here: [your_link_here] or What's your key takeaway?'",
+        "Invite perspectives: 'This is a balanced view. We'd love to hear different perspectives on this!'",
+    ),
+}
+
+
+@profiling.timed('render')
+def render_suggestions(overall_sentiment: str, keyword: str = None) -> list[str]:
+    """The suggestions for a sentiment label, with the keyword (or generic words) filled in."""
+    templates = SUGGESTION_TEMPLATES.get(overall_sentiment)
+    if templates is None:
+        return [f"Warning: Unknown sentiment '{overall_sentiment}'. No specific suggestions available."]
+    return [template.format(topic=keyword or "this topic", aspect=keyword or "this point") for template in templates]
+
+
+def _ensure_nltk_resources(names=('stopwords', 'punkt', 'averaged_perceptron_tagger')):
+    """
+    Verifies the NLTK resources needed for keyword extraction are installed locally
+    (once per process, no downloads). Raises MissingNLTKResourceError otherwise.
+    """
+    ensure_nltk_resources(names)
 
 
 class ContentSuggestor:
@@ -38,41 +61,106 @@ class ContentSuggestor:
     Suggestions are more specific and aim to be actionable.
     """
 
-    def _extract_keywords(self, text: str, num_keywords: int = 1) -> list[str]:
-        """
-        Extracts simple keywords from the text.
-        Prioritizes nouns, then other significant words if nouns are scarce.
+    NOUN_MODES = ('tagger', 'hybrid', 'lexicon')
+
+    def __init__(self, noun_mode: str = 'tagger', noun_lexicon_path: str = None):
         """
-        _ensure_nltk_resources() # Ensure resources are downloaded before use
+        Initializes the ContentSuggestor.
 
-        if not text:
+        Args:
+            noun_mode: How _extract_keywords decides which tokens are nouns (speed/quality trade-off):
+                       'tagger'  - NLTK's averaged perceptron tagger on every text (default, slowest).
+                       'hybrid'  - the precomputed noun lexicon, with the tagger used only for
+                                   texts containing words the lexicon does not know.
+                       'lexicon' - the precomputed noun lexicon only; unknown words (names,
+                                   hashtags, slang) are treated as nouns. Never loads the tagger.
+            noun_lexicon_path: Optional path to a lexicon built with src.noun_lexicon.
+                               Defaults to the lexicon shipped in src/resources.
+        """
+        if noun_mode not in self.NOUN_MODES:
+            raise ValueError(f"Unknown noun mode '{noun_mode}'. Expected one of {', '.join(self.NOUN_MODES)}.")
+        self.noun_mode = noun_mode
+        self.noun_lexicon_path = noun_lexicon_path or DEFAULT_LEXICON_PATH
+        self._stop_words = None
+
+    def _required_resources(self) -> tuple:
+        """The NLTK resources per-text keyword extraction needs in the configured noun mode."""
+        if self.noun_mode == 'lexicon':
+            return ('stopwords', 'punkt')
+        return ('stopwords', 'punkt', 'averaged_perceptron_tagger')
+
+    def _filter_tokens(self, text) -> list[str]:
+        """
+        Tokenizes and lowercases the text, then removes punctuation, stopwords and short words.
+        If a Document is given, its cached tokens are reused instead of tokenizing again.
+        """
+        if isinstance(text, Document):
+            tokens = text.tokens
+        elif not text:
             return []
-
-        # Tokenize and convert to lowercase
-        tokens = word_tokenize(text.lower())
+        else:
+            # Tokenize and convert to lowercase
+            with profiling.timer('tokenize'):
+                tokens = word_tokenize(text.lower())
 
         # Remove punctuation and stopwords
-        stop_words = set(stopwords.words('english'))
-        punct = set(string.punctuation)
-        filtered_tokens = [
+        if self._stop_words is None:
+            self._stop_words = set(stopwords.words('english')) | set(string.punctuation)
+        stop_words = self._stop_words
+        return [
             token for token in tokens 
-            if token not in stop_words and token not in punct and len(token) > 2 # Min word length
+            if token not in stop_words and len(token) > 2 # Min word length
         ]
 
-        if not filtered_tokens:
+    def _find_nouns(self, tokens: list[str]) -> list[str]:
+        """
+        Returns the tokens that are nouns, in order, according to the configured noun mode.
+        """
+        if self.noun_mode == 'tagger':
+            with profiling.timer('pos_tag'):
+                tagged_tokens = nltk.pos_tag(tokens)
+            return [word for word, tag in tagged_tokens if tag.startswith('NN')]
+
+        lexicon = load_noun_lexicon(self.noun_lexicon_path)
+        lookups = [lexicon.is_noun(token) for token in tokens]
+
+        if self.noun_mode == 'hybrid' and None in lookups:
+            # Tag the whole text (not just the unknown words) so the tagger keeps its context.
+            with profiling.timer('pos_tag'):
+                tagged_tokens = nltk.pos_tag(tokens)
+            return [
+                word for (word, tag), looked_up in zip(tagged_tokens, lookups)
+                if (tag.startswith('NN') if looked_up is None else looked_up)
+            ]
+
+        return [token for token, looked_up in zip(tokens, lookups) if looked_up is not False]
+
+    @profiling.timed('keywords')
+    def _extract_keywords(self, text, num_keywords: int = 1) -> list[str]:
+        """
+        Extracts simple keywords from the text (a string, Document or TweetRecord).
+        Prioritizes nouns, then other significant words if nouns are scarce.
+        """
+        text = record_text(text)
+        _ensure_nltk_resources(self._required_resources()) # Ensure resources are installed before use
+
+        if not (text.text if isinstance(text, Document) else text):
             return []
 
-        # Part-of-speech tagging
-        tagged_tokens = nltk.pos_tag(filtered_tokens)
+        filtered_tokens = self._filter_tokens(text)
+
+        if not filtered_tokens:
+            return []
 
         # Prioritize nouns
-        nouns = [word for word, tag in tagged_tokens if tag.startswith('NN')]
+        nouns = self._find_nouns(filtered_tokens)
         
         if nouns:
             # Most common nouns
             noun_counts = Counter(nouns)
             top_nouns = [word for word, count in noun_counts.most_common(num_keywords)]
             if top_nouns:
+                trending.record(top_nouns)
                 return top_nouns
 
         # Fallback: most common words if no nouns found or preferred nouns are not enough
@@ -80,11 +168,86 @@ class ContentSuggestor:
         if not nouns: # Or if you want to supplement nouns
             word_counts = Counter(filtered_tokens)
             top_words = [word for word, count in word_counts.most_common(num_keywords)]
+            trending.record(top_words)
             return top_words
             
         return [] # Should not be reached if filtered_tokens is not empty
 
-    def suggest_content(self, sentiment_analysis_result: dict) -> dict:
+    @profiling.timed('keywords_batch')
+    def extract_keywords_batch(self, texts: list, num_keywords: int = 1, mode: str = 'tfidf') -> list[list[str]]:
+        """
+        Extracts keywords for a whole batch of texts (e.g., a page of fetched tweets).
+
+        In 'tfidf' mode a single sparse TF-IDF matrix is built over the batch and each
+        text's top terms are taken from its row, so words that are frequent in one text
+        but rare across the batch rank highest. No POS tagging is done in this mode.
+        In 'pos' mode (or if scikit-learn is not installed) each text goes through
+        _extract_keywords individually. Either way the keywords are counted by the
+        trending tracker when it is enabled (see src.trending).
+
+        Args:
+            texts: The texts (strings, Documents or TweetRecords, or a TweetBatch) to extract
+                   keywords from. If every item is a Document, the TF-IDF matrix is built
+                   from their cached tokens.
+            num_keywords: The maximum number of keywords to return per text.
+            mode: 'tfidf' (default) or 'pos'.
+
+        Returns:
+            A list with one list of keywords per input text, in input order.
+        """
+        if mode not in ('tfidf', 'pos'):
+            raise ValueError(f"Unknown keyword extraction mode '{mode}'. Expected 'tfidf' or 'pos'.")
+        texts = texts.texts() if isinstance(texts, TweetBatch) else [record_text(text) for text in texts]
+        if not texts:
+            return []
+
+        if mode == 'tfidf':
+            try:
+                import numpy as np
+                from sklearn.feature_extraction.text import TfidfVectorizer
+            except ImportError:
+                mode = 'pos'
+
+        if mode == 'pos':
+            return [self._extract_keywords(text, num_keywords=num_keywords) for text in texts]
+
+        _ensure_nltk_resources(('stopwords', 'punkt') if all(isinstance(text, Document) for text in texts) else ('stopwords',))
+
+        if all(isinstance(text, Document) for text in texts):
+            vectorizer = TfidfVectorizer(analyzer=self._filter_tokens)
+            inputs = texts
+        else:
+            vectorizer = TfidfVectorizer(
+                lowercase=True,
+                stop_words=list(stopwords.words('english')),
+                token_pattern=r"(?u)\b\w\w\w+\b", # Same min word length as _extract_keywords
+            )
+            inputs = [
+                text.text if isinstance(text, Document) else text if isinstance(text, str) else ""
+                for text in texts
+            ]
+        try:
+            matrix = vectorizer.fit_transform(inputs).tocsr()
+        except ValueError: # Empty vocabulary: every text is empty or only stopwords
+            return [[] for _ in texts]
+        terms = vectorizer.get_feature_names_out()
+
+        # Rank the non-zero entries of every row at once: sort by row, then by
+        # descending score (ties broken alphabetically via the term index), and keep
+        # the first num_keywords entries of each row.
+        row_ids = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+        order = np.lexsort((matrix.indices, -matrix.data, row_ids))
+        ranks = np.arange(order.size) - matrix.indptr[row_ids[order]]
+        top = order[ranks < num_keywords]
+
+        keywords = [[] for _ in texts]
+        for row, term in zip(row_ids[top].tolist(), terms[matrix.indices[top]].tolist()):
+            keywords[row].append(term)
+        trending.record(terms[matrix.indices[top]].tolist())
+        return keywords
+
+    @profiling.timed('suggest')
+    def suggest_content(self, sentiment_analysis_result: dict, keywords: list[str] = None, document: Document = None) -> dict:
         """
         Generates specific content suggestions based on the overall sentiment of a text,
         incorporating extracted keywords where possible.
@@ -93,6 +256,10 @@ class ContentSuggestor:
             sentiment_analysis_result: A dictionary containing the output from
                                        SentimentAnalyzer.analyze_sentiment.
                                        Expected keys: 'overall_sentiment', 'text'.
+            keywords: Optional precomputed keywords for the text (e.g., from
+                      extract_keywords_batch). If None, they are extracted here.
+            document: Optional Document for the analysed text. If given, keyword
+                      extraction reuses its cached tokenization.
 
         Returns:
             A dictionary containing the original sentiment analysis result
@@ -115,34 +282,9 @@ class ContentSuggestor:
         overall_sentiment = sentiment_analysis_result['overall_sentiment']
         original_text = sentiment_analysis_result['text']
         
-        keywords = self._extract_keywords(original_text, num_keywords=1)
-        keyword_topic = keywords[0] if keywords else "this topic"
-        keyword_aspect = keywords[0] if keywords else "this point"
-
-
-        suggestions = []
-
-        if overall_sentiment == 'positive':
-            suggestions.extend([
-                f"Amplify this! Try: 'This is great! Fully agree with the point about {keyword_aspect}.'",
-                "Share the positivity: 'Love this perspective! What does everyone else think?'",
-                f"Engage further: 'Awesome point! Could you tell us more about {keyword_aspect}?'",
-                "Consider adding a relevant positive emoji to your response! e.g., 👍, 🎉, 😊"
-            ])
-        elif overall_sentiment == 'negative':
-            suggestions.extend([
-                f"Acknowledge and offer help: 'We're sorry to hear about your experience with {keyword_topic}. Please DM us your details so we can assist.'",
-                f"Show understanding: 'Thanks for bringing this to our attention. We understand your frustration regarding {keyword_topic} and are looking into it.'",
-                "Offer to take it private: 'This is important. To resolve it, could you please contact our support at [support@example.com/link] or DM us?'"
-            ])
-        elif overall_sentiment == 'neutral':
-            suggestions.extend([
-                f"Spark discussion: 'Interesting point. What are your thoughts on how this impacts {keyword_topic} or a related area?'",
-                "Add a call to action: 'Good overview. For those interested, learn more here: [your_link_here] or What's your key takeaway?'",
-                "Invite perspectives: 'This is a balanced view. We'd love to hear different perspectives on this!'"
-            ])
-        else:
-            suggestions.append(f"Warning: Unknown sentiment '{overall_sentiment}'. No specific suggestions available.")
+        if keywords is None:
+            keywords = self._extract_keywords(document if document is not None else original_text, num_keywords=1)
+        suggestions = render_suggestions(overall_sentiment, keywords[0] if keywords else None)
 
         return {
             'original_analysis': sentiment_analysis_result,
@@ -151,8 +293,8 @@ class ContentSuggestor:
 
 if __name__ == "__main__":
     print("--- Ensuring NLTK Resources for ContentSuggestor ---")
-    _ensure_nltk_resources() # Download resources if running standalone
-    print("NLTK resources check/download complete.")
+    _ensure_nltk_resources() # Fails with a report if resources are not installed
+    print("NLTK resources check complete.")
     print("----------------------------------------------------")
 
 
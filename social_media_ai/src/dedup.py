@@ -0,0 +1,239 @@
+# This file contains the retweet and near-duplicate collapsing stage run before analysis.
+import re
+import hashlib
+from collections import OrderedDict
+
+from src.tweet_record import TweetRecord, record_text
+
+_RETWEET_PREFIX = re.compile(r'^(?:RT\s+@\w+:\s*)+', re.IGNORECASE)
+_URL = re.compile(r'https?://\S+|www\.\S+', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+_WORD = re.compile(r'\w+')
+
+# Fingerprint size, character n-gram size of the SimHash features, and the default
+# Hamming distance treated as "near-duplicate". On tweet-length texts, copies with a
+# word changed or a hashtag/emoji appended land within about 8 bits, while unrelated
+# texts (even on the same topic) are typically 20+ bits apart.
+SIMHASH_BITS = 64
+NGRAM_SIZE = 5
+DEFAULT_MAX_DISTANCE = 10
+# Texts with fewer n-grams than this are only collapsed on exact matches: the
+# fingerprints of very short texts are too coarse ("I love it" vs "I hate it").
+MIN_FEATURES = 16
+
+_POPCOUNT = None
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes a tweet for duplicate detection: strips leading 'RT @user:' prefixes and
+    URLs (t.co links differ between copies) and collapses whitespace.
+    """
+    text = _RETWEET_PREFIX.sub('', text)
+    text = _URL.sub('', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def content_hash(normalized: str) -> bytes:
+    """Exact-match key of a normalized text."""
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+
+def _features(normalized: str) -> list[str]:
+    """Character n-grams of the lowercased words, ignoring punctuation and emoji."""
+    text = ' '.join(_WORD.findall(normalized.lower()))
+    return [text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)]
+
+
+def simhash(features: list[str]) -> int:
+    """
+    64-bit SimHash of a list of features: each bit of the fingerprint is the majority
+    vote of that bit over the features' hashes, so similar texts get fingerprints that
+    differ in few bits.
+    """
+    if not features:
+        return 0
+    import numpy as np
+
+    digests = b''.join(hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest() for f in features)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(features), SIMHASH_BITS)
+    majority = bits.sum(axis=0) * 2 > len(features)
+    return int.from_bytes(np.packbits(majority).tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def _hamming_distances(fingerprints, fingerprint: int):
+    """Hamming distances between one fingerprint and a uint64 array of fingerprints."""
+    global _POPCOUNT
+    import numpy as np
+
+    if _POPCOUNT is None:
+        _POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    differences = np.bitwise_xor(fingerprints, np.uint64(fingerprint))
+    return _POPCOUNT[differences.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class Cluster:
+    """
+    A group of duplicate texts within one batch passed to Deduplicator.group.
+
+    Attributes:
+        id: Cluster id, stable across batches for the lifetime of the Deduplicator.
+        members: The items of this batch in the cluster, in input order.
+        representative: The item to analyse (the first member).
+        is_new: True if the cluster was first seen in this batch.
+        total: Number of items assigned to the cluster so far, over all batches.
+    """
+
+    __slots__ = ('id', 'members', 'is_new', 'total')
+
+    def __init__(self, id: int, is_new: bool, total: int):
+        self.id = id
+        self.members = []
+        self.is_new = is_new
+        self.total = total
+
+    @property
+    def representative(self):
+        return self.members[0]
+
+    @property
+    def multiplicity(self) -> int:
+        """Number of members in this batch."""
+        return len(self.members)
+
+    def __repr__(self):
+        return f"Cluster(id={self.id}, multiplicity={self.multiplicity}, total={self.total})"
+
+
+class Deduplicator:
+    """
+    Assigns texts (strings, Documents or TweetRecords) to duplicate clusters.
+
+    Two items share a cluster if any of these hold:
+        - their normalized texts are identical (exact hash);
+        - one is a retweet of the other, or both retweet the same tweet (TweetRecords);
+        - their SimHash fingerprints differ in at most max_distance bits (near-duplicates,
+          only for texts with at least MIN_FEATURES character n-grams).
+
+    Fingerprints are kept in a fixed-size NumPy ring buffer and compared to a new
+    fingerprint in one vectorized pass. State is kept across batches (e.g., pages of
+    a stream) for up to max_clusters clusters; the oldest clusters are forgotten first.
+    """
+
+    def __init__(self, near_duplicates: bool = True, max_distance: int = DEFAULT_MAX_DISTANCE,
+                 max_clusters: int = 10_000):
+        self.near_duplicates = near_duplicates
+        self.max_distance = max_distance
+        self.max_clusters = max_clusters
+        self._keys = {} # exact key -> cluster id
+        self._clusters = OrderedDict() # cluster id -> [keys, total]
+        self._next_id = 0
+        self._fingerprints = None # ring buffer slot -> fingerprint (uint64)
+        self._slot_ids = None # ring buffer slot -> cluster id, -1 if unused
+
+    def __len__(self):
+        return len(self._clusters)
+
+    def _find_near_duplicate(self, fingerprint: int):
+        if self._fingerprints is None:
+            return None
+        distances = _hamming_distances(self._fingerprints, fingerprint)
+        distances[self._slot_ids < 0] = SIMHASH_BITS + 1
+        slot = int(distances.argmin())
+        return int(self._slot_ids[slot]) if distances[slot] <= self.max_distance else None
+
+    def _new_cluster(self, fingerprint) -> int:
+        if len(self._clusters) >= self.max_clusters:
+            cluster_id, (keys, _) = self._clusters.popitem(last=False)
+            for key in keys:
+                if self._keys.get(key) == cluster_id:
+                    del self._keys[key]
+        cluster_id = self._next_id
+        self._next_id += 1
+        self._clusters[cluster_id] = [[], 0]
+        if self._slot_ids is not None:
+            # The slot belonged to the cluster evicted above (ids are sequential)
+            self._slot_ids[cluster_id % self.max_clusters] = -1
+        if fingerprint is not None:
+            if self._fingerprints is None:
+                import numpy as np
+                self._fingerprints = np.zeros(self.max_clusters, dtype=np.uint64)
+                self._slot_ids = np.full(self.max_clusters, -1, dtype=np.int64)
+            slot = cluster_id % self.max_clusters
+            self._fingerprints[slot] = fingerprint
+            self._slot_ids[slot] = cluster_id
+        return cluster_id
+
+    def assign(self, item) -> tuple:
+        """Assigns one item to a cluster. Returns (cluster id, True if the cluster is new)."""
+        text = record_text(item)
+        text = getattr(text, 'text', text) # Document
+        normalized = normalize_text(text or '')
+        keys = [content_hash(normalized)]
+        if isinstance(item, TweetRecord) and item.id is not None:
+            keys.append(('tweet', item.retweet_of_id if item.retweet_of_id is not None else item.id))
+
+        cluster_id = next((self._keys[key] for key in keys if key in self._keys), None)
+        is_new = False
+        if cluster_id is None:
+            fingerprint = None
+            if self.near_duplicates:
+                features = _features(normalized)
+                if len(features) >= MIN_FEATURES:
+                    fingerprint = simhash(features)
+                    cluster_id = self._find_near_duplicate(fingerprint)
+            if cluster_id is None:
+                cluster_id = self._new_cluster(fingerprint)
+                is_new = True
+
+        cluster = self._clusters[cluster_id]
+        for key in keys:
+            if key not in self._keys:
+                self._keys[key] = cluster_id
+                cluster[0].append(key)
+        cluster[1] += 1
+        return cluster_id, is_new
+
+    def group(self, items) -> list[Cluster]:
+        """
+        Groups a batch of items into clusters, in order of first appearance.
+        Each cluster's representative is the first member of this batch.
+        """
+        clusters = {}
+        for item in items:
+            cluster_id, is_new = self.assign(item)
+            cluster = clusters.get(cluster_id)
+            if cluster is None:
+                cluster = clusters[cluster_id] = Cluster(cluster_id, is_new, 0)
+            cluster.members.append(item)
+        for cluster in clusters.values():
+            cluster.total = self._clusters[cluster.id][1] if cluster.id in self._clusters else cluster.multiplicity
+        return list(clusters.values())
+
+
+def analyze_collapsed(items, analyze, deduplicator: Deduplicator = None) -> list[tuple]:
+    """
+    Runs `analyze(representative)` once per duplicate cluster and fans the result out.
+
+    Args:
+        items: The batch of texts, Documents or TweetRecords.
+        analyze: Called with each cluster's representative.
+        deduplicator: Deduplicator to use (a fresh one if None). Pass the same one for
+                      consecutive batches to collapse duplicates across them too.
+
+    Returns:
+        One (item, result, multiplicity) tuple per input item, in input order, where
+        multiplicity is the size of the item's cluster in this batch.
+    """
+    deduplicator = deduplicator if deduplicator is not None else Deduplicator()
+    items = list(items)
+    outputs = {}
+    for cluster in deduplicator.group(items):
+        result = analyze(cluster.representative)
+        for member in cluster.members:
+            outputs[id(member)] = (member, result, cluster.multiplicity)
+    return [outputs[id(item)] for item in items]
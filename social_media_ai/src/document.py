@@ -0,0 +1,48 @@
+# This file contains the shared Document representation passed between analysis stages.
+from nltk.tokenize import word_tokenize
+
+from src import profiling
+
+
+class Document:
+    """
+    One input text, tokenized at most once and shared by every analysis stage.
+
+    The lowercased text and the word_tokenize tokens of the lowercased text are
+    computed lazily on first access and cached, so keyword extraction (per text and
+    batch TF-IDF) and content suggestions tokenize a text once between them.
+    Sentiment analysis and spam scoring only read the original text.
+    """
+
+    __slots__ = ('text', '_normalized', '_tokens')
+
+    def __init__(self, text: str):
+        self.text = text
+        self._normalized = None
+        self._tokens = None
+
+    @property
+    def normalized(self) -> str:
+        """The lowercased text."""
+        if self._normalized is None:
+            self._normalized = self.text.lower()
+        return self._normalized
+
+    @property
+    def tokens(self) -> list[str]:
+        """The tokens of the lowercased text, as produced by nltk's word_tokenize."""
+        if self._tokens is None:
+            if self.text:
+                with profiling.timer('tokenize'):
+                    self._tokens = word_tokenize(self.normalized)
+            else:
+                self._tokens = []
+        return self._tokens
+
+    def __repr__(self):
+        return f"Document({self.text!r})"
+
+
+def as_document(text) -> Document:
+    """Returns the input unchanged if it is already a Document, otherwise wraps the string."""
+    return text if isinstance(text, Document) else Document(text)
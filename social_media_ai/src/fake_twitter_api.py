@@ -0,0 +1,343 @@
+"""
+Local fake of the Twitter v1.1 search API for offline tests and load tests.
+
+The server answers the two endpoints TwitterClient uses (account/verify_credentials
+and search/tweets) with max_id/since_id/count pagination, x-rate-limit-* headers,
+429 responses once the per-window quota is spent, and a configurable per-request
+latency. Tweets are either synthetic (deterministic per query) or replayed from a
+recording of real API responses.
+
+Point TwitterClient at it with TWITTER_API_BASE_URL=http://127.0.0.1:<port> (the
+credential environment variables must still be set, to any value).
+Record real responses with TWITTER_RECORD_PATH=<file.jsonl>.
+
+Usage (from the social_media_ai directory):
+    python -m src.fake_twitter_api --port 8080 --tweets-per-query 5000 --latency 0.05
+    python -m src.fake_twitter_api --port 8080 --replay data/recorded_search.jsonl
+"""
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Standard search limits for user auth: 180 requests per 15-minute window.
+DEFAULT_RATE_LIMIT = 180
+DEFAULT_WINDOW_SECONDS = 15 * 60
+MAX_COUNT = 100
+DEFAULT_COUNT = 15
+
+_TEMPLATES = [
+    "I love the new {topic} update, it is amazing!",
+    "Really disappointed with {topic} today. Worst experience ever.",
+    "Reading about {topic} this morning.",
+    "Is anyone else having trouble with {topic}? The service keeps failing.",
+    "Great talk on {topic} at the conference, learned a lot about performance.",
+    "{topic} release notes are out, check the changelog.",
+    "Not sure how I feel about the {topic} pricing changes.",
+    "Thanks to the {topic} community for the fantastic support!",
+]
+_CREATED_AT_FORMAT = "%a %b %d %H:%M:%S +0000 %Y"
+
+
+def _synthetic_statuses(query: str, count: int, seed: int = 0, retweet_ratio: float = 0.1) -> list[dict]:
+    """
+    Deterministic synthetic search results for a query, newest first, as v1.1 JSON dicts.
+    A fraction of the tweets are retweets of earlier ones (text prefixed with 'RT @user: ').
+    """
+    rng = random.Random(f"{seed}:{query}")
+    topic = query.lstrip('#@') or "this"
+    base_id = 1_500_000_000_000_000_000
+    base_time = 1_700_000_000
+    statuses = []
+    for index in range(count):
+        tweet_id = base_id + index * 1000 + rng.randrange(1000)
+        status = {
+            'id': tweet_id,
+            'id_str': str(tweet_id),
+            'created_at': datetime.fromtimestamp(base_time + index * 30, timezone.utc).strftime(_CREATED_AT_FORMAT),
+            'full_text': rng.choice(_TEMPLATES).format(topic=topic),
+            'lang': 'en',
+            'user': {'id': 1000 + rng.randrange(500)},
+            'entities': {'hashtags': [], 'user_mentions': [], 'urls': []},
+        }
+        status['user']['id_str'] = str(status['user']['id'])
+        status['user']['screen_name'] = f"user{status['user']['id']}"
+        if statuses and rng.random() < retweet_ratio:
+            original = rng.choice(statuses)
+            status['retweeted_status'] = original
+            status['full_text'] = f"RT @{original['user']['screen_name']}: {original['full_text']}"
+        statuses.append(status)
+    statuses.reverse() # Newest first, like the search API
+    return statuses
+
+
+def _render(status: dict, tweet_mode: str) -> dict:
+    """Returns the status as the API would for the tweet_mode ('extended' has full_text, 'compat' a truncated text)."""
+    status = dict(status)
+    full_text = status.pop('full_text', None) or status.pop('text', '')
+    status.pop('text', None)
+    if tweet_mode == 'extended':
+        status['full_text'] = full_text
+        status['display_text_range'] = [0, len(full_text)]
+    else:
+        status['text'] = full_text[:140]
+        status['truncated'] = len(full_text) > 140
+    if isinstance(status.get('retweeted_status'), dict):
+        status['retweeted_status'] = _render(status['retweeted_status'], tweet_mode)
+    return status
+
+
+class FakeTwitterAPI:
+    """
+    The state behind the fake server: the tweet corpus, rate-limit window and latency.
+    Thread-safe; one instance can serve many concurrent requests.
+    """
+
+    def __init__(self, tweets_per_query: int = 1000, latency: float = 0.0, rate_limit: int = DEFAULT_RATE_LIMIT,
+                 window_seconds: float = DEFAULT_WINDOW_SECONDS, corpus: dict = None, seed: int = 0):
+        """
+        Args:
+            tweets_per_query: Number of synthetic tweets generated for a query not in `corpus`.
+                              0 serves only the corpus (unknown queries return no tweets).
+            latency: Seconds to wait before answering each request.
+            rate_limit: Search requests allowed per window (None disables rate limiting).
+            window_seconds: Length of the rate-limit window.
+            corpus: {query: list of v1.1 status dicts} served instead of synthetic tweets.
+            seed: Seed for the synthetic tweets.
+        """
+        self.tweets_per_query = tweets_per_query
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window_seconds = window_seconds
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._corpus = {}
+        for query, statuses in (corpus or {}).items():
+            self.add_statuses(query, statuses)
+        self._window_reset = time.time() + window_seconds
+        self._window_used = 0
+        self.request_count = 0
+        self.rejected_count = 0
+
+    @classmethod
+    def from_recording(cls, path: str, **kwargs):
+        """
+        Builds a fake API that replays the tweets captured by record_responses.
+        Every recorded status is served for its query, deduplicated and paginated anew,
+        so replays work with any page size.
+        """
+        corpus = {}
+        with open(path, encoding='utf-8') as recording:
+            for line in recording:
+                if line.strip():
+                    entry = json.loads(line)
+                    corpus.setdefault(entry['params']['q'], []).extend(entry['response'].get('statuses', []))
+        kwargs.setdefault('tweets_per_query', 0)
+        return cls(corpus=corpus, **kwargs)
+
+    def add_statuses(self, query: str, statuses):
+        """Adds status dicts to a query's corpus (deduplicated by id, kept newest first)."""
+        with self._lock:
+            merged = {status['id']: status for status in self._corpus.get(query, [])}
+            merged.update((status['id'], status) for status in statuses)
+            self._corpus[query] = sorted(merged.values(), key=lambda status: status['id'], reverse=True)
+
+    def _statuses(self, query: str) -> list[dict]:
+        if query not in self._corpus and self.tweets_per_query:
+            self._corpus[query] = _synthetic_statuses(query, self.tweets_per_query, self.seed)
+        return self._corpus.get(query, [])
+
+    def _take_quota(self) -> tuple:
+        """Counts one search request. Returns (allowed, rate-limit headers)."""
+        with self._lock:
+            self.request_count += 1
+            if self.rate_limit is None:
+                return True, {}
+            now = time.time()
+            if now >= self._window_reset:
+                self._window_reset = now + self.window_seconds
+                self._window_used = 0
+            allowed = self._window_used < self.rate_limit
+            if allowed:
+                self._window_used += 1
+            else:
+                self.rejected_count += 1
+            headers = {
+                'x-rate-limit-limit': str(self.rate_limit),
+                'x-rate-limit-remaining': str(self.rate_limit - self._window_used),
+                # tweepy parses the reset time as an integer; round up so clients never retry early.
+                'x-rate-limit-reset': str(int(-(-self._window_reset // 1))),
+            }
+            return allowed, headers
+
+    def search(self, params: dict) -> tuple:
+        """
+        Answers a search/tweets request. Returns (HTTP status, headers, JSON body).
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        allowed, headers = self._take_quota()
+        if not allowed:
+            return 429, headers, {'errors': [{'code': 88, 'message': 'Rate limit exceeded'}]}
+        query = params.get('q')
+        if not query:
+            return 400, headers, {'errors': [{'code': 25, 'message': 'Query parameters are missing.'}]}
+        try:
+            count = min(int(params.get('count', DEFAULT_COUNT)), MAX_COUNT)
+            max_id = int(params['max_id']) if 'max_id' in params else None
+            since_id = int(params['since_id']) if 'since_id' in params else None
+        except ValueError:
+            return 400, headers, {'errors': [{'code': 44, 'message': 'Invalid parameter.'}]}
+        lang = params.get('lang')
+        tweet_mode = params.get('tweet_mode', 'compat')
+
+        page = []
+        with self._lock:
+            statuses = self._statuses(query)
+        for status in statuses: # Newest first
+            if max_id is not None and status['id'] > max_id:
+                continue
+            if since_id is not None and status['id'] <= since_id:
+                break
+            if lang and status.get('lang') not in (None, lang):
+                continue
+            page.append(_render(status, tweet_mode))
+            if len(page) >= count:
+                break
+        metadata = {'count': count, 'query': query, 'max_id': page[0]['id'] if page else 0, 'since_id': since_id or 0}
+        return 200, headers, {'statuses': page, 'search_metadata': metadata}
+
+    def verify_credentials(self) -> tuple:
+        return 200, {}, {'id': 1, 'id_str': '1', 'screen_name': 'fake_api_user', 'name': 'Fake API User'}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        api = self.server.fake_api
+        if url.path == '/1.1/search/tweets.json':
+            status, headers, body = api.search(params)
+        elif url.path == '/1.1/account/verify_credentials.json':
+            status, headers, body = api.verify_credentials()
+        else:
+            status, headers, body = 404, {}, {'errors': [{'code': 34, 'message': 'Sorry, that page does not exist.'}]}
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logging.debug("fake twitter api: " + format, *args)
+
+
+class FakeTwitterServer:
+    """
+    Runs a FakeTwitterAPI on a local HTTP server in a background thread.
+
+    Example:
+        with FakeTwitterServer(FakeTwitterAPI(latency=0.01)) as server:
+            os.environ['TWITTER_API_BASE_URL'] = server.base_url
+    """
+
+    def __init__(self, fake_api: FakeTwitterAPI = None, host: str = '127.0.0.1', port: int = 0):
+        self.fake_api = fake_api or FakeTwitterAPI()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake_api = self.fake_api
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        """Serves in the calling thread until interrupted (used by the command line)."""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-twitter-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def record_responses(api, path: str):
+    """
+    Appends every successful search/tweets response received by a tweepy.API to a
+    JSONL file (request params, rate-limit headers and the raw JSON body), for later
+    replay with FakeTwitterAPI.from_recording.
+    """
+    lock = threading.Lock()
+
+    def hook(response, *args, **kwargs):
+        url = urlsplit(response.url)
+        if not url.path.endswith('/search/tweets.json') or response.status_code != 200:
+            return
+        entry = {
+            'params': {key: values[-1] for key, values in parse_qs(url.query).items()},
+            'headers': {name: value for name, value in response.headers.items() if name.lower().startswith('x-rate-limit')},
+            'response': response.json(),
+        }
+        with lock, open(path, 'a', encoding='utf-8') as recording:
+            recording.write(json.dumps(entry) + '\n')
+
+    api.session.hooks['response'].append(hook)
+    return api
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--tweets-per-query', type=int, default=1000, help="Synthetic tweets per query (default 1000).")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds of latency per request.")
+    parser.add_argument('--rate-limit', type=int, default=DEFAULT_RATE_LIMIT, help="Search requests per window (0 disables).")
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW_SECONDS, help="Rate-limit window in seconds.")
+    parser.add_argument('--replay', help="Serve the tweets of a recording made with TWITTER_RECORD_PATH.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    options = dict(latency=args.latency, rate_limit=args.rate_limit or None, window_seconds=args.window, seed=args.seed)
+    if args.replay:
+        fake_api = FakeTwitterAPI.from_recording(args.replay, **options)
+    else:
+        fake_api = FakeTwitterAPI(tweets_per_query=args.tweets_per_query, **options)
+
+    server = FakeTwitterServer(fake_api, args.host, args.port)
+    print(f"Fake Twitter API listening on {server.base_url} (TWITTER_API_BASE_URL={server.base_url})")
+    server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+# This file contains the concurrent, rate-limit-aware scheduler for multi-query tweet fetching.
+import time
+import heapq
+import logging
+import threading
+from itertools import count as _counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Twitter v1.1 rate limits are counted per 15-minute window.
+DEFAULT_WINDOW_SECONDS = 15 * 60
+# Requests per window for the standard search endpoint (user auth).
+DEFAULT_SEARCH_LIMIT = 180
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised by a page fetcher when the API answers 429 Too Many Requests.
+
+    Attributes:
+        reset_time: Unix time at which the quota resets, if known.
+        headers: The response headers, used to update the quota tracking.
+    """
+
+    def __init__(self, reset_time=None, headers=None):
+        self.reset_time = reset_time
+        self.headers = headers or {}
+        super().__init__(f"Rate limit exceeded (resets at {reset_time})")
+
+
+class TokenBucket:
+    """
+    Tracks the request quota of one endpoint.
+
+    Tokens refill continuously at capacity / window_seconds. Rate-limit response
+    headers (x-rate-limit-limit/-remaining/-reset) override the local estimate: once the
+    server reports no remaining calls, no token is handed out before the reset time.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_SEARCH_LIMIT, window_seconds: float = DEFAULT_WINDOW_SECONDS, clock=time.time):
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0
+        self._clock = clock
+        self._last_refill = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if now >= self.blocked_until > 0:
+            # The server-side window has reset.
+            self.tokens = float(self.capacity)
+            self.blocked_until = 0.0
+        elif self.blocked_until == 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self._last_refill) * self.capacity / self.window_seconds)
+        self._last_refill = now
+
+    def try_acquire(self) -> float:
+        """
+        Takes one token if available. Returns 0.0 on success, otherwise the number of
+        seconds until a token is expected to be available.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if self.blocked_until:
+                return max(self.blocked_until - now, 0.0)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) * self.window_seconds / self.capacity
+
+    def update_from_headers(self, headers: dict):
+        """Updates the quota from x-rate-limit-* response headers (missing headers are ignored)."""
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        limit = headers.get('x-rate-limit-limit')
+        remaining = headers.get('x-rate-limit-remaining')
+        reset = headers.get('x-rate-limit-reset')
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if limit is not None:
+                self.capacity = int(limit)
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+                if int(remaining) <= 0 and reset is not None:
+                    self.blocked_until = max(float(reset), now)
+
+    def block_until(self, reset_time: float):
+        """Blocks the bucket until the given Unix time (after a 429 response)."""
+        with self._lock:
+            self.tokens = 0.0
+            self.blocked_until = max(self.blocked_until, float(reset_time))
+
+
+class _QueryTask:
+    __slots__ = ('query', 'remaining', 'max_id', 'statuses', 'rate_limited')
+
+    def __init__(self, query, limit):
+        self.query = query
+        self.remaining = limit
+        self.max_id = None
+        self.statuses = []
+        self.rate_limited = 0
+
+
+class FetchScheduler:
+    """
+    Fetches search results for many queries concurrently without ever sleeping on a
+    rate limit.
+
+    Every query is paged through one request at a time; each request is handed to a
+    thread pool as soon as a source with remaining quota is available. When a source
+    is exhausted (or answers 429), its pending pages are re-queued for the reset time
+    and the workers keep serving other sources and queries in the meantime.
+
+    A source is a page fetcher `fetch_page(params) -> (statuses, headers)` where params
+    holds the search_tweets arguments (q, lang, count, tweet_mode, max_id) and
+    statuses have an `id`. Each source (e.g. one per endpoint or app credential) gets
+    its own TokenBucket.
+    """
+
+    def __init__(self, sources: dict, max_workers: int = 4, capacity: int = DEFAULT_SEARCH_LIMIT,
+                 window_seconds: float = DEFAULT_WINDOW_SECONDS, clock=time.time, max_rate_limit_retries: int = 5):
+        """
+        Args:
+            sources: {name: fetch_page} for every endpoint/credential that may serve searches.
+            max_workers: Number of requests in flight at once.
+            capacity: Assumed requests per window for each source until headers say otherwise.
+            window_seconds: Length of the rate-limit window.
+            clock: Time source returning Unix time (injectable for tests).
+            max_rate_limit_retries: 429 responses tolerated per query before giving up on it.
+        """
+        if not sources:
+            raise ValueError("FetchScheduler needs at least one source.")
+        self.sources = dict(sources)
+        self.buckets = {name: TokenBucket(capacity, window_seconds, clock) for name in self.sources}
+        self.max_workers = max_workers
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self._clock = clock
+        self.stats = {'requests': 0, 'rate_limited': 0, 'errors': 0}
+
+    def _acquire_source(self):
+        """Returns (source name, 0.0) for a source with quota, or (None, seconds until one frees up)."""
+        shortest_wait = None
+        for name, bucket in self.buckets.items():
+            wait_seconds = bucket.try_acquire()
+            if wait_seconds == 0.0:
+                return name, 0.0
+            shortest_wait = wait_seconds if shortest_wait is None else min(shortest_wait, wait_seconds)
+        return None, shortest_wait
+
+    def iter_results(self, queries, limit_per_query: int = 100, page_size: int = 100,
+                     lang: str = "en", tweet_mode: str = "extended"):
+        """
+        Fetches up to `limit_per_query` tweets for every query and yields
+        (query, statuses) as each query completes (not in input order).
+        Queries that fail with a non-rate-limit error yield what was fetched before the error.
+        """
+        sequence = _counter()
+        ready = [] # heap of (ready_at, seq, task)
+        for query in dict.fromkeys(queries): # Dedupe, keep order
+            heapq.heappush(ready, (0.0, next(sequence), _QueryTask(query, limit_per_query)))
+
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tweet-fetch") as executor:
+            while ready or in_flight:
+                now = self._clock()
+                next_wakeup = None
+                while ready and len(in_flight) < self.max_workers:
+                    ready_at, _, task = ready[0]
+                    if ready_at > now:
+                        next_wakeup = ready_at - now
+                        break
+                    source, wait_seconds = self._acquire_source()
+                    if source is None:
+                        # No quota anywhere: re-queue everything that is due for when a
+                        # token frees up, and keep collecting in-flight results meanwhile.
+                        next_wakeup = wait_seconds
+                        break
+                    heapq.heappop(ready)
+                    params = {'q': task.query, 'lang': lang, 'count': min(page_size, task.remaining), 'tweet_mode': tweet_mode}
+                    if task.max_id is not None:
+                        params['max_id'] = task.max_id
+                    self.stats['requests'] += 1
+                    future = executor.submit(self.sources[source], params)
+                    in_flight[future] = (task, source)
+
+                if not in_flight:
+                    if next_wakeup:
+                        time.sleep(min(next_wakeup, 1.0))
+                    continue
+
+                done, _ = wait(in_flight, timeout=next_wakeup, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task, source = in_flight.pop(future)
+                    finished = self._handle_response(task, source, future, ready, sequence)
+                    if finished:
+                        yield task.query, task.statuses
+
+    def _handle_response(self, task, source, future, ready, sequence) -> bool:
+        """Processes one completed page request. Returns True if the query is finished."""
+        bucket = self.buckets[source]
+        try:
+            statuses, headers = future.result()
+        except RateLimitExceeded as e:
+            self.stats['rate_limited'] += 1
+            task.rate_limited += 1
+            bucket.update_from_headers(e.headers)
+            reset_time = e.reset_time or self._clock() + bucket.window_seconds / bucket.capacity
+            bucket.block_until(reset_time)
+            if task.rate_limited > self.max_rate_limit_retries:
+                logging.error(f"Giving up on query '{task.query}' after {task.rate_limited} rate-limited requests.")
+                return True
+            logging.warning(f"Rate limit hit on '{source}' for query '{task.query}'; retrying after reset.")
+            heapq.heappush(ready, (0.0, next(sequence), task)) # Will wait for any source with quota
+            return False
+        except Exception as e:
+            self.stats['errors'] += 1
+            logging.error(f"Error fetching tweets for query '{task.query}': {e}")
+            return True
+
+        bucket.update_from_headers(headers)
+        statuses = list(statuses)[:task.remaining]
+        task.statuses.extend(statuses)
+        task.remaining -= len(statuses)
+        if not statuses or task.remaining <= 0:
+            return True
+        task.max_id = min(status.id for status in statuses) - 1
+        heapq.heappush(ready, (0.0, next(sequence), task))
+        return False
+
+    def fetch_all(self, queries, **kwargs) -> dict:
+        """Like iter_results, but returns {query: statuses} once every query is done."""
+        return dict(self.iter_results(queries, **kwargs))
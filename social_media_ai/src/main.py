@@ -4,37 +4,110 @@
 import sys
 import os
 import logging # Added logging
+import itertools
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.sentiment_analysis import SentimentAnalyzer
-from src.content_suggestion import ContentSuggestor
-try:
-    from src.twitter_client import TwitterClient
-except ImportError:
-    logging.warning("Tweepy library not found or src.twitter_client missing. Twitter functionality will be unavailable.")
-    TwitterClient = None # Ensure TwitterClient is defined, even if None
-except Exception as e:
-    logging.warning(f"An unexpected error occurred importing TwitterClient: {e}. Twitter functionality may be unavailable.")
-    TwitterClient = None
+# SentimentAnalyzer, ContentSuggestor (NLTK) and TwitterClient (tweepy) are imported
+# on first use by the loaders below, so importing this module and showing the menu
+# stay cheap, and tweepy is only loaded when tweets are actually fetched.
 
 
+# Tweets requested per search API call (the v1.1 search API allows up to 100).
+FETCH_PAGE_SIZE = 100
+
+# Workers of each stage of the fetched-tweets pipeline in run_app. 'fetch' is the
+# number of pages fetched ahead (pages of one query are fetched one after another);
+# 'analyze' and 'suggest' are worker processes.
+DEFAULT_STAGE_WORKERS = {'fetch': 1, 'analyze': 1, 'suggest': 2}
+
+# Analyzers loaded by get_worker_components, by noun mode.
+_worker_components = {}
+
 # Configure basic logging for the main application
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def process_text_and_suggest(text, sentiment_analyzer, content_suggestor):
+def load_core_components(noun_mode='tagger'):
+    """
+    Imports and initializes SentimentAnalyzer and ContentSuggestor.
+    Returns (sentiment_analyzer, content_suggestor), or None after reporting the error
+    if they cannot be initialized.
+    """
+    try:
+        from src.sentiment_analysis import SentimentAnalyzer
+        from src.content_suggestion import ContentSuggestor
+        sentiment_analyzer = SentimentAnalyzer()
+        content_suggestor = ContentSuggestor(noun_mode=noun_mode)
+        logging.info("SentimentAnalyzer and ContentSuggestor initialized successfully.")
+        return sentiment_analyzer, content_suggestor
+    except Exception as e:
+        logging.critical(f"Critical error initializing SentimentAnalyzer or ContentSuggestor: {e}")
+        print(f"Critical error during core component initialization: {e}. Application cannot continue.")
+        return None
+
+
+def get_worker_components(noun_mode='tagger'):
+    """
+    Returns this process's (sentiment_analyzer, content_suggestor) for noun_mode, loading
+    them on first use. For code running in worker processes (batch mode and the run_app
+    pipeline), which cannot share the analyzers of the main process.
+    Raises RuntimeError if they cannot be initialized.
+    """
+    components = _worker_components.get(noun_mode)
+    if components is None:
+        components = load_core_components(noun_mode)
+        if components is None:
+            raise RuntimeError("SentimentAnalyzer and ContentSuggestor could not be initialized.")
+        _worker_components[noun_mode] = components
+    return components
+
+
+def load_twitter_client():
+    """
+    Imports tweepy and initializes a TwitterClient.
+    Returns None (after logging why) if tweepy is not installed or the client cannot be initialized.
+    """
+    try:
+        from src.twitter_client import TwitterClient
+    except ImportError:
+        logging.warning("Tweepy library not found or src.twitter_client missing. Twitter functionality will be unavailable.")
+        return None
+    except Exception as e:
+        logging.warning(f"An unexpected error occurred importing TwitterClient: {e}. Twitter functionality may be unavailable.")
+        return None
+
+    try:
+        twitter_client_instance = TwitterClient()
+        logging.info("TwitterClient initialized successfully.")
+        return twitter_client_instance
+    except ValueError as ve: # Raised by TwitterClient if keys are missing
+        logging.warning(f"TwitterClient initialization failed: {ve}. Twitter functionality will be unavailable.")
+    except Exception as e: # Catch other potential Tweepy or unexpected errors
+        logging.error(f"An unexpected error occurred during TwitterClient initialization: {e}. Twitter functionality will be unavailable.")
+    return None
+
+
+def process_text_and_suggest(text, sentiment_analyzer, content_suggestor, keywords=None):
     """
     Helper function to analyze sentiment for a given text and provide suggestions.
+    If keywords are given (e.g., precomputed for a whole batch of tweets), they are
+    used for the suggestions instead of extracting keywords from this text alone.
+    The text (a string, Document or TweetRecord) is wrapped in a Document once, and
+    every stage reuses its cached normalization and tokenization.
     """
-    if not text.strip():
+    from src.document import as_document
+    from src.tweet_record import record_text
+
+    document = as_document(record_text(text))
+    if not document.text.strip():
         logging.info("Received empty text for processing.")
         print("  Input text is empty. Skipping analysis and suggestions.")
         return
 
     print("\n--- Sentiment Analysis ---")
     try:
-        sentiment_result = sentiment_analyzer.analyze_sentiment(text)
+        sentiment_result = sentiment_analyzer.analyze_sentiment(document)
         if 'error' in sentiment_result:
             print(f"  Error in sentiment analysis: {sentiment_result['error']}")
             return # Don't proceed if sentiment analysis itself had an error
@@ -55,7 +128,7 @@ def process_text_and_suggest(text, sentiment_analyzer, content_suggestor):
 
     print("\n--- Content Suggestions ---")
     try:
-        suggestion_result = content_suggestor.suggest_content(sentiment_result)
+        suggestion_result = content_suggestor.suggest_content(sentiment_result, keywords=keywords, document=document)
         if 'suggestions' in suggestion_result and isinstance(suggestion_result['suggestions'], list):
             if any("Error:" in s for s in suggestion_result['suggestions']):
                 print("  Could not generate suggestions due to an issue:")
@@ -70,38 +143,242 @@ def process_text_and_suggest(text, sentiment_analyzer, content_suggestor):
         print(f"  An unexpected error occurred during content suggestion: {e}")
 
 
-def run_app(test_inputs=None):
+def analyze_and_suggest(item, sentiment_analyzer, content_suggestor, keywords=None) -> dict:
+    """
+    Non-interactive counterpart of process_text_and_suggest: analyses one text (a string,
+    Document or TweetRecord) and returns the result as a JSON-serializable dict instead
+    of printing it. Used by the streaming and batch modes.
+
+    Returns:
+        {'id', 'text', 'overall_sentiment', 'sentiment', 'suggestions'}, or {'id', 'text', 'error'}
+        if the text is empty or could not be analysed. 'id' is the tweet id for a
+        TweetRecord and None otherwise.
+    """
+    from src.document import as_document
+    from src.tweet_record import TweetRecord, record_text
+
+    document = as_document(record_text(item))
+    result = {'id': item.id if isinstance(item, TweetRecord) else None, 'text': document.text}
+    if not document.text.strip():
+        result['error'] = "Input text is empty."
+        return result
+
+    sentiment_result = sentiment_analyzer.analyze_sentiment(document)
+    if 'error' in sentiment_result:
+        result['error'] = sentiment_result['error']
+        return result
+    result['overall_sentiment'] = sentiment_result['overall_sentiment']
+    result['sentiment'] = sentiment_result['sentiment']
+
+    suggestion_result = content_suggestor.suggest_content(sentiment_result, keywords=keywords, document=document)
+    result['suggestions'] = suggestion_result.get('suggestions', [])
+    return result
+
+
+def print_analysis(result: dict):
+    """Prints a result dict of analyze_and_suggest the way process_text_and_suggest prints its analysis."""
+    if 'error' in result:
+        if not result.get('text', '').strip():
+            print("  Input text is empty. Skipping analysis and suggestions.")
+        else:
+            print(f"  Error in sentiment analysis: {result['error']}")
+        return
+
+    print("\n--- Sentiment Analysis ---")
+    print(f"  Text: \"{result.get('text')}\"")
+    print(f"  Overall Sentiment: {result.get('overall_sentiment', 'N/A')}")
+    scores = result.get('sentiment', {})
+    print(f"  Scores:")
+    print(f"    Positive: {scores.get('positive', 0.0):.3f}")
+    print(f"    Negative: {scores.get('negative', 0.0):.3f}")
+    print(f"    Neutral:  {scores.get('neutral', 0.0):.3f}")
+    print(f"    Compound: {scores.get('compound', 0.0):.3f}")
+
+    print("\n--- Content Suggestions ---")
+    suggestions = result.get('suggestions')
+    if not isinstance(suggestions, list):
+        print("  Could not retrieve suggestions or suggestions are not in the expected format.")
+        return
+    if any("Error:" in s for s in suggestions):
+        print("  Could not generate suggestions due to an issue:")
+    for suggestion in suggestions:
+        print(f"  - {suggestion}")
+
+
+def stage_executors(stage_workers=None) -> dict:
+    """
+    Process pools for the analyze and suggest stages of process_fetched_tweets, sized by
+    stage_workers (see DEFAULT_STAGE_WORKERS). Sharing them across fetches keeps the
+    worker processes, and the analyzers they loaded, alive; shut them down when done.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = dict(DEFAULT_STAGE_WORKERS, **(stage_workers or {}))
+    return {stage: ProcessPoolExecutor(max_workers=workers[stage]) for stage in ('analyze', 'suggest')}
+
+
+def process_fetched_tweets(twitter_client, query, num_tweets, noun_mode='tagger', batch_keyword_mode='tfidf',
+                           collapse_duplicates=True, stage_workers=None, core_components=None, spam_filter=None,
+                           result_sink=None, executors=None) -> int:
+    """
+    Fetches up to num_tweets tweets for query and prints the analysis of each, running
+    the work as a pipeline of concurrent stages (see src.pipeline) connected by bounded
+    queues, so fetching, analysis and suggestions overlap:
+        fetch    pages of tweets, fetched ahead in the background (I/O), and collapsed
+                 into duplicate groups if collapse_duplicates is set (see src.dedup)
+        spam     if a spam_filter (src.spam_filter.SpamFilter) is given, spam is scored per
+                 page and removed before analysis; with action 'tag' it is still listed
+        analyze  sentiment analysis of each page, in worker processes
+        suggest  batch keyword extraction and suggestions per page, in worker processes
+        sink     prints the results in fetch order (this thread), and passes a result
+                 dict per fetched tweet to result_sink (e.g., a src.result_sink.ResultSink)
+                 if given: each duplicate gets its group's result with its own id and text
+    stage_workers overrides DEFAULT_STAGE_WORKERS per stage. If core_components is
+    given, the analyze and suggest stages run in threads with these analyzers instead
+    of in worker processes. executors ({'analyze': ..., 'suggest': ...}, see
+    stage_executors) reuses process pools across calls instead of starting new ones.
+    The throughput of each stage (and the spam filter rate) is printed at the end.
+
+    Returns:
+        The number of fetched tweets processed.
+    """
+    from functools import partial
+    from src.pipeline import Pipeline, Stage, analyze_page, suggest_page, format_stage_stats
+
+    workers = dict(DEFAULT_STAGE_WORKERS, **(stage_workers or {}))
+
+    from collections import OrderedDict
+    from src.dedup import Cluster, Deduplicator
+
+    deduplicator = Deduplicator() if collapse_duplicates else None
+
+    def fetch_pages():
+        tweet_stream = twitter_client.iter_records(
+            query=query, limit=num_tweets, page_size=FETCH_PAGE_SIZE, prefetch_pages=workers['fetch']
+        )
+        while True:
+            page = list(itertools.islice(tweet_stream, FETCH_PAGE_SIZE))
+            if not page:
+                return
+            if deduplicator is None:
+                clusters = [Cluster(None, True, 1) for _ in page]
+                for cluster, record in zip(clusters, page):
+                    cluster.members.append(record)
+            else:
+                clusters = deduplicator.group(page)
+            new = [cluster for cluster in clusters if cluster.is_new]
+            yield {
+                'records': [cluster.representative for cluster in new],
+                'copies': [cluster.multiplicity for cluster in new],
+                'clusters': new,
+                # Groups already analysed on an earlier page
+                'repeated': [cluster for cluster in clusters if not cluster.is_new],
+            }
+
+    use_processes = core_components is None
+    options = {'noun_mode': noun_mode} if use_processes else {'components': core_components}
+    executors = executors if use_processes and executors else {}
+    stages = [Stage('spam', spam_filter.filter_page)] if spam_filter is not None else []
+    pipeline = Pipeline(
+        fetch_pages(),
+        stages + [
+            Stage('analyze', partial(analyze_page, **options), workers=workers['analyze'], processes=use_processes,
+                  executor=executors.get('analyze')),
+            Stage('suggest', partial(suggest_page, keyword_mode=batch_keyword_mode, **options),
+                  workers=workers['suggest'], processes=use_processes, executor=executors.get('suggest')),
+        ],
+        size=lambda page: len(page['records']),
+    )
+
+    # Row of each duplicate group sunk so far, for its copies on later pages; groups the
+    # deduplicator has forgotten never repeat, so this keeps as many as it does.
+    group_rows = OrderedDict()
+
+    def sink_cluster(cluster, row):
+        """Passes row to result_sink once per member of cluster, with the member's id and text."""
+        if result_sink is None:
+            return
+        if cluster.id is not None:
+            group_rows[cluster.id] = row
+            group_rows.move_to_end(cluster.id)
+            if len(group_rows) > deduplicator.max_clusters:
+                group_rows.popitem(last=False)
+        for member in cluster.members:
+            result_sink(dict(row, id=member.id, text=member.text))
+
+    processed = 0
+    for page in pipeline.run():
+        if processed == 0:
+            print(f"--- Processing up to {num_tweets} Fetched Tweets ---")
+        for cluster in page['repeated']:
+            processed += cluster.multiplicity
+            print(f"\n\n--- Tweet {processed}/{num_tweets}: duplicate of an earlier tweet (seen {cluster.total} times) ---")
+            if cluster.id in group_rows:
+                sink_cluster(cluster, group_rows[cluster.id])
+        if spam_filter is not None and spam_filter.action == 'tag':
+            for (record, copies, score), cluster in zip(page['spam'], page['spam_clusters']):
+                processed += copies
+                print(f"\n\n--- Tweet {processed}/{num_tweets}: spam (score {score:.2f}), not analysed ---")
+                print(f"Original Tweet: \"{record.text}\"")
+                sink_cluster(cluster, {'spam': True, 'spam_score': score})
+        for result, copies, cluster in zip(page['results'], page['copies'], page['clusters']):
+            processed += copies
+            copies_text = f" ({copies} copies)" if copies > 1 else ""
+            print(f"\n\n--- Tweet {processed}/{num_tweets}{copies_text} ---")
+            print(f"Original Tweet: \"{result['text']}\"")
+            print_analysis(result)
+            print("-" * 30) # Separator for each tweet's full analysis
+            sink_cluster(cluster, result)
+
+    if processed:
+        stage_stats = format_stage_stats(pipeline.stats())
+        print("\n--- Pipeline Throughput (tweets per stage) ---")
+        print(stage_stats)
+        logging.info("Pipeline throughput:\n%s", stage_stats)
+    if spam_filter is not None:
+        stats = pipeline.stats()
+        analysed = stats['analyze']['items']
+        seconds_per_item = (stats['analyze']['busy_seconds'] + stats['suggest']['busy_seconds']) / analysed if analysed else None
+        spam_summary = spam_filter.summary(seconds_per_item)
+        print(spam_summary)
+        logging.info(spam_summary)
+    return processed
+
+
+def run_app(test_inputs=None, batch_keyword_mode='tfidf', noun_mode='tagger', collapse_duplicates=True,
+            stage_workers=None, use_processes=True, spam_threshold=None, spam_action='drop', result_path=None,
+            flush_size=1000, flush_interval=1.0):
     """
     Runs the Social Media AI application.
     Initializes components, then enters a loop for user interaction:
     manual text input, fetching tweets, or exiting.
+
+    batch_keyword_mode selects how keywords are extracted for a batch of fetched
+    tweets: 'tfidf' (one TF-IDF matrix over the whole batch) or 'pos' (per-tweet
+    POS tagging). noun_mode is passed to ContentSuggestor ('tagger', 'hybrid' or
+    'lexicon') and trades keyword quality for speed on per-text extraction.
+    With collapse_duplicates, retweets and near-identical fetched tweets are grouped
+    (see src.dedup) and each group is analysed and shown once, with its copy count.
+    Fetched tweets run through a concurrent pipeline (see process_fetched_tweets);
+    stage_workers sets the workers of its stages, and use_processes=False runs the
+    analyze and suggest stages in threads of this process instead of worker processes.
+    The worker processes are started on the first fetch and reused by later ones.
+    If spam_threshold is set, fetched tweets scored above it by the spam model (see
+    src.spam_filter) are dropped or, with spam_action='tag', listed but not analysed.
+    If result_path is set, the results of fetched tweets are also saved there, in batches
+    of up to flush_size results (or every flush_interval seconds) by a writer thread (see
+    src.result_sink; .sqlite, .parquet or JSONL by extension).
+
+    Components are loaded on first use: the analyzers when the first text is
+    processed, and the Twitter client (and tweepy) when tweets are first fetched.
     """
     logging.info("Initializing Social Media AI...")
-    sentiment_analyzer = None
-    content_suggestor = None
+    core_components = None # (sentiment_analyzer, content_suggestor), loaded on first use
     twitter_client_instance = None
-
-    try:
-        sentiment_analyzer = SentimentAnalyzer()
-        content_suggestor = ContentSuggestor()
-        logging.info("SentimentAnalyzer and ContentSuggestor initialized successfully.")
-    except Exception as e:
-        logging.critical(f"Critical error initializing SentimentAnalyzer or ContentSuggestor: {e}")
-        print(f"Critical error during core component initialization: {e}. Application cannot continue.")
-        return
-
-    if TwitterClient: # Only try to initialize if the class was imported
-        try:
-            twitter_client_instance = TwitterClient()
-            logging.info("TwitterClient initialized successfully.")
-        except ValueError as ve: # Raised by TwitterClient if keys are missing
-            logging.warning(f"TwitterClient initialization failed: {ve}. Twitter functionality will be unavailable.")
-            twitter_client_instance = None
-        except Exception as e: # Catch other potential Tweepy or unexpected errors
-            logging.error(f"An unexpected error occurred during TwitterClient initialization: {e}. Twitter functionality will be unavailable.")
-            twitter_client_instance = None
-    else:
-        logging.warning("TwitterClient class not available. Twitter functionality disabled.")
+    twitter_client_loaded = False
+    spam_filter = None # Loaded on the first fetch if spam_threshold is set
+    result_sink = None # Opened on the first fetch if result_path is set
+    executors = None # Stage process pools, started on the first fetch and reused by later ones
 
     print("\nInitialization complete. Welcome to Social Media AI!")
 
@@ -152,6 +429,11 @@ def run_app(test_inputs=None):
                     logging.warning("EOFError encountered while reading manual text. Returning to main menu.")
                     continue
             
+            if core_components is None:
+                core_components = load_core_components(noun_mode)
+                if core_components is None:
+                    return
+            sentiment_analyzer, content_suggestor = core_components
             process_text_and_suggest(manual_text, sentiment_analyzer, content_suggestor)
 
         elif choice == '2': # Fetch tweets
@@ -159,6 +441,10 @@ def run_app(test_inputs=None):
                 print("Test Mode: Skipping Twitter fetching.")
                 continue
 
+            if not twitter_client_loaded: # pragma: no cover
+                twitter_client_instance = load_twitter_client()
+                twitter_client_loaded = True
+
             if not twitter_client_instance: # pragma: no cover
                 print("Twitter client not available. Please check API credentials and ensure 'tweepy' is installed.")
                 logging.warning("Attempted to use Twitter client, but it's not available.")
@@ -170,13 +456,13 @@ def run_app(test_inputs=None):
                 print("Search query cannot be empty.")
                 continue
             
-            num_tweets_str = input("How many tweets to fetch? (default 10, max 100): ").strip()
+            num_tweets_str = input("How many tweets to fetch? (default 10): ").strip()
             num_tweets = 10 # Default
             if num_tweets_str:
                 try:
                     num_tweets = int(num_tweets_str)
-                    if not (1 <= num_tweets <= 100):
-                        print("Number of tweets must be between 1 and 100. Using default (10).")
+                    if num_tweets < 1:
+                        print("Number of tweets must be at least 1. Using default (10).")
                         num_tweets = 10
                 except ValueError:
                     print("Invalid number. Using default (10).")
@@ -184,19 +470,36 @@ def run_app(test_inputs=None):
             
             print(f"\nFetching {num_tweets} tweets for query: '{search_query}'...")
             try:
-                fetched_tweets = twitter_client_instance.fetch_tweets(query=search_query, count=num_tweets)
-                if not fetched_tweets:
+                if not use_processes and core_components is None:
+                    core_components = load_core_components(noun_mode)
+                    if core_components is None:
+                        return
+                if result_path is not None and result_sink is None:
+                    from src.result_sink import open_result_sink
+                    result_sink = open_result_sink(result_path, flush_size=flush_size, flush_interval=flush_interval)
+                if spam_threshold is not None and spam_filter is None:
+                    from src.spam_filter import SpamFilter
+                    spam_filter = SpamFilter.load(threshold=spam_threshold, action=spam_action)
+                if use_processes and executors is None:
+                    executors = stage_executors(stage_workers)
+                processed = process_fetched_tweets(
+                    twitter_client_instance, search_query, num_tweets, noun_mode=noun_mode,
+                    batch_keyword_mode=batch_keyword_mode, collapse_duplicates=collapse_duplicates,
+                    stage_workers=stage_workers, core_components=None if use_processes else core_components,
+                    spam_filter=spam_filter, result_sink=result_sink, executors=executors,
+                )
+                if result_sink is not None:
+                    result_sink.flush() # Results of this fetch are on disk before the menu returns
+                if processed == 0:
                     print("No tweets found for your query, or an error occurred during fetching.")
-                else:
-                    print(f"--- Processing {len(fetched_tweets)} Fetched Tweets ---")
-                    for i, tweet_text in enumerate(fetched_tweets):
-                        print(f"\n\n--- Tweet {i+1}/{len(fetched_tweets)} ---")
-                        print(f"Original Tweet: \"{tweet_text}\"")
-                        process_text_and_suggest(tweet_text, sentiment_analyzer, content_suggestor)
-                        print("-" * 30) # Separator for each tweet's full analysis
-            except Exception as e: # Catch any error from fetch_tweets or subsequent processing
+            except Exception as e: # Catch any error from fetching or subsequent processing
                 logging.error(f"An error occurred during tweet fetching or processing: {e}")
                 print(f"An error occurred: {e}")
+                from concurrent.futures.process import BrokenProcessPool
+                if isinstance(e, BrokenProcessPool) and executors is not None: # A worker died; start over next time
+                    for executor in executors.values():
+                        executor.shutdown(cancel_futures=True)
+                    executors = None
 
 
         elif choice == '3': # Exit
@@ -209,32 +512,64 @@ def run_app(test_inputs=None):
                  print("Invalid choice. Please enter 1, 2, or 3.")
             # In test mode, an invalid choice means the test_action was not 'exit', so it's treated as text.
 
+    if executors is not None:
+        for executor in executors.values():
+            executor.shutdown()
+    if result_sink is not None:
+        result_sink.close()
+
 
 if __name__ == "__main__":
-    # NLTK VADER lexicon check (remains important)
+    import argparse
+    from src.batch import build_parser, run_from_args
+
+    parser = argparse.ArgumentParser(
+        description="Social Media AI. Runs the interactive menu, or the batch mode (see src/batch.py) with --input."
+    )
+    parser.add_argument('--input', help="Analyse a JSONL or CSV file ('-' for stdin) and write the results (see --output) instead of running the menu.")
+    build_parser(parser)
+    for stage, description in (('fetch', "pages of tweets fetched ahead"),
+                               ('analyze', "sentiment analysis processes for fetched tweets"),
+                               ('suggest', "keyword and suggestion processes for fetched tweets")):
+        parser.add_argument(f'--{stage}-workers', type=int, metavar='N',
+                            help=f"Menu only: {description} (default {DEFAULT_STAGE_WORKERS[stage]}).")
+    args = parser.parse_args()
+    stage_workers = {stage: getattr(args, f'{stage}_workers') for stage in DEFAULT_STAGE_WORKERS
+                     if getattr(args, f'{stage}_workers') is not None}
+    if args.input and stage_workers: # Batch mode sizes its pool with --workers
+        parser.error(f"{', '.join(f'--{stage}-workers' for stage in stage_workers)} only apply without --input.")
+    if any(workers < 1 for workers in stage_workers.values()):
+        parser.error("Stage workers must be at least 1.")
+    if not args.input: # The menu takes the analysis, spam, output and report options, but not these
+        batch_only = [option for option in ('format', 'batch_size', 'workers', 'shard', 'checkpoint',
+                                            'checkpoint_interval', 'resume')
+                      if getattr(args, option) != parser.get_default(option)]
+        if batch_only:
+            parser.error(f"{', '.join('--' + option.replace('_', '-') for option in batch_only)} "
+                         f"only apply with --input.")
+
+    # One-time offline preflight of the NLTK resources of the selected modes: fail fast with
+    # a clear report instead of failing (or trying to download) halfway through a run.
+    # The menu extracts the keywords of manually entered texts per text ('pos').
     try:
-        import nltk
-        nltk.data.find('sentiment/vader_lexicon.zip')
-    except nltk.downloader.DownloadError: # pragma: no cover
-        logging.warning("NLTK 'vader_lexicon' not found. Attempting to download...")
-        try:
-            nltk.download('vader_lexicon')
-            logging.info("'vader_lexicon' downloaded successfully.")
-        except Exception as e:
-            logging.critical(f"Failed to download 'vader_lexicon': {e}. Application might not work correctly.")
-            print(f"Failed to download 'vader_lexicon': {e}. Please ensure internet connection or install manually.")
-            # sys.exit(1) # Decided not to exit, SentimentAnalyzer will also try to download
+        from src.nltk_resources import ensure_nltk_resources, required_resources, MissingNLTKResourceError
+        timings = ensure_nltk_resources(required_resources(args.noun_mode, args.keyword_mode if args.input else 'pos'))
+        logging.info("NLTK resources verified in %.1f ms.", sum(t.get('find', 0.0) for t in timings.values()) * 1000)
     except ImportError: # pragma: no cover
         logging.critical("NLTK library not found. Please install it: pip install nltk")
         print("NLTK library not found. Please install it using: pip install nltk")
         sys.exit(1) # NLTK is critical for core functionality
+    except MissingNLTKResourceError as e: # pragma: no cover
+        logging.critical("NLTK resource preflight failed.")
+        print(e)
+        sys.exit(1)
 
-    # Tweepy check (optional, as TwitterClient handles its absence)
-    try:
-        import tweepy
-    except ImportError: # pragma: no cover
-        logging.warning("Tweepy library not found. Twitter functionality will be disabled. Install with: pip install tweepy")
-        # No sys.exit here as Twitter functionality is optional
+    if args.input:
+        sys.exit(run_from_args(args))
+
+    from src import profiling, trending
+    profiling.enable_from_args(args)
+    trending.enable_from_args(args)
 
     # Test feed for non-interactive mode (manual input path)
     # The test_feed will only test choice '1' (manual input) and '3' (exit)
@@ -251,5 +586,11 @@ if __name__ == "__main__":
     # Defaulting to interactive mode if run directly for now.
     # If you want to automatically run test_feed, uncomment the line below
     # run_app(test_inputs=test_feed) 
-    run_app() # Runs in interactive mode by default.
+    try:
+        run_app(batch_keyword_mode=args.keyword_mode, noun_mode=args.noun_mode, spam_threshold=args.spam_threshold,
+                spam_action=args.spam_action, result_path=args.output, flush_size=args.flush_size,
+                flush_interval=args.flush_interval, stage_workers=stage_workers) # Runs in interactive mode by default.
+    finally:
+        profiling.report_from_args(args)
+        trending.report_from_args(args)
     # For automated testing in a CI/CD, you might pass a special arg or env var to trigger test_feed.
@@ -0,0 +1,198 @@
+# This file contains the NLTK resource manager shared by all modules.
+import os
+import sys
+import time
+import logging
+import argparse
+from contextlib import contextmanager
+
+import nltk
+
+# Bundled data directory searched before NLTK's default locations.
+# Override with the SOCIAL_MEDIA_AI_NLTK_DATA environment variable.
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nltk_data')
+
+# name -> (resource path for NLTK >= 3.9, resource path for older NLTK)
+# NLTK 3.9 replaced the pickled punkt and tagger models with 'punkt_tab' and
+# 'averaged_perceptron_tagger_eng'; the package id to download is the last path component.
+RESOURCES = {
+    'stopwords': ('corpora/stopwords', 'corpora/stopwords'),
+    'punkt': ('tokenizers/punkt_tab/english/', 'tokenizers/punkt'),
+    'averaged_perceptron_tagger': ('taggers/averaged_perceptron_tagger_eng/', 'taggers/averaged_perceptron_tagger'),
+    'vader_lexicon': ('sentiment/vader_lexicon.zip', 'sentiment/vader_lexicon.zip'),
+}
+
+_VERIFIED = set()
+_TIMINGS = {}
+_DATA_DIR_ADDED = None
+
+
+class MissingNLTKResourceError(LookupError):
+    """
+    Raised when one or more required NLTK resources are not installed locally.
+    The message lists every missing resource and the directories that were searched.
+    """
+
+    def __init__(self, missing: list[str], search_paths: list[str]):
+        self.missing = missing
+        self.search_paths = search_paths
+        lines = ["Required NLTK resources are missing:"]
+        lines += [f"  - {name} ({resource_path(name)})" for name in missing]
+        lines.append("Searched:")
+        lines += [f"  - {path}" for path in search_paths]
+        lines.append("Install them into the bundled data directory (requires network, run once at build time):")
+        lines.append(f"  python -m src.nltk_resources download --dir {data_dir()}")
+        super().__init__("\n".join(lines))
+
+
+def _uses_new_resource_names() -> bool:
+    """True for NLTK >= 3.9, which loads 'punkt_tab' and 'averaged_perceptron_tagger_eng'."""
+    from nltk.tokenize import punkt
+    return hasattr(punkt, 'PunktTokenizer')
+
+
+def resource_path(name: str) -> str:
+    """Returns the nltk.data path of a resource for the installed NLTK version."""
+    new_path, old_path = RESOURCES[name]
+    return new_path if _uses_new_resource_names() else old_path
+
+
+def _package_id(name: str) -> str:
+    return resource_path(name).rstrip('/').split('/')[1].replace('.zip', '')
+
+
+def data_dir() -> str:
+    """The bundled NLTK data directory in use."""
+    return os.environ.get('SOCIAL_MEDIA_AI_NLTK_DATA') or DEFAULT_DATA_DIR
+
+
+def _use_data_dir():
+    """Puts the bundled data directory first on nltk.data.path (once)."""
+    global _DATA_DIR_ADDED
+    directory = data_dir()
+    if _DATA_DIR_ADDED == directory:
+        return
+    if directory in nltk.data.path:
+        nltk.data.path.remove(directory)
+    nltk.data.path.insert(0, directory)
+    _DATA_DIR_ADDED = directory
+
+
+def required_resources(noun_mode: str = 'tagger', keyword_mode: str = 'pos') -> list[str]:
+    """
+    The resources a run with these ContentSuggestor noun and keyword modes needs:
+    VADER, stopwords and punkt always, and the POS tagger only when keywords are
+    extracted per text ('pos' mode, or 'tfidf' without scikit-learn) outside the
+    'lexicon' noun mode.
+    """
+    names = ['stopwords', 'punkt', 'vader_lexicon']
+    if keyword_mode == 'tfidf':
+        import importlib.util
+        if importlib.util.find_spec('sklearn') is None:
+            keyword_mode = 'pos'
+    if noun_mode != 'lexicon' and keyword_mode == 'pos':
+        names.insert(2, 'averaged_perceptron_tagger')
+    return names
+
+
+def ensure_nltk_resources(names=None) -> dict:
+    """
+    Verifies that the given NLTK resources (default: all of RESOURCES) are installed
+    locally. Each resource is only looked up once per process; nothing is downloaded.
+
+    Args:
+        names: Resource names from RESOURCES to check.
+
+    Returns:
+        The load timings recorded so far (see resource_timings).
+
+    Raises:
+        MissingNLTKResourceError: If any of the resources cannot be found. All missing
+                                  resources are reported together.
+    """
+    names = list(RESOURCES) if names is None else list(names)
+    pending = [name for name in names if name not in _VERIFIED]
+    if not pending:
+        return resource_timings()
+
+    _use_data_dir()
+    missing = []
+    for name in pending:
+        start = time.perf_counter()
+        try:
+            nltk.data.find(resource_path(name))
+        except LookupError:
+            missing.append(name)
+            continue
+        finally:
+            _TIMINGS.setdefault(name, {})['find'] = time.perf_counter() - start
+        _VERIFIED.add(name)
+
+    if missing:
+        error = MissingNLTKResourceError(missing, list(nltk.data.path))
+        logging.error(str(error))
+        raise error
+    return resource_timings()
+
+
+@contextmanager
+def load_timer(name: str):
+    """Records how long loading a resource (e.g., building the VADER analyzer) takes."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _TIMINGS.setdefault(name, {})['load'] = time.perf_counter() - start
+
+
+def resource_timings() -> dict:
+    """Returns {resource name: {'find': seconds, 'load': seconds}} for this process."""
+    return {name: dict(timing) for name, timing in _TIMINGS.items()}
+
+
+def reset():
+    """Forgets verified resources and timings (used by tests)."""
+    global _DATA_DIR_ADDED
+    _VERIFIED.clear()
+    _TIMINGS.clear()
+    _DATA_DIR_ADDED = None
+
+
+def download_resources(directory: str = None, names=None):
+    """
+    Downloads resources into the bundled data directory. This needs network access
+    and is meant for build time only; the application itself never downloads.
+    """
+    directory = directory or data_dir()
+    names = list(RESOURCES) if names is None else list(names)
+    os.makedirs(directory, exist_ok=True)
+    for name in names:
+        if not nltk.download(_package_id(name), download_dir=directory, quiet=True, raise_on_error=True):
+            raise RuntimeError(f"Failed to download NLTK resource '{name}'.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or install the NLTK resources used by Social Media AI.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('check', help="Verify all resources are installed and print load timings.")
+    download_parser = subparsers.add_parser('download', help="Download all resources into the bundled data directory.")
+    download_parser.add_argument('--dir', default=None, help=f"Target directory (default: {data_dir()}).")
+    args = parser.parse_args(argv)
+
+    if args.command == 'download':
+        download_resources(args.dir)
+        print(f"Downloaded {', '.join(RESOURCES)} to {args.dir or data_dir()}")
+        return 0
+
+    try:
+        timings = ensure_nltk_resources()
+    except MissingNLTKResourceError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for name, timing in timings.items():
+        print(f"{name:<28} found in {timing['find'] * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
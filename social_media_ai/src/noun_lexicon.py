@@ -0,0 +1,244 @@
+# This file contains the precomputed noun lexicon used for fast keyword extraction.
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+from collections import Counter, defaultdict
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', 'noun_lexicon.json.gz')
+
+_LEXICON_CACHE = {}
+
+
+class NounLexicon:
+    """
+    A compact, context-free lookup of which lowercase words are nouns.
+
+    Words are split into two frozensets: words that are (most often) tagged as nouns,
+    and words that are known but (most often) tagged as something else. Words in
+    neither set are unknown to the lexicon.
+    """
+
+    __slots__ = ('nouns', 'non_nouns')
+
+    def __init__(self, nouns, non_nouns):
+        self.nouns = frozenset(nouns)
+        self.non_nouns = frozenset(non_nouns) - self.nouns
+
+    def is_noun(self, word: str):
+        """
+        Returns True if the word is a known noun, False if it is a known non-noun
+        or contains no letters or any digits, and None if the word is not in the lexicon.
+        """
+        if word in self.nouns:
+            return True
+        if word in self.non_nouns or not _is_word(word):
+            return False
+        return None
+
+    def __len__(self):
+        return len(self.nouns) + len(self.non_nouns)
+
+    def __contains__(self, word):
+        return word in self.nouns or word in self.non_nouns
+
+
+def _is_word(token: str) -> bool:
+    """True for tokens with at least one letter and no digits."""
+    return any(ch.isalpha() for ch in token) and not any(ch.isdigit() for ch in token)
+
+
+def build_noun_lexicon(tagged_words) -> NounLexicon:
+    """
+    Builds a NounLexicon from (word, Penn Treebank tag) pairs.
+
+    Each word is lowercased and assigned its most frequent tag across all of its
+    occurrences; it counts as a noun if that tag starts with 'NN'. Only words longer
+    than two characters are kept, matching the tokens _extract_keywords looks at, and
+    words containing digits are skipped (they are never treated as nouns).
+    """
+    tag_counts = defaultdict(Counter)
+    for word, tag in tagged_words:
+        word = word.lower()
+        if len(word) > 2 and _is_word(word):
+            tag_counts[word][tag] += 1
+
+    nouns = []
+    non_nouns = []
+    for word, counts in tag_counts.items():
+        # Ties are broken by tag name so that builds are reproducible.
+        top_tag = min(counts.items(), key=lambda item: (-item[1], item[0]))[0]
+        (nouns if top_tag.startswith('NN') else non_nouns).append(word)
+    return NounLexicon(nouns, non_nouns)
+
+
+def tag_corpus(texts, tagger=None):
+    """
+    Tags every text with the NLTK averaged perceptron tagger (or the given tagger)
+    and yields (word, tag) pairs, for use with build_noun_lexicon.
+    """
+    import nltk
+    from nltk.tokenize import word_tokenize
+    tagger = tagger or nltk.pos_tag
+    for text in texts:
+        if isinstance(text, str) and text.strip():
+            yield from tagger(word_tokenize(text))
+
+
+def read_tagged_lexicon(path):
+    """
+    Reads a plain-text tagged lexicon ('word TAG [TAG ...]' per line, most frequent
+    tag first, ';;;' comment lines ignored) and yields (word, tag) pairs.
+    Lowercase entries take precedence over capitalised variants of the same word.
+    """
+    entries = {}
+    with open(path, encoding='utf-8') as lexicon_file:
+        for line in lexicon_file:
+            if line.startswith(';;;'):
+                continue
+            parts = line.split()
+            if len(parts) < 2:
+                continue
+            word, tag = parts[0], parts[1]
+            key = word.lower()
+            if key not in entries or word == key:
+                entries[key] = tag
+    return entries.items()
+
+
+def save_noun_lexicon(lexicon: NounLexicon, path: str = DEFAULT_LEXICON_PATH):
+    """Writes the lexicon as gzipped JSON with sorted word lists."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {'nouns': sorted(lexicon.nouns), 'non_nouns': sorted(lexicon.non_nouns)}
+    # mtime=0 keeps the output byte-identical across rebuilds of the same lexicon.
+    with open(path, 'wb') as raw_file:
+        with gzip.GzipFile(filename='', fileobj=raw_file, mode='wb', mtime=0) as gz_file:
+            gz_file.write(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+
+
+def load_noun_lexicon(path: str = DEFAULT_LEXICON_PATH) -> NounLexicon:
+    """
+    Loads a lexicon written by save_noun_lexicon. Lexicons are cached per path,
+    so repeated calls are free.
+
+    Raises:
+        FileNotFoundError: If the lexicon file does not exist.
+    """
+    path = os.path.abspath(path)
+    lexicon = _LEXICON_CACHE.get(path)
+    if lexicon is None:
+        with gzip.open(path, 'rt', encoding='utf-8') as lexicon_file:
+            payload = json.load(lexicon_file)
+        lexicon = NounLexicon(payload['nouns'], payload['non_nouns'])
+        _LEXICON_CACHE[path] = lexicon
+    return lexicon
+
+
+def agreement_report(token_lists, lexicon: NounLexicon, tagger=None) -> dict:
+    """
+    Compares lexicon-based noun detection with the tagger on the given token lists
+    (e.g., the filtered tokens _extract_keywords would tag).
+
+    Returns a dictionary with token counts, lexicon coverage, the agreement rate of
+    the 'lexicon' mode (unknown words counted as nouns) and the 'hybrid' mode (unknown
+    words decided by the tagger), noun precision/recall of the lexicon mode, and the
+    time spent in the tagger versus the lexicon lookups.
+    """
+    import nltk
+    tagger = tagger or nltk.pos_tag
+
+    total = known = lexicon_agree = hybrid_agree = 0
+    true_pos = false_pos = false_neg = 0
+    tagger_seconds = lexicon_seconds = 0.0
+
+    for tokens in token_lists:
+        if not tokens:
+            continue
+        start = time.perf_counter()
+        tagger_nouns = [tag.startswith('NN') for _, tag in tagger(tokens)]
+        tagger_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        lookups = [lexicon.is_noun(token) for token in tokens]
+        lexicon_seconds += time.perf_counter() - start
+
+        for looked_up, is_tagger_noun in zip(lookups, tagger_nouns):
+            total += 1
+            lexicon_noun = looked_up is not False
+            if looked_up is not None:
+                known += 1
+            hybrid_noun = is_tagger_noun if looked_up is None else looked_up
+            lexicon_agree += lexicon_noun == is_tagger_noun
+            hybrid_agree += hybrid_noun == is_tagger_noun
+            true_pos += lexicon_noun and is_tagger_noun
+            false_pos += lexicon_noun and not is_tagger_noun
+            false_neg += is_tagger_noun and not lexicon_noun
+
+    def ratio(numerator, denominator):
+        return numerator / denominator if denominator else 0.0
+
+    return {
+        'tokens': total,
+        'coverage': ratio(known, total),
+        'lexicon_agreement': ratio(lexicon_agree, total),
+        'hybrid_agreement': ratio(hybrid_agree, total),
+        'lexicon_noun_precision': ratio(true_pos, true_pos + false_pos),
+        'lexicon_noun_recall': ratio(true_pos, true_pos + false_neg),
+        'tagger_seconds': tagger_seconds,
+        'lexicon_seconds': lexicon_seconds,
+    }
+
+
+def _read_corpus(path):
+    """Reads texts from a plain-text file (one per line) or the 'Message' column of a CSV."""
+    if path.endswith('.csv'):
+        import csv
+        with open(path, encoding='utf-8', newline='') as corpus_file:
+            reader = csv.DictReader(corpus_file)
+            column = 'Message' if 'Message' in (reader.fieldnames or []) else reader.fieldnames[-1]
+            return [row[column] for row in reader]
+    with open(path, encoding='utf-8') as corpus_file:
+        return [line.rstrip('\n') for line in corpus_file]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or evaluate the noun lexicon used for fast keyword extraction.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Build the lexicon and write it to --output.")
+    source = build_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--corpus', help="Reference corpus to tag with the NLTK tagger (.csv or one text per line).")
+    source.add_argument('--tagged-lexicon', help="Plain-text tagged lexicon ('word TAG ...' per line).")
+    build_parser.add_argument('--output', default=DEFAULT_LEXICON_PATH)
+
+    report_parser = subparsers.add_parser('report', help="Benchmark and compare the lexicon against the NLTK tagger.")
+    report_parser.add_argument('--corpus', required=True, help="Evaluation corpus (.csv or one text per line).")
+    report_parser.add_argument('--lexicon', default=DEFAULT_LEXICON_PATH)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        if args.corpus:
+            tagged_words = tag_corpus(_read_corpus(args.corpus))
+        else:
+            tagged_words = read_tagged_lexicon(args.tagged_lexicon)
+        lexicon = build_noun_lexicon(tagged_words)
+        save_noun_lexicon(lexicon, args.output)
+        print(f"Wrote {len(lexicon.nouns)} nouns and {len(lexicon.non_nouns)} other words to {args.output}")
+        return 0
+
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from src.content_suggestion import ContentSuggestor
+
+    suggestor = ContentSuggestor()
+    token_lists = [suggestor._filter_tokens(text) for text in _read_corpus(args.corpus)]
+    report = agreement_report(token_lists, load_noun_lexicon(args.lexicon))
+    report['speedup'] = report['tagger_seconds'] / report['lexicon_seconds'] if report['lexicon_seconds'] else 0.0
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+# This file contains the staged fetch -> analyze -> suggest -> sink pipeline used by run_app.
+import time
+import queue
+import logging
+import threading
+
+from src import profiling, trending
+
+_DONE = object()
+
+# How often blocked queue operations re-check whether the pipeline was stopped.
+_POLL_SECONDS = 0.1
+
+
+def _call_instrumented(func, unit):
+    """Runs a stage function in a worker process, returning its stage timings and trending keyword sketch with the unit."""
+    return func(unit), profiling.drain(), trending.drain()
+
+
+class _Failure:
+    """An exception raised while producing or processing one unit, passed on in its place."""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class Stage:
+    """
+    One processing stage of a Pipeline.
+
+    Attributes:
+        name: Stage name used in the statistics.
+        func: Called with each unit from the previous stage; its return value goes to the
+              next stage. Must be picklable (a module-level function or a
+              functools.partial of one) when processes is True.
+        workers: Number of units processed concurrently.
+        processes: Run func in a process pool of `workers` processes (for CPU-bound
+                   stages) instead of in the stage's threads.
+        executor: An existing executor to run func in instead of a new process pool, so
+                  a pool (and what its workers loaded) is reused across runs. The
+                  pipeline does not shut it down.
+    """
+
+    def __init__(self, name: str, func, workers: int = 1, processes: bool = False, executor=None):
+        if workers < 1:
+            raise ValueError(f"Stage '{name}' needs at least 1 worker.")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.processes = processes or executor is not None
+        self.executor = executor
+
+
+class StageStats:
+    """Throughput counters of one stage, updated by its workers."""
+
+    __slots__ = ('name', 'workers', 'units', 'items', 'busy_seconds', 'started_at', 'finished_at', '_lock')
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.units = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float):
+        with self._lock:
+            self.units += 1
+            self.items += items
+            self.busy_seconds += seconds
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            end = self.finished_at if self.finished_at is not None else time.perf_counter()
+            elapsed = end - self.started_at if self.started_at is not None else 0.0
+            return {
+                'workers': self.workers,
+                'units': self.units,
+                'items': self.items,
+                'busy_seconds': self.busy_seconds,
+                'elapsed_seconds': elapsed,
+                'throughput_per_second': self.items / elapsed if elapsed else 0.0,
+                # Share of the stage's worker time spent working rather than waiting for input or output.
+                'utilization': self.busy_seconds / (elapsed * self.workers) if elapsed else 0.0,
+            }
+
+
+class Pipeline:
+    """
+    Runs a source and a chain of stages concurrently, connected by bounded queues.
+
+    The source iterable is consumed in its own thread (for I/O such as fetching
+    pages), and every stage runs `workers` threads, or a pool of `workers` processes.
+    A slow stage fills its input queue and blocks the stages before it, so at most
+    about queue_size units per stage are in flight. Results are yielded by run() in
+    source order, whatever order the workers finish in.
+
+    Example:
+        pipeline = Pipeline(fetch_pages(), [Stage('analyze', analyze_page, workers=2, processes=True)])
+        for page in pipeline.run():
+            show(page)
+        print(format_stage_stats(pipeline.stats()))
+    """
+
+    def __init__(self, source, stages: list, queue_size: int = 4, source_name: str = 'fetch',
+                 sink_name: str = 'sink', size=len):
+        """
+        Args:
+            source: Iterable of units (e.g., pages of tweets) to process.
+            stages: Stages to run, in order.
+            queue_size: Capacity of each queue between two stages.
+            source_name: Name of the source stage in the statistics.
+            sink_name: Name of the consumer of run() in the statistics.
+            size: Number of items in a unit, for the items-per-second statistics.
+        """
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1.")
+        self.source = source
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.source_name = source_name
+        self.sink_name = sink_name
+        self.size = size
+        self._stop = threading.Event()
+        self._stats = {source_name: StageStats(source_name, 1)}
+        for stage in self.stages:
+            self._stats[stage.name] = StageStats(stage.name, stage.workers)
+        self._stats[sink_name] = StageStats(sink_name, 1)
+
+    def stats(self) -> dict:
+        """Per-stage statistics, in pipeline order: {name: {'items', 'throughput_per_second', ...}}."""
+        return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def _put(self, target: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: queue.Queue):
+        while True:
+            try:
+                return source.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return _DONE
+
+    def _run_source(self, outbox: queue.Queue):
+        stats = self._stats[self.source_name]
+        stats.started_at = time.perf_counter()
+        iterator = iter(self.source)
+        sequence = 0
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    unit = next(iterator)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    self._put(outbox, (sequence, _Failure(e)))
+                    break
+                stats.record(self.size(unit), time.perf_counter() - start)
+                if not self._put(outbox, (sequence, unit)):
+                    break
+                sequence += 1
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+            stats.finished_at = time.perf_counter()
+            self._put(outbox, _DONE)
+
+    def _run_stage(self, stage: Stage, executor, inbox: queue.Queue, outbox: queue.Queue, running: list):
+        stats = self._stats[stage.name]
+        while True:
+            item = self._get(inbox)
+            if item is _DONE:
+                try:
+                    inbox.put_nowait(_DONE) # Let the other workers of this stage see it too
+                except queue.Full: # Only when stopped: the others stop on their own
+                    pass
+                break
+            sequence, unit = item
+            if not isinstance(unit, _Failure):
+                items = self.size(unit)
+                start = time.perf_counter()
+                try:
+                    if executor is None:
+                        unit = stage.func(unit)
+                    elif profiling.is_enabled() or trending.is_enabled(): # Bring the worker's stage timings
+                        unit, timings, keywords = executor.submit(_call_instrumented, stage.func, unit).result()
+                        profiling.merge(timings)                                  # and keyword counts back with the unit
+                        trending.merge(keywords)
+                    else:
+                        unit = executor.submit(stage.func, unit).result()
+                except Exception as e:
+                    logging.error(f"Pipeline stage '{stage.name}' failed: {e}")
+                    unit = _Failure(e)
+                else:
+                    stats.record(items, time.perf_counter() - start)
+            if not self._put(outbox, (sequence, unit)):
+                break
+        with stats._lock:
+            running[0] -= 1
+            last = running[0] == 0
+            if last:
+                stats.finished_at = time.perf_counter()
+        if last:
+            self._put(outbox, _DONE)
+
+    def run(self):
+        """
+        Starts the source and stage threads and yields the final units in source order.
+        If the source or a stage raised, the exception is re-raised here at the position
+        of the failed unit. Closing the generator early stops all stages.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        executors = []
+        threads = [threading.Thread(target=self._run_source, args=(queues[0],), name=f"pipeline-{self.source_name}", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            executor = stage.executor
+            if stage.processes and executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+                executor = ProcessPoolExecutor(max_workers=stage.workers)
+                executors.append(executor)
+            self._stats[stage.name].started_at = time.perf_counter()
+            running = [stage.workers]
+            threads.extend(
+                threading.Thread(target=self._run_stage, args=(stage, executor, queues[index], queues[index + 1], running),
+                                 name=f"pipeline-{stage.name}-{worker}", daemon=True)
+                for worker in range(stage.workers)
+            )
+
+        sink_stats = self._stats[self.sink_name]
+        sink_stats.started_at = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        pending = {}
+        next_sequence = 0
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _DONE:
+                    break
+                sequence, unit = item
+                pending[sequence] = unit
+                while next_sequence in pending:
+                    unit = pending.pop(next_sequence)
+                    next_sequence += 1
+                    if isinstance(unit, _Failure):
+                        raise unit.error
+                    start = time.perf_counter()
+                    yield unit
+                    sink_stats.record(self.size(unit), time.perf_counter() - start)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            for executor in executors:
+                executor.shutdown(cancel_futures=True)
+            sink_stats.finished_at = time.perf_counter()
+
+
+def format_stage_stats(stats: dict) -> str:
+    """One line per stage of Pipeline.stats(), for logs and the console."""
+    lines = []
+    for name, stage in stats.items():
+        lines.append(
+            f"{name:<8} {stage['items']:7d} items in {stage['elapsed_seconds']:7.2f}s "
+            f"({stage['throughput_per_second']:8.1f}/s, {stage['workers']} workers, "
+            f"{stage['utilization'] * 100:5.1f}% busy)"
+        )
+    return "\n".join(lines)
+
+
+def analyze_page(page: dict, noun_mode: str = 'tagger', components=None) -> dict:
+    """
+    Analyze stage of run_app: adds page['results'], one sentiment result per record of
+    page['records'] in the format of main.analyze_and_suggest (without 'suggestions'),
+    and page['documents'], the matching Documents for the suggest stage to reuse.
+
+    components is (sentiment_analyzer, content_suggestor); if None (in a worker
+    process), this process's own analyzers for noun_mode are used.
+    """
+    from src.main import get_worker_components
+    from src.document import as_document
+
+    sentiment_analyzer, _ = components if components is not None else get_worker_components(noun_mode)
+    results, documents = [], []
+    for record in page['records']:
+        document = as_document(record.text)
+        documents.append(document)
+        result = {'id': record.id, 'text': document.text}
+        if not document.text.strip():
+            result['error'] = "Input text is empty."
+        else:
+            try:
+                sentiment_result = sentiment_analyzer.analyze_sentiment(document)
+            except Exception as e:
+                sentiment_result = {'error': str(e)}
+            if 'error' in sentiment_result:
+                result['error'] = sentiment_result['error']
+            else:
+                result['overall_sentiment'] = sentiment_result['overall_sentiment']
+                result['sentiment'] = sentiment_result['sentiment']
+        results.append(result)
+    page['results'] = results
+    page['documents'] = documents
+    return page
+
+
+def suggest_page(page: dict, noun_mode: str = 'tagger', keyword_mode: str = 'tfidf', components=None) -> dict:
+    """
+    Suggest stage of run_app: extracts keywords for the analysed texts of a page in one
+    batch and adds 'suggestions' to each successful result of page['results'].
+    The Documents of the analyze stage (page['documents']) are reused and dropped from the page.
+    """
+    from src.main import get_worker_components
+
+    _, content_suggestor = components if components is not None else get_worker_components(noun_mode)
+    pairs = [(result, document) for result, document in zip(page['results'], page.pop('documents'))
+             if 'error' not in result]
+    analysed = [result for result, _ in pairs]
+    documents = [document for _, document in pairs]
+    batch_keywords = content_suggestor.extract_keywords_batch(documents, num_keywords=1, mode=keyword_mode) if documents else []
+    for result, document, keywords in zip(analysed, documents, batch_keywords):
+        suggestion_result = content_suggestor.suggest_content(result, keywords=keywords, document=document)
+        result['suggestions'] = suggestion_result.get('suggestions', [])
+    return page
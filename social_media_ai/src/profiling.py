@@ -0,0 +1,477 @@
+# This file contains the per-stage timers, latency histograms and --profile dumps of the analysis pipeline.
+import os
+import glob
+import json
+import math
+import time
+import random
+import functools
+import threading
+from array import array
+
+# Stages timed by the analysis code (timers are inclusive: 'keywords' contains the
+# 'tokenize' and 'pos_tag' calls made while extracting keywords, and so on).
+STAGES = ('fetch', 'spam', 'tokenize', 'vader', 'pos_tag', 'keywords', 'keywords_batch', 'suggest', 'render', 'sink_write')
+
+# Latency samples kept per stage for the percentiles; beyond this, reservoir sampling
+# keeps a uniform sample (count, mean and max stay exact).
+MAX_SAMPLES = 10_000
+
+_enabled = False
+_profile_dir = None
+_memory_snapshot_call = 1
+_histograms = {}
+_profiles = {} # stage -> [cProfile.Profile], one per thread that ran the stage
+_lock = threading.Lock()
+_local = threading.local()
+_pid = None
+
+
+class Histogram:
+    """Latency distribution of one stage (seconds), with optional memory maxima in profile mode."""
+
+    __slots__ = ('count', 'total', 'max', 'samples', 'max_net_bytes', 'max_peak_bytes', '_random')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = array('d')
+        self.max_net_bytes = None
+        self.max_peak_bytes = None
+        self._random = random.Random(0)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            slot = self._random.randrange(self.count)
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = seconds
+
+    def add_memory(self, net_bytes: int, peak_bytes: int = None):
+        if self.max_net_bytes is None or net_bytes > self.max_net_bytes:
+            self.max_net_bytes = net_bytes
+        if peak_bytes is not None and (self.max_peak_bytes is None or peak_bytes > self.max_peak_bytes):
+            self.max_peak_bytes = peak_bytes
+
+    def merge(self, state: dict):
+        """
+        Adds the data of another histogram's state() (e.g. from a worker process). The two
+        reservoirs fill the merged one in proportion to the latencies they stand for, so it
+        stays a uniform sample of all of them.
+        """
+        samples = state['samples']
+        if samples:
+            size = min(MAX_SAMPLES, len(self.samples) + len(samples))
+            share = round(size * state['count'] / (self.count + state['count']))
+            taken = min(len(samples), max(size - len(self.samples), share))
+            incoming = self._random.sample(samples, taken)
+            dropped = len(self.samples) + taken - size # Own samples replaced by incoming ones
+            for slot, seconds in zip(self._random.sample(range(len(self.samples)), dropped), incoming):
+                self.samples[slot] = seconds
+            self.samples.extend(incoming[dropped:])
+        self.count += state['count']
+        self.total += state['total']
+        self.max = max(self.max, state['max'])
+        if state['max_net_bytes'] is not None:
+            self.add_memory(state['max_net_bytes'], state['max_peak_bytes'])
+
+    def state(self) -> dict:
+        return {'count': self.count, 'total': self.total, 'max': self.max, 'samples': self.samples.tolist(),
+                'max_net_bytes': self.max_net_bytes, 'max_peak_bytes': self.max_peak_bytes}
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples)
+        summary = {
+            'count': self.count,
+            'total_seconds': self.total,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': _nearest_rank(ordered, 50) * 1000,
+            'p95_ms': _nearest_rank(ordered, 95) * 1000,
+            'p99_ms': _nearest_rank(ordered, 99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+        if self.max_net_bytes is not None:
+            summary['max_net_kib'] = self.max_net_bytes / 1024
+        if self.max_peak_bytes is not None:
+            summary['max_peak_kib'] = self.max_peak_bytes / 1024
+        return summary
+
+
+def _nearest_rank(ordered, percent: float) -> float:
+    """Nearest-rank percentile of sorted values (0.0 if there are none)."""
+    if not ordered:
+        return 0.0
+    return ordered[max(1, math.ceil(len(ordered) * percent / 100)) - 1]
+
+
+class _NullTimer:
+    """The timer returned while instrumentation is disabled: entering and leaving it does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('stage', 'start', 'profiled', 'memory')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.profiled = False
+        self.memory = None
+
+    def __enter__(self):
+        if _profile_dir is not None:
+            _profile_enter(self)
+            self.profiled = True
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        histogram = _histogram(self.stage)
+        with _lock:
+            histogram.add(elapsed)
+        if self.profiled:
+            _profile_exit(self, histogram)
+        return False
+
+
+def timer(stage: str):
+    """
+    Context manager timing one call of a stage:
+
+        with profiling.timer('vader'):
+            scores = analyzer.polarity_scores(text)
+
+    While instrumentation is disabled (the default) this returns a shared no-op
+    object, so the cost is one function call and one global lookup.
+    """
+    return _Timer(stage) if _enabled else _NULL_TIMER
+
+
+def timed(stage: str):
+    """
+    Decorator timing every call of a function as one call of `stage`. While
+    instrumentation is disabled, the wrapper only adds a flag check to each call.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _check_process():
+    """In a freshly forked worker process, drops the data inherited from the parent (which reports its own)."""
+    global _pid
+    if _pid != os.getpid():
+        with _lock:
+            if _pid != os.getpid():
+                _histograms.clear()
+                _profiles.clear()
+                _local.__dict__.clear()
+                _pid = os.getpid()
+
+
+def _histogram(stage: str) -> Histogram:
+    _check_process()
+    histogram = _histograms.get(stage)
+    if histogram is None:
+        with _lock:
+            histogram = _histograms.setdefault(stage, Histogram())
+    return histogram
+
+
+def enable(profile_dir: str = None, memory_snapshot_call: int = 1):
+    """
+    Turns the stage timers on (in this process and in worker processes forked from it).
+
+    Args:
+        profile_dir: If given, every stage also runs under cProfile and tracemalloc, and
+                     dump_profiles() writes the results to this directory. This slows
+                     the run down several times and is meant for finding hot spots.
+        memory_snapshot_call: Which call of each stage (1 = the first, which includes
+                              one-time loading) gets tracemalloc snapshots around it.
+    """
+    global _enabled, _profile_dir, _memory_snapshot_call
+    if profile_dir is not None:
+        import tracemalloc
+        os.makedirs(profile_dir, exist_ok=True)
+        for _, files in _per_stage_files(profile_dir): # Per-process files of an earlier run
+            for path in files:
+                os.remove(path)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+    _profile_dir = profile_dir
+    _memory_snapshot_call = memory_snapshot_call
+    _enabled = True
+
+
+def disable():
+    """Turns the stage timers (and profiling) off; recorded data is kept until reset()."""
+    global _enabled, _profile_dir
+    if _profile_dir is not None:
+        import tracemalloc
+        tracemalloc.stop()
+    _enabled = False
+    _profile_dir = None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Discards the recorded timings and profiles of this process."""
+    with _lock:
+        _histograms.clear()
+        _profiles.clear()
+    _local.__dict__.clear()
+
+
+def record(stage: str, seconds: float):
+    """Adds a latency measured elsewhere to a stage's histogram (only while enabled)."""
+    if _enabled:
+        histogram = _histogram(stage)
+        with _lock:
+            histogram.add(seconds)
+
+
+def _profile_enter(timer: _Timer):
+    import cProfile
+    import tracemalloc
+
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+        _local.profiles = {}
+    # Only one profiler can be active per thread: the enclosing stage's profiler is
+    # paused while a nested stage runs, so each .prof holds the stage's own time.
+    if stack:
+        stack[-1].disable()
+    profile = _local.profiles.get(timer.stage)
+    if profile is None:
+        profile = _local.profiles[timer.stage] = cProfile.Profile()
+        with _lock:
+            _profiles.setdefault(timer.stage, []).append(profile)
+    stack.append(profile)
+
+    if tracemalloc.is_tracing():
+        histogram = _histogram(timer.stage)
+        snapshot = tracemalloc.take_snapshot() if histogram.count + 1 == _memory_snapshot_call else None
+        if len(stack) == 1:
+            tracemalloc.reset_peak() # Peaks (process-wide) are only measured for outermost stages
+        timer.memory = (tracemalloc.get_traced_memory()[0], snapshot)
+    _enable_profile(profile) # Last, so the bookkeeping above is not profiled
+
+
+def _profile_exit(timer: _Timer, histogram: Histogram):
+    import tracemalloc
+
+    stack = _local.stack
+    stack.pop().disable()
+
+    if timer.memory is not None and tracemalloc.is_tracing():
+        start_bytes, snapshot = timer.memory
+        current, peak = tracemalloc.get_traced_memory()
+        with _lock:
+            histogram.add_memory(current - start_bytes, peak - start_bytes if not stack else None)
+        if snapshot is not None:
+            _write_memory_snapshot(timer.stage, snapshot, tracemalloc.take_snapshot())
+    if stack:
+        _enable_profile(stack[-1])
+
+
+def _enable_profile(profile):
+    try:
+        profile.enable()
+    except ValueError: # Another profiler is active (e.g. the whole run is under cProfile)
+        pass
+
+
+def _write_memory_snapshot(stage: str, before, after):
+    """Dumps the snapshot taken after a stage call, and the top allocations of that call as text."""
+    import tracemalloc
+
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    before, after = before.filter_traces(ignore), after.filter_traces(ignore)
+    base = os.path.join(_profile_dir, f"{stage}.{os.getpid()}")
+    after.dump(base + '.tracemalloc')
+    lines = [f"Top allocations of call {_memory_snapshot_call} of stage '{stage}' (size, change, location):"]
+    for difference in after.compare_to(before, 'lineno')[:20]:
+        frame = difference.traceback[0]
+        lines.append(f"{difference.size / 1024:10.1f} KiB {difference.size_diff / 1024:+10.1f} KiB  "
+                     f"{frame.filename}:{frame.lineno}")
+    with open(base + '.memory.txt', 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def drain() -> dict:
+    """
+    Returns and clears this process's histogram states, for a worker process to send
+    its timings to the parent (see merge). In profile mode, the worker's cProfile
+    data is written to the profile directory as <stage>.<pid>.prof first.
+    """
+    if not _enabled:
+        return {}
+    _check_process()
+    if _profile_dir is not None:
+        _dump_process_profiles()
+    with _lock:
+        states = {stage: histogram.state() for stage, histogram in _histograms.items() if histogram.count}
+        _histograms.clear()
+    return states
+
+
+def merge(states: dict):
+    """Adds histogram states returned by drain() in another process."""
+    for stage, state in states.items():
+        histogram = _histogram(stage)
+        with _lock:
+            histogram.merge(state)
+
+
+def _dump_process_profiles():
+    import pstats
+
+    with _lock:
+        profiles = {stage: list(stage_profiles) for stage, stage_profiles in _profiles.items()}
+    for stage, stage_profiles in profiles.items():
+        stats = None
+        for profile in stage_profiles:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats is not None:
+            stats.dump_stats(os.path.join(_profile_dir, f"{stage}.{os.getpid()}.prof"))
+
+
+def dump_profiles(top: int = 25) -> list[str]:
+    """
+    Writes the cProfile data of every stage, merged over threads and worker processes,
+    to <profile_dir>/<stage>.prof (load with pstats or snakeviz), plus the `top`
+    functions by cumulative time to <stage>.txt. Returns the paths of the .prof files.
+    """
+    import io
+    import pstats
+
+    if _profile_dir is None:
+        return []
+    _dump_process_profiles()
+    paths = []
+    for stage, files in _per_stage_files(_profile_dir):
+        stats = pstats.Stats(*files)
+        path = os.path.join(_profile_dir, f"{stage}.prof")
+        stats.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(path, stream=text).sort_stats('cumulative').print_stats(top)
+        with open(os.path.join(_profile_dir, f"{stage}.txt"), 'w', encoding='utf-8') as f:
+            f.write(text.getvalue())
+        paths.append(path)
+    return paths
+
+
+def _per_stage_files(directory: str) -> list:
+    """[(stage, [<stage>.<pid>.prof paths])] in a profile directory."""
+    files = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.*.prof'))):
+        stage, pid = os.path.basename(path)[:-len('.prof')].rsplit('.', 1)
+        if pid.isdigit():
+            files.setdefault(stage, []).append(path)
+    return sorted(files.items())
+
+
+def summary() -> dict:
+    """{stage: {'count', 'total_seconds', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', ...}} of this process."""
+    with _lock:
+        return {stage: histogram.summary() for stage, histogram in sorted(_histograms.items()) if histogram.count}
+
+
+def format_summary(stats: dict) -> str:
+    """A table of summary(), one line per stage, for the console."""
+    if not stats:
+        return "No stage timings recorded."
+    lines = [f"{'stage':<15} {'count':>8} {'total s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+    for stage, row in stats.items():
+        line = (f"{stage:<15} {row['count']:8d} {row['total_seconds']:9.3f} {row['mean_ms']:9.3f} "
+                f"{row['p50_ms']:9.3f} {row['p95_ms']:9.3f} {row['p99_ms']:9.3f} {row['max_ms']:9.3f}")
+        if 'max_net_kib' in row:
+            line += f"  net {row['max_net_kib']:.0f} KiB"
+        if 'max_peak_kib' in row:
+            line += f", peak {row['max_peak_kib']:.0f} KiB"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def export_summary(path: str, stats: dict = None):
+    """Writes summary() (or `stats`) to a .json file, or a .csv file for that extension."""
+    stats = summary() if stats is None else stats
+    if path.lower().endswith('.csv'):
+        import csv
+        columns = ['count', 'total_seconds', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'max_net_kib', 'max_peak_kib']
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['stage'] + columns)
+            for stage, row in stats.items():
+                writer.writerow([stage] + [row.get(column, '') for column in columns])
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+
+
+def add_arguments(parser):
+    """Adds --timings, --timings-output and --profile to an argparse parser."""
+    parser.add_argument('--timings', action='store_true',
+                        help="Time each analysis stage and print a latency table (count, mean, p50/p95/p99) to stderr at the end.")
+    parser.add_argument('--timings-output', metavar='PATH',
+                        help="Also write the stage timings to this .json (or .csv) file; implies --timings.")
+    parser.add_argument('--profile', metavar='DIR',
+                        help="Run every stage under cProfile and tracemalloc and write per-stage profiles, memory "
+                             "snapshots and the timings (summary.json) to DIR; implies --timings. Slows the run down.")
+    return parser
+
+
+def enable_from_args(args) -> bool:
+    """Enables instrumentation as requested by the add_arguments options; returns whether it is on."""
+    if args.profile or args.timings or args.timings_output:
+        enable(profile_dir=args.profile)
+        return True
+    return False
+
+
+def report_from_args(args, stream=None):
+    """Prints, exports and dumps the results of a run enabled by enable_from_args, then disables it."""
+    import sys
+
+    if not _enabled:
+        return
+    stats = summary()
+    print("--- Stage Timings ---\n" + format_summary(stats), file=stream or sys.stderr)
+    if args.timings_output:
+        export_summary(args.timings_output, stats)
+    if args.profile:
+        export_summary(os.path.join(args.profile, 'summary.json'), stats)
+        dump_profiles()
+    disable()
@@ -0,0 +1,398 @@
+# This file contains the batched result sinks (SQLite, Parquet, JSONL) that persist analysis results.
+import os
+import json
+import time
+import queue
+import sqlite3
+import logging
+import threading
+
+from src import profiling
+
+# Columns of a stored result, flattened from the dicts of main.analyze_and_suggest.
+RESULT_COLUMNS = ('id', 'text', 'overall_sentiment', 'positive', 'negative', 'neutral', 'compound',
+                  'suggestions', 'error', 'spam_score')
+
+_CLOSE = object()
+
+
+def result_row(result: dict) -> tuple:
+    """Flattens a result dict into a tuple in RESULT_COLUMNS order (missing values are None)."""
+    sentiment = result.get('sentiment') or {}
+    return (
+        result.get('id'),
+        result.get('text'),
+        result.get('overall_sentiment'),
+        sentiment.get('positive'),
+        sentiment.get('negative'),
+        sentiment.get('neutral'),
+        sentiment.get('compound'),
+        result.get('suggestions'),
+        result.get('error'),
+        result.get('spam_score'),
+    )
+
+
+class _Flush:
+    """Marker asking the writer thread to write its buffer now and signal when done."""
+
+    __slots__ = ('done',)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class ResultSink:
+    """
+    Base class of the result sinks: results are written in batches by one writer thread.
+
+    write() (or calling the sink) can be used from any number of worker threads; it
+    only puts the result on a bounded queue, and blocks when the writer falls that far
+    behind. The writer thread writes a batch when flush_size results are buffered or
+    flush_interval seconds have passed since the last write, whichever comes first.
+    An error in the writer thread is raised by the next write(), flush() or close().
+
+    Subclasses implement _write_rows(rows) (or _write_results(results) to get the
+    unflattened dicts) and _close_backend(); both are only called from the writer
+    thread, and the backend is opened before it starts.
+
+    Resumable sinks (resumable = True) also implement _backend_position(), a value
+    identifying the end of the written output, and accept resume_from=<position> to
+    reopen existing output and discard anything written after that position. After
+    flush(), `position` covers every result written so far (see batch --resume).
+    """
+
+    resumable = False
+
+    def __init__(self, flush_size: int = 1000, flush_interval: float = 1.0, queue_size: int = 10_000):
+        """
+        Args:
+            flush_size: Results per batch written to the backend.
+            flush_interval: Maximum seconds a buffered result waits before being written.
+            queue_size: Capacity of the queue between the writers and the writer thread.
+        """
+        if flush_size < 1:
+            raise ValueError("flush_size must be at least 1.")
+        if flush_interval <= 0:
+            raise ValueError("flush_interval must be positive.")
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self.rows_written = 0
+        self.batches_written = 0
+        self.write_seconds = 0.0
+        self.position = self._backend_position()
+        self._thread = threading.Thread(target=self._run, name=f"{type(self).__name__}-writer", daemon=True)
+        self._thread.start()
+
+    def _write_results(self, results: list[dict]):
+        self._write_rows([result_row(result) for result in results])
+
+    def _write_rows(self, rows: list[tuple]):
+        raise NotImplementedError
+
+    def _close_backend(self):
+        pass
+
+    def _sync_backend(self):
+        pass
+
+    def _backend_position(self):
+        return None
+
+    def _write_batch(self, buffer: list):
+        if not buffer or self._error is not None:
+            buffer.clear()
+            return
+        start = time.perf_counter()
+        try:
+            with profiling.timer('sink_write'):
+                self._write_results(buffer)
+        except Exception as e:
+            logging.error(f"{type(self).__name__} failed to write {len(buffer)} results: {e}")
+            self._error = e
+        else:
+            self.rows_written += len(buffer)
+            self.batches_written += 1
+            self.position = self._backend_position()
+        self.write_seconds += time.perf_counter() - start
+        buffer.clear()
+
+    def _run(self):
+        buffer = []
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty: # flush_interval elapsed
+                    self._write_batch(buffer)
+                    deadline = None
+                    continue
+                if item is _CLOSE:
+                    self._write_batch(buffer)
+                    return
+                if isinstance(item, _Flush):
+                    self._write_batch(buffer)
+                    deadline = None
+                    try:
+                        self._sync_backend()
+                    except Exception as e:
+                        logging.error(f"{type(self).__name__} failed to sync: {e}")
+                        self._error = self._error or e
+                    item.done.set()
+                    continue
+                buffer.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(buffer) >= self.flush_size:
+                    self._write_batch(buffer)
+                    deadline = None
+        finally:
+            try:
+                self._close_backend()
+            except Exception as e:
+                logging.error(f"{type(self).__name__} failed to close: {e}")
+                self._error = self._error or e
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError(f"{type(self).__name__} writer failed: {self._error}") from self._error
+
+    def write(self, result: dict):
+        """Queues one result dict for writing."""
+        if self._closed:
+            raise ValueError("write to a closed result sink.")
+        self._raise_error()
+        self._queue.put(result)
+
+    __call__ = write
+
+    def flush(self):
+        """Blocks until every result queued so far has been written (and synced to disk)."""
+        if self._closed:
+            return
+        marker = _Flush()
+        self._queue.put(marker)
+        while not marker.done.wait(0.1):
+            if not self._thread.is_alive():
+                break
+        self._raise_error()
+
+    def close(self):
+        """Writes the remaining results and closes the backend."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        self._raise_error()
+
+    def stats(self) -> dict:
+        return {
+            'rows_written': self.rows_written,
+            'batches_written': self.batches_written,
+            'write_seconds': self.write_seconds,
+            'rows_per_write_second': self.rows_written / self.write_seconds if self.write_seconds else 0.0,
+            'queued': self._queue.qsize(),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SQLiteResultSink(ResultSink):
+    """
+    Writes results to a SQLite table with one executemany per batch, in one transaction.
+    The database uses WAL journaling with synchronous=NORMAL, so readers are not blocked
+    and a batch costs one fsync-free append to the log; flush() checkpoints the log into the
+    database with fsync, so a position taken after it survives a crash. Suggestions are
+    stored as JSON text.
+    Like a JSONL file, an existing table starts over unless resuming; the position is the last rowid.
+    """
+
+    resumable = True
+
+    def __init__(self, path: str, table: str = 'results', resume_from: int = None, **kwargs):
+        """
+        Args:
+            path: Path of the SQLite database file (created if needed).
+            table: Name of the results table (created if needed).
+            resume_from: If given, rows after this rowid (written after a checkpoint) are deleted;
+                         otherwise every existing row is.
+            **kwargs: flush_size, flush_interval and queue_size of ResultSink.
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name '{table}'.")
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.table = table
+        self._connection = sqlite3.connect(path, check_same_thread=False) # Used by the writer thread only
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    id INTEGER,
+                    text TEXT,
+                    overall_sentiment TEXT,
+                    positive REAL,
+                    negative REAL,
+                    neutral REAL,
+                    compound REAL,
+                    suggestions TEXT,
+                    error TEXT,
+                    spam_score REAL
+                )
+            """)
+        if resume_from is not None:
+            last = self._connection.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+            if last < resume_from:
+                self._connection.close()
+                raise ValueError(f"{path} has rows up to rowid {last}, fewer than the {resume_from} of the checkpoint.")
+        with self._connection:
+            if resume_from is not None:
+                self._connection.execute(f"DELETE FROM {table} WHERE rowid > ?", (resume_from,))
+            else:
+                self._connection.execute(f"DELETE FROM {table}")
+        self._insert = f"INSERT INTO {table} ({', '.join(RESULT_COLUMNS)}) VALUES ({', '.join('?' * len(RESULT_COLUMNS))})"
+        super().__init__(**kwargs)
+
+    def _write_rows(self, rows):
+        suggestions = RESULT_COLUMNS.index('suggestions')
+        rows = [
+            row[:suggestions] + (json.dumps(row[suggestions], ensure_ascii=False) if row[suggestions] is not None else None,) + row[suggestions + 1:]
+            for row in rows
+        ]
+        with self._connection:
+            self._connection.executemany(self._insert, rows)
+
+    def _sync_backend(self):
+        self._connection.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def _backend_position(self):
+        return self._connection.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {self.table}").fetchone()[0]
+
+    def _close_backend(self):
+        self._connection.close()
+
+
+class ParquetResultSink(ResultSink):
+    """
+    Writes results to a Parquet file with pyarrow, one row group per batch: a batch is
+    converted to Arrow columns once and appended, so the file stays readable by
+    column and writes cost one encode per flush_size results. Needs pyarrow.
+
+    Ids are stored as strings, since input records may carry string ids (e.g., from
+    CSV files).
+    """
+
+    def __init__(self, path: str, **kwargs):
+        """
+        Args:
+            path: Path of the Parquet file (overwritten).
+            **kwargs: flush_size (the row group size), flush_interval and queue_size of ResultSink.
+        """
+        if kwargs.pop('resume_from', None) is not None:
+            raise ValueError("Parquet output cannot be resumed (a Parquet file cannot be appended to); use .jsonl or .sqlite.")
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Writing Parquet needs pyarrow. Install it with: pip install pyarrow") from None
+        self.path = path
+        self._pa = pa
+        self._schema = pa.schema([
+            ('id', pa.string()),
+            ('text', pa.string()),
+            ('overall_sentiment', pa.string()),
+            ('positive', pa.float64()),
+            ('negative', pa.float64()),
+            ('neutral', pa.float64()),
+            ('compound', pa.float64()),
+            ('suggestions', pa.list_(pa.string())),
+            ('error', pa.string()),
+            ('spam_score', pa.float64()),
+        ])
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._writer = pq.ParquetWriter(path, self._schema)
+        super().__init__(**kwargs)
+
+    def _write_rows(self, rows):
+        columns = list(zip(*rows))
+        columns[0] = [None if id is None else str(id) for id in columns[0]]
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema,
+        ))
+
+    def _close_backend(self):
+        self._writer.close()
+
+
+class JSONLResultSink(ResultSink):
+    """
+    Writes each result dict as one JSON line (unflattened), one write call per batch.
+    The position is the byte offset of the end of the file.
+    """
+
+    resumable = True
+
+    def __init__(self, path: str, resume_from: int = None, **kwargs):
+        """
+        Args:
+            path: Path of the JSONL file (overwritten unless resuming).
+            resume_from: If given, the existing file is kept up to this byte offset and appended to.
+            **kwargs: flush_size, flush_interval and queue_size of ResultSink.
+        """
+        self.path = path
+        if resume_from is None:
+            self._file = open(path, 'wb')
+        else:
+            self._file = open(path, 'r+b')
+            size = self._file.seek(0, os.SEEK_END)
+            if size < resume_from:
+                self._file.close()
+                raise ValueError(f"{path} has {size} bytes, fewer than the {resume_from} of the checkpoint.")
+            self._file.truncate(resume_from)
+            self._file.seek(resume_from)
+        super().__init__(**kwargs)
+
+    def _write_results(self, results):
+        self._file.write(''.join(json.dumps(result, ensure_ascii=False) + '\n' for result in results).encode('utf-8'))
+        self._file.flush()
+
+    def _sync_backend(self):
+        os.fsync(self._file.fileno())
+
+    def _backend_position(self):
+        return self._file.tell()
+
+    def _close_backend(self):
+        self._file.close()
+
+
+# Sink classes by file extension, used by open_result_sink.
+SINKS = {
+    '.sqlite': SQLiteResultSink,
+    '.sqlite3': SQLiteResultSink,
+    '.db': SQLiteResultSink,
+    '.parquet': ParquetResultSink,
+    '.jsonl': JSONLResultSink,
+    '.json': JSONLResultSink,
+}
+
+
+def open_result_sink(path: str, **kwargs) -> ResultSink:
+    """
+    Opens the sink for a path by its extension (see SINKS); unknown extensions are
+    written as JSONL. kwargs are passed to the sink (flush_size, flush_interval, ...).
+    """
+    sink_class = SINKS.get(os.path.splitext(path)[1].lower(), JSONLResultSink)
+    return sink_class(path, **kwargs)
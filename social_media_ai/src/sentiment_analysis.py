@@ -1,6 +1,15 @@
-import nltk
+import os
+import sys
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 
+if not __package__: # Allow direct execution (python src/sentiment_analysis.py)
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.document import Document
+from src.tweet_record import record_text
+from src.nltk_resources import ensure_nltk_resources, load_timer
+from src import profiling
+
 class SentimentAnalyzer:
     """
     A class to perform sentiment analysis on text using VADER.
@@ -9,20 +18,24 @@ class SentimentAnalyzer:
     def __init__(self):
         """
         Initializes the SentimentIntensityAnalyzer.
-        Downloads the 'vader_lexicon' if not already present.
+        The 'vader_lexicon' must be installed locally (see src.nltk_resources);
+        it is never downloaded at runtime.
+
+        Raises:
+            MissingNLTKResourceError: If 'vader_lexicon' is not installed.
         """
-        try:
-            nltk.data.find('sentiment/vader_lexicon.zip')
-        except nltk.downloader.DownloadError:
-            nltk.download('vader_lexicon')
-        self.analyzer = SentimentIntensityAnalyzer()
+        ensure_nltk_resources(['vader_lexicon'])
+        with load_timer('vader_lexicon'):
+            self.analyzer = SentimentIntensityAnalyzer()
 
-    def analyze_sentiment(self, text: str) -> dict:
+    def analyze_sentiment(self, text) -> dict:
         """
         Analyzes the sentiment of a given text.
 
         Args:
-            text: The input string to analyze.
+            text: The input string, or a Document or TweetRecord wrapping it, to analyze.
+                  VADER scores the original (case-preserved) text, so a Document's
+                  lowercased tokens are not used here.
 
         Returns:
             A dictionary containing the input text, sentiment scores (compound,
@@ -41,13 +54,18 @@ class SentimentAnalyzer:
                 'overall_sentiment': 'positive'
             }
         """
+        text = record_text(text)
+        if isinstance(text, Document):
+            text = text.text
+
         if not isinstance(text, str):
             return {
                 'error': 'Input must be a string.',
                 'text': text
             }
 
-        sentiment_scores = self.analyzer.polarity_scores(text)
+        with profiling.timer('vader'):
+            sentiment_scores = self.analyzer.polarity_scores(text)
         compound_score = sentiment_scores['compound']
 
         if compound_score >= 0.05:
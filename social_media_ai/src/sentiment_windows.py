@@ -0,0 +1,258 @@
+# This file contains streaming sentiment aggregates per query or keyword over tumbling and sliding time windows.
+import math
+import time
+import threading
+from array import array
+from collections import OrderedDict
+
+LABELS = ('negative', 'neutral', 'positive')
+# The compound score lies in [-1, 1]; SCORE_BINS bins of width 0.01 bound the quantile error to 0.005.
+SCORE_BINS = 200
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+class ScoreSketch:
+    """
+    A fixed-bin histogram of compound scores: constant memory (SCORE_BINS counters)
+    however many scores are added, mergeable by adding counters, with exact count,
+    mean, min and max and quantiles to within half a bin (0.005).
+    """
+
+    __slots__ = ('bins', 'count', 'total', 'minimum', 'maximum')
+
+    def __init__(self):
+        self.bins = array('I', bytes(4 * SCORE_BINS))
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, score: float):
+        score = min(max(score, -1.0), 1.0)
+        self.bins[min(int((score + 1.0) * SCORE_BINS / 2.0), SCORE_BINS - 1)] += 1
+        self.count += 1
+        self.total += score
+        self.minimum = min(self.minimum, score)
+        self.maximum = max(self.maximum, score)
+
+    def merge(self, other: 'ScoreSketch'):
+        for index, count in enumerate(other.bins):
+            if count:
+                self.bins[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        The nearest-rank q-quantile (0 < q <= 1), as the midpoint of its bin clamped to
+        [min, max] (the exact min and max for the first and last rank).
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        if rank == 1:
+            return self.minimum
+        if rank >= self.count:
+            return self.maximum
+        seen = 0
+        for index, count in enumerate(self.bins):
+            seen += count
+            if seen >= rank:
+                midpoint = -1.0 + (index + 0.5) * 2.0 / SCORE_BINS
+                return min(max(midpoint, self.minimum), self.maximum)
+        return self.maximum
+
+
+class _Pane:
+    """Label counts and score sketch of one key over one slide interval."""
+
+    __slots__ = ('labels', 'scores')
+
+    def __init__(self):
+        self.labels = [0] * len(LABELS)
+        self.scores = ScoreSketch()
+
+
+class SentimentWindows:
+    """
+    Rolling sentiment aggregates per key (a search query or a keyword), fed one
+    analysis result at a time, for monitoring sentiment over time without keeping
+    the per-post results.
+
+    Windows are `size` seconds long and start every `slide` seconds (slide == size,
+    the default, gives tumbling windows; a smaller slide, which must divide size,
+    gives sliding windows). Results are bucketed by event time into panes of one
+    slide; a window is the merge of its size/slide panes, so each key keeps at most
+    size/slide + 1 panes of SCORE_BINS counters, and at most max_keys keys are kept
+    (the least recently updated key is evicted first). Results older than the
+    previous window are counted as late and dropped.
+
+    Thread-safe: workers can add results while summaries are read.
+
+        windows = SentimentWindows(size=300, slide=60)
+        windows.add(result, ['#brand'], timestamp=record.created_at)
+        windows.summary('#brand')
+    """
+
+    def __init__(self, size: float = 300.0, slide: float = None, max_keys: int = 1000, clock=time.time):
+        """
+        Args:
+            size: Window length in seconds.
+            slide: Seconds between window starts (default: size, i.e. tumbling windows).
+            max_keys: Maximum number of keys kept.
+            clock: Time source for results without a timestamp.
+        """
+        slide = size if slide is None else slide
+        if size <= 0 or slide <= 0:
+            raise ValueError("size and slide must be positive.")
+        panes = round(size / slide)
+        if panes < 1 or abs(panes * slide - size) > 1e-9 * size:
+            raise ValueError("slide must divide size.")
+        if max_keys < 1:
+            raise ValueError("max_keys must be at least 1.")
+        self.size = size
+        self.slide = slide
+        self.panes_per_window = panes
+        self.max_keys = max_keys
+        self._clock = clock
+        self._keys = OrderedDict() # key -> {pane index: _Pane}, least recently updated first
+        self._watermark = None # Latest pane index seen
+        self._lock = threading.Lock()
+        self.added = 0
+        self.skipped = 0
+        self.late = 0
+        self.evicted_keys = 0
+
+    def add(self, result: dict, keys, timestamp: float = None) -> bool:
+        """
+        Adds an analysis result (with 'overall_sentiment' and the 'sentiment' scores, as
+        returned by SentimentAnalyzer.analyze_sentiment or main.analyze_and_suggest) to
+        the windows of each key. Errors, spam and results without keys are skipped.
+
+        Returns:
+            True if the result was added, False if it was skipped or late.
+        """
+        label = result.get('overall_sentiment')
+        scores = result.get('sentiment')
+        keys = [key for key in keys if key is not None]
+        if label not in LABELS or not scores or not keys:
+            with self._lock:
+                self.skipped += 1
+            return False
+        timestamp = self._clock() if timestamp is None else timestamp
+        pane_index = math.floor(timestamp / self.slide)
+        with self._lock:
+            if self._watermark is None or pane_index > self._watermark:
+                self._watermark = pane_index
+            oldest = self._watermark - self.panes_per_window
+            if pane_index < oldest:
+                self.late += 1
+                return False
+            for key in keys:
+                panes = self._keys.get(key)
+                if panes is None:
+                    if len(self._keys) >= self.max_keys:
+                        self._keys.popitem(last=False)
+                        self.evicted_keys += 1
+                    panes = self._keys[key] = {}
+                else:
+                    self._keys.move_to_end(key)
+                    for index in [index for index in panes if index < oldest]:
+                        del panes[index]
+                pane = panes.get(pane_index)
+                if pane is None:
+                    pane = panes[pane_index] = _Pane()
+                pane.labels[LABELS.index(label)] += 1
+                pane.scores.add(scores['compound'])
+            self.added += 1
+        return True
+
+    def _window_end(self, now: float = None, complete: bool = False):
+        """Index of the last pane of the current window (at `now`, or at the latest event), or None."""
+        end = math.floor(now / self.slide) if now is not None else self._watermark
+        if end is None:
+            return None
+        return end - 1 if complete else end
+
+    def _summarize(self, key, panes: dict, end: int, complete: bool) -> dict:
+        labels = [0] * len(LABELS)
+        scores = ScoreSketch()
+        for index in range(end - self.panes_per_window + 1, end + 1):
+            pane = panes.get(index)
+            if pane is not None:
+                labels = [total + count for total, count in zip(labels, pane.labels)]
+                scores.merge(pane.scores)
+        if not scores.count:
+            return None
+        return {
+            'key': key,
+            'window_start': (end - self.panes_per_window + 1) * self.slide,
+            'window_end': (end + 1) * self.slide,
+            'complete': complete,
+            'count': scores.count,
+            'labels': dict(zip(LABELS, labels)),
+            'mean_compound': scores.mean,
+            'min_compound': scores.minimum,
+            'max_compound': scores.maximum,
+            'quantiles': {f"p{round(q * 100):02d}": scores.quantile(q) for q in QUANTILES},
+        }
+
+    def summary(self, key, now: float = None, complete: bool = False):
+        """
+        Aggregates of `key` over the current window, or None if it has no results there.
+
+        The current window ends with the pane of `now` (default: of the latest result
+        added), so it includes the slide still in progress; with complete=True the
+        window ending one slide earlier, which no longer changes (except by late
+        results within the previous window), is summarized instead.
+
+        Returns:
+            {'key', 'window_start', 'window_end', 'complete', 'count', 'labels':
+            {label: count}, 'mean_compound', 'min_compound', 'max_compound',
+            'quantiles': {'p05', 'p25', 'p50', 'p75', 'p95'}}
+        """
+        with self._lock:
+            end = self._window_end(now, complete)
+            panes = self._keys.get(key)
+            if end is None or panes is None:
+                return None
+            return self._summarize(key, panes, end, complete)
+
+    def summaries(self, now: float = None, complete: bool = False) -> list[dict]:
+        """The summaries (see summary) of every key with results in the window, most results first."""
+        with self._lock:
+            end = self._window_end(now, complete)
+            if end is None:
+                return []
+            summaries = [self._summarize(key, panes, end, complete) for key, panes in self._keys.items()]
+        return sorted((summary for summary in summaries if summary is not None), key=lambda summary: -summary['count'])
+
+    def stats(self) -> dict:
+        with self._lock:
+            panes = sum(len(panes) for panes in self._keys.values())
+            return {
+                'keys': len(self._keys),
+                'panes': panes,
+                'added': self.added,
+                'skipped': self.skipped,
+                'late': self.late,
+                'evicted_keys': self.evicted_keys,
+                'sketch_bytes': panes * SCORE_BINS * 4,
+            }
+
+
+def format_summary(summary: dict) -> str:
+    """One-line report of a window summary for logs."""
+    labels = summary['labels']
+    quantiles = summary['quantiles']
+    return (f"{summary['key']} [{time.strftime('%H:%M:%S', time.localtime(summary['window_start']))}-"
+            f"{time.strftime('%H:%M:%S', time.localtime(summary['window_end']))}): n={summary['count']} "
+            f"neg/neu/pos={labels['negative']}/{labels['neutral']}/{labels['positive']} "
+            f"mean={summary['mean_compound']:+.3f} p05={quantiles['p05']:+.2f} p50={quantiles['p50']:+.2f} "
+            f"p95={quantiles['p95']:+.2f}")
@@ -0,0 +1,520 @@
+"""
+Async HTTP analysis service: sentiment analysis and content suggestions over JSON.
+
+Endpoints (all responses are JSON):
+    POST /sentiment   {"text": "..."} -> {"id", "text", "overall_sentiment", "sentiment"}
+    POST /suggest     {"text": "..."} -> the same plus "suggestions" (see main.analyze_and_suggest)
+    POST /bulk        {"texts": ["...", {"id": 1, "text": "..."}, ...]} -> {"results": [...]}, in order
+    GET  /health      {"status": "ok"} once the workers are loaded ("starting" with status 503 before)
+    GET  /metrics     request counts, latency percentiles, batch sizes and queue depth
+    GET  /trending    {"terms": [{"term", "count", "error", "share"}, ...]}, the top --trending K
+                      keywords of the suggested texts (404 unless started with --trending)
+
+The event loop only parses requests and serializes responses. Texts from concurrent
+requests are collected into micro-batches (up to --max-batch-size texts, waiting
+at most --max-wait-ms for a batch to fill) that are analysed in a pool of worker
+processes. Each worker loads the NLTK resources, VADER and the noun lexicon once when
+it starts. Keywords of a batch are ranked with one TF-IDF pass over the batch, as in
+batch mode. When --max-queue texts are waiting, requests are refused with 503 so
+callers can back off. If a worker process dies, the batches it was part of get 503
+and the pool is replaced for the following ones. With --trending, each worker counts the keywords it extracts in
+a small sketch that is sent back and merged with every batch (see src/trending.py).
+
+Usage (from the social_media_ai directory):
+    python -m src.service --port 8000 --workers 4 --noun-mode lexicon
+    curl -s localhost:8000/suggest -d '{"text": "I love the new camera"}'
+Load test it with benchmarks/bench_service.py.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, BrokenExecutor
+
+if not __package__: # Allow direct execution (python src/service.py)
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import trending
+from src.profiling import Histogram
+
+MAX_BODY_BYTES = 1 << 20
+MAX_BULK_TEXTS = 1000
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    """An error answered with an HTTP status and a JSON {"error": message} body."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _init_worker(noun_mode: str):
+    """Process pool initializer: loads the analyzers (and the noun lexicon) of this worker once."""
+    from src.main import get_worker_components
+    from src.noun_lexicon import DEFAULT_LEXICON_PATH, load_noun_lexicon
+
+    get_worker_components(noun_mode)
+    if noun_mode != 'tagger':
+        load_noun_lexicon(DEFAULT_LEXICON_PATH)
+
+
+def _ping():
+    return os.getpid()
+
+
+def sentiment_batch(records: list, noun_mode: str = 'tagger') -> list[dict]:
+    """Worker function of /sentiment: one sentiment result per record, in order."""
+    from src.main import get_worker_components
+    from src.pipeline import analyze_page
+
+    return analyze_page({'records': records}, noun_mode, components=get_worker_components(noun_mode))['results']
+
+
+def suggest_batch(records: list, noun_mode: str = 'tagger', keyword_mode: str = 'tfidf') -> list[dict]:
+    """Worker function of /suggest and /bulk: one analyze_and_suggest result per record, in order."""
+    from src.batch import analyze_chunk
+
+    return analyze_chunk(records, noun_mode, keyword_mode)
+
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent requests into batches for one worker function.
+
+    A batch is dispatched when max_batch_size items are waiting or max_wait seconds
+    after its first item arrived. At most max_in_flight batches run at once; while
+    they do, arriving items wait in the queue and form the next (bigger) batch.
+
+    With `collect`, func returns (results, extra) and collect(extra) is called in the
+    event loop for each batch, e.g. to merge data a worker process sends back.
+    If the executor breaks (a worker process died), the batch fails with 503 and
+    on_broken(executor) is called in the event loop, e.g. to replace it.
+    """
+
+    def __init__(self, name: str, func, executor, max_batch_size: int = 64, max_wait: float = 0.005,
+                 max_in_flight: int = 2, max_queue: int = 10_000, collect=None, on_broken=None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.name = name
+        self.func = func
+        self.collect = collect
+        self.on_broken = on_broken
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._task = None
+        self._running = set()
+        self.batches = 0
+        self.batch_sizes = Histogram()
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    async def submit_many(self, items: list) -> list:
+        """Queues items (one request's texts) and returns their results, in order."""
+        if self._queue.qsize() + len(items) > self.max_queue:
+            raise HTTPError(503, f"Too many texts waiting ({self._queue.qsize()}); retry later.")
+        loop = asyncio.get_running_loop()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._queue.put_nowait((item, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._slots.acquire()
+            task = loop.create_task(self._execute(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, batch: list):
+        try:
+            self.batches += 1
+            self.batch_sizes.add(len(batch))
+            items = [item for item, _ in batch]
+            executor = self.executor
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(executor, self.func, items)
+                if self.collect is not None:
+                    results, extra = results
+                    self.collect(extra)
+            except BrokenExecutor as e:
+                logging.error(f"Batch of {len(batch)} texts lost in '{self.name}', the workers broke: {e}")
+                if self.on_broken is not None:
+                    self.on_broken(executor)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(HTTPError(503, "A worker process failed; retry the request."))
+                return
+            except Exception as e:
+                logging.error(f"Batch of {len(batch)} texts failed in '{self.name}': {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(HTTPError(500, f"Analysis failed: {e}"))
+                return
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {'batches': self.batches, 'mean_batch_size': self.batch_sizes.total / self.batches if self.batches else 0.0,
+                'max_batch_size': int(self.batch_sizes.max), 'queued': self.queued}
+
+
+class AnalysisService:
+    """
+    The request handlers and worker pool of the HTTP service.
+
+    Example:
+        service = AnalysisService(noun_mode='lexicon', workers=4)
+        asyncio.run(service.serve('127.0.0.1', 8000))
+    """
+
+    ENDPOINTS = {
+        ('POST', '/sentiment'): 'sentiment',
+        ('POST', '/suggest'): 'suggest',
+        ('POST', '/bulk'): 'bulk',
+        ('GET', '/health'): 'health',
+        ('GET', '/metrics'): 'metrics',
+        ('GET', '/trending'): 'trending',
+    }
+
+    def __init__(self, noun_mode: str = 'tagger', keyword_mode: str = 'tfidf', workers: int = 2,
+                 max_batch_size: int = 64, max_wait: float = 0.005, max_queue: int = 10_000, trending_top: int = 10):
+        """
+        Args:
+            noun_mode: Passed to ContentSuggestor (see main.load_core_components).
+            keyword_mode: Passed to extract_keywords_batch ('tfidf' or 'pos').
+            workers: Worker processes; 0 analyses in one thread of the server process
+                     (for tests and debugging).
+            max_batch_size: Texts per micro-batch.
+            max_wait: Seconds a text waits for its micro-batch to fill.
+            max_queue: Waiting texts per endpoint beyond which requests get 503.
+            trending_top: Terms returned by /trending, if trending.enable() was called
+                          before start().
+        """
+        if workers < 0:
+            raise ValueError("workers must not be negative.")
+        self.noun_mode = noun_mode
+        self.keyword_mode = keyword_mode
+        self.workers = workers
+        self.trending_top = trending_top
+        self.batcher_options = dict(max_batch_size=max_batch_size, max_wait=max_wait,
+                                    max_in_flight=max(2, 2 * workers), max_queue=max_queue)
+        self.ready = False
+        self.started_at = None
+        self.worker_restarts = 0
+        self._executor = None
+        self._batchers = {}
+        self._server = None
+        self._requests = {}
+        self._statuses = {}
+        self._latencies = {}
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8000):
+        """Preloads the workers, then starts listening. Returns the asyncio server."""
+        from functools import partial
+
+        self.started_at = time.time()
+        self._executor = self._new_executor()
+        loop = asyncio.get_running_loop()
+        # Start and initialize every worker now rather than on the first requests.
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(max(1, self.workers))))
+        suggest = partial(suggest_batch, noun_mode=self.noun_mode, keyword_mode=self.keyword_mode)
+        collect = None
+        if trending.is_enabled() and self.workers: # Bring each worker's keyword counts back with its batch
+            suggest, collect = partial(trending.call_drained, suggest), trending.merge
+        self._batchers = {
+            'sentiment': MicroBatcher('sentiment', partial(sentiment_batch, noun_mode=self.noun_mode),
+                                      self._executor, on_broken=self._replace_executor, **self.batcher_options),
+            'suggest': MicroBatcher('suggest', suggest, self._executor, collect=collect,
+                                    on_broken=self._replace_executor, **self.batcher_options),
+        }
+        for batcher in self._batchers.values():
+            batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self.ready = True
+        logging.info(f"Analysis service listening on {self.address} with {self.workers} workers.")
+        return self._server
+
+    def _new_executor(self):
+        if self.workers:
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.noun_mode,))
+        return ThreadPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(self.noun_mode,))
+
+    def _replace_executor(self, broken):
+        """Starts a new worker pool in place of a broken one (once, whichever batch noticed first)."""
+        if broken is not self._executor:
+            return
+        logging.warning("The worker pool is broken; starting new workers.")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._new_executor()
+        self.worker_restarts += 1
+        for batcher in self._batchers.values():
+            batcher.executor = self._executor
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        self.ready = False
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for batcher in self._batchers.values():
+            await batcher.stop()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8000):
+        """Runs the service until cancelled (e.g. by Ctrl+C)."""
+        server = await self.start(host, port)
+        try:
+            await server.serve_forever()
+        finally:
+            await self.stop()
+
+    # --- Request handling ---
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not request_line.strip():
+                    break
+                keep_alive = await self._handle_request(request_line, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, request_line: bytes, reader, writer) -> bool:
+        start = time.perf_counter()
+        endpoint = None
+        keep_alive = True
+        try:
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                raise HTTPError(400, "Malformed request line.") from None
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' and (version != 'HTTP/1.0' or connection == 'keep-alive')
+
+            try:
+                length = int(headers.get('content-length') or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                keep_alive = False # The end of the body is unknown
+                raise HTTPError(400, "Invalid Content-Length.")
+            if length > MAX_BODY_BYTES:
+                keep_alive = False # The body is not read
+                raise HTTPError(413, f"Request body exceeds {MAX_BODY_BYTES} bytes.")
+            body = await reader.readexactly(length) if length else b''
+
+            path = target.split('?', 1)[0]
+            endpoint = self.ENDPOINTS.get((method, path))
+            if endpoint is None:
+                if any(known_path == path for _, known_path in self.ENDPOINTS):
+                    raise HTTPError(405, f"{method} is not allowed on {path}.")
+                raise HTTPError(404, f"No endpoint {path}.")
+            status, payload = await getattr(self, f"_{endpoint}")(body)
+        except HTTPError as e:
+            status, payload = e.status, {'error': str(e)}
+        except asyncio.IncompleteReadError:
+            return False
+        except Exception as e:
+            logging.exception("Unexpected error while handling a request.")
+            status, payload = 500, {'error': str(e)}
+
+        self._write_response(writer, status, payload, keep_alive)
+        self._record(endpoint or 'other', status, time.perf_counter() - start)
+        return keep_alive
+
+    @staticmethod
+    def _write_response(writer, status: int, payload: dict, keep_alive: bool):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + data)
+
+    def _record(self, endpoint: str, status: int, seconds: float):
+        self._requests[endpoint] = self._requests.get(endpoint, 0) + 1
+        self._statuses[status] = self._statuses.get(status, 0) + 1
+        self._latencies.setdefault(endpoint, Histogram()).add(seconds)
+
+    @staticmethod
+    def _parse_json(body: bytes):
+        try:
+            return json.loads(body or b'null')
+        except ValueError as e:
+            raise HTTPError(400, f"Invalid JSON: {e}") from None
+
+    @staticmethod
+    def _record_from(item, default_id: int = None):
+        from src.tweet_record import TweetRecord
+
+        if isinstance(item, str):
+            return TweetRecord(id=default_id, text=item)
+        if isinstance(item, dict) and isinstance(item.get('text'), str):
+            return TweetRecord.from_dict(item, default_id=default_id)
+        raise HTTPError(400, "Each text must be a string or an object with a \"text\" string.")
+
+    def _single_record(self, body: bytes):
+        data = self._parse_json(body)
+        if not isinstance(data, dict) or 'text' not in data:
+            raise HTTPError(400, "Expected a JSON object with a \"text\" field.")
+        return self._record_from(data)
+
+    def _check_ready(self):
+        if not self.ready:
+            raise HTTPError(503, "The service is starting.")
+
+    async def _sentiment(self, body: bytes):
+        self._check_ready()
+        record = self._single_record(body)
+        (result,) = await self._batchers['sentiment'].submit_many([record])
+        return 200, result
+
+    async def _suggest(self, body: bytes):
+        self._check_ready()
+        record = self._single_record(body)
+        (result,) = await self._batchers['suggest'].submit_many([record])
+        return 200, result
+
+    async def _bulk(self, body: bytes):
+        self._check_ready()
+        data = self._parse_json(body)
+        texts = data.get('texts') if isinstance(data, dict) else data
+        if not isinstance(texts, list):
+            raise HTTPError(400, "Expected {\"texts\": [...]}.")
+        if len(texts) > MAX_BULK_TEXTS:
+            raise HTTPError(413, f"At most {MAX_BULK_TEXTS} texts per request.")
+        records = [self._record_from(item, default_id=index) for index, item in enumerate(texts)]
+        results = await self._batchers['suggest'].submit_many(records)
+        return 200, {'results': results}
+
+    async def _health(self, body: bytes):
+        if not self.ready:
+            return 503, {'status': 'starting'}
+        return 200, {'status': 'ok', 'workers': self.workers, 'noun_mode': self.noun_mode,
+                     'worker_restarts': self.worker_restarts}
+
+    async def _metrics(self, body: bytes):
+        return 200, self.metrics()
+
+    async def _trending(self, body: bytes):
+        if not trending.is_enabled():
+            raise HTTPError(404, "Trending keywords are not tracked; start the service with --trending K.")
+        return 200, {'terms': trending.top(self.trending_top)}
+
+    def metrics(self) -> dict:
+        latencies = {}
+        for endpoint, histogram in self._latencies.items():
+            summary = histogram.summary()
+            latencies[endpoint] = {key: summary[key] for key in ('count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')}
+        return {
+            'uptime_seconds': time.time() - self.started_at if self.started_at else 0.0,
+            'workers': self.workers,
+            'worker_restarts': self.worker_restarts,
+            'requests': dict(self._requests),
+            'statuses': {str(status): count for status, count in sorted(self._statuses.items())},
+            'latency': latencies,
+            'batches': {name: batcher.stats() for name, batcher in self._batchers.items()},
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes (default: one per CPU).")
+    parser.add_argument('--max-batch-size', type=int, default=64, help="Texts per micro-batch (default 64).")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help="Milliseconds a text waits for its batch to fill (default 5).")
+    parser.add_argument('--max-queue', type=int, default=10_000, help="Waiting texts per endpoint before 503 (default 10000).")
+    parser.add_argument('--noun-mode', choices=['tagger', 'hybrid', 'lexicon'], default='lexicon')
+    parser.add_argument('--keyword-mode', choices=['tfidf', 'pos'], default='tfidf')
+    trending.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # Fail fast with a clear report instead of failing in every worker.
+    from src.nltk_resources import ensure_nltk_resources, required_resources, MissingNLTKResourceError
+    try:
+        ensure_nltk_resources(required_resources(args.noun_mode, args.keyword_mode))
+    except MissingNLTKResourceError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    trending.enable_from_args(args) # Before the worker processes are forked
+    service = AnalysisService(args.noun_mode, args.keyword_mode, args.workers, args.max_batch_size,
+                              args.max_wait_ms / 1000, args.max_queue, trending_top=args.trending)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        trending.report_from_args(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Deterministic sharding of batch runs across machines, and merging of shard outputs.
+
+A batch run with --shard i/N (0 <= i < N) reads the whole input but analyses only
+the records whose stable hash (BLAKE2b of the record id, or of the text for records
+without one) falls into shard i. The hash does not depend on the machine, the
+Python process or the order of the input, so N runs started anywhere on the same
+input, with no coordinator, split it into N disjoint parts that together cover
+every record. Spam scoring is sharded the same way (--spam-threshold, with
+--spam-action tag to keep the scores).
+
+Each shard writes its own --output (JSONL or SQLite) and, next to it, a
+<output>.stats.json with its shard, input, options and counts. `merge` checks
+that the shard outputs form one complete run before combining them:
+    - every shard 0..N-1 is present exactly once, with the same N, input and options;
+    - every shard finished and scanned the same number of input records;
+    - the shards' records add up to that number;
+    - each output holds as many rows as its stats say it wrote.
+The outputs are then concatenated in shard order into --output, and the counts
+are summed into <output>.stats.json.
+
+Usage (from the social_media_ai directory):
+    python -m src.batch tweets.jsonl --shard 0/3 --output out.0.jsonl    # on machine 1
+    python -m src.batch tweets.jsonl --shard 1/3 --output out.1.jsonl    # on machine 2
+    python -m src.batch tweets.jsonl --shard 2/3 --output out.2.jsonl    # on machine 3
+    python -m src.sharding merge out.0.jsonl out.1.jsonl out.2.jsonl --output results.jsonl
+"""
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import hashlib
+import argparse
+
+if not __package__: # Allow direct execution (python src/sharding.py)
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+STATS_SUFFIX = '.stats.json'
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parses 'i/N' into (i, N), with 0 <= i < N."""
+    index, separator, count = value.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index = count = None
+    if not separator or count is None or count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{value}'. Expected i/N with 0 <= i < N, e.g. 0/4.")
+    return index, count
+
+
+def shard_key(record) -> bytes:
+    """The bytes a record is partitioned by: its id if it has one, otherwise its text."""
+    from src.tweet_record import record_text
+
+    record_id = getattr(record, 'id', None)
+    if record_id is not None:
+        return b'id:' + str(record_id).encode('utf-8')
+    text = record_text(record)
+    return b'text:' + getattr(text, 'text', text).encode('utf-8') # Documents
+
+
+def shard_of(record, count: int) -> int:
+    """The shard (0..count-1) of a record; the same in every process and on every machine."""
+    digest = hashlib.blake2b(shard_key(record), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count
+
+
+class ShardFilter:
+    """
+    Iterates over the records of one shard, counting every record read (`scanned`)
+    and every record of the shard (`selected`).
+    """
+
+    def __init__(self, records, index: int, count: int):
+        self.records = records
+        self.index = index
+        self.count = count
+        self.scanned = 0
+        self.selected = 0
+
+    def __iter__(self):
+        for record in self.records:
+            self.scanned += 1
+            if shard_of(record, self.count) == self.index:
+                self.selected += 1
+                yield record
+
+
+def stats_path(output: str) -> str:
+    return output + STATS_SUFFIX
+
+
+def _output_kind(path: str) -> str:
+    from src.result_sink import SINKS, SQLiteResultSink, JSONLResultSink
+
+    sink_class = SINKS.get(os.path.splitext(path)[1].lower(), JSONLResultSink)
+    if sink_class is SQLiteResultSink:
+        return 'sqlite'
+    if sink_class is JSONLResultSink:
+        return 'jsonl'
+    raise ValueError(f"{path}: only JSONL and SQLite shard outputs can be merged.")
+
+
+def count_rows(path: str) -> int:
+    """Number of results in a JSONL or SQLite output."""
+    if _output_kind(path) == 'sqlite':
+        connection = sqlite3.connect(path)
+        try:
+            return connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        finally:
+            connection.close()
+    rows = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            rows += block.count(b'\n')
+    return rows
+
+
+def verify_shards(paths: list) -> list:
+    """
+    Loads the stats of the shard outputs at `paths` and checks that they form one
+    complete run (see the module docstring). Returns the stats, ordered by shard.
+
+    Raises:
+        ValueError: Listing every problem found.
+    """
+    problems = []
+    shards = []
+    for path in paths:
+        try:
+            with open(stats_path(path), encoding='utf-8') as f:
+                stats = json.load(f)
+        except (OSError, ValueError) as e:
+            problems.append(f"{path}: cannot read {stats_path(path)}: {e}")
+            continue
+        stats['path'] = path
+        shards.append(stats)
+        if not stats.get('complete'):
+            problems.append(f"{path}: shard {stats.get('shard')} did not finish.")
+        elif stats['counts']['processed'] != stats['shard_records']:
+            problems.append(f"{path}: processed {stats['counts']['processed']} of its {stats['shard_records']} records.")
+        try:
+            rows = count_rows(path)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            problems.append(f"{path}: cannot count its rows: {e}")
+        else:
+            if rows != stats.get('rows'):
+                problems.append(f"{path}: has {rows} rows, but shard {stats.get('shard')} wrote {stats.get('rows')}.")
+    if problems:
+        raise ValueError('\n'.join(problems))
+
+    first = shards[0]
+    for name in ('count', 'input', 'format', 'options', 'input_records'):
+        values = {json.dumps(stats[name], sort_keys=True) for stats in shards}
+        if len(values) > 1:
+            problems.append(f"The shards differ in {name}: {', '.join(sorted(values))}.")
+    count = first['count']
+    indexes = sorted(stats['index'] for stats in shards)
+    missing = sorted(set(range(count)) - set(indexes))
+    if missing:
+        problems.append(f"Missing shards: {', '.join(f'{index}/{count}' for index in missing)}.")
+    duplicates = sorted({index for index in indexes if indexes.count(index) > 1})
+    if duplicates:
+        problems.append(f"Duplicate shards: {', '.join(f'{index}/{count}' for index in duplicates)}.")
+    if not problems:
+        selected = sum(stats['shard_records'] for stats in shards)
+        if selected != first['input_records']:
+            problems.append(f"The shards hold {selected} of the {first['input_records']} input records.")
+    if problems:
+        raise ValueError('\n'.join(problems))
+    return sorted(shards, key=lambda stats: stats['index'])
+
+
+def merge_shards(paths: list, output: str) -> dict:
+    """
+    Verifies the shard outputs at `paths` (see verify_shards) and concatenates them,
+    in shard order, into `output` (replaced if it exists), which must be of the same
+    kind (JSONL or SQLite). Writes and returns the aggregated stats.
+    """
+    from src.batch import write_json_atomic
+
+    shards = verify_shards(paths)
+    kind = _output_kind(output)
+    for stats in shards:
+        if _output_kind(stats['path']) != kind:
+            raise ValueError(f"{stats['path']} is not a {kind} output like {output}.")
+
+    for path in (output, output + '-wal', output + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+    if kind == 'jsonl':
+        with open(output, 'wb') as merged:
+            for stats in shards:
+                with open(stats['path'], 'rb') as f:
+                    shutil.copyfileobj(f, merged, 1 << 20)
+    else:
+        from src.result_sink import SQLiteResultSink, RESULT_COLUMNS
+
+        SQLiteResultSink(output).close() # Creates the results table
+        columns = ', '.join(RESULT_COLUMNS)
+        connection = sqlite3.connect(output)
+        try:
+            for stats in shards:
+                connection.execute("ATTACH DATABASE ? AS shard", (stats['path'],))
+                with connection:
+                    connection.execute(f"INSERT INTO results ({columns}) SELECT {columns} FROM shard.results ORDER BY rowid")
+                connection.execute("DETACH DATABASE shard")
+        finally:
+            connection.close()
+
+    counts = {name: sum(stats['counts'][name] for stats in shards) for name in shards[0]['counts']}
+    elapsed = max(stats['elapsed_seconds'] for stats in shards)
+    merged = {
+        'shards': len(shards),
+        'input': shards[0]['input'],
+        'format': shards[0]['format'],
+        'output': os.path.abspath(output),
+        'options': shards[0]['options'],
+        'input_records': shards[0]['input_records'],
+        'counts': counts,
+        'rows': sum(stats['rows'] for stats in shards),
+        'elapsed_seconds': elapsed, # Of the slowest shard
+        'throughput_per_second': counts['processed'] / elapsed if elapsed else 0.0,
+        'per_shard': [{name: stats[name] for name in ('shard', 'shard_records', 'rows', 'elapsed_seconds')}
+                      for stats in shards],
+    }
+    write_json_atomic(stats_path(output), merged)
+    return merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    merge = commands.add_parser('merge', help="Verify shard outputs and combine them.")
+    merge.add_argument('shards', nargs='+', help="Outputs of the shard runs (with their .stats.json files).")
+    merge.add_argument('--output', help="Merged output (.jsonl or .sqlite, like the shards).")
+    merge.add_argument('--verify-only', action='store_true', help="Only check that the shards are complete.")
+    args = parser.parse_args(argv)
+    if not args.verify_only and not args.output:
+        parser.error("merge needs --output (or --verify-only).")
+
+    try:
+        if args.verify_only:
+            shards = verify_shards(args.shards)
+            print(f"{len(shards)} shards complete: {shards[0]['input_records']} input records.")
+            return 0
+        merged = merge_shards(args.shards, args.output)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Cannot merge the shards:\n{e}", file=sys.stderr)
+        return 1
+    counts = merged['counts']
+    print(f"Merged {merged['shards']} shards into {args.output}: {merged['rows']} rows from {merged['input_records']} "
+          f"input records ({counts['errors']} errors, {counts['spam']} spam).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
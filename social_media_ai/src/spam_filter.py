@@ -0,0 +1,193 @@
+# This file contains the spam pre-filter that keeps spam out of sentiment analysis and suggestions.
+import os
+import time
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+
+from src import profiling
+
+# The spam model and vectorizer trained by spam.py live in the repository root.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_MODEL_PATH = os.path.join(_REPO_ROOT, 'spam_model.pkl')
+DEFAULT_VECTORIZER_PATH = os.path.join(_REPO_ROOT, 'vectorizer.pkl')
+
+DEFAULT_SPAM_THRESHOLD = 0.5
+# 'drop' removes spam from the output, 'tag' outputs it marked as spam (but unanalysed).
+SPAM_ACTIONS = ('drop', 'tag')
+
+
+class SpamFilter:
+    """
+    Scores texts with the TF-IDF + logistic regression spam model of spam.py and
+    separates spam (score above the threshold) from real posts, before the expensive
+    analysis stages run. All texts of a batch are vectorized and scored in one call.
+
+    Counters of scored and flagged texts and of the time spent scoring are kept for
+    reporting (safe to use from several threads). With `metrics`, every scored batch
+    is also recorded there for export (see src/spam_metrics.py), and with cache_size,
+    the scores of the most recently scored distinct texts are reused.
+    """
+
+    def __init__(self, model, vectorizer, threshold: float = DEFAULT_SPAM_THRESHOLD, action: str = 'drop',
+                 metrics=None, cache_size: int = 0):
+        """
+        Args:
+            model: A fitted classifier with predict_proba and classes_, where class 1 is spam.
+            vectorizer: The fitted vectorizer the model was trained with.
+            threshold: Spam probability above which a text is treated as spam.
+            action: What callers do with spam, one of SPAM_ACTIONS.
+            metrics: Optional SpamMetrics recording requests, latencies, batch sizes and cache hits.
+            cache_size: Scores of up to this many distinct texts kept for repeated texts (0 disables).
+        """
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError("threshold must be between 0 and 1.")
+        if action not in SPAM_ACTIONS:
+            raise ValueError(f"Unknown spam action '{action}'. Expected one of {SPAM_ACTIONS}.")
+        self.model = model
+        self.vectorizer = vectorizer
+        self.threshold = threshold
+        self.action = action
+        self.metrics = metrics
+        self.cache_size = cache_size
+        self._cache = OrderedDict() # text -> score, least recently used first
+        self._spam_column = list(model.classes_).index(1)
+        self._lock = threading.Lock()
+        self.scored = 0
+        self.flagged = 0
+        self.scoring_seconds = 0.0
+
+    @classmethod
+    def load(cls, model_path: str = None, vectorizer_path: str = None, **kwargs):
+        """
+        Loads the pickled model and vectorizer. Paths default to the SPAM_MODEL_PATH and
+        SPAM_VECTORIZER_PATH environment variables, then to the files in the repository root.
+        """
+        model_path, vectorizer_path = cls.model_paths(model_path, vectorizer_path)
+        with open(model_path, 'rb') as model_file:
+            model = pickle.load(model_file)
+        with open(vectorizer_path, 'rb') as vectorizer_file:
+            vectorizer = pickle.load(vectorizer_file)
+        logging.info(f"Spam model loaded from {model_path}.")
+        return cls(model, vectorizer, **kwargs)
+
+    @staticmethod
+    def model_paths(model_path: str = None, vectorizer_path: str = None) -> tuple[str, str]:
+        """The model and vectorizer paths load() uses (e.g. for spam_metrics.model_version)."""
+        return (model_path or os.getenv("SPAM_MODEL_PATH") or DEFAULT_MODEL_PATH,
+                vectorizer_path or os.getenv("SPAM_VECTORIZER_PATH") or DEFAULT_VECTORIZER_PATH)
+
+    @profiling.timed('spam')
+    def score(self, texts: list[str]) -> list[float]:
+        """Spam probabilities of a batch of texts."""
+        if not texts:
+            return []
+        start = time.perf_counter()
+        scores = [None] * len(texts)
+        if self.cache_size:
+            with self._lock:
+                for index, text in enumerate(texts):
+                    score = self._cache.get(text)
+                    if score is not None:
+                        self._cache.move_to_end(text)
+                        scores[index] = score
+        missing = [index for index, score in enumerate(scores) if score is None]
+        vectorize_seconds = predict_seconds = None
+        if missing:
+            features = self.vectorizer.transform([texts[index] for index in missing])
+            vectorized = time.perf_counter()
+            vectorize_seconds = vectorized - start
+            computed = self.model.predict_proba(features)[:, self._spam_column].tolist()
+            predict_seconds = time.perf_counter() - vectorized
+            for index, score in zip(missing, computed):
+                scores[index] = score
+        elapsed = time.perf_counter() - start
+        flagged = sum(score > self.threshold for score in scores)
+        with self._lock:
+            self.scored += len(texts)
+            self.flagged += flagged
+            self.scoring_seconds += elapsed
+            if self.cache_size:
+                for index in missing:
+                    self._cache[texts[index]] = scores[index]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        if self.metrics is not None:
+            self.metrics.observe(len(texts), flagged, vectorize_seconds, predict_seconds,
+                                 cache_hits=len(texts) - len(missing))
+        return scores
+
+    def split(self, items) -> tuple[list, list]:
+        """
+        Scores a batch of texts, Documents or TweetRecords.
+
+        Returns:
+            (kept, spam): the items below the threshold, and (item, score) pairs for the
+            items above it, both in input order.
+        """
+        from src.tweet_record import record_text
+
+        items = list(items)
+        texts = [record_text(item) for item in items]
+        texts = [getattr(text, 'text', text) for text in texts] # Documents
+        kept, spam = [], []
+        for item, score in zip(items, self.score(texts)):
+            if score > self.threshold:
+                spam.append((item, score))
+            else:
+                kept.append(item)
+        return kept, spam
+
+    def filter_page(self, page: dict) -> dict:
+        """
+        Spam stage of the run_app pipeline: removes spam from page['records'] (and the
+        matching page['copies'] and page['clusters']) and lists it in page['spam'] as
+        (record, copies, score), with the matching clusters in page['spam_clusters'].
+        """
+        copies = dict(zip(map(id, page['records']), page['copies']))
+        clusters = dict(zip(map(id, page['records']), page.get('clusters', [])))
+        kept, spam = self.split(page['records'])
+        page['records'] = kept
+        page['copies'] = [copies[id(record)] for record in kept]
+        page['spam'] = [(record, copies[id(record)], score) for record, score in spam]
+        if 'clusters' in page:
+            page['clusters'] = [clusters[id(record)] for record in kept]
+            page['spam_clusters'] = [clusters[id(record)] for record, _ in spam]
+        return page
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'scored': self.scored,
+                'flagged': self.flagged,
+                'filter_rate': self.flagged / self.scored if self.scored else 0.0,
+                'scoring_seconds': self.scoring_seconds,
+            }
+
+    def summary(self, seconds_per_item: float = None) -> str:
+        """
+        One-line report of the filter rate. If seconds_per_item (the measured cost of
+        analysing one non-spam text downstream) is given, the estimated time saved by
+        not analysing the flagged texts is included.
+        """
+        stats = self.stats()
+        text = (f"Spam filter: {stats['flagged']}/{stats['scored']} flagged ({stats['filter_rate'] * 100:.1f}%, "
+                f"threshold {self.threshold}, action {self.action}), scoring took {stats['scoring_seconds']:.3f}s")
+        if seconds_per_item is not None:
+            saved = stats['flagged'] * seconds_per_item - stats['scoring_seconds']
+            text += f", estimated {saved:.2f}s of analysis saved"
+        return text
+
+
+# Spam filters of this process, by (threshold, action); see get_worker_spam_filter.
+_worker_filters = {}
+
+
+def get_worker_spam_filter(threshold: float = DEFAULT_SPAM_THRESHOLD, action: str = 'drop') -> SpamFilter:
+    """Returns this process's SpamFilter for the settings, loading the model on first use."""
+    key = (threshold, action)
+    spam_filter = _worker_filters.get(key)
+    if spam_filter is None:
+        spam_filter = _worker_filters[key] = SpamFilter.load(threshold=threshold, action=action)
+    return spam_filter
@@ -0,0 +1,250 @@
+# This file contains the serving metrics of the spam model, exported in the Prometheus text format.
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from bisect import bisect_left
+
+# Bucket upper bounds (Prometheus 'le') of the latency histograms, in seconds, and of the batch sizes.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_exporters_lock = threading.Lock()
+_exported = None # The _ExportedMetrics of start_exporters, once started
+
+
+def model_version(*paths: str) -> str:
+    """A short content hash of the model files, to label metrics with the model that produced them."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class _BucketHistogram:
+    """Counts per fixed bucket plus sum and count: the Prometheus histogram type."""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total')
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1) # The last one is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def lines(self, name: str, labels: str) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total!r}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class SpamMetrics:
+    """
+    Counters and histograms of spam model scoring, cheap enough to keep on in the
+    hot path: one observe() per scored batch takes a lock and a few integer updates
+    (bucket lookups are a bisect over a dozen bounds). Rendering happens only when
+    the metrics are scraped or written out.
+
+    Every series is labelled with model_version, so latency and spam rate can be
+    compared across model deployments.
+
+        metrics = SpamMetrics(model_version('spam_model.pkl', 'vectorizer.pkl'))
+        spam_filter = SpamFilter.load(metrics=metrics, cache_size=1024)
+        metrics.serve(port=9108)    # GET /metrics
+    """
+
+    def __init__(self, model_version: str = 'unknown', namespace: str = 'spam'):
+        self.model_version = model_version
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+        self.flagged = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.vectorize_seconds = _BucketHistogram(LATENCY_BUCKETS)
+        self.predict_seconds = _BucketHistogram(LATENCY_BUCKETS)
+        self.batch_sizes = _BucketHistogram(BATCH_SIZE_BUCKETS)
+
+    def observe(self, texts: int, flagged: int, vectorize_seconds: float = None, predict_seconds: float = None,
+                cache_hits: int = 0):
+        """
+        Records one scoring request of `texts` texts, `flagged` of them as spam, of which
+        `cache_hits` were answered from a score cache. The vectorize and predict times
+        cover the texts that were not cached (None if nothing had to be scored).
+        """
+        with self._lock:
+            self.requests += 1
+            self.texts += texts
+            self.flagged += flagged
+            self.cache_hits += cache_hits
+            self.cache_misses += texts - cache_hits
+            self.batch_sizes.add(texts)
+            if vectorize_seconds is not None:
+                self.vectorize_seconds.add(vectorize_seconds)
+            if predict_seconds is not None:
+                self.predict_seconds.add(predict_seconds)
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format (version 0.0.4)."""
+        name = self.namespace
+        labels = f'model_version="{self.model_version}"'
+        with self._lock:
+            looked_up = self.cache_hits + self.cache_misses
+            lines = [
+                f"# HELP {name}_model_info The spam model being served.",
+                f"# TYPE {name}_model_info gauge",
+                f"{name}_model_info{{{labels}}} 1",
+                f"# HELP {name}_requests_total Scoring requests (batches of texts).",
+                f"# TYPE {name}_requests_total counter",
+                f"{name}_requests_total{{{labels}}} {self.requests}",
+                f"# HELP {name}_texts_total Texts scored.",
+                f"# TYPE {name}_texts_total counter",
+                f"{name}_texts_total{{{labels}}} {self.texts}",
+                f"# HELP {name}_flagged_total Texts scored as spam.",
+                f"# TYPE {name}_flagged_total counter",
+                f"{name}_flagged_total{{{labels}}} {self.flagged}",
+                f"# HELP {name}_rate Fraction of the scored texts flagged as spam since start.",
+                f"# TYPE {name}_rate gauge",
+                f"{name}_rate{{{labels}}} {self.flagged / self.texts if self.texts else 0.0!r}",
+                f"# HELP {name}_cache_hits_total Texts answered from the score cache.",
+                f"# TYPE {name}_cache_hits_total counter",
+                f"{name}_cache_hits_total{{{labels}}} {self.cache_hits}",
+                f"# HELP {name}_cache_misses_total Texts that had to be vectorized and scored.",
+                f"# TYPE {name}_cache_misses_total counter",
+                f"{name}_cache_misses_total{{{labels}}} {self.cache_misses}",
+                f"# HELP {name}_cache_hit_ratio Fraction of the texts answered from the score cache since start.",
+                f"# TYPE {name}_cache_hit_ratio gauge",
+                f"{name}_cache_hit_ratio{{{labels}}} {self.cache_hits / looked_up if looked_up else 0.0!r}",
+            ]
+            for metric, histogram, description in (
+                    ('vectorize_seconds', self.vectorize_seconds, "Time to vectorize a batch of uncached texts."),
+                    ('predict_seconds', self.predict_seconds, "Time to score a vectorized batch."),
+                    ('batch_size', self.batch_sizes, "Texts per scoring request.")):
+                lines += [f"# HELP {name}_{metric} {description}", f"# TYPE {name}_{metric} histogram"]
+                lines += histogram.lines(f"{name}_{metric}", labels)
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str):
+        """Atomically writes the metrics to `path`, e.g. for the node_exporter textfile collector (*.prom)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.metrics-', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    def write_periodically(self, path: str, interval: float = 15.0) -> threading.Event:
+        """
+        Rewrites the textfile every `interval` seconds in a daemon thread; set the returned
+        event to stop. A failed write is logged and retried at the next interval.
+        """
+        stop = threading.Event()
+
+        def write():
+            try:
+                self.write_textfile(path)
+            except Exception as e:
+                logging.error(f"Cannot write the spam metrics to {path}: {e}")
+
+        def run():
+            while not stop.wait(interval):
+                write()
+            write()
+
+        threading.Thread(target=run, name='spam-metrics-writer', daemon=True).start()
+        return stop
+
+    def serve(self, host: str = '127.0.0.1', port: int = 9108):
+        """
+        Serves GET /metrics from a daemon thread (port 0 picks a free port). Returns the
+        HTTP server; call shutdown() on it to stop.
+        """
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args): # Scrapes are not worth a log line each
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='spam-metrics-server', daemon=True).start()
+        return server
+
+
+class _ExportedMetrics(SpamMetrics):
+    """Renders the SpamMetrics start_exporters was last called with."""
+
+    def __init__(self, metrics: SpamMetrics):
+        self.metrics = metrics
+        self.server = None
+        self.stop_writing = None
+
+    def render(self) -> str:
+        return self.metrics.render()
+
+
+def start_exporters(metrics: SpamMetrics, port: int = None, host: str = '127.0.0.1', path: str = None,
+                    interval: float = 15.0):
+    """
+    Exports `metrics` at http://host:port/metrics and/or to the textfile `path`, starting
+    the exporters only once per process. Later calls (a Streamlit rerun, a cleared
+    st.cache_resource or a reloaded model) switch the running exporters to the new
+    metrics instead of binding the port again.
+    """
+    global _exported
+    with _exporters_lock:
+        if _exported is not None:
+            _exported.metrics = metrics
+            return
+        exported = _ExportedMetrics(metrics)
+        if port is not None:
+            exported.server = exported.serve(host, port)
+        if path is not None:
+            exported.stop_writing = exported.write_periodically(path, interval)
+        _exported = exported
+
+
+def stop_exporters():
+    """Stops the exporters of start_exporters (the textfile is written once more)."""
+    global _exported
+    with _exporters_lock:
+        if _exported is None:
+            return
+        if _exported.server is not None:
+            _exported.server.shutdown()
+            _exported.server.server_close()
+        if _exported.stop_writing is not None:
+            _exported.stop_writing.set()
+        _exported = None
@@ -0,0 +1,539 @@
+"""
+Streaming ingestion mode: a producer pushes tweets into a bounded queue and a pool of
+analysis workers runs sentiment analysis and content suggestion on them.
+
+When the workers fall behind, the queue's overflow policy decides what happens:
+    block        the producer waits for free space (throttles the source)
+    drop_oldest  the oldest queued tweet is dropped to make room (freshest data wins)
+    drop_newest  the incoming tweet is dropped (queued data wins)
+
+Queue depth, queueing lag, event lag (age of a tweet when its analysis finishes) and
+drop counts are reported periodically and at the end, to size the worker pool for a
+given input volume.
+
+With --window SECONDS, sentiment is also aggregated per query (or per top keyword,
+with --window-by keyword) over tumbling windows, or sliding ones with --window-slide
+(see src/sentiment_windows.py). The current windows are logged with the metrics and,
+with --windows-output PATH, written to a JSON file at every report.
+
+With --trending K, the top K keywords are reported with the metrics; add
+--trending-half-life SECONDS so that terms that are emerging now outrank terms
+that were frequent earlier (see src/trending.py).
+
+Sources:
+    --jsonl PATH     JSONL file of tweet records ({"text": ..., "id": ..., ...}); '-' for stdin.
+                     With --follow the file is tailed like `tail -f`.
+    --search QUERY   Polls the search API for new tweets (since_id) every --poll-interval
+                     seconds. Set TWITTER_API_BASE_URL to use the local fake API.
+    --filter RULE    The v2 filtered stream (needs TWITTER_BEARER_TOKEN).
+
+Usage (from the social_media_ai directory):
+    python -m src.streaming --jsonl tweets.jsonl --workers 4 --queue-size 1000 --policy drop_oldest
+    python -m src.streaming --search "#python" --output results.jsonl --report-interval 5
+    python -m src.streaming --search "#brand" --window 300 --window-slide 60 --windows-output windows.json
+    python -m src.streaming --search "#brand" --trending 10 --trending-half-life 600 --trending-output trending.json
+"""
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from collections import deque
+
+if not __package__: # Allow direct execution (python src/streaming.py)
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import profiling, trending
+
+POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+_CLOSED = object()
+
+
+class StreamQueue:
+    """
+    A bounded FIFO queue with an overflow policy and queueing statistics.
+    Thread-safe for any number of producers and consumers.
+    """
+
+    def __init__(self, maxsize: int = 1000, policy: str = 'block', clock=time.monotonic):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy}'. Expected one of {POLICIES}.")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.policy = policy
+        self._clock = clock
+        self._items = deque()
+        self._closed = False
+        self._condition = threading.Condition()
+        self.put_count = 0
+        self.get_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.blocked_seconds = 0.0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.lag_last = 0.0
+
+    def __len__(self):
+        with self._condition:
+            return len(self._items)
+
+    def put(self, item) -> bool:
+        """
+        Adds an item, applying the overflow policy if the queue is full.
+        Returns False if the item itself was dropped (drop_newest, or a closed queue).
+        """
+        with self._condition:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.policy == 'block':
+                    start = self._clock()
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._condition.wait()
+                    self.blocked_seconds += self._clock() - start
+                    if self._closed:
+                        return False
+                elif self.policy == 'drop_oldest':
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    self.dropped += 1
+                    return False
+            self._items.append((self._clock(), item))
+            self.put_count += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._condition.notify_all()
+            return True
+
+    def get(self, timeout: float = None):
+        """
+        Removes and returns the oldest item. Blocks until one is available; returns
+        the _CLOSED sentinel once the queue is closed and drained.
+
+        Raises:
+            queue.Empty: If timeout (seconds) passed without an item.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self._closed, timeout):
+                raise queue.Empty
+            if not self._items:
+                return _CLOSED
+            enqueued_at, item = self._items.popleft()
+            lag = self._clock() - enqueued_at
+            self.get_count += 1
+            self.lag_last = lag
+            self.lag_total += lag
+            self.lag_max = max(self.lag_max, lag)
+            self._condition.notify_all()
+            return item
+
+    def close(self):
+        """Signals that no more items will be put. Consumers drain what is left."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                'queue_depth': len(self._items),
+                'max_queue_depth': self.max_depth,
+                'enqueued': self.put_count,
+                'dequeued': self.get_count,
+                'dropped': self.dropped,
+                'producer_blocked_seconds': self.blocked_seconds,
+                'queue_lag_last_seconds': self.lag_last,
+                'queue_lag_max_seconds': self.lag_max,
+                'queue_lag_mean_seconds': self.lag_total / self.get_count if self.get_count else 0.0,
+            }
+
+
+class StreamProcessor:
+    """
+    Runs `handler(item)` on a pool of worker threads for every item a producer yields,
+    through a StreamQueue. Results are passed to `sink(result)` (serialized, so the sink
+    needs no locking of its own).
+    """
+
+    def __init__(self, handler, workers: int = 4, queue_size: int = 1000, policy: str = 'block',
+                 sink=None, report_interval: float = None, clock=time.time, on_report=None):
+        """
+        Args:
+            handler: Called with each item; its return value goes to the sink.
+            workers: Number of analysis worker threads.
+            queue_size: Capacity of the bounded queue between producer and workers.
+            policy: Overflow policy, one of POLICIES.
+            sink: Called with each handler result (None to discard results).
+            report_interval: If set, metrics are logged every this many seconds.
+            clock: Unix time source, used for the event lag of items with a created_at.
+            on_report: Called (without arguments) after each periodic metrics report.
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1.")
+        self.handler = handler
+        self.workers = workers
+        self.queue = StreamQueue(queue_size, policy)
+        self.sink = sink
+        self.report_interval = report_interval
+        self._clock = clock
+        self.on_report = on_report
+        self._sink_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.event_lag_last = None
+        self.event_lag_max = 0.0
+        self._started_at = None
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is _CLOSED:
+                return
+            try:
+                result = self.handler(item)
+            except Exception as e:
+                logging.error(f"Error processing streamed item: {e}")
+                with self._stats_lock:
+                    self.errors += 1
+                continue
+            created_at = getattr(item, 'created_at', None)
+            with self._stats_lock:
+                self.processed += 1
+                if created_at is not None:
+                    self.event_lag_last = self._clock() - created_at
+                    self.event_lag_max = max(self.event_lag_max, self.event_lag_last)
+            if self.sink is not None:
+                with self._sink_lock:
+                    self.sink(result)
+
+    def _reporter(self, stop: threading.Event):
+        while not stop.wait(self.report_interval):
+            logging.info(format_metrics(self.metrics()))
+            if self.on_report is not None:
+                try:
+                    self.on_report()
+                except Exception as e:
+                    logging.error(f"Stream report failed: {e}")
+
+    def metrics(self) -> dict:
+        """Queue statistics plus processed/error counts, throughput and event lag."""
+        metrics = self.queue.stats()
+        with self._stats_lock:
+            elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+            metrics.update({
+                'workers': self.workers,
+                'processed': self.processed,
+                'errors': self.errors,
+                'elapsed_seconds': elapsed,
+                'throughput_per_second': self.processed / elapsed if elapsed else 0.0,
+                'event_lag_last_seconds': self.event_lag_last,
+                'event_lag_max_seconds': self.event_lag_max,
+            })
+        return metrics
+
+    def run(self, producer, stop_event: threading.Event = None) -> dict:
+        """
+        Feeds every item of the `producer` iterable into the queue (in the calling
+        thread) until it is exhausted or stop_event is set, waits for the workers to
+        drain the queue, and returns the final metrics.
+        """
+        self._started_at = time.monotonic()
+        threads = [threading.Thread(target=self._worker, name=f"stream-worker-{i}", daemon=True) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        reporter_stop = threading.Event()
+        reporter = None
+        if self.report_interval:
+            reporter = threading.Thread(target=self._reporter, args=(reporter_stop,), name="stream-metrics", daemon=True)
+            reporter.start()
+        try:
+            for item in producer:
+                self.queue.put(item)
+                if stop_event is not None and stop_event.is_set():
+                    break
+        finally:
+            if hasattr(producer, 'close'):
+                producer.close()
+            self.queue.close()
+            for thread in threads:
+                thread.join()
+            reporter_stop.set()
+            if reporter is not None:
+                reporter.join()
+        return self.metrics()
+
+
+def format_metrics(metrics: dict) -> str:
+    """One-line summary of StreamProcessor metrics for logs."""
+    event_lag = metrics.get('event_lag_last_seconds')
+    event_lag_text = f"{event_lag:.2f}s" if event_lag is not None else "n/a"
+    return (
+        f"stream: processed={metrics['processed']} ({metrics['throughput_per_second']:.1f}/s) "
+        f"depth={metrics['queue_depth']}/{metrics['max_queue_depth']} dropped={metrics['dropped']} "
+        f"errors={metrics['errors']} queue_lag={metrics['queue_lag_mean_seconds'] * 1000:.1f}ms "
+        f"(max {metrics['queue_lag_max_seconds'] * 1000:.1f}ms) event_lag={event_lag_text} "
+        f"producer_blocked={metrics['producer_blocked_seconds']:.2f}s"
+    )
+
+
+def tail_jsonl(path: str, follow: bool = False, poll_interval: float = 0.5, stop_event: threading.Event = None):
+    """
+    Yields a TweetRecord for each JSON line of a file ('-' for stdin). Each line is an
+    object with at least "text" (see TweetRecord.from_dict) or a bare JSON string.
+    Invalid lines are logged and skipped. With follow=True the file is tailed: the
+    generator waits for new lines until stop_event is set.
+    """
+    from src.tweet_record import TweetRecord
+
+    stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    line_number = 0
+    pending = ''
+    try:
+        while stop_event is None or not stop_event.is_set():
+            line = stream.readline()
+            if not line:
+                if not follow or path == '-':
+                    break
+                time.sleep(poll_interval)
+                continue
+            pending += line
+            if not pending.endswith('\n') and follow:
+                continue # Partial line still being written
+            line, pending = pending, ''
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                yield TweetRecord(id=line_number, text=data) if isinstance(data, str) else TweetRecord.from_dict(data, default_id=line_number)
+            except (ValueError, KeyError, TypeError) as e:
+                logging.warning(f"Skipping invalid line {line_number} of {path}: {e}")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def poll_search(client, query: str, poll_interval: float = 5.0, page_size: int = 100, lang: str = "en",
+                max_per_poll: int = None, stop_event: threading.Event = None):
+    """
+    Turns the pull-based search API into a stream: polls for tweets newer than the newest
+    one seen (since_id) every poll_interval seconds and yields their TweetRecords, oldest
+    first of each poll. Runs until stop_event is set.
+
+    The stream starts at the newest tweets of the first poll. After that, since_id only
+    advances once a poll drained every page down to it: if an error or max_per_poll cuts
+    a poll short, the next polls continue below the oldest tweet it returned (max_id)
+    until they reach since_id, and only then move on to newer tweets.
+    """
+    since_id = None
+    gap = None # (max_id, newest id) of a poll that was cut short
+    while stop_event is None or not stop_event.is_set():
+        max_id, newest = gap if gap is not None else (None, None)
+        outcome = {}
+        records = list(client.iter_records(query, limit=max_per_poll, page_size=page_size, lang=lang,
+                                           prefetch_pages=0, since_id=since_id, max_id=max_id, outcome=outcome))
+        if records:
+            newest = max(newest or 0, max(record.id for record in records))
+        if outcome['complete'] or since_id is None:
+            since_id, gap = newest if newest is not None else since_id, None
+        elif records:
+            gap = (min(record.id for record in records) - 1, newest)
+        yield from reversed(records)
+        if stop_event is not None:
+            if stop_event.wait(poll_interval):
+                return
+        else:
+            time.sleep(poll_interval)
+
+
+def filtered_stream(bearer_token: str, rules: list[str], stop_event: threading.Event = None):
+    """
+    Yields TweetRecords from the Twitter API v2 filtered stream for the given rules.
+    tweepy's stream thread hands tweets over one at a time, so a blocked consumer
+    throttles the connection instead of buffering without bound.
+    """
+    import tweepy
+    from src.tweet_record import TweetRecord
+
+    handoff = queue.Queue(maxsize=1)
+
+    class _Stream(tweepy.StreamingClient):
+        def on_tweet(self, tweet):
+            retweet_of_id = None
+            for reference in tweet.referenced_tweets or []:
+                if reference.type == 'retweeted':
+                    retweet_of_id = reference.id
+            handoff.put(TweetRecord(
+                id=tweet.id, text=tweet.text,
+                created_at=tweet.created_at.timestamp() if tweet.created_at else None,
+                author_id=tweet.author_id, retweet_of_id=retweet_of_id, lang=tweet.lang,
+            ))
+
+        def on_errors(self, errors):
+            logging.error(f"Filtered stream errors: {errors}")
+
+    stream = _Stream(bearer_token)
+    existing = stream.get_rules().data or []
+    if existing:
+        stream.delete_rules([rule.id for rule in existing])
+    stream.add_rules([tweepy.StreamRule(rule) for rule in rules])
+    thread = stream.filter(threaded=True, tweet_fields=['created_at', 'author_id', 'lang', 'referenced_tweets'])
+    try:
+        while (stop_event is None or not stop_event.is_set()) and thread.is_alive():
+            try:
+                yield handoff.get(timeout=0.5)
+            except queue.Empty:
+                continue
+    finally:
+        stream.disconnect()
+
+
+def windowed_handler(windows, sentiment_analyzer, content_suggestor, query: str, window_by: str = 'query'):
+    """
+    Stream handler that analyses an item like main.analyze_and_suggest and adds the
+    result to `windows` under the query, or under its top keyword with
+    window_by='keyword' (extracted once and reused for the suggestions), at the
+    item's created_at (or the current time).
+    """
+    from src.main import analyze_and_suggest
+    from src.document import as_document
+    from src.tweet_record import record_text
+
+    def handle(item):
+        keywords = None
+        if window_by == 'keyword':
+            document = as_document(record_text(item))
+            keywords = content_suggestor._extract_keywords(document, num_keywords=1) if document.text.strip() else []
+        result = analyze_and_suggest(item, sentiment_analyzer, content_suggestor, keywords=keywords)
+        keys = [query] if window_by == 'query' else keywords[:1]
+        windows.add(result, keys, getattr(item, 'created_at', None))
+        return result
+
+    return handle
+
+
+def report_windows(windows, path: str = None, top: int = 5):
+    """Logs the current windows of the `top` busiest keys and writes all of them to `path` (JSON) if set."""
+    from src.sentiment_windows import format_summary
+
+    summaries = windows.summaries()
+    for summary in summaries[:top]:
+        logging.info(f"window: {format_summary(summary)}")
+    if path:
+        from src.batch import write_json_atomic
+        write_json_atomic(path, {
+            'window_seconds': windows.size,
+            'slide_seconds': windows.slide,
+            'current': summaries,
+            'previous': windows.summaries(complete=True),
+            'stats': windows.stats(),
+        })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--jsonl', metavar='PATH', help="JSONL file of tweet records ('-' for stdin).")
+    source.add_argument('--search', metavar='QUERY', help="Poll the search API for new tweets.")
+    source.add_argument('--filter', metavar='RULE', action='append', help="v2 filtered stream rule (repeatable).")
+    parser.add_argument('--follow', action='store_true', help="Keep tailing the JSONL file for new lines.")
+    parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds between search polls (default 5).")
+    parser.add_argument('--workers', type=int, default=4, help="Analysis worker threads (default 4).")
+    parser.add_argument('--queue-size', type=int, default=1000, help="Bounded queue capacity (default 1000).")
+    parser.add_argument('--policy', choices=POLICIES, default='block', help="Overflow policy (default block).")
+    parser.add_argument('--report-interval', type=float, default=10.0, help="Seconds between metric reports (0 disables).")
+    parser.add_argument('--output', help="Write results to this file: .sqlite/.db (SQLite), .parquet (needs pyarrow) "
+                                         "or JSONL for any other extension (default: JSONL to stdout).")
+    parser.add_argument('--flush-size', type=int, default=1000, help="Results per batched write to --output (default 1000).")
+    parser.add_argument('--flush-interval', type=float, default=1.0, help="Maximum seconds between writes to --output (default 1).")
+    parser.add_argument('--noun-mode', choices=['tagger', 'hybrid', 'lexicon'], default='tagger')
+    parser.add_argument('--window', type=float, metavar='SECONDS',
+                        help="Aggregate sentiment over time windows of this length (tumbling unless --window-slide).")
+    parser.add_argument('--window-slide', type=float, metavar='SECONDS',
+                        help="Start a window every this many seconds (must divide --window; default: --window).")
+    parser.add_argument('--window-by', choices=['query', 'keyword'], default='query',
+                        help="Aggregate per query (default) or per top keyword of each tweet.")
+    parser.add_argument('--window-max-keys', type=int, default=1000, help="Keys kept in the windows (default 1000).")
+    parser.add_argument('--windows-output', metavar='PATH', help="Write the current windows as JSON at every report.")
+    profiling.add_arguments(parser)
+    trending.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    windows = None
+    if args.window:
+        from src.sentiment_windows import SentimentWindows
+        try:
+            windows = SentimentWindows(args.window, args.window_slide, max_keys=args.window_max_keys)
+        except ValueError as e:
+            parser.error(str(e))
+
+    from src.main import load_core_components, load_twitter_client, analyze_and_suggest
+
+    components = load_core_components(args.noun_mode)
+    if components is None:
+        return 1
+    sentiment_analyzer, content_suggestor = components
+
+    stop_event = threading.Event()
+    if args.jsonl:
+        producer = tail_jsonl(args.jsonl, follow=args.follow, stop_event=stop_event)
+    elif args.search:
+        client = load_twitter_client()
+        if client is None:
+            return 1
+        producer = poll_search(client, args.search, poll_interval=args.poll_interval, stop_event=stop_event)
+    else:
+        bearer_token = os.getenv("TWITTER_BEARER_TOKEN")
+        if not bearer_token:
+            print("The filtered stream needs TWITTER_BEARER_TOKEN to be set.", file=sys.stderr)
+            return 1
+        producer = filtered_stream(bearer_token, args.filter, stop_event=stop_event)
+
+    if args.output:
+        from src.result_sink import open_result_sink
+        sink = open_result_sink(args.output, flush_size=args.flush_size, flush_interval=args.flush_interval)
+    else:
+        def sink(result):
+            sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+            sys.stdout.flush()
+
+    handler = lambda item: analyze_and_suggest(item, sentiment_analyzer, content_suggestor)
+    reports = []
+    if windows is not None:
+        query = args.search or (' OR '.join(args.filter) if args.filter else 'all')
+        handler = windowed_handler(windows, sentiment_analyzer, content_suggestor, query, args.window_by)
+        reports.append(lambda: report_windows(windows, args.windows_output))
+    if trending.enable_from_args(args):
+        reports.append(lambda: trending.report_from_args(args))
+    on_report = (lambda: [report() for report in reports]) if reports else None
+
+    processor = StreamProcessor(
+        handler, workers=args.workers, queue_size=args.queue_size, policy=args.policy,
+        sink=sink, report_interval=args.report_interval or None, on_report=on_report,
+    )
+    profiling.enable_from_args(args)
+    try:
+        metrics = processor.run(producer, stop_event)
+    except KeyboardInterrupt:
+        stop_event.set()
+        metrics = processor.metrics()
+    finally:
+        if args.output:
+            sink.close()
+        profiling.report_from_args(args)
+        trending.report_from_args(args)
+    logging.info(format_metrics(metrics))
+    if windows is not None:
+        report_windows(windows, args.windows_output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
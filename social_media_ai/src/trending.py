@@ -0,0 +1,286 @@
+# This file contains the trending keyword tracker: a time-decayed Space-Saving sketch fed by the keyword extractor.
+import os
+import time
+import heapq
+import threading
+
+DEFAULT_CAPACITY = 1000
+# Decayed counts are kept relative to a landmark time and rescaled once the weight of
+# new terms exceeds 2**_MAX_EXPONENT, long before floats lose precision.
+_MAX_EXPONENT = 64
+
+_sketch = None
+_lock = threading.Lock()
+_pid = None
+
+
+class SpaceSaving:
+    """
+    The Space-Saving heavy-hitters sketch (Metwally et al.) with optional exponential
+    time decay: the `capacity` most frequent terms of a stream of any vocabulary size.
+
+    Each monitored term has a count and an error. A term that is not monitored
+    replaces the one with the smallest count when the sketch is full, and inherits
+    that count as its error, so a term's true count lies in [count - error, count]
+    and every term with a true count above (total / capacity) is monitored.
+
+    With half_life (seconds), each occurrence weighs 2 ** ((t - landmark) / half_life)
+    (forward decay), so older occurrences count for half as much every half_life and
+    emerging terms overtake terms that were frequent earlier. Decayed counts keep
+    their order, so the sketch works exactly as without decay.
+
+    Sketches merge by adding counts (a term missing from a full sketch is counted
+    with that sketch's minimum, as its error), so worker processes can each keep
+    one and periodically send it to a parent (see drain and merge).
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, half_life: float = None, clock=time.time):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        if half_life is not None and half_life <= 0:
+            raise ValueError("half_life must be positive.")
+        self.capacity = capacity
+        self.half_life = half_life
+        self._clock = clock
+        self.landmark = None
+        self.total = 0.0
+        self._counters = {} # term -> [count, error]
+        self._heap = [] # (count, term), one entry per term; an entry is stale if the count has grown since
+
+    def __len__(self):
+        return len(self._counters)
+
+    def _weight(self, timestamp: float) -> float:
+        if self.half_life is None:
+            return 1.0
+        if self.landmark is None:
+            self.landmark = timestamp
+        exponent = (timestamp - self.landmark) / self.half_life
+        if exponent > _MAX_EXPONENT:
+            self._rescale(timestamp)
+            exponent = 0.0
+        return 2.0 ** exponent
+
+    def _rescale(self, landmark: float):
+        """Moves the landmark, dividing every count by the weight of the new one."""
+        factor = 2.0 ** ((landmark - self.landmark) / self.half_life)
+        for counter in self._counters.values():
+            counter[0] /= factor
+            counter[1] /= factor
+        self.total /= factor
+        self.landmark = landmark
+        self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(counter[0], term) for term, counter in self._counters.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_minimum(self) -> str:
+        """Removes and returns the monitored term with the smallest count."""
+        while True:
+            count, term = heapq.heappop(self._heap)
+            current = self._counters[term][0]
+            if current == count:
+                return term
+            heapq.heappush(self._heap, (current, term))
+
+    def add(self, term: str, timestamp: float = None, weight: float = 1.0):
+        """Counts one occurrence of term (at `timestamp`, default now, when decaying)."""
+        if self.half_life is not None:
+            weight *= self._weight(self._clock() if timestamp is None else timestamp)
+        self.total += weight
+        counter = self._counters.get(term)
+        if counter is not None:
+            counter[0] += weight
+            return
+        if len(self._counters) < self.capacity:
+            self._counters[term] = [weight, 0.0]
+            heapq.heappush(self._heap, (weight, term))
+            return
+        evicted = self._pop_minimum()
+        minimum = self._counters.pop(evicted)[0]
+        self._counters[term] = [minimum + weight, minimum]
+        heapq.heappush(self._heap, (minimum + weight, term))
+
+    def _minimum(self) -> float:
+        if len(self._counters) < self.capacity:
+            return 0.0
+        return min(counter[0] for counter in self._counters.values())
+
+    def state(self) -> dict:
+        """A picklable/JSON-serializable copy of the sketch, for merge()."""
+        return {
+            'capacity': self.capacity,
+            'half_life': self.half_life,
+            'landmark': self.landmark,
+            'total': self.total,
+            'minimum': self._minimum(),
+            'counters': [(term, count, error) for term, (count, error) in self._counters.items()],
+        }
+
+    def merge(self, state: dict):
+        """Adds the counts of another sketch's state() (with the same half_life)."""
+        if state.get('half_life') != self.half_life:
+            raise ValueError("Cannot merge sketches with different half-lives.")
+        if not state['counters']:
+            return
+        scale = 1.0
+        if self.half_life is not None:
+            if self.landmark is None:
+                self.landmark = state['landmark']
+            if state['landmark'] > self.landmark + _MAX_EXPONENT * self.half_life:
+                self._rescale(state['landmark'])
+            scale = 2.0 ** ((state['landmark'] - self.landmark) / self.half_life)
+
+        own_minimum = self._minimum()
+        other_minimum = state['minimum'] * scale
+        other = {term: (count * scale, error * scale) for term, count, error in state['counters']}
+        merged = {}
+        for term in set(self._counters) | set(other):
+            count, error = self._counters.get(term, (own_minimum, own_minimum))
+            other_count, other_error = other.get(term, (other_minimum, other_minimum))
+            merged[term] = [count + other_count, error + other_error]
+        if len(merged) > self.capacity:
+            merged = dict(heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0]))
+        self._counters = merged
+        self.total += state['total'] * scale
+        self._rebuild_heap()
+
+    def top(self, k: int = 10, now: float = None) -> list[dict]:
+        """
+        The k terms with the highest (decayed, as of `now`) counts.
+
+        Returns:
+            [{'term', 'count', 'error', 'share'}], highest count first. 'count' is an
+            upper bound of the term's count and count - error a lower bound; 'share'
+            is count over the total of all terms.
+        """
+        decay = 1.0
+        if self.half_life is not None and self.landmark is not None:
+            now = self._clock() if now is None else now
+            decay = 2.0 ** ((self.landmark - now) / self.half_life)
+        ranked = heapq.nlargest(k, self._counters.items(), key=lambda item: item[1][0])
+        return [{
+            'term': term,
+            'count': count * decay,
+            'error': error * decay,
+            'share': count / self.total if self.total else 0.0,
+        } for term, (count, error) in ranked]
+
+
+def _check_process():
+    """In a freshly forked worker process, starts an empty sketch (the parent reports its own terms)."""
+    global _sketch, _pid
+    if _pid != os.getpid():
+        with _lock:
+            if _pid != os.getpid() and _sketch is not None:
+                _sketch = SpaceSaving(_sketch.capacity, _sketch.half_life)
+            _pid = os.getpid()
+
+
+def enable(capacity: int = DEFAULT_CAPACITY, half_life: float = None):
+    """Starts tracking the extracted keywords (in this process and in worker processes forked from it)."""
+    global _sketch, _pid
+    with _lock:
+        _sketch = SpaceSaving(capacity, half_life)
+        _pid = os.getpid()
+
+
+def disable():
+    global _sketch
+    with _lock:
+        _sketch = None
+
+
+def is_enabled() -> bool:
+    return _sketch is not None
+
+
+def record(terms, timestamp: float = None):
+    """Counts keywords extracted from one or more texts (only while enabled; cheap otherwise)."""
+    if _sketch is None or not terms:
+        return
+    _check_process()
+    with _lock:
+        if _sketch is not None:
+            for term in terms:
+                _sketch.add(term, timestamp)
+
+
+def top(k: int = 10, now: float = None) -> list[dict]:
+    """The k trending terms of this process (see SpaceSaving.top); [] when not enabled."""
+    _check_process()
+    with _lock:
+        return _sketch.top(k, now) if _sketch is not None else []
+
+
+def drain() -> dict:
+    """
+    Returns and clears this process's sketch state, for a worker process to send its
+    terms to the parent (see merge). {} when not enabled.
+    """
+    global _sketch
+    if _sketch is None:
+        return {}
+    _check_process()
+    with _lock:
+        state = _sketch.state()
+        _sketch = SpaceSaving(_sketch.capacity, _sketch.half_life)
+    return state
+
+
+def merge(state: dict):
+    """Adds a sketch state returned by drain() in another process."""
+    if not state or _sketch is None:
+        return
+    _check_process()
+    with _lock:
+        _sketch.merge(state)
+
+
+def call_drained(func, *args, **kwargs):
+    """Runs func in a worker process and returns (result, drain()), so the parent can merge() the worker's terms."""
+    return func(*args, **kwargs), drain()
+
+
+def format_top(terms: list[dict]) -> str:
+    """One line per trending term for reports."""
+    if not terms:
+        return "  (no keywords yet)"
+    width = max(len(term['term']) for term in terms)
+    return "\n".join(f"  {rank:>3}. {term['term']:<{width}}  {term['count']:10.1f}  (±{term['error']:.1f}, "
+                     f"{term['share'] * 100:.1f}%)" for rank, term in enumerate(terms, start=1))
+
+
+def add_arguments(parser):
+    """Adds --trending, --trending-capacity, --trending-half-life and --trending-output to an argparse parser."""
+    parser.add_argument('--trending', type=int, metavar='K', default=0,
+                        help="Track the keywords extracted from the texts and report the top K.")
+    parser.add_argument('--trending-capacity', type=int, default=DEFAULT_CAPACITY,
+                        help=f"Terms kept by the trending sketch (default {DEFAULT_CAPACITY}); bounds its memory.")
+    parser.add_argument('--trending-half-life', type=float, metavar='SECONDS',
+                        help="Halve the weight of older keyword occurrences every this many seconds (default: no decay).")
+    parser.add_argument('--trending-output', metavar='PATH', help="Also write the top K terms to this JSON file.")
+    return parser
+
+
+def enable_from_args(args) -> bool:
+    """Enables tracking as requested by the add_arguments options; returns whether it is on."""
+    if args.trending > 0:
+        enable(args.trending_capacity, args.trending_half_life)
+        return True
+    return False
+
+
+def report_from_args(args, stream=None):
+    """Prints (and exports) the top terms of a run enabled by enable_from_args."""
+    import sys
+
+    if _sketch is None:
+        return
+    terms = top(args.trending)
+    print(f"--- Trending Keywords (top {args.trending}) ---\n" + format_top(terms), file=stream or sys.stderr)
+    if args.trending_output:
+        from src.batch import write_json_atomic
+        write_json_atomic(args.trending_output, {'generated_at': time.time(), 'half_life_seconds': _sketch.half_life,
+                                                 'capacity': _sketch.capacity, 'terms': terms})
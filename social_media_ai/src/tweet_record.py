@@ -0,0 +1,173 @@
+# This file contains the compact tweet representations returned by the Twitter client.
+import math
+from array import array
+
+
+class TweetRecord:
+    """
+    One fetched tweet with the fields downstream stages need to dedupe by id,
+    collapse retweets and window by time.
+
+    Attributes:
+        id: The tweet id.
+        created_at: Creation time as Unix seconds (None if unknown).
+        author_id: The id of the tweeting user (None if unknown).
+        text: The tweet text.
+        retweet_of_id: The id of the retweeted tweet, or None if this is not a retweet.
+        lang: The language code reported by Twitter (None if unknown).
+    """
+
+    __slots__ = ('id', 'created_at', 'author_id', 'text', 'retweet_of_id', 'lang')
+
+    def __init__(self, id: int, text: str, created_at: float = None, author_id: int = None,
+                 retweet_of_id: int = None, lang: str = None):
+        self.id = id
+        self.created_at = created_at
+        self.author_id = author_id
+        self.text = text
+        self.retweet_of_id = retweet_of_id
+        self.lang = lang
+
+    @classmethod
+    def from_status(cls, status, text: str):
+        """Builds a record from a tweepy Status and its already extracted text."""
+        created_at = getattr(status, 'created_at', None)
+        user = getattr(status, 'user', None)
+        retweeted = getattr(status, 'retweeted_status', None)
+        return cls(
+            id=status.id,
+            text=text,
+            created_at=created_at.timestamp() if created_at is not None else None,
+            author_id=getattr(user, 'id', None),
+            retweet_of_id=getattr(retweeted, 'id', None),
+            lang=getattr(status, 'lang', None),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict, default_id: int = None):
+        """
+        Builds a record from a dict with the attribute names as keys (as written by
+        to_dict). Only 'text' is required; 'id' falls back to default_id.
+        """
+        return cls(
+            id=data.get('id', default_id),
+            text=data['text'],
+            created_at=data.get('created_at'),
+            author_id=data.get('author_id'),
+            retweet_of_id=data.get('retweet_of_id'),
+            lang=data.get('lang'),
+        )
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @property
+    def is_retweet(self) -> bool:
+        return self.retweet_of_id is not None
+
+    def __eq__(self, other):
+        if not isinstance(other, TweetRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"TweetRecord(id={self.id!r}, text={self.text!r})"
+
+
+class TweetBatch:
+    """
+    A columnar, read-only batch of tweets for large fetches.
+
+    Numeric fields are stored in typed arrays, languages as indexes into a small
+    string table, and all texts as one UTF-8 buffer with offsets. This takes a few
+    dozen bytes per tweet plus the encoded text, instead of a record object and a
+    str object per tweet. Missing values are stored as 0 (ids), NaN (created_at)
+    and 0 (lang code of None), and come back as None from the record view.
+    """
+
+    __slots__ = ('ids', 'created_at', 'author_ids', 'retweet_of_ids', 'lang_codes', 'langs',
+                 '_text_data', '_text_offsets')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.created_at = array('d')
+        self.author_ids = array('q')
+        self.retweet_of_ids = array('q')
+        self.lang_codes = array('H')
+        self.langs = [None] # String table; code 0 is "unknown"
+        self._text_data = b''
+        self._text_offsets = array('Q', [0])
+
+    @classmethod
+    def from_records(cls, records):
+        """Builds a batch from an iterable of TweetRecords in one pass."""
+        batch = cls()
+        lang_codes = {None: 0}
+        texts = []
+        offset = 0
+        for record in records:
+            batch.ids.append(record.id)
+            batch.created_at.append(math.nan if record.created_at is None else record.created_at)
+            batch.author_ids.append(record.author_id or 0)
+            batch.retweet_of_ids.append(record.retweet_of_id or 0)
+            code = lang_codes.get(record.lang)
+            if code is None:
+                code = lang_codes[record.lang] = len(batch.langs)
+                batch.langs.append(record.lang)
+            batch.lang_codes.append(code)
+            encoded = record.text.encode('utf-8')
+            texts.append(encoded)
+            offset += len(encoded)
+            batch._text_offsets.append(offset)
+        batch._text_data = b''.join(texts)
+        return batch
+
+    def __len__(self):
+        return len(self.ids)
+
+    def text(self, index: int) -> str:
+        """The text of the tweet at `index`."""
+        if index < 0:
+            index += len(self)
+        return self._text_data[self._text_offsets[index]:self._text_offsets[index + 1]].decode('utf-8')
+
+    def texts(self) -> list[str]:
+        """All texts, in batch order."""
+        data = self._text_data
+        offsets = self._text_offsets
+        return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(self))]
+
+    def __getitem__(self, index: int) -> TweetRecord:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TweetBatch index out of range")
+        created_at = self.created_at[index]
+        return TweetRecord(
+            id=self.ids[index],
+            text=self.text(index),
+            created_at=None if math.isnan(created_at) else created_at,
+            author_id=self.author_ids[index] or None,
+            retweet_of_id=self.retweet_of_ids[index] or None,
+            lang=self.langs[self.lang_codes[index]],
+        )
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the stored data in bytes (arrays and text buffer)."""
+        columns = (self.ids, self.created_at, self.author_ids, self.retweet_of_ids, self.lang_codes, self._text_offsets)
+        return sum(column.itemsize * len(column) for column in columns) + len(self._text_data)
+
+    def __repr__(self):
+        return f"TweetBatch({len(self)} tweets)"
+
+
+def record_text(item):
+    """Returns the text of a TweetRecord; any other input (str, Document) is returned unchanged."""
+    return item.text if isinstance(item, TweetRecord) else item
@@ -1,6 +1,23 @@
 import os
+import sys
+import queue
 import tweepy
 import logging
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+if not __package__: # Allow direct execution (python src/twitter_client.py)
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.fetch_scheduler import FetchScheduler, RateLimitExceeded
+from src.tweet_record import TweetRecord, TweetBatch
+from src import profiling
+
+# Default location of the local tweet store used for incremental fetching.
+DEFAULT_TWEET_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'tweets.sqlite3')
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -11,12 +28,19 @@ class TwitterClient:
     Handles authentication and fetching tweets.
     """
 
-    def __init__(self):
+    def __init__(self, base_url: str = None, record_path: str = None):
         """
         Initializes the TwitterClient.
 
         Loads Twitter API credentials from environment variables and authenticates with Tweepy.
 
+        Args:
+            base_url: Root URL of the API server (e.g., 'http://127.0.0.1:8080' for the local
+                      fake API in src.fake_twitter_api). Defaults to TWITTER_API_BASE_URL,
+                      or the real Twitter API if that is not set.
+            record_path: If given (or TWITTER_RECORD_PATH is set), every search response is
+                         appended to this JSONL file for replay with the fake API.
+
         Environment Variables Expected:
             - TWITTER_API_KEY: Your Twitter application's API key.
             - TWITTER_API_SECRET_KEY: Your Twitter application's API secret key.
@@ -31,6 +55,8 @@ class TwitterClient:
         self.api_secret_key = os.getenv("TWITTER_API_SECRET_KEY")
         self.access_token = os.getenv("TWITTER_ACCESS_TOKEN")
         self.access_token_secret = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
+        self.base_url = base_url or os.getenv("TWITTER_API_BASE_URL")
+        self.record_path = record_path or os.getenv("TWITTER_RECORD_PATH")
 
         if not all([self.api_key, self.api_secret_key, self.access_token, self.access_token_secret]):
             error_msg = "Twitter API credentials not fully found in environment variables. "\
@@ -40,11 +66,12 @@ class TwitterClient:
             raise ValueError(error_msg)
 
         try:
-            auth = tweepy.OAuth1UserHandler(
+            self.auth = tweepy.OAuth1UserHandler(
                 self.api_key, self.api_secret_key,
                 self.access_token, self.access_token_secret
             )
-            self.api = tweepy.API(auth, wait_on_rate_limit=True)
+            self.api = self._make_api(wait_on_rate_limit=True)
+            self._thread_local = threading.local()
             # Verify credentials to ensure authentication is successful
             self.api.verify_credentials()
             logging.info("TwitterClient initialized and authenticated successfully.")
@@ -52,6 +79,21 @@ class TwitterClient:
             logging.error(f"Error during Twitter authentication: {e}")
             raise  # Re-raise the TweepyException to be handled by the caller
 
+    def _make_api(self, wait_on_rate_limit: bool):
+        """Creates a tweepy.API for the configured server, recording responses if requested."""
+        if not self.base_url:
+            api = tweepy.API(self.auth, wait_on_rate_limit=wait_on_rate_limit)
+        else:
+            # tweepy always builds https://<host>/1.1/... URLs; only the host is configurable.
+            url = urlsplit(self.base_url)
+            api = tweepy.API(self.auth, wait_on_rate_limit=wait_on_rate_limit, host=url.netloc)
+            if url.scheme == 'http':
+                api.session.mount(f"https://{url.netloc}/", _PlainHTTPAdapter())
+        if self.record_path:
+            from src.fake_twitter_api import record_responses
+            record_responses(api, self.record_path)
+        return api
+
     def fetch_tweets(self, query: str, count: int = 10, lang: str = "en", tweet_mode: str = "extended") -> list[str]:
         """
         Fetches recent tweets based on a search query.
@@ -75,14 +117,9 @@ class TwitterClient:
             searched_tweets = self.api.search_tweets(q=query, lang=lang, count=count, tweet_mode=tweet_mode)
             
             for status in searched_tweets:
-                if tweet_mode == "extended":
-                    if hasattr(status, 'full_text'):
-                        tweets_text.append(status.full_text)
-                    elif hasattr(status, 'text'): # Fallback for safety, though extended should have full_text
-                        tweets_text.append(status.text)
-                else: # tweet_mode == "compat" or not specified for older API versions
-                     if hasattr(status, 'text'):
-                        tweets_text.append(status.text)
+                text = self._status_text(status, tweet_mode)
+                if text is not None:
+                    tweets_text.append(text)
             
             logging.info(f"Fetched {len(tweets_text)} tweets for query: '{query}'")
 
@@ -95,6 +132,450 @@ class TwitterClient:
         
         return tweets_text
 
+    @staticmethod
+    def _status_text(status, tweet_mode: str):
+        """Returns the text of a tweepy Status for the given tweet_mode, or None if it has none."""
+        if tweet_mode == "extended":
+            if hasattr(status, 'full_text'):
+                return status.full_text
+            elif hasattr(status, 'text'): # Fallback for safety, though extended should have full_text
+                return status.text
+        else: # tweet_mode == "compat" or not specified for older API versions
+            if hasattr(status, 'text'):
+                return status.text
+        return None
+
+    def _iter_pages(self, query: str, limit: int, page_size: int, lang: str, tweet_mode: str,
+                    max_id: int = None, since_id: int = None, outcome: dict = None):
+        """
+        Yields pages (lists of Status objects) of search results, newest first, following
+        max_id pagination until `limit` tweets were returned (None for no limit) or the
+        results run out. If since_id is given, only tweets newer than it are requested.
+        Errors are logged and end the iteration.
+
+        If `outcome` is given, outcome['complete'] is set to True when the results ran
+        out, and to False when an error or the limit ended the iteration first.
+        """
+        outcome = {} if outcome is None else outcome
+        outcome['complete'] = False
+        remaining = limit
+        while remaining is None or remaining > 0:
+            count = page_size if remaining is None else min(page_size, remaining)
+            params = {'q': query, 'lang': lang, 'count': count, 'tweet_mode': tweet_mode}
+            if max_id is not None:
+                params['max_id'] = max_id
+            if since_id is not None:
+                params['since_id'] = since_id
+            try:
+                with profiling.timer('fetch'):
+                    page = list(self.api.search_tweets(**params))
+            except tweepy.TweepyException as e:
+                logging.error(f"Error fetching tweets for query '{query}': {e}")
+                return
+            except Exception as e:
+                logging.error(f"An unexpected error occurred while fetching tweets: {e}")
+                return
+            if not page:
+                outcome['complete'] = True
+                return
+            if remaining is not None:
+                page = page[:remaining]
+                remaining -= len(page)
+            yield page
+            # Ask for tweets strictly older than the oldest one on this page.
+            max_id = min(status.id for status in page) - 1
+
+    def iter_records(self, query: str, limit: int = None, page_size: int = 100, lang: str = "en",
+                     tweet_mode: str = "extended", prefetch_pages: int = 1, since_id: int = None,
+                     max_id: int = None, outcome: dict = None):
+        """
+        Generator that pages through search results and yields a TweetRecord per tweet
+        as each page arrives.
+
+        Unlike fetch_tweets, there is no cap on the number of tweets: pages of up to
+        `page_size` tweets are requested with max_id pagination until `limit` tweets
+        have been yielded or no older tweets are left. While the caller processes one
+        page, up to `prefetch_pages` further pages are fetched in a background thread,
+        so memory stays bounded by (prefetch_pages + 1) * page_size tweets.
+
+        Args:
+            query: The search query (e.g., keyword, hashtag).
+            limit: The maximum number of tweets to yield (None for no limit).
+            page_size: Tweets requested per API call (the v1.1 search API allows up to 100).
+            lang: The language of tweets to search for. Default is "en".
+            tweet_mode: "extended" (default) or "compat", as in fetch_tweets.
+            prefetch_pages: Pages fetched ahead of the consumer; 0 fetches each page only
+                            when the previous one has been consumed.
+            since_id: If given, only tweets newer than this id are fetched.
+            max_id: If given, only tweets up to this id are fetched.
+            outcome: If given, outcome['complete'] tells at the end whether every tweet
+                     down to since_id was fetched (False after an error or at the limit).
+
+        Yields:
+            A TweetRecord for each fetched tweet, newest first. Errors are logged and end the iteration.
+        """
+        pages = self._iter_pages(query, limit, page_size, lang, tweet_mode, max_id=max_id, since_id=since_id,
+                                 outcome=outcome)
+        if prefetch_pages > 0:
+            pages = _prefetch(pages, prefetch_pages)
+        fetched = 0
+        try:
+            for page in pages:
+                for status in page:
+                    text = self._status_text(status, tweet_mode)
+                    if text is not None:
+                        fetched += 1
+                        yield TweetRecord.from_status(status, text)
+        finally:
+            pages.close()
+            logging.info(f"Fetched {fetched} tweets for query: '{query}'")
+
+    def iter_tweets(self, query: str, limit: int = None, page_size: int = 100, lang: str = "en",
+                    tweet_mode: str = "extended", prefetch_pages: int = 1):
+        """
+        Like iter_records, but yields only the text of each tweet.
+        """
+        records = self.iter_records(query, limit, page_size, lang, tweet_mode, prefetch_pages)
+        try:
+            for record in records:
+                yield record.text
+        finally:
+            records.close()
+
+    def fetch_records(self, query: str, count: int = 10, page_size: int = 100, lang: str = "en",
+                      tweet_mode: str = "extended") -> list[TweetRecord]:
+        """
+        Fetches up to `count` tweets as TweetRecords (id, created_at, author id, text,
+        retweet-of id, lang), following pagination beyond a single page if needed.
+        """
+        return list(self.iter_records(query, count, page_size, lang, tweet_mode))
+
+    def fetch_batch(self, query: str, count: int = 1000, page_size: int = 100, lang: str = "en",
+                    tweet_mode: str = "extended") -> TweetBatch:
+        """
+        Fetches up to `count` tweets into a columnar TweetBatch. Meant for large fetches:
+        records are packed page by page, so only one page of objects is alive at a time.
+        """
+        return TweetBatch.from_records(self.iter_records(query, count, page_size, lang, tweet_mode))
+
+    def fetch_new_tweets(self, query: str, store, limit: int = None, page_size: int = 100,
+                         lang: str = "en", tweet_mode: str = "extended") -> list[str]:
+        """
+        Fetches only tweets newer than the ones already in the store for this query,
+        saves them, and returns the texts of the tweets that were not stored before.
+
+        The highest tweet id stored for the query is sent as since_id, so polling the
+        same query repeatedly only downloads what is new since the previous poll.
+        Tweets are deduplicated by id and stored page by page, but the query's since_id
+        only advances once pagination reached the since_id without an error. If an API
+        error or `limit` cuts a fetch short, the store remembers the gap between the
+        oldest tweet fetched and the old since_id, and the next calls fetch that gap
+        (with max_id) before moving since_id past it. The first fetch of a query has no
+        since_id to fill a gap down to, so it counts as complete however it ended: the
+        query starts at the newest tweets, as poll_search in src.streaming does.
+
+        Args:
+            query: The search query (e.g., keyword, hashtag).
+            store: The TweetStore to read the since_id from and to save tweets to.
+            limit: The maximum number of tweets to fetch (None for no limit).
+            page_size, lang, tweet_mode: As in iter_tweets.
+
+        Returns:
+            The texts of the newly stored tweets, newest first.
+        """
+        since_id = store.since_id(query, lang)
+        gap = store.gap(query, lang) # (max_id, newest id) of an earlier fetch that was cut short
+        max_id, newest = gap if gap is not None else (None, None)
+        oldest = None
+        outcome = {}
+        new_tweets = []
+        for page in self._iter_pages(query, limit, page_size, lang, tweet_mode, max_id=max_id, since_id=since_id,
+                                     outcome=outcome):
+            records = []
+            for status in page:
+                text = self._status_text(status, tweet_mode)
+                if text is not None:
+                    records.append((status.id, text))
+            new_tweets.extend(text for _, text in store.add(query, lang, records, advance_since_id=False))
+            page_ids = [status.id for status in page]
+            newest = max(page_ids) if newest is None else max(newest, *page_ids)
+            oldest = min(page_ids) if oldest is None else min(oldest, *page_ids)
+        if outcome['complete'] or since_id is None:
+            if newest is not None:
+                store.commit_since_id(query, lang, newest)
+        elif oldest is not None:
+            store.set_gap(query, lang, oldest - 1, newest)
+            logging.info(f"Fetch for query '{query}' was cut short; tweets older than {oldest} are fetched next time.")
+        logging.info(f"Fetched {len(new_tweets)} new tweets for query: '{query}' (since_id={since_id})")
+        return new_tweets
+
+    def fetch_recent_tweets(self, query: str, store, count: int = 10, lang: str = "en",
+                            tweet_mode: str = "extended", refresh: bool = True) -> list[str]:
+        """
+        Returns the `count` most recent tweets for a query, served from the store.
+
+        With refresh=True (default) new tweets are first fetched incrementally with
+        fetch_new_tweets; with refresh=False no API call is made at all.
+        """
+        if refresh:
+            self.fetch_new_tweets(query, store, limit=count, lang=lang, tweet_mode=tweet_mode)
+        return store.get_tweets(query, lang, limit=count)
+
+
+    def search_page(self, params: dict) -> tuple:
+        """
+        Fetches one page of search results without waiting on rate limits.
+
+        This is the page fetcher used by FetchScheduler: every worker thread gets its own
+        tweepy.API (with wait_on_rate_limit=False), so the response headers of concurrent
+        requests do not overwrite each other.
+
+        Args:
+            params: Keyword arguments for search_tweets (q, lang, count, tweet_mode, max_id).
+
+        Returns:
+            (list of Status objects, response headers)
+
+        Raises:
+            RateLimitExceeded: If the API answered 429 Too Many Requests.
+        """
+        api = getattr(self._thread_local, 'api', None)
+        if api is None:
+            api = self._thread_local.api = self._make_api(wait_on_rate_limit=False)
+        try:
+            statuses = list(api.search_tweets(**params))
+        except tweepy.TooManyRequests as e:
+            raise RateLimitExceeded(reset_time=e.reset_time, headers=dict(e.response.headers)) from e
+        response = api.last_response
+        return statuses, dict(response.headers) if response is not None else {}
+
+    def fetch_many(self, queries, count: int = 100, page_size: int = 100, lang: str = "en",
+                   tweet_mode: str = "extended", max_workers: int = 4) -> dict:
+        """
+        Fetches tweets for several queries concurrently, respecting the search rate limit.
+
+        Pages of all queries are interleaved on a thread pool. Remaining quota is tracked
+        from the x-rate-limit-* response headers; when it runs out, pending pages are
+        scheduled for the reset time instead of blocking a worker (see FetchScheduler).
+
+        Args:
+            queries: The search queries.
+            count: The maximum number of tweets to fetch per query.
+            page_size, lang, tweet_mode: As in iter_tweets.
+            max_workers: Number of requests in flight at once.
+
+        Returns:
+            {query: list of tweet texts, newest first}. A query that fails keeps the
+            tweets fetched before the error.
+        """
+        scheduler = FetchScheduler({'search/tweets': self.search_page}, max_workers=max_workers)
+        results = {}
+        for query, statuses in scheduler.iter_results(queries, limit_per_query=count, page_size=page_size,
+                                                      lang=lang, tweet_mode=tweet_mode):
+            texts = [self._status_text(status, tweet_mode) for status in statuses]
+            results[query] = [text for text in texts if text is not None]
+            logging.info(f"Fetched {len(results[query])} tweets for query: '{query}'")
+        return results
+
+
+class TweetStore:
+    """
+    A local SQLite store of fetched tweets, used for incremental (since_id) fetching.
+
+    Tweets are stored once per id and linked to every query that returned them.
+    For each (query, lang) the highest tweet id seen is recorded, so the next fetch
+    can ask the API only for newer tweets, and repeated reads of already-fetched
+    tweets are served from disk.
+    """
+
+    def __init__(self, path: str = DEFAULT_TWEET_STORE_PATH):
+        """
+        Opens (and creates if needed) the store.
+
+        Args:
+            path: Path of the SQLite database file, or ':memory:' for a temporary store.
+        """
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS tweets (
+                    id INTEGER PRIMARY KEY,
+                    text TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS query_tweets (
+                    query TEXT NOT NULL,
+                    lang TEXT NOT NULL,
+                    tweet_id INTEGER NOT NULL REFERENCES tweets(id),
+                    PRIMARY KEY (query, lang, tweet_id)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS queries (
+                    query TEXT NOT NULL,
+                    lang TEXT NOT NULL,
+                    since_id INTEGER NOT NULL,
+                    PRIMARY KEY (query, lang)
+                );
+                CREATE TABLE IF NOT EXISTS query_gaps (
+                    query TEXT NOT NULL,
+                    lang TEXT NOT NULL,
+                    max_id INTEGER NOT NULL,
+                    newest_id INTEGER NOT NULL,
+                    PRIMARY KEY (query, lang)
+                );
+            """)
+
+    def since_id(self, query: str, lang: str = "en"):
+        """Returns the newest tweet id up to which the query was completely fetched, or None if it never was."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT since_id FROM queries WHERE query = ? AND lang = ?", (query, lang)
+            ).fetchone()
+        return row[0] if row else None
+
+    def gap(self, query: str, lang: str = "en"):
+        """
+        Returns (max_id, newest_id) if a fetch for the query was cut short: tweets up to
+        max_id and newer than since_id are still missing, and since_id becomes newest_id
+        once they are fetched. None if there is no gap.
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT max_id, newest_id FROM query_gaps WHERE query = ? AND lang = ?", (query, lang)
+            ).fetchone()
+
+    def set_gap(self, query: str, lang: str, max_id: int, newest_id: int):
+        """Records (or narrows) the gap of a fetch that was cut short (see gap)."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO query_gaps (query, lang, max_id, newest_id) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (query, lang) DO UPDATE SET max_id = excluded.max_id, "
+                "newest_id = MAX(newest_id, excluded.newest_id)",
+                (query, lang, max_id, newest_id)
+            )
+
+    def commit_since_id(self, query: str, lang: str, since_id: int):
+        """Advances the query's since_id after a complete fetch, and clears its gap."""
+        with self._lock, self._connection:
+            self._upsert_since_id(query, lang, since_id)
+            self._connection.execute("DELETE FROM query_gaps WHERE query = ? AND lang = ?", (query, lang))
+
+    def _upsert_since_id(self, query: str, lang: str, since_id: int):
+        self._connection.execute(
+            "INSERT INTO queries (query, lang, since_id) VALUES (?, ?, ?) "
+            "ON CONFLICT (query, lang) DO UPDATE SET since_id = MAX(since_id, excluded.since_id)",
+            (query, lang, since_id)
+        )
+
+    def add(self, query: str, lang: str, records, advance_since_id: bool = True) -> list[tuple]:
+        """
+        Stores (tweet id, text) records for a query in one transaction and, unless
+        advance_since_id is False (see commit_since_id), advances the query's since_id.
+        Returns the records that were new for this query.
+        """
+        records = list(records)
+        if not records:
+            return []
+        with self._lock, self._connection:
+            known = set()
+            ids = [tweet_id for tweet_id, _ in records]
+            for start in range(0, len(ids), 500): # Stay below SQLite's bound-parameter limit
+                chunk = ids[start:start + 500]
+                known.update(row[0] for row in self._connection.execute(
+                    f"SELECT tweet_id FROM query_tweets WHERE query = ? AND lang = ? AND tweet_id IN ({','.join('?' * len(chunk))})",
+                    [query, lang, *chunk]
+                ))
+            new_records = []
+            for tweet_id, text in records:
+                if tweet_id not in known:
+                    known.add(tweet_id)
+                    new_records.append((tweet_id, text))
+            self._connection.executemany("INSERT OR IGNORE INTO tweets (id, text) VALUES (?, ?)", new_records)
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO query_tweets (query, lang, tweet_id) VALUES (?, ?, ?)",
+                [(query, lang, tweet_id) for tweet_id, _ in new_records]
+            )
+            if advance_since_id:
+                self._upsert_since_id(query, lang, max(ids))
+        return new_records
+
+    def get_tweets(self, query: str, lang: str = "en", limit: int = None) -> list[str]:
+        """Returns the stored texts for a query, newest first (at most `limit` if given)."""
+        sql = ("SELECT tweets.text FROM query_tweets JOIN tweets ON tweets.id = query_tweets.tweet_id "
+               "WHERE query_tweets.query = ? AND query_tweets.lang = ? ORDER BY query_tweets.tweet_id DESC")
+        params = [query, lang]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self._connection.execute(sql, params)]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _PlainHTTPAdapter(requests.adapters.HTTPAdapter):
+    """Sends the https:// requests tweepy builds over plain HTTP (for a local fake API)."""
+
+    def send(self, request, **kwargs):
+        request.url = 'http://' + request.url[len('https://'):]
+        return super().send(request, **kwargs)
+
+
+_PAGES_DONE = object()
+
+
+def _prefetch(pages, depth: int):
+    """
+    Runs the `pages` generator in a background thread, keeping up to `depth` pages
+    ready in a bounded queue. Closing the returned generator stops the thread.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer():
+        try:
+            for page in pages:
+                if not put(page):
+                    break
+        except BaseException as e: # Hand the error to the consumer thread
+            put(e)
+        finally:
+            pages.close()
+            put(_PAGES_DONE)
+
+    thread = threading.Thread(target=producer, name="tweet-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _PAGES_DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
 if __name__ == "__main__":
     print("Twitter Client Example Usage")
     print("----------------------------")
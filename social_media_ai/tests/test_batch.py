@@ -0,0 +1,281 @@
+import unittest
+import os
+import sys
+import io
+import json
+import tempfile
+from unittest.mock import patch, MagicMock
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import batch
+from src.tweet_record import TweetRecord
+
+
+def _split_tokenize(text):
+    return text.replace(',', ' ,').replace('.', ' .').replace('!', ' !').split()
+
+
+def _load_components(noun_mode='tagger'):
+    from src.sentiment_analysis import SentimentAnalyzer
+    from src.content_suggestion import ContentSuggestor
+    return SentimentAnalyzer(), ContentSuggestor(noun_mode='lexicon')
+
+
+class TestReaders(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_csv(self):
+        path = self._write('tweets.csv', 'id,text,created_at,lang\n7,"Hello, world",1700000000.5,en\n,No id,,\nx,Bad id,,\n')
+        records = list(batch.read_records(path))
+        self.assertEqual(records, [
+            TweetRecord(id=7, text="Hello, world", created_at=1700000000.5, lang='en'),
+            TweetRecord(id=2, text="No id"),
+        ])
+
+    def test_csv_without_text_column(self):
+        path = self._write('tweets.csv', 'id,body\n1,Hello\n')
+        with self.assertRaises(ValueError):
+            list(batch.read_records(path))
+
+    def test_jsonl_and_format_detection(self):
+        path = self._write('tweets.txt', '{"id": 3, "text": "First"}\n"Second"\n')
+        self.assertEqual(batch.detect_format(path), 'jsonl')
+        self.assertEqual(batch.detect_format('TWEETS.CSV'), 'csv')
+        self.assertEqual([(r.id, r.text) for r in batch.read_records(path)], [(3, "First"), (2, "Second")])
+        with self.assertRaises(ValueError):
+            batch.read_records(path, 'xml')
+
+    def test_iter_chunks(self):
+        self.assertEqual(list(batch.iter_chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+
+@patch('src.content_suggestion._ensure_nltk_resources', MagicMock())
+@patch('src.document.word_tokenize', side_effect=_split_tokenize)
+@patch('src.main.load_core_components', side_effect=_load_components)
+class TestRunBatch(unittest.TestCase):
+
+    RECORDS = [
+        TweetRecord(id=10, text="I love this new phone, the camera is amazing!"),
+        TweetRecord(id=11, text="This is the worst service I have ever received."),
+        TweetRecord(id=12, text="   "),
+        TweetRecord(id=13, text="The weather is quite neutral today."),
+    ]
+
+    def setUp(self):
+        from src import main
+        main._worker_components.clear()
+        self.addCleanup(main._worker_components.clear)
+
+    def test_results_in_order(self, mock_load, mock_tokenize):
+        results = []
+        stats = batch.run_batch(self.RECORDS, results.append, batch_size=3, noun_mode='lexicon')
+
+        self.assertEqual([r['id'] for r in results], [10, 11, 12, 13])
+        self.assertEqual(results[0]['overall_sentiment'], 'positive')
+        self.assertEqual(results[1]['overall_sentiment'], 'negative')
+        self.assertEqual(results[2]['error'], "Input text is empty.")
+        self.assertTrue(results[3]['suggestions'])
+        self.assertEqual((stats['processed'], stats['errors'], stats['chunks']), (4, 1, 2))
+        mock_load.assert_called_once_with('lexicon') # Analyzers are reused across chunks
+
+    def test_worker_processes_keep_input_order(self, mock_load, mock_tokenize):
+        sequential, parallel = [], []
+        batch.run_batch(self.RECORDS * 3, sequential.append, batch_size=2)
+        batch.run_batch(self.RECORDS * 3, parallel.append, batch_size=2, workers=2)
+        self.assertEqual(parallel, sequential)
+
+    def test_spam_is_not_analysed(self, mock_load, mock_tokenize):
+        from src.spam_filter import SpamFilter
+        from tests.test_spam_filter import KeywordModel, IdentityVectorizer
+
+        records = self.RECORDS + [TweetRecord(id=14, text="Free tickets, click the link now!")]
+        spam_filter = SpamFilter(KeywordModel(), IdentityVectorizer())
+        with patch('src.spam_filter.get_worker_spam_filter', return_value=spam_filter):
+            dropped, tagged = [], []
+            stats = batch.run_batch(records, dropped.append, batch_size=10, spam_threshold=0.5)
+            batch.run_batch(records, tagged.append, batch_size=10, spam_threshold=0.5, spam_action='tag')
+
+        self.assertEqual([r['id'] for r in dropped], [10, 11, 12, 13])
+        self.assertEqual((stats['processed'], stats['spam'], stats['spam_rate']), (5, 1, 0.2))
+        self.assertGreater(stats['estimated_seconds_saved'], 0.0)
+        self.assertEqual(tagged[-1], {'id': 14, 'text': "Free tickets, click the link now!", 'spam': True, 'spam_score': 0.9})
+        self.assertEqual(tagged[:4], dropped)
+
+    def test_invalid_arguments(self, mock_load, mock_tokenize):
+        with self.assertRaises(ValueError):
+            batch.run_batch([], print, batch_size=0)
+        with self.assertRaises(ValueError):
+            batch.run_batch([], print, workers=0)
+        with self.assertRaises(ValueError):
+            batch.run_batch([], print, spam_action='delete')
+
+    def test_cli_writes_jsonl(self, mock_load, mock_tokenize):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'in.jsonl')
+            output_path = os.path.join(directory, 'out.jsonl')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(record.to_dict()) + '\n' for record in self.RECORDS)
+
+            stdout = io.StringIO()
+            with patch('sys.stdout', stdout):
+                self.assertEqual(batch.main([input_path, '--output', output_path, '--batch-size', '2']), 0)
+            self.assertEqual(stdout.getvalue(), "") # No per-item prints
+            with open(output_path, encoding='utf-8') as f:
+                results = [json.loads(line) for line in f]
+        self.assertEqual([r['id'] for r in results], [10, 11, 12, 13])
+
+    def test_cli_writes_sqlite(self, mock_load, mock_tokenize):
+        import sqlite3
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'in.jsonl')
+            output_path = os.path.join(directory, 'out.sqlite')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(record.to_dict()) + '\n' for record in self.RECORDS)
+
+            self.assertEqual(batch.main([input_path, '--output', output_path, '--flush-size', '3']), 0)
+            connection = sqlite3.connect(output_path)
+            rows = connection.execute("SELECT id, overall_sentiment, error FROM results ORDER BY id").fetchall()
+            connection.close()
+        self.assertEqual(rows, [(10, 'positive', None), (11, 'negative', None), (12, None, "Input text is empty."),
+                                (13, 'neutral', None)])
+
+    def test_resume_checks_the_checkpoint(self, mock_load, mock_tokenize):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'in.jsonl')
+            output_path = os.path.join(directory, 'out.jsonl')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(record.to_dict()) + '\n' for record in self.RECORDS)
+
+            with patch('sys.stderr', io.StringIO()) as stderr:
+                self.assertEqual(batch.main([input_path, '--output', output_path, '--resume']), 1)
+            self.assertIn("No checkpoint", stderr.getvalue())
+
+            self.assertEqual(batch.main([input_path, '--output', output_path, '--batch-size', '2']), 0)
+            checkpoint = batch.read_checkpoint(output_path + '.checkpoint.json')
+            self.assertTrue(checkpoint['complete'])
+            self.assertEqual((checkpoint['records_done'], checkpoint['counts']['errors']), (4, 1))
+            self.assertEqual(checkpoint['sink_position'], os.path.getsize(output_path))
+
+            with patch('sys.stderr', io.StringIO()) as stderr:
+                self.assertEqual(batch.main([input_path, '--output', output_path, '--resume']), 1)
+            self.assertIn("batch_size differ", stderr.getvalue())
+            # Resuming a complete run changes nothing
+            self.assertEqual(batch.main([input_path, '--output', output_path, '--batch-size', '2', '--resume']), 0)
+            with open(output_path, encoding='utf-8') as f:
+                self.assertEqual([json.loads(line)['id'] for line in f], [10, 11, 12, 13])
+
+    def test_cli_reports_unreadable_input(self, mock_load, mock_tokenize):
+        with patch('sys.stderr', io.StringIO()) as stderr:
+            self.assertEqual(batch.main(['/nonexistent/tweets.jsonl']), 1)
+        self.assertIn("Batch processing failed", stderr.getvalue())
+
+
+# Runs batch.main(argv) in a subprocess with the same stubs as the tests, slowed down
+# so that it can be killed mid-run.
+_SLOW_BATCH = """
+import sys, time
+from unittest.mock import patch, MagicMock
+sys.path.insert(0, {project!r})
+from src import batch
+from tests.test_batch import _split_tokenize, _load_components
+analyze_chunk = batch.analyze_chunk
+def slow_analyze_chunk(*args, **kwargs):
+    time.sleep(0.05)
+    return analyze_chunk(*args, **kwargs)
+with patch('src.content_suggestion._ensure_nltk_resources', MagicMock()), \\
+     patch('src.document.word_tokenize', side_effect=_split_tokenize), \\
+     patch('src.main.load_core_components', side_effect=_load_components), \\
+     patch('src.batch.analyze_chunk', slow_analyze_chunk):
+    sys.exit(batch.main(sys.argv[1:]))
+"""
+
+
+@patch('src.content_suggestion._ensure_nltk_resources', MagicMock())
+@patch('src.document.word_tokenize', side_effect=_split_tokenize)
+@patch('src.main.load_core_components', side_effect=_load_components)
+class TestKillAndResume(unittest.TestCase):
+
+    TEXTS = ["I love this new phone, the camera is amazing!", "This is the worst service I have ever received.",
+             "The weather is quite neutral today.", "   ", "Great battery and a great screen."]
+
+    def setUp(self):
+        from src import main
+        main._worker_components.clear()
+        self.addCleanup(main._worker_components.clear)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.input_path = os.path.join(self.directory.name, 'in.jsonl')
+        with open(self.input_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps({'id': 100 + i, 'text': self.TEXTS[i % 5].replace('!', f" #{i}!")}) + '\n'
+                         for i in range(80))
+
+    def _read_output(self, path):
+        if path.endswith('.jsonl'):
+            with open(path, encoding='utf-8') as f:
+                return [json.loads(line) for line in f]
+        import sqlite3
+        connection = sqlite3.connect(path)
+        self.addCleanup(connection.close)
+        return connection.execute("SELECT * FROM results ORDER BY rowid").fetchall()
+
+    def _kill_mid_run(self, argv, checkpoint_path, records_done):
+        """Starts a slowed-down batch run and SIGKILLs it once a checkpoint covers `records_done` records."""
+        import signal
+        import subprocess
+        import time
+        project = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        process = subprocess.Popen([sys.executable, '-c', _SLOW_BATCH.format(project=project)] + argv,
+                                   cwd=project, stderr=subprocess.DEVNULL)
+        self.addCleanup(process.wait)
+        self.addCleanup(lambda: process.poll() is None and process.kill())
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                checkpoint = batch.read_checkpoint(checkpoint_path)
+            except ValueError: # Only possible if the checkpoint were not written atomically
+                self.fail("Read a partially written checkpoint.")
+            if checkpoint and checkpoint['records_done'] >= records_done:
+                break
+            self.assertIsNone(process.poll(), "The batch run ended before it could be killed.")
+            time.sleep(0.01)
+        else:
+            self.fail("No checkpoint was written.")
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+        return batch.read_checkpoint(checkpoint_path)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "needs POSIX signals")
+    def test_killed_run_resumes_without_gaps_or_duplicates(self, mock_load, mock_tokenize):
+        for name in ('out.jsonl', 'out.sqlite'):
+            with self.subTest(name):
+                output_path = os.path.join(self.directory.name, name)
+                expected_path = os.path.join(self.directory.name, 'expected' + os.path.splitext(name)[1])
+                options = ['--batch-size', '4', '--flush-size', '3', '--checkpoint-interval', '0']
+                self.assertEqual(batch.main([self.input_path, '--output', expected_path] + options), 0)
+
+                checkpoint = self._kill_mid_run([self.input_path, '--output', output_path] + options,
+                                                output_path + '.checkpoint.json', records_done=20)
+                self.assertFalse(checkpoint['complete'])
+                self.assertLess(checkpoint['records_done'], 80)
+                self.assertLess(len(self._read_output(output_path)), 80)
+
+                self.assertEqual(batch.main([self.input_path, '--output', output_path, '--resume'] + options), 0)
+                self.assertEqual(self._read_output(output_path), self._read_output(expected_path))
+                checkpoint = batch.read_checkpoint(output_path + '.checkpoint.json')
+                self.assertTrue(checkpoint['complete'])
+                self.assertEqual(checkpoint['counts'], {'processed': 80, 'errors': 16, 'spam': 0, 'chunks': 20})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+import os
+import sys
+import pickle
+from unittest.mock import patch
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.batch_result import BatchResult
+from src.content_suggestion import ContentSuggestor
+
+
+def _deep_size(value, seen=None) -> int:
+    """sys.getsizeof summed over nested dicts, lists and their items (each object once)."""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(key, seen) + _deep_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_deep_size(item, seen) for item in value)
+    return size
+
+
+class TestBatchResult(unittest.TestCase):
+
+    SENTIMENT = {'compound': 0.8516, 'positive': 0.52, 'negative': 0.0, 'neutral': 0.48}
+
+    def _results(self):
+        results = BatchResult()
+        results.add_analysis(10, "I love the camera", self.SENTIMENT, 'positive', 'camera')
+        results.add_error(None, "  ", "Input text is empty.")
+        results.add_spam(12, "Free followers", 0.97)
+        results.add_analysis(13, "Service was bad", {'compound': -0.5423, 'positive': 0.0, 'negative': 0.467, 'neutral': 0.533},
+                             'negative', None)
+        return results.freeze()
+
+    def test_dict_views(self):
+        results = self._results()
+        suggestor = ContentSuggestor()
+
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0], {
+            'id': 10, 'text': "I love the camera", 'overall_sentiment': 'positive', 'sentiment': self.SENTIMENT,
+            'suggestions': suggestor.suggest_content({'overall_sentiment': 'positive', 'text': "I love the camera"},
+                                                     keywords=['camera'])['suggestions'],
+        })
+        self.assertEqual(results[1], {'id': None, 'text': "  ", 'error': "Input text is empty."})
+        self.assertEqual(results[2], {'id': 12, 'text': "Free followers", 'spam': True, 'spam_score': 0.97})
+        self.assertIn("this topic", results[-1]['suggestions'][0]) # No keyword: generic wording
+        self.assertEqual([result['id'] for result in results], [10, None, 12, 13])
+        self.assertEqual(results.label_counts(), {'negative': 1, 'neutral': 0, 'positive': 1, 'error': 1, 'spam': 1})
+        with self.assertRaises(IndexError):
+            results[4]
+
+    def test_frozen_and_picklable(self):
+        results = self._results()
+        with self.assertRaises(ValueError):
+            results.add_error(1, "late", "too late")
+        self.assertEqual(pickle.loads(pickle.dumps(results)).to_dicts(), results.to_dicts())
+
+    def test_keywords_are_shared(self):
+        results = BatchResult()
+        for index in range(100):
+            results.add_analysis(index, f"Phone number {index}", self.SENTIMENT, 'positive', 'phone')
+        results.freeze()
+        self.assertEqual(results.keywords, ['phone'])
+        self.assertEqual(set(results.keyword_ids.tolist()), {0})
+
+    def test_ids_outside_the_int64_column(self):
+        results = BatchResult()
+        results.add_analysis("1234567890123456789", "Great camera", self.SENTIMENT, 'positive', 'camera') # v2 API
+        results.add_error("abc", "", "Input text is empty.")
+        results.add_spam(1 << 70, "Free followers", 0.97)
+        results.add_error(True, " ", "Input text is empty.")
+        results.freeze()
+        self.assertEqual([result['id'] for result in results], ["1234567890123456789", "abc", 1 << 70, True])
+        self.assertEqual(pickle.loads(pickle.dumps(results)).to_dicts(), results.to_dicts())
+
+    def test_smaller_than_result_dicts(self):
+        results = BatchResult()
+        for index in range(1000):
+            results.add_analysis(index, f"Tweet number {index} about the new phone", self.SENTIMENT, 'positive', 'phone')
+        results.freeze()
+        dicts = results.to_dicts()
+        self.assertLess(results.nbytes * 10, _deep_size(dicts))
+
+
+class TestColumnarChunks(unittest.TestCase):
+
+    def test_analyze_chunk_columnar_matches_dicts(self):
+        from unittest.mock import MagicMock
+        from src import batch, main
+        from src.tweet_record import TweetRecord
+        from tests.test_batch import _split_tokenize, _load_components
+
+        records = [TweetRecord(id=1, text="I love this new phone, the camera is amazing!"),
+                   TweetRecord(id=2, text=""),
+                   TweetRecord(id=3, text="The weather is quite neutral today.")]
+        main._worker_components.clear()
+        self.addCleanup(main._worker_components.clear)
+        with patch('src.content_suggestion._ensure_nltk_resources', MagicMock()), \
+             patch('src.document.word_tokenize', side_effect=_split_tokenize), \
+             patch('src.main.load_core_components', side_effect=_load_components):
+            columnar = batch.analyze_chunk(records, 'lexicon', columnar=True)
+            dicts = batch.analyze_chunk(records, 'lexicon')
+            sentiment_analyzer, content_suggestor = main.get_worker_components('lexicon')
+            expected = main.analyze_and_suggest(records[0], sentiment_analyzer, content_suggestor,
+                                                keywords=[columnar.keyword(0)])
+
+        self.assertIsInstance(columnar, BatchResult)
+        self.assertEqual(columnar.to_dicts(), dicts)
+        self.assertEqual(dicts[0], expected)
+
+    def test_analyze_chunk_with_string_ids(self):
+        from unittest.mock import MagicMock
+        from src import batch, main
+        from src.tweet_record import TweetRecord
+        from tests.test_batch import _split_tokenize, _load_components
+
+        records = [TweetRecord(id="abc", text=""), TweetRecord(id="123", text="What a great camera!")]
+        main._worker_components.clear()
+        self.addCleanup(main._worker_components.clear)
+        with patch('src.content_suggestion._ensure_nltk_resources', MagicMock()), \
+             patch('src.document.word_tokenize', side_effect=_split_tokenize), \
+             patch('src.main.load_core_components', side_effect=_load_components):
+            results = batch.analyze_chunk(records, 'lexicon', columnar=True).to_dicts()
+        self.assertEqual([result['id'] for result in results], ["abc", "123"])
+        self.assertEqual(results[0]['error'], "Input text is empty.")
+        self.assertEqual(results[1]['overall_sentiment'], 'positive')
+
+
+if __name__ == '__main__':
+    unittest.main()
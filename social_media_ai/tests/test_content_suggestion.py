@@ -7,6 +7,8 @@ from unittest.mock import patch, MagicMock
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.content_suggestion import ContentSuggestor
+from src.noun_lexicon import NounLexicon
+from src.tweet_record import TweetRecord, TweetBatch
 
 # To prevent actual NLTK downloads during tests and to control NLTK function outputs
 # Patching where the names are looked up in the 'src.content_suggestion' module.
@@ -178,5 +180,121 @@ class TestContentSuggestor(unittest.TestCase):
         self.assertIn("Error: Input must be a dictionary.", result['suggestions'][0])
 
 
+@patch('src.content_suggestion._ensure_nltk_resources', MagicMock())
+@patch('src.content_suggestion.stopwords.words', MagicMock(return_value=['is', 'a', 'the', 'it', 'what', 'and', 'for', 'its']))
+class TestBatchKeywordExtraction(unittest.TestCase):
+    """
+    Unit tests for ContentSuggestor.extract_keywords_batch (TF-IDF over a batch of texts).
+    """
+
+    def setUp(self):
+        self.suggestor = ContentSuggestor()
+
+    def test_tfidf_prefers_terms_distinctive_to_each_text(self):
+        """Terms shared by every text in the batch should rank below distinctive ones."""
+        texts = [
+            "Python release python release today",
+            "Python conference keynote keynote",
+            "Python tutorial for beginners tutorial",
+        ]
+        keywords = self.suggestor.extract_keywords_batch(texts, num_keywords=1)
+        self.assertEqual(keywords, [['release'], ['keynote'], ['tutorial']])
+
+    def test_tfidf_returns_up_to_num_keywords_per_text(self):
+        texts = ["The data breach is a disaster", "Great launch event"]
+        keywords = self.suggestor.extract_keywords_batch(texts, num_keywords=2)
+        self.assertEqual(len(keywords), 2)
+        self.assertEqual(len(keywords[0]), 2)
+        self.assertTrue(set(keywords[0]) <= {'data', 'breach', 'disaster'})
+        self.assertEqual(len(keywords[1]), 2)
+
+    def test_tfidf_handles_empty_and_stopword_only_texts(self):
+        keywords = self.suggestor.extract_keywords_batch(["", "It is what it is.", "Shiny new laptop"])
+        self.assertEqual(keywords[0], [])
+        self.assertEqual(keywords[1], [])
+        self.assertEqual(len(keywords[2]), 1)
+
+    def test_accepts_tweet_records_and_batches(self):
+        texts = ["Python release python release today", "Python conference keynote keynote"]
+        records = [TweetRecord(id=i, text=text) for i, text in enumerate(texts, 1)]
+        expected = self.suggestor.extract_keywords_batch(texts)
+
+        self.assertEqual(self.suggestor.extract_keywords_batch(records), expected)
+        self.assertEqual(self.suggestor.extract_keywords_batch(TweetBatch.from_records(records)), expected)
+
+    def test_tfidf_all_texts_without_vocabulary(self):
+        self.assertEqual(self.suggestor.extract_keywords_batch(["", "it is"]), [[], []])
+
+    def test_empty_batch(self):
+        self.assertEqual(self.suggestor.extract_keywords_batch([]), [])
+
+    def test_pos_mode_uses_per_text_extraction(self):
+        with patch.object(self.suggestor, '_extract_keywords', return_value=['kw']) as mock_extract:
+            keywords = self.suggestor.extract_keywords_batch(["one text", "two text"], mode='pos')
+        self.assertEqual(keywords, [['kw'], ['kw']])
+        self.assertEqual(mock_extract.call_count, 2)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            self.suggestor.extract_keywords_batch(["text"], mode='bogus')
+
+    def test_suggest_content_uses_precomputed_keywords(self):
+        sentiment_data = {
+            'text': "The launch went well.",
+            'sentiment': {'compound': 0.5, 'positive': 0.5, 'negative': 0.0, 'neutral': 0.5},
+            'overall_sentiment': 'positive'
+        }
+        with patch.object(self.suggestor, '_extract_keywords') as mock_extract:
+            result = self.suggestor.suggest_content(sentiment_data, keywords=['rocket'])
+        mock_extract.assert_not_called()
+        self.assertTrue(any("rocket" in s for s in result['suggestions']))
+
+
+@patch('src.content_suggestion._ensure_nltk_resources', MagicMock())
+@patch('src.content_suggestion.stopwords.words', MagicMock(return_value=['is', 'a', 'the', 'it', 'what', 'and', 'for']))
+@patch('src.content_suggestion.nltk.pos_tag')
+@patch('src.content_suggestion.word_tokenize')
+class TestNounModes(unittest.TestCase):
+    """
+    Unit tests for the lexicon-based noun detection modes of _extract_keywords.
+    """
+
+    def setUp(self):
+        self.lexicon = NounLexicon(['breach', 'data'], ['terrible', 'recent'])
+        patcher = patch('src.content_suggestion.load_noun_lexicon', return_value=self.lexicon)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lexicon_mode_does_not_call_tagger(self, mock_word_tokenize, mock_pos_tag):
+        mock_word_tokenize.return_value = ['the', 'recent', 'data', 'breach', 'is', 'terrible', 'breach']
+        suggestor = ContentSuggestor(noun_mode='lexicon')
+        self.assertEqual(suggestor._extract_keywords("The recent data breach is terrible breach"), ['breach'])
+        mock_pos_tag.assert_not_called()
+
+    def test_lexicon_mode_treats_unknown_words_as_nouns(self, mock_word_tokenize, mock_pos_tag):
+        mock_word_tokenize.return_value = ['terrible', 'acmecorp', 'acmecorp']
+        suggestor = ContentSuggestor(noun_mode='lexicon')
+        self.assertEqual(suggestor._extract_keywords("terrible acmecorp acmecorp"), ['acmecorp'])
+        mock_pos_tag.assert_not_called()
+
+    def test_hybrid_mode_skips_tagger_when_all_words_known(self, mock_word_tokenize, mock_pos_tag):
+        mock_word_tokenize.return_value = ['recent', 'data', 'breach', 'breach']
+        suggestor = ContentSuggestor(noun_mode='hybrid')
+        self.assertEqual(suggestor._extract_keywords("recent data breach breach"), ['breach'])
+        mock_pos_tag.assert_not_called()
+
+    def test_hybrid_mode_uses_tagger_for_unknown_words(self, mock_word_tokenize, mock_pos_tag):
+        mock_word_tokenize.return_value = ['terrible', 'shipping', 'shipping', 'data']
+        mock_pos_tag.return_value = [('terrible', 'NN'), ('shipping', 'VBG'), ('shipping', 'VBG'), ('data', 'NNS')]
+        suggestor = ContentSuggestor(noun_mode='hybrid')
+        # 'terrible' stays a non-noun from the lexicon even though the tagger says otherwise.
+        self.assertEqual(suggestor._extract_keywords("terrible shipping shipping data"), ['data'])
+        mock_pos_tag.assert_called_once()
+
+    def test_unknown_noun_mode(self, mock_word_tokenize, mock_pos_tag):
+        with self.assertRaises(ValueError):
+            ContentSuggestor(noun_mode='fast')
+
+
 if __name__ == '__main__':
     unittest.main()
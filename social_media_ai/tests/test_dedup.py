@@ -0,0 +1,91 @@
+import unittest
+import os
+import sys
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.dedup import Deduplicator, normalize_text, simhash, hamming_distance, analyze_collapsed, _features
+from src.tweet_record import TweetRecord
+
+COPYPASTA = "Our new phone has the best battery life and the brightest screen we have ever shipped, order today"
+
+
+class TestNormalization(unittest.TestCase):
+
+    def test_strips_retweet_prefix_urls_and_whitespace(self):
+        self.assertEqual(
+            normalize_text("RT @alice: RT @bob:  Big   news https://t.co/abc123 today\n"),
+            "Big news today"
+        )
+
+    def test_simhash_is_close_for_small_edits(self):
+        base = simhash(_features(COPYPASTA))
+        edited = simhash(_features(COPYPASTA + "!!"))
+        different = simhash(_features("Completely unrelated tweet about the weather in the mountains this weekend"))
+        self.assertLessEqual(hamming_distance(base, edited), 3)
+        self.assertGreater(hamming_distance(base, different), 10)
+
+
+class TestDeduplicator(unittest.TestCase):
+
+    def test_exact_duplicates_after_normalization(self):
+        clusters = Deduplicator().group([
+            "Big news today https://t.co/1", "RT @alice: Big news today https://t.co/2", "Other news",
+        ])
+        self.assertEqual([c.multiplicity for c in clusters], [2, 1])
+        self.assertEqual(clusters[0].representative, "Big news today https://t.co/1")
+
+    def test_retweets_grouped_by_id(self):
+        original = TweetRecord(id=1, text="Original tweet text that is fairly long and detailed")
+        retweet = TweetRecord(id=2, text="RT @someone: Original tweet text that is fairly lo…", retweet_of_id=1)
+        other_retweet = TweetRecord(id=3, text="RT @someone: Original tweet text…", retweet_of_id=1)
+        clusters = Deduplicator(near_duplicates=False).group([retweet, original, other_retweet])
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(clusters[0].multiplicity, 3)
+
+    def test_near_duplicates(self):
+        texts = [COPYPASTA, COPYPASTA + "!!", COPYPASTA.replace("today", "now"), "I hate mondays so much honestly"]
+        self.assertEqual([c.multiplicity for c in Deduplicator().group(texts)], [3, 1])
+        self.assertEqual(len(Deduplicator(near_duplicates=False).group(texts)), 4)
+
+    def test_short_texts_only_collapse_exactly(self):
+        clusters = Deduplicator().group(["I love it", "I hate it", "I love it"])
+        self.assertEqual([c.multiplicity for c in clusters], [2, 1])
+
+    def test_state_across_batches(self):
+        deduplicator = Deduplicator()
+        first = deduplicator.group(["Big news today", "Other news"])
+        second = deduplicator.group(["Big news today", "Fresh news"])
+        self.assertTrue(all(c.is_new for c in first))
+        self.assertEqual([(c.is_new, c.total) for c in second], [(False, 2), (True, 1)])
+        self.assertEqual(second[0].id, first[0].id)
+
+    def test_max_clusters_evicts_oldest(self):
+        deduplicator = Deduplicator(max_clusters=2)
+        deduplicator.group(["one", "two", "three"])
+        self.assertEqual(len(deduplicator), 2)
+        self.assertTrue(deduplicator.group(["one"])[0].is_new)
+        self.assertFalse(deduplicator.group(["three"])[0].is_new)
+
+
+class TestAnalyzeCollapsed(unittest.TestCase):
+
+    def test_analyzes_each_cluster_once_and_fans_out(self):
+        calls = []
+
+        def analyze(text):
+            calls.append(text)
+            return {'text': text}
+
+        items = ["Big news today", "Other news", "RT @bob: Big news today"]
+        outputs = analyze_collapsed(items, analyze)
+
+        self.assertEqual(calls, ["Big news today", "Other news"])
+        self.assertEqual([item for item, _, _ in outputs], items)
+        self.assertEqual([multiplicity for _, _, multiplicity in outputs], [2, 1, 2])
+        self.assertIs(outputs[0][1], outputs[2][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
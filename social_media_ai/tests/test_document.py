@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.document import Document, as_document
+from src.content_suggestion import ContentSuggestor
+
+
+@patch('src.document.word_tokenize')
+class TestDocument(unittest.TestCase):
+    """
+    Unit tests for the shared Document representation.
+    """
+
+    def test_normalized_and_tokens_are_cached(self, mock_word_tokenize):
+        mock_word_tokenize.return_value = ['great', 'launch', '!']
+        document = Document("Great Launch!")
+
+        self.assertEqual(document.normalized, "great launch!")
+        self.assertEqual(document.tokens, ['great', 'launch', '!'])
+        self.assertIs(document.tokens, document.tokens)
+        mock_word_tokenize.assert_called_once_with("great launch!")
+
+    def test_empty_text_is_not_tokenized(self, mock_word_tokenize):
+        self.assertEqual(Document("").tokens, [])
+        mock_word_tokenize.assert_not_called()
+
+    def test_slots(self, mock_word_tokenize):
+        with self.assertRaises(AttributeError):
+            Document("text").extra = 1
+
+    def test_as_document(self, mock_word_tokenize):
+        document = Document("text")
+        self.assertIs(as_document(document), document)
+        self.assertEqual(as_document("other").text, "other")
+
+
+@patch('src.content_suggestion._ensure_nltk_resources', MagicMock())
+@patch('src.content_suggestion.stopwords.words', MagicMock(return_value=['the', 'is', 'a']))
+@patch('src.content_suggestion.nltk.pos_tag')
+@patch('src.content_suggestion.word_tokenize')
+class TestDocumentReuse(unittest.TestCase):
+    """
+    Checks that keyword extraction reuses a Document's tokens instead of re-tokenizing.
+    """
+
+    def test_extract_keywords_reuses_document_tokens(self, mock_word_tokenize, mock_pos_tag):
+        mock_pos_tag.return_value = [('launch', 'NN'), ('great', 'JJ')]
+        document = Document("The launch is great")
+        with patch('src.document.word_tokenize', return_value=['the', 'launch', 'is', 'great']) as mock_doc_tokenize:
+            suggestor = ContentSuggestor()
+            self.assertEqual(suggestor._extract_keywords(document), ['launch'])
+            suggestor._extract_keywords(document)
+        mock_word_tokenize.assert_not_called()
+        mock_doc_tokenize.assert_called_once()
+
+    def test_suggest_content_with_document(self, mock_word_tokenize, mock_pos_tag):
+        mock_pos_tag.return_value = [('launch', 'NN')]
+        document = Document("The launch")
+        document._tokens = ['the', 'launch']
+        sentiment_data = {
+            'text': "The launch",
+            'sentiment': {'compound': 0.0, 'positive': 0.0, 'negative': 0.0, 'neutral': 1.0},
+            'overall_sentiment': 'neutral'
+        }
+        result = ContentSuggestor().suggest_content(sentiment_data, document=document)
+        mock_word_tokenize.assert_not_called()
+        self.assertTrue(any("launch" in s for s in result['suggestions']))
+
+    def test_batch_tfidf_uses_document_tokens(self, mock_word_tokenize, mock_pos_tag):
+        documents = [Document("Rocket launch rocket"), Document("Launch party")]
+        documents[0]._tokens = ['rocket', 'launch', 'rocket']
+        documents[1]._tokens = ['launch', 'party']
+        keywords = ContentSuggestor().extract_keywords_batch(documents)
+        self.assertEqual(keywords, [['rocket'], ['party']])
+        mock_word_tokenize.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.fake_twitter_api import FakeTwitterAPI, FakeTwitterServer
+from src.fetch_scheduler import RateLimitExceeded
+from src.twitter_client import TwitterClient, TweetStore
+
+FAKE_CREDENTIALS = {
+    'TWITTER_API_KEY': 'key', 'TWITTER_API_SECRET_KEY': 'secret',
+    'TWITTER_ACCESS_TOKEN': 'token', 'TWITTER_ACCESS_TOKEN_SECRET': 'token_secret',
+}
+
+
+class TestFakeTwitterAPI(unittest.TestCase):
+    """
+    Unit tests for the fake API state, without HTTP.
+    """
+
+    def test_synthetic_tweets_paginate_newest_first(self):
+        api = FakeTwitterAPI(tweets_per_query=30, rate_limit=None)
+        status, _, body = api.search({'q': '#python', 'count': '20', 'tweet_mode': 'extended'})
+        self.assertEqual(status, 200)
+        ids = [s['id'] for s in body['statuses']]
+        self.assertEqual(len(ids), 20)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+        _, _, body = api.search({'q': '#python', 'count': '20', 'max_id': str(ids[-1] - 1)})
+        self.assertEqual(len(body['statuses']), 10)
+        self.assertIn('text', body['statuses'][0]) # compat mode
+        self.assertNotIn('full_text', body['statuses'][0])
+
+    def test_synthetic_tweets_are_deterministic(self):
+        first = FakeTwitterAPI(tweets_per_query=5, rate_limit=None).search({'q': 'ai'})[2]
+        second = FakeTwitterAPI(tweets_per_query=5, rate_limit=None).search({'q': 'ai'})[2]
+        self.assertEqual(first, second)
+
+    def test_since_id(self):
+        api = FakeTwitterAPI(tweets_per_query=10, rate_limit=None)
+        newest = api.search({'q': 'ai', 'count': '1'})[2]['statuses'][0]['id']
+        self.assertEqual(api.search({'q': 'ai', 'since_id': str(newest)})[2]['statuses'], [])
+
+    def test_rate_limit_returns_429(self):
+        api = FakeTwitterAPI(tweets_per_query=10, rate_limit=2, window_seconds=60)
+        self.assertEqual(api.search({'q': 'ai'})[1]['x-rate-limit-remaining'], '1')
+        self.assertEqual(api.search({'q': 'ai'})[0], 200)
+        status, headers, _ = api.search({'q': 'ai'})
+        self.assertEqual(status, 429)
+        self.assertEqual(headers['x-rate-limit-remaining'], '0')
+        self.assertEqual(api.rejected_count, 1)
+
+
+@patch.dict(os.environ, FAKE_CREDENTIALS)
+class TestTwitterClientAgainstFakeServer(unittest.TestCase):
+    """
+    End-to-end tests of TwitterClient (real tweepy, real HTTP) against the local fake server.
+    """
+
+    def setUp(self):
+        self.fake_api = FakeTwitterAPI(tweets_per_query=250, rate_limit=None)
+        self.server = FakeTwitterServer(self.fake_api).start()
+        self.addCleanup(self.server.stop)
+
+    def test_iter_records_paginates(self):
+        client = TwitterClient(base_url=self.server.base_url)
+        records = list(client.iter_records("#python", limit=230, page_size=100))
+
+        self.assertEqual(len(records), 230)
+        self.assertEqual(len({record.id for record in records}), 230)
+        self.assertIn("python", records[0].text)
+        self.assertIsNotNone(records[0].created_at)
+        self.assertIsNotNone(records[0].author_id)
+        self.assertTrue(any(record.is_retweet for record in records))
+        self.assertEqual(self.fake_api.request_count, 3)
+
+    def test_fetch_new_tweets_with_store(self):
+        client = TwitterClient(base_url=self.server.base_url)
+        with TweetStore(':memory:') as store:
+            self.assertEqual(len(client.fetch_new_tweets("ai", store, limit=50)), 50)
+            self.assertEqual(client.fetch_new_tweets("ai", store), []) # A first fetch starts at the newest tweets
+
+    def test_search_page_rate_limited(self):
+        self.fake_api.rate_limit = 1
+        client = TwitterClient(base_url=self.server.base_url)
+        statuses, headers = client.search_page({'q': "ai", 'count': 5, 'tweet_mode': "extended"})
+        self.assertEqual(len(statuses), 5)
+        self.assertEqual(headers['x-rate-limit-remaining'], '0')
+        with self.assertRaises(RateLimitExceeded) as context:
+            client.search_page({'q': "ai", 'count': 5, 'tweet_mode': "extended"})
+        self.assertIsNotNone(context.exception.reset_time)
+
+    def test_record_and_replay(self):
+        with tempfile.TemporaryDirectory() as directory:
+            recording = os.path.join(directory, 'search.jsonl')
+            recorder = TwitterClient(base_url=self.server.base_url, record_path=recording)
+            original = recorder.fetch_tweets("ai", count=40)
+            original += list(recorder.iter_tweets("nlp", limit=25, page_size=10))
+
+            with FakeTwitterServer(FakeTwitterAPI.from_recording(recording, rate_limit=None)) as replay_server:
+                replayer = TwitterClient(base_url=replay_server.base_url)
+                replayed = list(replayer.iter_tweets("ai", page_size=7))
+                replayed += replayer.fetch_tweets("nlp", count=100)
+                self.assertEqual(replayer.fetch_tweets("unknown"), [])
+
+        self.assertEqual(replayed, original)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import unittest
+import os
+import sys
+import time
+import threading
+from types import SimpleNamespace
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.fetch_scheduler import FetchScheduler, RateLimitExceeded, TokenBucket
+
+
+class FakeSearchAPI:
+    """
+    In-process stand-in for the v1.1 search endpoint: a fixed number of calls per window,
+    x-rate-limit-* headers on every response, and 429s (RateLimitExceeded) once the
+    window's quota is spent.
+    """
+
+    def __init__(self, corpus, limit=100, window=0.3, latency=0.01, reset_in=None):
+        self.corpus = corpus # query -> number of tweets available
+        self.limit = limit
+        self.window = window
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.window_reset = time.time() + (reset_in if reset_in is not None else window)
+        self.used = limit if reset_in is not None else 0 # reset_in: start exhausted
+        self.calls = []
+        self.rejected = 0
+        self.active = 0
+        self.max_active = 0
+
+    def search_page(self, params):
+        with self.lock:
+            now = time.time()
+            if now >= self.window_reset:
+                self.window_reset = now + self.window
+                self.used = 0
+            if self.used >= self.limit:
+                self.rejected += 1
+                raise RateLimitExceeded(
+                    reset_time=self.window_reset,
+                    headers={'x-rate-limit-limit': str(self.limit), 'x-rate-limit-remaining': '0',
+                             'x-rate-limit-reset': str(self.window_reset)}
+                )
+            self.used += 1
+            remaining = self.limit - self.used
+            self.calls.append(dict(params))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.latency)
+        with self.lock:
+            self.active -= 1
+        max_id = params.get('max_id', self.corpus[params['q']])
+        ids = range(min(max_id, self.corpus[params['q']]), 0, -1)[:params['count']]
+        statuses = [SimpleNamespace(id=i, full_text=f"{params['q']} {i}") for i in ids]
+        headers = {'x-rate-limit-limit': str(self.limit), 'x-rate-limit-remaining': str(remaining),
+                   'x-rate-limit-reset': str(self.window_reset)}
+        return statuses, headers
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.bucket = TokenBucket(capacity=2, window_seconds=10, clock=lambda: self.now)
+
+    def test_acquire_until_empty_then_refill(self):
+        self.assertEqual(self.bucket.try_acquire(), 0.0)
+        self.assertEqual(self.bucket.try_acquire(), 0.0)
+        self.assertAlmostEqual(self.bucket.try_acquire(), 5.0) # One token per 5 seconds
+        self.now += 5
+        self.assertEqual(self.bucket.try_acquire(), 0.0)
+
+    def test_headers_block_until_reset(self):
+        self.bucket.update_from_headers({'X-Rate-Limit-Limit': '15', 'X-Rate-Limit-Remaining': '0',
+                                         'X-Rate-Limit-Reset': '1060'})
+        self.assertEqual(self.bucket.capacity, 15)
+        self.assertAlmostEqual(self.bucket.try_acquire(), 60.0)
+        self.now = 1060
+        self.assertEqual(self.bucket.try_acquire(), 0.0)
+        self.assertEqual(self.bucket.tokens, 14) # Full window after the reset
+
+    def test_headers_lower_local_estimate(self):
+        self.bucket.update_from_headers({'x-rate-limit-remaining': '1', 'x-rate-limit-reset': '1900'})
+        self.assertEqual(self.bucket.try_acquire(), 0.0)
+        self.assertGreater(self.bucket.try_acquire(), 0.0)
+
+
+class TestFetchScheduler(unittest.TestCase):
+
+    def test_fetches_all_queries_with_pagination(self):
+        api = FakeSearchAPI({'python': 250, 'nltk': 30, 'empty': 0})
+        scheduler = FetchScheduler({'search': api.search_page}, max_workers=3)
+        results = scheduler.fetch_all(['python', 'nltk', 'empty', 'python'], limit_per_query=220, page_size=100)
+
+        self.assertEqual(set(results), {'python', 'nltk', 'empty'})
+        self.assertEqual([s.id for s in results['python']], list(range(250, 30, -1)))
+        self.assertEqual(len(results['nltk']), 30)
+        self.assertEqual(results['empty'], [])
+        python_calls = [c for c in api.calls if c['q'] == 'python']
+        self.assertEqual([c['count'] for c in python_calls], [100, 100, 20])
+        self.assertEqual(python_calls[1]['max_id'], 150)
+
+    def test_requests_run_concurrently(self):
+        api = FakeSearchAPI({f'q{i}': 10 for i in range(8)}, latency=0.05)
+        scheduler = FetchScheduler({'search': api.search_page}, max_workers=4)
+        start = time.perf_counter()
+        results = scheduler.fetch_all([f'q{i}' for i in range(8)], limit_per_query=10)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(results), 8)
+        self.assertGreater(api.max_active, 1)
+        self.assertLess(elapsed, 8 * 0.05)
+
+    def test_waits_for_reset_instead_of_hammering(self):
+        # 3 calls per 0.3s window, 8 pages to fetch: needs at least two resets.
+        api = FakeSearchAPI({f'q{i}': 20 for i in range(4)}, limit=3, window=0.3)
+        scheduler = FetchScheduler({'search': api.search_page}, max_workers=4, capacity=3)
+        start = time.perf_counter()
+        results = scheduler.fetch_all([f'q{i}' for i in range(4)], limit_per_query=20, page_size=10)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual({q: len(s) for q, s in results.items()}, {f'q{i}': 20 for i in range(4)})
+        self.assertEqual(len(api.calls), 8)
+        self.assertGreaterEqual(elapsed, 0.5)
+        # Headers announce the exhausted quota, so 429s stay rare.
+        self.assertLessEqual(api.rejected, 4)
+        self.assertEqual(scheduler.stats['rate_limited'], api.rejected)
+
+    def test_exhausted_source_does_not_block_others(self):
+        blocked = FakeSearchAPI({'a': 30, 'b': 30}, limit=5, reset_in=60) # Starts with no quota for a minute
+        available = FakeSearchAPI({'a': 30, 'b': 30})
+        scheduler = FetchScheduler({'blocked': blocked.search_page, 'available': available.search_page}, max_workers=2)
+        start = time.perf_counter()
+        results = scheduler.fetch_all(['a', 'b'], limit_per_query=30, page_size=10)
+
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual({q: len(s) for q, s in results.items()}, {'a': 30, 'b': 30})
+        self.assertEqual(blocked.calls, [])
+        self.assertLessEqual(blocked.rejected, 2) # At most one 429 per worker before the bucket is blocked
+        self.assertEqual(len(available.calls), 6)
+
+    def test_gives_up_after_repeated_rate_limits(self):
+        def always_limited(params):
+            raise RateLimitExceeded(reset_time=time.time() + 0.01)
+
+        scheduler = FetchScheduler({'search': always_limited}, max_workers=1, max_rate_limit_retries=2)
+        with self.assertLogs(level='ERROR'):
+            results = scheduler.fetch_all(['x'])
+        self.assertEqual(results, {'x': []})
+        self.assertEqual(scheduler.stats['rate_limited'], 3)
+
+    def test_error_keeps_partial_results(self):
+        def flaky(params):
+            if 'max_id' in params:
+                raise ConnectionError("boom")
+            return [SimpleNamespace(id=5), SimpleNamespace(id=4)], {}
+
+        scheduler = FetchScheduler({'search': flaky})
+        with self.assertLogs(level='ERROR'):
+            results = scheduler.fetch_all(['x'], limit_per_query=10, page_size=2)
+        self.assertEqual([s.id for s in results['x']], [5, 4])
+        self.assertEqual(scheduler.stats['errors'], 1)
+
+    def test_requires_a_source(self):
+        with self.assertRaises(ValueError):
+            FetchScheduler({})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import sys
+import os
+import subprocess
+from unittest.mock import patch, MagicMock
+
+# Adjust sys.path to allow imports from the 'src' directory
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PROJECT_DIR)
+
+from src import main
+
+
+class TestLazyLoading(unittest.TestCase):
+    """
+    Tests that the entry point only loads heavy dependencies when they are used.
+    """
+
+    def test_import_does_not_load_heavy_dependencies(self):
+        """Importing src.main in a fresh interpreter must not import NLTK, tweepy or scikit-learn."""
+        code = (
+            "import sys, src.main; "
+            "print(','.join(m for m in ('nltk', 'tweepy', 'sklearn') if m in sys.modules))"
+        )
+        completed = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_DIR, capture_output=True, text=True)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertEqual(completed.stdout.strip(), "")
+
+    @patch('src.main.process_text_and_suggest')
+    @patch('src.main.load_twitter_client')
+    @patch('src.main.load_core_components')
+    def test_run_app_loads_core_components_once_and_no_twitter_client(self, mock_load_core, mock_load_twitter, mock_process):
+        sentiment_analyzer, content_suggestor = MagicMock(), MagicMock()
+        mock_load_core.return_value = (sentiment_analyzer, content_suggestor)
+
+        main.run_app(test_inputs=["First post", "Second post", "exit"], noun_mode='lexicon')
+
+        mock_load_core.assert_called_once_with('lexicon')
+        mock_load_twitter.assert_not_called()
+        self.assertEqual(mock_process.call_count, 2)
+        mock_process.assert_any_call("First post", sentiment_analyzer, content_suggestor)
+
+    @patch('src.main.load_core_components', return_value=None)
+    def test_run_app_stops_if_core_components_fail(self, mock_load_core):
+        main.run_app(test_inputs=["First post", "Second post"])
+        mock_load_core.assert_called_once()
+
+    def test_exit_does_not_load_components(self):
+        with patch('src.main.load_core_components') as mock_load_core:
+            main.run_app(test_inputs=["exit"])
+        mock_load_core.assert_not_called()
+
+
+class TestCommandLine(unittest.TestCase):
+    """
+    Tests the option checks of `python src/main.py`, which run before anything is loaded.
+    """
+
+    def test_stage_worker_options_are_menu_only(self):
+        for argv, error in ((['--input', 'tweets.jsonl', '--analyze-workers', '2'], "--analyze-workers only apply without --input"),
+                            (['--suggest-workers', '0'], "Stage workers must be at least 1"),
+                            (['--workers', '2'], "--workers only apply with --input")):
+            with self.subTest(argv=argv):
+                completed = subprocess.run([sys.executable, 'src/main.py'] + argv, cwd=PROJECT_DIR,
+                                           capture_output=True, text=True)
+                self.assertEqual(completed.returncode, 2)
+                self.assertIn(error, completed.stderr)
+
+
+class TestAnalyzeAndSuggest(unittest.TestCase):
+    """
+    Tests for the non-printing analyze_and_suggest used by the streaming and batch modes.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        from src.sentiment_analysis import SentimentAnalyzer
+        from src.content_suggestion import ContentSuggestor
+        cls.sentiment_analyzer = SentimentAnalyzer()
+        cls.content_suggestor = ContentSuggestor()
+
+    def test_result_for_tweet_record(self):
+        from src.tweet_record import TweetRecord
+        record = TweetRecord(id=5, text="I love this new product! It's amazing.")
+        result = main.analyze_and_suggest(record, self.sentiment_analyzer, self.content_suggestor, keywords=['product'])
+
+        self.assertEqual(result['id'], 5)
+        self.assertEqual(result['overall_sentiment'], 'positive')
+        self.assertIn('compound', result['sentiment'])
+        self.assertTrue(any('product' in suggestion for suggestion in result['suggestions']))
+
+    def test_empty_text(self):
+        result = main.analyze_and_suggest("   ", self.sentiment_analyzer, self.content_suggestor)
+        self.assertEqual(result, {'id': None, 'text': "   ", 'error': "Input text is empty."})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import sys
+import os
+import tempfile
+import zipfile
+from unittest.mock import patch
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import nltk
+from src import nltk_resources
+from src.nltk_resources import ensure_nltk_resources, MissingNLTKResourceError, resource_timings, load_timer
+
+
+class TestNLTKResources(unittest.TestCase):
+    """
+    Unit tests for the offline NLTK resource manager.
+    NLTK's search path is replaced by an empty list so only the temporary bundled directory is searched.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        nltk_resources.reset()
+        self.addCleanup(nltk_resources.reset)
+        for patcher in (
+            patch.dict(os.environ, {'SOCIAL_MEDIA_AI_NLTK_DATA': self.tmp_dir.name}),
+            patch.object(nltk.data, 'path', []),
+            patch('src.nltk_resources._uses_new_resource_names', return_value=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def install(self, relative_path):
+        os.makedirs(os.path.join(self.tmp_dir.name, relative_path), exist_ok=True)
+
+    def test_finds_resources_in_bundled_directory(self):
+        self.install('corpora/stopwords')
+        self.install('tokenizers/punkt_tab/english')
+
+        timings = ensure_nltk_resources(['stopwords', 'punkt'])
+
+        self.assertEqual(nltk.data.path[0], self.tmp_dir.name)
+        self.assertEqual(set(timings), {'stopwords', 'punkt'})
+        self.assertGreaterEqual(timings['stopwords']['find'], 0.0)
+
+    def test_resources_are_verified_once(self):
+        self.install('corpora/stopwords')
+        ensure_nltk_resources(['stopwords'])
+        with patch('src.nltk_resources.nltk.data.find') as mock_find:
+            ensure_nltk_resources(['stopwords'])
+        mock_find.assert_not_called()
+
+    def test_missing_resources_are_reported_together(self):
+        self.install('corpora/stopwords')
+        with patch('src.nltk_resources.nltk.download') as mock_download:
+            with self.assertRaises(MissingNLTKResourceError) as context:
+                ensure_nltk_resources()
+        mock_download.assert_not_called()
+
+        error = context.exception
+        self.assertIsInstance(error, LookupError)
+        self.assertEqual(error.missing, ['punkt', 'averaged_perceptron_tagger', 'vader_lexicon'])
+        message = str(error)
+        self.assertIn('tokenizers/punkt_tab/english/', message)
+        self.assertIn('taggers/averaged_perceptron_tagger_eng/', message)
+        self.assertIn(self.tmp_dir.name, message)
+
+    def test_required_resources_by_mode(self):
+        tagger = 'averaged_perceptron_tagger'
+        self.assertIn(tagger, nltk_resources.required_resources('tagger', 'pos'))
+        self.assertIn(tagger, nltk_resources.required_resources('hybrid', 'pos'))
+        self.assertNotIn(tagger, nltk_resources.required_resources('lexicon', 'pos'))
+        self.assertNotIn(tagger, nltk_resources.required_resources('tagger', 'tfidf')) # No POS tagging per batch
+        with patch('importlib.util.find_spec', return_value=None): # Without scikit-learn, tfidf falls back to pos
+            self.assertIn(tagger, nltk_resources.required_resources('tagger', 'tfidf'))
+
+        self.install('corpora/stopwords')
+        self.install('tokenizers/punkt_tab/english')
+        self.install('sentiment')
+        with zipfile.ZipFile(os.path.join(self.tmp_dir.name, 'sentiment', 'vader_lexicon.zip'), 'w') as archive:
+            archive.writestr('vader_lexicon/vader_lexicon.txt', '')
+        ensure_nltk_resources(nltk_resources.required_resources('lexicon', 'pos')) # No tagger installed
+
+    def test_legacy_resource_names(self):
+        self.install('taggers/averaged_perceptron_tagger')
+        with patch('src.nltk_resources._uses_new_resource_names', return_value=False):
+            ensure_nltk_resources(['averaged_perceptron_tagger'])
+
+    def test_load_timer(self):
+        with load_timer('vader_lexicon'):
+            pass
+        self.assertIn('load', resource_timings()['vader_lexicon'])
+
+
+if __name__ == '__main__':
+    unittest.main()
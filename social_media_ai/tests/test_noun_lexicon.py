@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.noun_lexicon import (
+    NounLexicon, build_noun_lexicon, save_noun_lexicon, load_noun_lexicon,
+    read_tagged_lexicon, agreement_report, DEFAULT_LEXICON_PATH
+)
+
+
+def fake_tagger(tokens):
+    """A deterministic stand-in for nltk.pos_tag: words ending in 'ing' are verbs, the rest nouns."""
+    return [(token, 'VBG' if token.endswith('ing') else 'NN') for token in tokens]
+
+
+class TestNounLexicon(unittest.TestCase):
+    """
+    Unit tests for the precomputed noun lexicon.
+    """
+
+    def test_build_uses_most_frequent_tag(self):
+        lexicon = build_noun_lexicon([
+            ('Promise', 'NN'), ('promise', 'VB'), ('promise', 'NN'),
+            ('shows', 'VBZ'), ('at', 'IN'), ('2024', 'CD'),
+        ])
+        self.assertTrue(lexicon.is_noun('promise'))
+        self.assertFalse(lexicon.is_noun('shows'))
+        self.assertNotIn('at', lexicon, "Words of two characters or less should be skipped.")
+        self.assertNotIn('2024', lexicon, "Words with digits should be skipped.")
+
+    def test_is_noun_unknown_and_non_words(self):
+        lexicon = NounLexicon(['model'], ['excellent'])
+        self.assertTrue(lexicon.is_noun('model'))
+        self.assertFalse(lexicon.is_noun('excellent'))
+        self.assertIsNone(lexicon.is_noun('xyzzy'))
+        self.assertFalse(lexicon.is_noun('1000'))
+        self.assertFalse(lexicon.is_noun('...'))
+
+    def test_save_and_load_round_trip(self):
+        lexicon = NounLexicon(['model', 'data'], ['excellent'])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'lexicon.json.gz')
+            save_noun_lexicon(lexicon, path)
+            loaded = load_noun_lexicon(path)
+            self.assertEqual(loaded.nouns, lexicon.nouns)
+            self.assertEqual(loaded.non_nouns, lexicon.non_nouns)
+            self.assertIs(load_noun_lexicon(path), loaded, "Lexicons should be cached per path.")
+
+    def test_read_tagged_lexicon_prefers_lowercase_entries(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'lexicon.txt')
+            with open(path, 'w', encoding='utf-8') as lexicon_file:
+                lexicon_file.write(";;; comment\nApple NNP\napple NN JJ\nLondon NNP\nrun VB NN\n")
+            entries = dict(read_tagged_lexicon(path))
+        self.assertEqual(entries, {'apple': 'NN', 'london': 'NNP', 'run': 'VB'})
+
+    def test_shipped_lexicon(self):
+        lexicon = load_noun_lexicon(DEFAULT_LEXICON_PATH)
+        for word in ['model', 'breach', 'company', 'earnings', 'week']:
+            self.assertTrue(lexicon.is_noun(word), word)
+        for word in ['excellent', 'announce', 'terrible']:
+            self.assertFalse(lexicon.is_noun(word), word)
+
+    def test_agreement_report(self):
+        lexicon = NounLexicon(['model', 'running'], ['walking'])
+        report = agreement_report([['model', 'running', 'walking', 'xyzzy'], []], lexicon, tagger=fake_tagger)
+        self.assertEqual(report['tokens'], 4)
+        self.assertAlmostEqual(report['coverage'], 0.75)
+        # 'running' disagrees in both modes; 'xyzzy' is unknown (noun in lexicon mode, tagger in hybrid).
+        self.assertAlmostEqual(report['lexicon_agreement'], 0.75)
+        self.assertAlmostEqual(report['hybrid_agreement'], 0.75)
+        self.assertAlmostEqual(report['lexicon_noun_precision'], 2 / 3)
+        self.assertAlmostEqual(report['lexicon_noun_recall'], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
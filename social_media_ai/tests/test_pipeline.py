@@ -0,0 +1,244 @@
+import unittest
+import os
+import sys
+import io
+import time
+import random
+import threading
+from functools import partial
+from unittest.mock import patch, MagicMock
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pipeline import Pipeline, Stage, format_stage_stats, analyze_page, suggest_page
+from src.tweet_record import TweetRecord
+from src import main
+
+
+def _square(values):
+    return [value * value for value in values]
+
+
+def _with_pid(function, unit):
+    return function(unit), os.getpid()
+
+
+def _jittered(function, unit):
+    time.sleep(random.random() * 0.01)
+    return function(unit)
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_results_in_source_order(self):
+        source = [[i, i + 1] for i in range(0, 40, 2)]
+        pipeline = Pipeline(source, [
+            Stage('double', partial(_jittered, lambda unit: [v * 2 for v in unit]), workers=4),
+            Stage('negate', partial(_jittered, lambda unit: [-v for v in unit]), workers=3),
+        ], queue_size=2)
+        results = list(pipeline.run())
+
+        self.assertEqual(results, [[-2 * i, -2 * (i + 1)] for i in range(0, 40, 2)])
+        stats = pipeline.stats()
+        self.assertEqual(list(stats), ['fetch', 'double', 'negate', 'sink'])
+        self.assertTrue(all(stage['items'] == 40 for stage in stats.values()))
+        self.assertEqual(stats['double']['workers'], 4)
+        self.assertIn('double', format_stage_stats(stats))
+
+    def test_process_stage(self):
+        pipeline = Pipeline([[1, 2], [3]], [Stage('square', _square, workers=2, processes=True)])
+        self.assertEqual(list(pipeline.run()), [[1, 4], [9]])
+
+    def test_shared_executor_is_reused(self):
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            pids = set()
+            for source in ([[1, 2], [3]], [[4]]):
+                pipeline = Pipeline(source, [Stage('pid', partial(_with_pid, _square), executor=executor)])
+                for unit, pid in pipeline.run():
+                    pids.add(pid)
+            self.assertEqual(unit, [16])
+            self.assertEqual(len(pids), 1) # One worker process for both runs
+            self.assertEqual(executor.submit(_square, [5]).result(), [25]) # Not shut down by the pipelines
+
+    def test_stage_overlap(self):
+        # Three 50 ms stages over 6 units take ~8 steps when overlapped, 18 when sequential.
+        def slow(unit):
+            time.sleep(0.05)
+            return unit
+
+        def source():
+            for unit in range(6):
+                time.sleep(0.05)
+                yield [unit]
+
+        start = time.perf_counter()
+        results = list(Pipeline(source(), [Stage('a', slow), Stage('b', slow)]).run())
+        self.assertEqual(results, [[unit] for unit in range(6)])
+        self.assertLess(time.perf_counter() - start, 0.05 * 14)
+
+    def test_stage_error_is_raised_in_order(self):
+        def fail_on_three(unit):
+            if unit == [3]:
+                raise ValueError("bad unit")
+            return unit
+
+        seen = []
+        with self.assertRaisesRegex(ValueError, "bad unit"):
+            for unit in Pipeline([[i] for i in range(10)], [Stage('check', fail_on_three, workers=2)]).run():
+                seen.append(unit)
+        self.assertEqual(seen, [[0], [1], [2]])
+
+    def test_source_error(self):
+        def source():
+            yield [1]
+            raise ConnectionError("fetch failed")
+
+        with self.assertRaises(ConnectionError):
+            list(Pipeline(source(), [Stage('same', lambda unit: unit)]).run())
+
+    def test_closing_early_stops_all_stages(self):
+        def endless():
+            while True:
+                yield [0]
+
+        threads_before = threading.active_count()
+        run = Pipeline(endless(), [Stage('same', lambda unit: unit, workers=3)], queue_size=1).run()
+        next(run)
+        run.close()
+        self.assertEqual(threading.active_count(), threads_before)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            Stage('none', print, workers=0)
+        with self.assertRaises(ValueError):
+            Pipeline([], [], queue_size=0)
+
+
+class TestPageStages(unittest.TestCase):
+
+    def test_analyze_and_suggest_page(self):
+        sentiment_analyzer = MagicMock()
+        sentiment_analyzer.analyze_sentiment.side_effect = lambda document: {
+            'text': document.text, 'overall_sentiment': 'positive', 'sentiment': {'compound': 0.8},
+        }
+        content_suggestor = MagicMock()
+        content_suggestor.extract_keywords_batch.return_value = [['phone']]
+        content_suggestor.suggest_content.return_value = {'suggestions': ["Talk about phone"]}
+        components = (sentiment_analyzer, content_suggestor)
+
+        page = {'records': [TweetRecord(id=1, text="Great phone"), TweetRecord(id=2, text=" ")]}
+        page = suggest_page(analyze_page(page, components=components), components=components)
+
+        self.assertEqual(page['results'], [
+            {'id': 1, 'text': "Great phone", 'overall_sentiment': 'positive', 'sentiment': {'compound': 0.8},
+             'suggestions': ["Talk about phone"]},
+            {'id': 2, 'text': " ", 'error': "Input text is empty."},
+        ])
+        documents = content_suggestor.extract_keywords_batch.call_args[0][0]
+        self.assertEqual([document.text for document in documents], ["Great phone"])
+        # The suggest stage reuses the analyze stage's Document, so its tokens are computed once
+        self.assertIs(documents[0], sentiment_analyzer.analyze_sentiment.call_args[0][0])
+        self.assertIs(content_suggestor.suggest_content.call_args[1]['document'], documents[0])
+        self.assertNotIn('documents', page)
+
+
+class FakeTwitterClient:
+
+    def __init__(self, records):
+        self.records = records
+        self.calls = []
+
+    def iter_records(self, query, limit, page_size, prefetch_pages):
+        self.calls.append((query, limit, page_size, prefetch_pages))
+        return iter(self.records[:limit])
+
+
+class TestProcessFetchedTweets(unittest.TestCase):
+
+    def setUp(self):
+        sentiment_analyzer = MagicMock()
+        sentiment_analyzer.analyze_sentiment.side_effect = lambda document: {
+            'text': document.text, 'overall_sentiment': 'neutral', 'sentiment': {},
+        }
+        content_suggestor = MagicMock()
+        content_suggestor.extract_keywords_batch.side_effect = lambda documents, **kwargs: [[]] * len(documents)
+        content_suggestor.suggest_content.return_value = {'suggestions': ["A suggestion"]}
+        self.components = (sentiment_analyzer, content_suggestor)
+
+    def test_prints_results_in_order_with_copies(self):
+        records = [
+            TweetRecord(id=1, text="First tweet about the launch event today"),
+            TweetRecord(id=2, text="RT @a: First tweet about the launch event today", retweet_of_id=1),
+            TweetRecord(id=3, text="Second tweet"),
+        ]
+        client = FakeTwitterClient(records)
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            processed = main.process_fetched_tweets(client, "#launch", 10, core_components=self.components,
+                                                    stage_workers={'fetch': 2})
+        output = stdout.getvalue()
+
+        self.assertEqual(processed, 3)
+        self.assertEqual(client.calls, [("#launch", 10, main.FETCH_PAGE_SIZE, 2)])
+        self.assertIn("--- Tweet 2/10 (2 copies) ---", output)
+        self.assertIn("--- Tweet 3/10 ---", output)
+        self.assertLess(output.index("First tweet"), output.index("Second tweet"))
+        self.assertIn("Pipeline Throughput", output)
+
+    def test_spam_filter_stage(self):
+        from src.spam_filter import SpamFilter
+        from tests.test_spam_filter import KeywordModel, IdentityVectorizer
+
+        records = [TweetRecord(id=1, text="Free followers, click here"), TweetRecord(id=2, text="Real post")]
+        spam_filter = SpamFilter(KeywordModel(), IdentityVectorizer(), action='tag')
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            processed = main.process_fetched_tweets(FakeTwitterClient(records), "#q", 10, core_components=self.components,
+                                                    spam_filter=spam_filter)
+        output = stdout.getvalue()
+
+        self.assertEqual(processed, 2)
+        self.assertIn("--- Tweet 1/10: spam (score 0.90), not analysed ---", output)
+        self.assertIn("Spam filter: 1/2 flagged", output)
+        analysed = [call[0][0].text for call in self.components[0].analyze_sentiment.call_args_list]
+        self.assertEqual(analysed, ["Real post"])
+
+    def test_sink_gets_a_row_per_fetched_tweet(self):
+        from src.spam_filter import SpamFilter
+        from tests.test_spam_filter import KeywordModel, IdentityVectorizer
+
+        text = "First tweet about the launch event today"
+        records = [TweetRecord(id=1, text=text), TweetRecord(id=2, text=f"RT @a: {text}", retweet_of_id=1),
+                   TweetRecord(id=3, text="Free followers"), TweetRecord(id=4, text="Free followers")]
+        # The second page repeats both groups of the first one
+        records += [TweetRecord(id=5, text=f"RT @b: {text}", retweet_of_id=1), TweetRecord(id=6, text="Free followers")]
+        spam_filter = SpamFilter(KeywordModel(), IdentityVectorizer(), action='tag')
+        rows = []
+        with patch.object(main, 'FETCH_PAGE_SIZE', 4), patch('sys.stdout', new_callable=io.StringIO):
+            processed = main.process_fetched_tweets(FakeTwitterClient(records), "#launch", 10, core_components=self.components,
+                                                    spam_filter=spam_filter, result_sink=rows.append)
+
+        self.assertEqual(processed, 6)
+        self.assertEqual(sorted(row['id'] for row in rows), [1, 2, 3, 4, 5, 6])
+        by_id = {row['id']: row for row in rows}
+        self.assertEqual(by_id[5]['text'], f"RT @b: {text}")
+        self.assertEqual(by_id[5]['suggestions'], ["A suggestion"])
+        self.assertEqual((by_id[6]['spam'], by_id[6]['spam_score']), (True, 0.9))
+        self.assertEqual(self.components[0].analyze_sentiment.call_count, 1)
+
+        rows = []
+        with patch('sys.stdout', new_callable=io.StringIO):
+            main.process_fetched_tweets(FakeTwitterClient(records), "#launch", 10, core_components=self.components,
+                                        collapse_duplicates=False, result_sink=rows.append)
+        self.assertEqual([row['id'] for row in rows], [1, 2, 3, 4, 5, 6])
+
+    def test_no_tweets(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            processed = main.process_fetched_tweets(FakeTwitterClient([]), "#none", 10, core_components=self.components)
+        self.assertEqual(processed, 0)
+        self.assertEqual(stdout.getvalue(), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import unittest
+import os
+import sys
+import io
+import json
+import time
+import pstats
+import tempfile
+from unittest.mock import patch, MagicMock
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import profiling
+from src.tweet_record import TweetRecord
+from tests.test_batch import _split_tokenize, _load_components
+
+
+class ProfilingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        profiling.reset()
+        self.addCleanup(profiling.reset)
+        self.addCleanup(profiling.disable)
+
+
+class TestTimers(ProfilingTestCase):
+
+    def test_disabled_records_nothing(self):
+        self.assertIs(profiling.timer('vader'), profiling.timer('pos_tag')) # The shared no-op timer
+        with profiling.timer('vader'):
+            pass
+        profiling.record('vader', 1.0)
+        self.assertEqual(profiling.summary(), {})
+
+    def test_histogram_percentiles(self):
+        profiling.enable()
+        for milliseconds in range(1, 101):
+            profiling.record('suggest', milliseconds / 1000)
+        stats = profiling.summary()['suggest']
+
+        self.assertEqual(stats['count'], 100)
+        self.assertAlmostEqual(stats['mean_ms'], 50.5)
+        self.assertAlmostEqual(stats['p50_ms'], 50.0)
+        self.assertAlmostEqual(stats['p95_ms'], 95.0)
+        self.assertAlmostEqual(stats['p99_ms'], 99.0)
+        self.assertAlmostEqual(stats['max_ms'], 100.0)
+        self.assertIn('suggest', profiling.format_summary(profiling.summary()))
+
+    def test_timer_and_decorator(self):
+        @profiling.timed('keywords')
+        def extract(text):
+            with profiling.timer('tokenize'):
+                time.sleep(0.002)
+            return text.split()
+
+        self.assertEqual(extract("a b"), ['a', 'b']) # Not timed while disabled
+        profiling.enable()
+        extract("a b")
+        extract("c")
+        stats = profiling.summary()
+
+        self.assertEqual((stats['keywords']['count'], stats['tokenize']['count']), (2, 2))
+        self.assertGreaterEqual(stats['keywords']['mean_ms'], stats['tokenize']['mean_ms'])
+        self.assertGreaterEqual(stats['tokenize']['p50_ms'], 2.0)
+
+    def test_drain_and_merge(self):
+        profiling.enable()
+        profiling.record('vader', 0.001)
+        profiling.record('vader', 0.003)
+        states = profiling.drain()
+        self.assertEqual(profiling.summary(), {})
+
+        profiling.merge(states)
+        profiling.merge(states)
+        self.assertEqual(profiling.summary()['vader']['count'], 4)
+        self.assertAlmostEqual(profiling.summary()['vader']['max_ms'], 3.0)
+
+    def test_merge_beyond_max_samples(self):
+        fast, slow = profiling.Histogram(), profiling.Histogram()
+        for _ in range(profiling.MAX_SAMPLES):
+            fast.add(0.001)
+        for _ in range(3 * profiling.MAX_SAMPLES): # Three times as many latencies, as many samples
+            slow.add(0.1)
+        merged = profiling.Histogram()
+        merged.merge(fast.state())
+        merged.merge(slow.state())
+
+        self.assertEqual(len(merged.samples), profiling.MAX_SAMPLES)
+        self.assertAlmostEqual(list(merged.samples).count(0.1) / profiling.MAX_SAMPLES, 0.75, delta=0.03)
+        self.assertAlmostEqual(merged.summary()['p50_ms'], 100.0)
+
+    def test_export(self):
+        profiling.enable()
+        profiling.record('fetch', 0.25)
+        with tempfile.TemporaryDirectory() as directory:
+            profiling.export_summary(os.path.join(directory, 'timings.json'))
+            profiling.export_summary(os.path.join(directory, 'timings.csv'))
+            with open(os.path.join(directory, 'timings.json'), encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['fetch']['count'], 1)
+            with open(os.path.join(directory, 'timings.csv'), encoding='utf-8') as f:
+                self.assertTrue(f.readlines()[1].startswith('fetch,1,0.25'))
+
+
+class TestProfileMode(ProfilingTestCase):
+
+    def test_writes_profiles_and_memory_snapshots(self):
+        def tokenize(text):
+            with profiling.timer('tokenize'):
+                return [word.lower() for word in text.split()]
+
+        def keywords(text):
+            with profiling.timer('keywords'):
+                buffer = [bytes(1000) for _ in range(100)] # Freed when the stage ends: counts for the peak only
+                del buffer
+                return sorted(set(tokenize(text)))[:1]
+
+        with tempfile.TemporaryDirectory() as directory:
+            profiling.enable(profile_dir=directory)
+            for _ in range(3):
+                keywords("The quick brown fox")
+            paths = profiling.dump_profiles()
+            stats = profiling.summary()
+            profiling.disable()
+
+            self.assertEqual(sorted(os.path.basename(path) for path in paths), ['keywords.prof', 'tokenize.prof'])
+            # Each stage's profile holds its own calls, not those of the stages nested in it.
+            keyword_functions = {function[2] for function in pstats.Stats(os.path.join(directory, 'keywords.prof')).stats}
+            self.assertIn('<listcomp>', keyword_functions)
+            self.assertNotIn("<method 'lower' of 'str' objects>", keyword_functions)
+            self.assertNotIn('take_snapshot', keyword_functions)
+            self.assertTrue(os.path.exists(os.path.join(directory, 'keywords.txt')))
+            self.assertTrue(any(name.endswith('.memory.txt') for name in os.listdir(directory)))
+            self.assertGreater(stats['keywords']['max_peak_kib'], 90)
+            self.assertNotIn('max_peak_kib', stats['tokenize']) # Only outermost stages get peaks
+
+
+@patch('src.content_suggestion._ensure_nltk_resources', MagicMock())
+@patch('src.document.word_tokenize', side_effect=_split_tokenize)
+@patch('src.main.load_core_components', side_effect=_load_components)
+class TestInstrumentedRuns(ProfilingTestCase):
+
+    RECORDS = [TweetRecord(id=i, text=text) for i, text in enumerate([
+        "I love this new phone, the camera is amazing!",
+        "This is the worst service I have ever received.",
+        "The weather is quite neutral today.",
+    ] * 4)]
+
+    def setUp(self):
+        super().setUp()
+        from src import main
+        main._worker_components.clear()
+        self.addCleanup(main._worker_components.clear)
+
+    def test_batch_stages_are_timed_in_worker_processes(self, mock_load, mock_tokenize):
+        from src import batch
+
+        profiling.enable()
+        batch.run_batch(self.RECORDS, lambda result: None, batch_size=4, workers=2, noun_mode='lexicon')
+        stats = profiling.summary()
+
+        self.assertEqual(stats['vader']['count'], 12)
+        self.assertEqual(stats['render']['count'], 12) # Suggestions are rendered when results are written
+        self.assertEqual(stats['keywords_batch']['count'], 3)
+        self.assertEqual(stats['tokenize']['count'], 12)
+
+    def test_cli_timings_output(self, mock_load, mock_tokenize):
+        from src import batch
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'in.jsonl')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(record.to_dict()) + '\n' for record in self.RECORDS)
+            timings_path = os.path.join(directory, 'timings.json')
+
+            with patch('sys.stdout', io.StringIO()), patch('sys.stderr', io.StringIO()) as stderr:
+                self.assertEqual(batch.main([input_path, '--noun-mode', 'lexicon', '--timings-output', timings_path]), 0)
+            with open(timings_path, encoding='utf-8') as f:
+                timings = json.load(f)
+
+        self.assertIn("Stage Timings", stderr.getvalue())
+        self.assertEqual(timings['vader']['count'], 12)
+        self.assertFalse(profiling.is_enabled())
+
+
+if __name__ == '__main__':
+    unittest.main()
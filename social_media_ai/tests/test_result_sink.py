@@ -0,0 +1,206 @@
+import unittest
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.result_sink import (ResultSink, SQLiteResultSink, ParquetResultSink, JSONLResultSink, open_result_sink,
+                             result_row, RESULT_COLUMNS)
+
+try:
+    import pyarrow # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def _result(i):
+    return {
+        'id': i, 'text': f"Tweet {i}", 'overall_sentiment': 'positive',
+        'sentiment': {'positive': 0.5, 'negative': 0.0, 'neutral': 0.5, 'compound': 0.6},
+        'suggestions': ["Amplify this!", "Ask a question"],
+    }
+
+
+class RecordingSink(ResultSink):
+
+    def __init__(self, fail=False, **kwargs):
+        self.batches = []
+        self.threads = set()
+        self.fail = fail
+        super().__init__(**kwargs)
+
+    def _write_rows(self, rows):
+        if self.fail:
+            raise IOError("disk full")
+        self.threads.add(threading.current_thread().name)
+        self.batches.append(rows)
+
+
+class TestResultSink(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_result_row(self):
+        self.assertEqual(result_row(_result(1)), (1, "Tweet 1", 'positive', 0.5, 0.0, 0.5, 0.6, ["Amplify this!", "Ask a question"], None, None))
+        self.assertEqual(result_row({'id': 2, 'text': "", 'error': "Input text is empty."}),
+                         (2, "", None, None, None, None, None, None, "Input text is empty.", None))
+        self.assertEqual(len(RESULT_COLUMNS), len(result_row({})))
+
+    def test_batches_by_size_from_one_writer_thread(self):
+        sink = RecordingSink(flush_size=10, flush_interval=60)
+        writers = [threading.Thread(target=lambda: [sink.write(_result(i)) for i in range(25)]) for _ in range(4)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        sink.close()
+
+        self.assertEqual([len(batch) for batch in sink.batches], [10] * 10)
+        self.assertEqual(len(sink.threads), 1)
+        self.assertEqual(sink.stats()['rows_written'], 100)
+
+    def test_flush_interval_and_flush(self):
+        sink = RecordingSink(flush_size=1000, flush_interval=0.05)
+        sink.write(_result(1))
+        deadline = time.monotonic() + 2
+        while not sink.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(sink.batches), 1) # Written by the interval, not the size
+
+        sink.write(_result(2))
+        sink.flush()
+        self.assertEqual(len(sink.batches), 2)
+        sink.close()
+
+    def test_writer_error_is_raised(self):
+        sink = RecordingSink(fail=True, flush_size=1)
+        sink.write(_result(1))
+        with self.assertRaises(RuntimeError):
+            sink.flush()
+        with self.assertRaises(RuntimeError):
+            sink.close()
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            RecordingSink(flush_size=0)
+        sink = RecordingSink()
+        sink.close()
+        with self.assertRaises(ValueError):
+            sink.write(_result(1))
+
+    def test_sqlite(self):
+        path = os.path.join(self.directory.name, 'results.sqlite')
+        with SQLiteResultSink(path, flush_size=7) as sink:
+            for i in range(20):
+                sink(_result(i))
+            sink({'id': 20, 'text': "Buy now", 'spam': True, 'spam_score': 0.97})
+
+        connection = sqlite3.connect(path)
+        self.addCleanup(connection.close)
+        self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        self.assertEqual(connection.execute("SELECT COUNT(*) FROM results").fetchone()[0], 21)
+        row = connection.execute("SELECT overall_sentiment, compound, suggestions FROM results WHERE id = 3").fetchone()
+        self.assertEqual((row[0], row[1], json.loads(row[2])), ('positive', 0.6, ["Amplify this!", "Ask a question"]))
+        self.assertEqual(connection.execute("SELECT spam_score FROM results WHERE id = 20").fetchone()[0], 0.97)
+        self.assertEqual(sink.stats()['batches_written'], 3)
+
+        with SQLiteResultSink(path) as sink: # A new run replaces the rows, as a JSONL file is truncated
+            sink(_result(100))
+        self.assertEqual(connection.execute("SELECT id FROM results").fetchall(), [(100,)])
+
+    def test_sqlite_flush_checkpoints_the_log(self):
+        path = os.path.join(self.directory.name, 'results.sqlite')
+        statements = []
+        with SQLiteResultSink(path) as sink:
+            sink._connection.set_trace_callback(statements.append)
+            sink(_result(1))
+            sink.flush() # The rows of a checkpointed position are fsynced into the database file
+            self.assertEqual(statements[-1], "PRAGMA wal_checkpoint(FULL)")
+
+    def test_jsonl_and_open_by_extension(self):
+        path = os.path.join(self.directory.name, 'results.jsonl')
+        sink = open_result_sink(path, flush_size=2)
+        self.assertIsInstance(sink, JSONLResultSink)
+        for i in range(3):
+            sink.write(_result(i))
+        sink.close()
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual([json.loads(line) for line in f], [_result(i) for i in range(3)])
+
+        sqlite_sink = open_result_sink(os.path.join(self.directory.name, 'results.db'))
+        self.assertIsInstance(sqlite_sink, SQLiteResultSink)
+        sqlite_sink.close()
+
+    def test_resume_discards_rows_after_position(self):
+        for name in ('results.jsonl', 'results.sqlite'):
+            with self.subTest(name):
+                path = os.path.join(self.directory.name, name)
+                sink = open_result_sink(path)
+                for i in range(3):
+                    sink.write(_result(i))
+                sink.flush()
+                position = sink.position
+                for i in range(3, 5): # Written after the "checkpoint"
+                    sink.write(_result(i))
+                sink.close()
+                self.assertNotEqual(sink.position, position)
+
+                with open_result_sink(path, resume_from=position) as resumed:
+                    self.assertEqual(resumed.position, position)
+                    resumed.write(_result(9))
+                if name.endswith('.jsonl'):
+                    with open(path, encoding='utf-8') as f:
+                        ids = [json.loads(line)['id'] for line in f]
+                else:
+                    connection = sqlite3.connect(path)
+                    ids = [row[0] for row in connection.execute("SELECT id FROM results ORDER BY rowid")]
+                    connection.close()
+                self.assertEqual(ids, [0, 1, 2, 9])
+
+        with self.assertRaises(ValueError): # Shorter than the checkpoint says
+            JSONLResultSink(os.path.join(self.directory.name, 'results.jsonl'), resume_from=10 ** 6)
+        with self.assertRaisesRegex(ValueError, "fewer than the 1000000"): # Rows lost since the checkpoint
+            SQLiteResultSink(os.path.join(self.directory.name, 'results.sqlite'), resume_from=10 ** 6)
+        with self.assertRaises(ValueError):
+            ParquetResultSink(os.path.join(self.directory.name, 'results.parquet'), resume_from=0)
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_parquet_row_groups(self):
+        import pyarrow.parquet as pq
+        path = os.path.join(self.directory.name, 'results.parquet')
+        with ParquetResultSink(path, flush_size=4) as sink:
+            for i in range(10):
+                sink.write(_result(i))
+        parquet_file = pq.ParquetFile(path)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+        table = parquet_file.read()
+        self.assertEqual(table.column('id').to_pylist(), [str(i) for i in range(10)])
+        self.assertEqual(table.column('suggestions').to_pylist()[0], ["Amplify this!", "Ask a question"])
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow is not installed")
+    def test_parquet_string_ids(self):
+        import pyarrow.parquet as pq
+        path = os.path.join(self.directory.name, 'results.parquet')
+        with ParquetResultSink(path) as sink:
+            sink.write(dict(_result(1), id="tweet-1"))
+            sink.write(_result(2))
+            sink.write(dict(_result(3), id=None))
+        self.assertEqual(pq.read_table(path).column('id').to_pylist(), ["tweet-1", "2", None])
+
+    @unittest.skipIf(HAS_PYARROW, "pyarrow is installed")
+    def test_parquet_needs_pyarrow(self):
+        with self.assertRaises(ImportError):
+            ParquetResultSink(os.path.join(self.directory.name, 'results.parquet'))
+
+
+if __name__ == '__main__':
+    unittest.main()
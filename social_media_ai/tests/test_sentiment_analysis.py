@@ -6,6 +6,8 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.sentiment_analysis import SentimentAnalyzer
+from src.document import Document
+from src.tweet_record import TweetRecord
 
 class TestSentimentAnalyzer(unittest.TestCase):
     """
@@ -175,6 +177,21 @@ class TestSentimentAnalyzer(unittest.TestCase):
         self.assertEqual(result_very_good['text'], text_very_good)
         self.assertEqual(result_slightly_good['text'], text_slightly_good)
 
+    def test_document_input(self):
+        """Test that a Document is analysed like its text."""
+        text = "I love this product! It's amazing and fantastic."
+        result = self.analyzer.analyze_sentiment(Document(text))
+
+        self.assertEqual(result, self.analyzer.analyze_sentiment(text))
+        self.assertEqual(result['text'], text)
+
+    def test_tweet_record_input(self):
+        """Test that a TweetRecord is analysed like its text."""
+        text = "This is the worst service I have ever received."
+        result = self.analyzer.analyze_sentiment(TweetRecord(id=1, text=text))
+
+        self.assertEqual(result, self.analyzer.analyze_sentiment(text))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,165 @@
+import unittest
+import os
+import sys
+import json
+import math
+import random
+import tempfile
+import threading
+from unittest.mock import patch, MagicMock
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sentiment_windows import ScoreSketch, SentimentWindows, SCORE_BINS, format_summary
+
+
+def _result(compound):
+    label = 'positive' if compound >= 0.05 else 'negative' if compound <= -0.05 else 'neutral'
+    return {'overall_sentiment': label, 'sentiment': {'compound': compound, 'positive': 0.0, 'negative': 0.0, 'neutral': 1.0}}
+
+
+class TestScoreSketch(unittest.TestCase):
+
+    def test_quantiles_within_half_a_bin(self):
+        rng = random.Random(7)
+        scores = [max(-1.0, min(1.0, rng.gauss(0.2, 0.4))) for _ in range(5000)]
+        sketch = ScoreSketch()
+        for score in scores:
+            sketch.add(score)
+        ordered = sorted(scores)
+        for q in (0.05, 0.5, 0.95):
+            exact = ordered[math.ceil(q * len(ordered)) - 1]
+            self.assertAlmostEqual(sketch.quantile(q), exact, delta=1.0 / SCORE_BINS)
+        self.assertAlmostEqual(sketch.mean, sum(scores) / len(scores))
+        self.assertEqual((sketch.minimum, sketch.maximum), (ordered[0], ordered[-1]))
+
+    def test_merge_and_extremes(self):
+        left, right, both = ScoreSketch(), ScoreSketch(), ScoreSketch()
+        for score in (-1.0, -0.3, 0.0):
+            left.add(score)
+            both.add(score)
+        for score in (0.5, 1.0):
+            right.add(score)
+            both.add(score)
+        left.merge(right)
+        self.assertEqual(list(left.bins), list(both.bins))
+        self.assertEqual((left.count, left.quantile(1.0), left.quantile(0.01)), (5, 1.0, -1.0))
+        self.assertEqual(ScoreSketch().quantile(0.5), 0.0)
+
+
+class TestSentimentWindows(unittest.TestCase):
+
+    def test_tumbling_windows(self):
+        windows = SentimentWindows(size=60)
+        for timestamp, compound in ((0, 0.8), (10, -0.6), (59, 0.0), (60, 0.9), (61, 0.7)):
+            windows.add(_result(compound), ['#brand'], timestamp)
+
+        current = windows.summary('#brand')
+        self.assertEqual((current['window_start'], current['window_end'], current['count']), (60, 120, 2))
+        previous = windows.summary('#brand', complete=True)
+        self.assertEqual((previous['window_start'], previous['count'], previous['complete']), (0, 3, True))
+        self.assertEqual(previous['labels'], {'negative': 1, 'neutral': 1, 'positive': 1})
+        self.assertAlmostEqual(previous['mean_compound'], 0.2 / 3)
+        self.assertAlmostEqual(previous['quantiles']['p50'], 0.0, delta=0.005)
+        self.assertIsNone(windows.summary('#other'))
+        self.assertIn("#brand", format_summary(current))
+
+    def test_sliding_windows_and_late_results(self):
+        windows = SentimentWindows(size=60, slide=20)
+        for timestamp in range(0, 100, 5): # One result every 5s from 0 to 95
+            windows.add(_result(0.5), ['q'], timestamp)
+
+        summary = windows.summary('q')
+        self.assertEqual((summary['window_start'], summary['window_end'], summary['count']), (40, 100, 12))
+        self.assertEqual(windows.summary('q', now=130)['count'], 4) # Only 80..95 is in [80, 140)
+        self.assertEqual(windows.summaries(complete=True)[0]['count'], 12) # [20, 80)
+
+        self.assertTrue(windows.add(_result(0.5), ['q'], 25)) # Still within the previous window
+        self.assertFalse(windows.add(_result(0.5), ['q'], 5)) # Older: late
+        self.assertEqual(windows.stats()['late'], 1)
+        self.assertLessEqual(windows.stats()['panes'], 60 // 20 + 1)
+
+    def test_memory_is_bounded(self):
+        windows = SentimentWindows(size=10, slide=1, max_keys=3)
+        for timestamp in range(1000):
+            windows.add(_result(0.1), [f"key{timestamp % 5}"], timestamp)
+        stats = windows.stats()
+        self.assertEqual(stats['keys'], 3)
+        self.assertLessEqual(stats['panes'], 3 * 11)
+        self.assertGreater(stats['evicted_keys'], 0)
+
+    def test_errors_and_spam_are_skipped(self):
+        windows = SentimentWindows(size=60, clock=lambda: 1000.0)
+        self.assertFalse(windows.add({'id': 1, 'text': "", 'error': "Input text is empty."}, ['q']))
+        self.assertFalse(windows.add({'id': 2, 'text': "Buy", 'spam': True, 'spam_score': 0.9}, ['q']))
+        self.assertFalse(windows.add(_result(0.3), []))
+        self.assertTrue(windows.add(_result(0.3), ['q'])) # At the clock's time
+        self.assertEqual(windows.summary('q')['window_start'], 960)
+        self.assertEqual(windows.stats()['skipped'], 3)
+
+    def test_invalid_arguments(self):
+        for kwargs in ({'size': 0}, {'size': 60, 'slide': 25}, {'size': 60, 'max_keys': 0}):
+            with self.assertRaises(ValueError):
+                SentimentWindows(**kwargs)
+
+    def test_summaries_while_ingesting(self):
+        windows = SentimentWindows(size=3600, slide=60)
+        stop = threading.Event()
+        counts = []
+
+        def read():
+            while not stop.is_set():
+                counts.extend(summary['count'] for summary in windows.summaries())
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        writers = [threading.Thread(target=lambda: [windows.add(_result(0.2), ['a', 'b'], 100.0) for _ in range(2000)])
+                   for _ in range(4)]
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        stop.set()
+        reader.join()
+        self.assertEqual([summary['count'] for summary in windows.summaries()], [8000, 8000])
+        self.assertTrue(all(0 <= count <= 8000 for count in counts))
+
+
+class TestStreamingWindows(unittest.TestCase):
+
+    def test_windowed_stream(self):
+        from src.streaming import StreamProcessor, windowed_handler, report_windows
+        from src.tweet_record import TweetRecord
+        from tests.test_batch import _split_tokenize, _load_components
+
+        sentiment_analyzer, content_suggestor = _load_components()
+        records = [TweetRecord(id=i, text=text, created_at=1000.0 + i) for i, text in enumerate(
+            ["What a great camera!", "The camera is terrible.", "The battery is great!", "   "])]
+        windows = SentimentWindows(size=60)
+        with patch('src.content_suggestion._ensure_nltk_resources', MagicMock()), \
+             patch('src.document.word_tokenize', side_effect=_split_tokenize):
+            results = []
+            StreamProcessor(windowed_handler(windows, sentiment_analyzer, content_suggestor, '#phone'),
+                            workers=2, sink=results.append).run(records)
+            by_keyword = SentimentWindows(size=60)
+            StreamProcessor(windowed_handler(by_keyword, sentiment_analyzer, content_suggestor, '#phone', 'keyword'),
+                            workers=2).run(records)
+
+        self.assertEqual(len(results), 4)
+        summary = windows.summary('#phone')
+        self.assertEqual((summary['count'], summary['labels']['positive'], summary['labels']['negative']), (3, 2, 1))
+        self.assertEqual({summary['key']: summary['count'] for summary in by_keyword.summaries()},
+                         {'camera': 2, 'battery': 1})
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'windows.json')
+            report_windows(windows, path)
+            with open(path, encoding='utf-8') as f:
+                report = json.load(f)
+        self.assertEqual(report['current'][0]['count'], 3)
+        self.assertEqual(report['stats']['added'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
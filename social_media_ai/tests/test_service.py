@@ -0,0 +1,219 @@
+import unittest
+import os
+import sys
+import json
+import asyncio
+import urllib.request
+import urllib.error
+from unittest.mock import patch, MagicMock
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.service import AnalysisService, MicroBatcher, HTTPError
+from tests.test_batch import _split_tokenize, _load_components
+
+
+def _request(url, payload=None, method=None):
+    """Sends one request with urllib; returns (status, decoded JSON body)."""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def test_concurrent_items_are_batched_in_order(self):
+        calls = []
+
+        def double(items):
+            calls.append(list(items))
+            return [item * 2 for item in items]
+
+        async def scenario():
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                batcher = MicroBatcher('double', double, executor, max_batch_size=8, max_wait=0.05)
+                batcher.start()
+                results = await asyncio.gather(*(batcher.submit_many([i]) for i in range(20)))
+                bulk = await batcher.submit_many([100, 101])
+                await batcher.stop()
+            return results, bulk, batcher.stats()
+
+        results, bulk, stats = asyncio.run(scenario())
+        self.assertEqual(results, [[i * 2] for i in range(20)])
+        self.assertEqual(bulk, [200, 202])
+        self.assertEqual([len(call) for call in calls[:3]], [8, 8, 4]) # 20 concurrent items in full batches
+        self.assertEqual(stats['batches'], len(calls))
+        self.assertEqual(stats['max_batch_size'], 8)
+
+    def test_collect_receives_extra_data(self):
+        collected = []
+
+        async def scenario():
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                batcher = MicroBatcher('sum', lambda items: (items, sum(items)), executor, collect=collected.append)
+                batcher.start()
+                results = await batcher.submit_many([1, 2, 3])
+                await batcher.stop()
+            return results
+
+        self.assertEqual(asyncio.run(scenario()), [1, 2, 3])
+        self.assertEqual(collected, [6])
+
+    def test_queue_limit_and_failures(self):
+        def fail(items):
+            raise RuntimeError("model crashed")
+
+        async def scenario():
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                batcher = MicroBatcher('fail', fail, executor, max_queue=2)
+                batcher.start()
+                with self.assertRaises(HTTPError) as full:
+                    await batcher.submit_many([1, 2, 3])
+                with self.assertRaises(HTTPError) as failed:
+                    await batcher.submit_many([1])
+                await batcher.stop()
+            return full.exception, failed.exception
+
+        full, failed = asyncio.run(scenario())
+        self.assertEqual(full.status, 503)
+        self.assertEqual(failed.status, 500)
+        self.assertIn("model crashed", str(failed))
+
+
+@patch('src.content_suggestion._ensure_nltk_resources', MagicMock())
+@patch('src.document.word_tokenize', side_effect=_split_tokenize)
+@patch('src.main.load_core_components', side_effect=_load_components)
+class TestAnalysisService(unittest.TestCase):
+
+    def setUp(self):
+        from src import main
+        main._worker_components.clear()
+        self.addCleanup(main._worker_components.clear)
+
+    def _run(self, scenario, **options):
+        """Starts a service on a free port with in-process analysis and runs scenario(base_url) in a thread."""
+        async def run():
+            service = AnalysisService(noun_mode='lexicon', workers=0, **options)
+            await service.start('127.0.0.1', 0)
+            try:
+                return await asyncio.get_running_loop().run_in_executor(None, scenario, service.address), service.metrics()
+            finally:
+                await service.stop()
+        return asyncio.run(run())
+
+    def test_endpoints(self, mock_load, mock_tokenize):
+        def scenario(url):
+            return {
+                'sentiment': _request(url + '/sentiment', {'text': "I love this new phone!"}),
+                'suggest': _request(url + '/suggest', {'text': "This is the worst service ever."}),
+                'bulk': _request(url + '/bulk', {'texts': ["Great camera!", {'id': 7, 'text': "   "}]}),
+                'health': _request(url + '/health'),
+            }
+
+        responses, metrics = self._run(scenario)
+
+        status, result = responses['sentiment']
+        self.assertEqual((status, result['overall_sentiment']), (200, 'positive'))
+        self.assertNotIn('suggestions', result)
+        status, result = responses['suggest']
+        self.assertEqual((status, result['overall_sentiment']), (200, 'negative'))
+        self.assertTrue(result['suggestions'])
+        status, body = responses['bulk']
+        self.assertEqual(status, 200)
+        self.assertEqual([result['id'] for result in body['results']], [0, 7])
+        self.assertEqual(body['results'][1]['error'], "Input text is empty.")
+        self.assertEqual(responses['health'], (200, {'status': 'ok', 'workers': 0, 'noun_mode': 'lexicon',
+                                                     'worker_restarts': 0}))
+        self.assertEqual(metrics['requests'], {'sentiment': 1, 'suggest': 1, 'bulk': 1, 'health': 1})
+        self.assertEqual(metrics['batches']['suggest']['batches'], 2)
+        mock_load.assert_called_once_with('lexicon') # Loaded once at startup
+
+    def test_concurrent_requests_share_batches(self, mock_load, mock_tokenize):
+        from concurrent.futures import ThreadPoolExecutor
+
+        def scenario(url):
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                return list(pool.map(lambda i: _request(url + '/suggest', {'text': f"Great phone number {i}"}), range(32)))
+
+        responses, metrics = self._run(scenario, max_wait=0.05)
+        self.assertTrue(all(status == 200 for status, _ in responses))
+        self.assertEqual([body['text'] for _, body in responses], [f"Great phone number {i}" for i in range(32)])
+        self.assertLess(metrics['batches']['suggest']['batches'], 32)
+        self.assertEqual(metrics['latency']['suggest']['count'], 32)
+
+    def test_errors(self, mock_load, mock_tokenize):
+        def scenario(url):
+            bad_json = urllib.request.Request(url + '/suggest', data=b'{not json', method='POST')
+            try:
+                urllib.request.urlopen(bad_json, timeout=10)
+            except urllib.error.HTTPError as e:
+                bad_json_status = e.code
+            return {
+                'bad_json': bad_json_status,
+                'missing_text': _request(url + '/sentiment', {'txt': "typo"})[0],
+                'not_found': _request(url + '/nothing')[0],
+                'wrong_method': _request(url + '/bulk')[0],
+                'too_many': _request(url + '/bulk', {'texts': ["x"] * 1001})[0],
+            }
+
+        statuses, metrics = self._run(scenario)
+        self.assertEqual(statuses, {'bad_json': 400, 'missing_text': 400, 'not_found': 404, 'wrong_method': 405,
+                                    'too_many': 413})
+        self.assertEqual(metrics['statuses'], {'400': 2, '404': 1, '405': 1, '413': 1})
+
+    def test_invalid_content_length_closes_the_connection(self, mock_load, mock_tokenize):
+        import socket
+        from urllib.parse import urlsplit
+
+        def scenario(url):
+            address = (urlsplit(url).hostname, urlsplit(url).port)
+            responses = []
+            for length in ('abc', '-5'):
+                with socket.create_connection(address, timeout=10) as connection:
+                    connection.sendall(f"POST /sentiment HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+                    response = b''
+                    while chunk := connection.recv(4096): # The server closes the connection after answering
+                        response += chunk
+                responses.append(response.decode('latin-1'))
+            return responses
+
+        responses, metrics = self._run(scenario)
+        for response in responses:
+            self.assertTrue(response.startswith("HTTP/1.1 400 "))
+            self.assertIn("Connection: close", response)
+            self.assertIn("Invalid Content-Length", response)
+        self.assertEqual(metrics['statuses'], {'400': 2})
+
+    def test_dead_worker_is_replaced(self, mock_load, mock_tokenize):
+        import signal
+
+        async def run():
+            service = AnalysisService(noun_mode='lexicon', workers=1)
+            await service.start('127.0.0.1', 0)
+            try:
+                loop = asyncio.get_running_loop()
+                pid = await loop.run_in_executor(service._executor, os.getpid)
+                os.kill(pid, signal.SIGKILL)
+
+                def scenario(url):
+                    return [_request(url + '/sentiment', {'text': "Great phone"})[0] for _ in range(2)] + \
+                           [_request(url + '/health')]
+                return await loop.run_in_executor(None, scenario, service.address)
+            finally:
+                await service.stop()
+
+        lost, recovered, (health_status, health) = asyncio.run(run())
+        self.assertEqual((lost, recovered), (503, 200))
+        self.assertEqual((health_status, health['status'], health['worker_restarts']), (200, 'ok', 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import subprocess
+from unittest.mock import patch, MagicMock
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import batch
+from src.sharding import ShardFilter, parse_shard, shard_of, verify_shards, merge_shards, stats_path, main
+from src.tweet_record import TweetRecord
+from tests.test_batch import _split_tokenize, _load_components
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Runs batch.main(argv) in a separate process with the same stubs as the tests.
+_BATCH = """
+import sys
+from unittest.mock import patch, MagicMock
+sys.path.insert(0, {project!r})
+from src import batch
+from tests.test_batch import _split_tokenize, _load_components
+with patch('src.content_suggestion._ensure_nltk_resources', MagicMock()), \\
+     patch('src.document.word_tokenize', side_effect=_split_tokenize), \\
+     patch('src.main.load_core_components', side_effect=_load_components):
+    sys.exit(batch.main(sys.argv[1:]))
+""".format(project=PROJECT_DIR)
+
+
+class TestPartitioning(unittest.TestCase):
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('2/4'), (2, 4))
+        for value in ('4/4', '-1/4', '1/0', '1', 'a/b'):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_shards_are_disjoint_complete_and_stable(self):
+        records = [TweetRecord(id=i, text=f"Tweet {i}") for i in range(1000)]
+        shards = [list(ShardFilter(records, index, 4)) for index in range(4)]
+        self.assertEqual(sorted(record.id for shard in shards for record in shard), list(range(1000)))
+        self.assertTrue(all(200 < len(shard) < 300 for shard in shards)) # Roughly balanced
+
+        # Independent of the process (unlike hash()) and of the input order
+        script = "import sys; sys.path.insert(0, {!r}); from src.sharding import shard_of; " \
+                 "from src.tweet_record import TweetRecord; " \
+                 "print([shard_of(TweetRecord(id=i, text=''), 4) for i in range(50)])".format(PROJECT_DIR)
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(json.loads(output), [shard_of(records[i], 4) for i in range(50)])
+        self.assertEqual(shard_of("Same text", 4), shard_of(TweetRecord(id=None, text="Same text"), 4))
+
+    def test_shard_filter_counts(self):
+        shard = ShardFilter((TweetRecord(id=i, text="x") for i in range(100)), 1, 3)
+        selected = list(shard)
+        self.assertEqual((shard.scanned, shard.selected), (100, len(selected)))
+
+
+@patch('src.content_suggestion._ensure_nltk_resources', MagicMock())
+@patch('src.document.word_tokenize', side_effect=_split_tokenize)
+@patch('src.main.load_core_components', side_effect=_load_components)
+class TestShardedRuns(unittest.TestCase):
+
+    TEXTS = ["I love this new phone, the camera is amazing!", "This is the worst service I have ever received.",
+             "The weather is quite neutral today.", "   "]
+
+    def setUp(self):
+        from src import main as app
+        app._worker_components.clear()
+        self.addCleanup(app._worker_components.clear)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.input_path = self._path('in.jsonl')
+        with open(self.input_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps({'id': i, 'text': self.TEXTS[i % 4].replace('.', f" {i}.")}) + '\n' for i in range(60))
+
+    def _path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def _run_shards(self, extension, count=3, options=(), processes=False):
+        """Runs the shards one after another, or as concurrent local processes; returns their outputs."""
+        outputs = [self._path(f'out.{index}{extension}') for index in range(count)]
+        argvs = [[self.input_path, '--shard', f'{index}/{count}', '--output', output, '--batch-size', '8', *options]
+                 for index, output in enumerate(outputs)]
+        if processes:
+            started = [subprocess.Popen([sys.executable, '-c', _BATCH, *argv], cwd=PROJECT_DIR) for argv in argvs]
+            self.assertEqual([process.wait() for process in started], [0] * count)
+        else:
+            self.assertEqual([batch.main(argv) for argv in argvs], [0] * count)
+        return outputs
+
+    def _rows(self, path):
+        if path.endswith('.jsonl'):
+            with open(path, encoding='utf-8') as f:
+                return [json.loads(line) for line in f]
+        connection = sqlite3.connect(path)
+        self.addCleanup(connection.close)
+        return connection.execute("SELECT id, text, overall_sentiment, error FROM results").fetchall()
+
+    def test_merged_shards_cover_the_input(self, mock_load, mock_tokenize):
+        for extension in ('.jsonl', '.sqlite'):
+            with self.subTest(extension):
+                outputs = self._run_shards(extension, processes=True)
+                merged = merge_shards(outputs, self._path('merged' + extension))
+
+                self.assertEqual(batch.main([self.input_path, '--output', self._path('single' + extension)]), 0)
+                key = (lambda row: row['id']) if extension == '.jsonl' else (lambda row: row[0])
+                rows = self._rows(self._path('merged' + extension))
+                self.assertEqual(sorted(rows, key=key), sorted(self._rows(self._path('single' + extension)), key=key))
+                self.assertEqual((merged['shards'], merged['input_records'], merged['rows']), (3, 60, 60))
+                self.assertEqual(merged['counts']['errors'], 15)
+                self.assertEqual(sum(shard['shard_records'] for shard in merged['per_shard']), 60)
+                with open(stats_path(self._path('merged' + extension)), encoding='utf-8') as f:
+                    self.assertEqual(json.load(f)['counts'], merged['counts'])
+
+    def test_spam_scoring_shards(self, mock_load, mock_tokenize):
+        from src.spam_filter import SpamFilter
+        from tests.test_spam_filter import KeywordModel, IdentityVectorizer
+
+        spam_filter = SpamFilter(KeywordModel(), IdentityVectorizer())
+        outputs = [self._path(f'spam.{index}.jsonl') for index in range(2)]
+        with patch('src.spam_filter.get_worker_spam_filter', return_value=spam_filter):
+            for index, output in enumerate(outputs):
+                self.assertEqual(batch.main([self.input_path, '--shard', f'{index}/2', '--output', output,
+                                             '--spam-threshold', '0.5', '--spam-action', 'tag']), 0)
+        merged = merge_shards(outputs, self._path('spam.jsonl'))
+        self.assertEqual((merged['input_records'], merged['rows']), (60, 60))
+        self.assertEqual(merged['options']['spam_action'], 'tag')
+
+    def test_resuming_a_finished_shard_keeps_its_stats(self, mock_load, mock_tokenize):
+        outputs = self._run_shards('.jsonl', count=2)
+        self.assertEqual(batch.main([self.input_path, '--shard', '0/2', '--output', outputs[0], '--batch-size', '8',
+                                     '--resume']), 0)
+        self.assertEqual(merge_shards(outputs, self._path('merged.jsonl'))['rows'], 60)
+
+    def test_incomplete_shards_are_not_merged(self, mock_load, mock_tokenize):
+        outputs = self._run_shards('.jsonl')
+        with self.assertRaisesRegex(ValueError, "Missing shards: 1/3"):
+            verify_shards([outputs[0], outputs[2]])
+        with self.assertRaisesRegex(ValueError, "Duplicate shards: 0/3"):
+            verify_shards(outputs + [outputs[0]])
+
+        with open(outputs[1], 'a', encoding='utf-8') as f: # A row the stats do not account for
+            f.write('{"id": 1000, "text": "extra"}\n')
+        with patch('sys.stderr') as stderr:
+            self.assertEqual(main(['merge', *outputs, '--output', self._path('merged.jsonl')]), 1)
+        self.assertIn("rows, but shard 1/3 wrote",
+                      ''.join(call.args[0] for call in stderr.write.call_args_list))
+        self.assertFalse(os.path.exists(self._path('merged.jsonl')))
+
+        os.remove(stats_path(outputs[2]))
+        with self.assertRaisesRegex(ValueError, "cannot read"):
+            verify_shards(outputs)
+
+    def test_other_options_are_rejected(self, mock_load, mock_tokenize):
+        outputs = self._run_shards('.jsonl', count=2)
+        other = self._run_shards('.other.jsonl', count=2, options=['--keyword-mode', 'pos'])
+        with self.assertRaisesRegex(ValueError, "differ in options"):
+            verify_shards([outputs[0], other[1]])
+        with patch('sys.stderr'):
+            self.assertEqual(batch.main([self.input_path, '--shard', '2/2', '--output', self._path('x.jsonl')]), 1)
+            self.assertEqual(batch.main([self.input_path, '--shard', '0/2']), 1) # No --output
+
+
+if __name__ == '__main__':
+    unittest.main()
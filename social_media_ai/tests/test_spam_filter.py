@@ -0,0 +1,91 @@
+import unittest
+import os
+import sys
+import warnings
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.spam_filter import SpamFilter, DEFAULT_MODEL_PATH, DEFAULT_VECTORIZER_PATH
+from src.tweet_record import TweetRecord
+
+
+class KeywordModel:
+    """Stand-in for the logistic regression model: texts containing 'free' are spam."""
+
+    classes_ = [0, 1]
+
+    def predict_proba(self, texts):
+        import numpy as np
+        spam = np.array([0.9 if 'free' in text.lower() else 0.1 for text in texts])
+        return np.column_stack([1 - spam, spam])
+
+
+class IdentityVectorizer:
+
+    def transform(self, texts):
+        return list(texts)
+
+
+class TestSpamFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.spam_filter = SpamFilter(KeywordModel(), IdentityVectorizer(), threshold=0.5)
+
+    def test_split_keeps_order_and_counts(self):
+        items = ["Hello there", TweetRecord(id=2, text="FREE prize, click now"), "free money", "See you soon"]
+        kept, spam = self.spam_filter.split(items)
+
+        self.assertEqual(kept, ["Hello there", "See you soon"])
+        self.assertEqual([item for item, _ in spam], [items[1], "free money"])
+        self.assertAlmostEqual(spam[0][1], 0.9)
+        stats = self.spam_filter.stats()
+        self.assertEqual((stats['scored'], stats['flagged'], stats['filter_rate']), (4, 2, 0.5))
+
+    def test_filter_page_keeps_copies_aligned(self):
+        records = [TweetRecord(id=1, text="free stuff"), TweetRecord(id=2, text="Real post")]
+        page = self.spam_filter.filter_page({'records': records, 'copies': [3, 2], 'clusters': ['a', 'b']})
+
+        self.assertEqual(page['records'], [records[1]])
+        self.assertEqual(page['copies'], [2])
+        self.assertEqual(page['spam'], [(records[0], 3, 0.9)])
+        self.assertEqual((page['clusters'], page['spam_clusters']), (['b'], ['a']))
+
+    def test_summary_reports_time_saved(self):
+        self.spam_filter.split(["free", "free", "ok"])
+        summary = self.spam_filter.summary(seconds_per_item=0.5)
+        self.assertIn("2/3 flagged (66.7%", summary)
+        self.assertIn("s of analysis saved", summary)
+        self.assertNotIn("saved", self.spam_filter.summary())
+
+    def test_empty_batch(self):
+        self.assertEqual(self.spam_filter.score([]), [])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            SpamFilter(KeywordModel(), IdentityVectorizer(), threshold=1.5)
+        with self.assertRaises(ValueError):
+            SpamFilter(KeywordModel(), IdentityVectorizer(), action='delete')
+
+
+@unittest.skipUnless(os.path.exists(DEFAULT_MODEL_PATH) and os.path.exists(DEFAULT_VECTORIZER_PATH), "spam model not found")
+class TestTrainedModel(unittest.TestCase):
+
+    def test_scores_spam_above_ham(self):
+        try:
+            import sklearn # noqa: F401
+        except ImportError:
+            self.skipTest("scikit-learn is not installed")
+        with warnings.catch_warnings(): # The pickles may come from another scikit-learn version
+            warnings.simplefilter('ignore')
+            spam_filter = SpamFilter.load()
+        spam_score, ham_score = spam_filter.score([
+            "WINNER!! You have won a free prize, call now to claim your cash reward",
+            "Hey, are we still on for lunch tomorrow?",
+        ])
+        self.assertGreater(spam_score, 0.5)
+        self.assertLess(ham_score, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import os
+import sys
+import time
+import tempfile
+import urllib.request
+import urllib.error
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.spam_filter import SpamFilter
+from src.spam_metrics import SpamMetrics, LATENCY_BUCKETS, CONTENT_TYPE, model_version, start_exporters, stop_exporters
+from tests.test_spam_filter import KeywordModel, IdentityVectorizer
+
+
+def _samples(text):
+    """The sample lines of a Prometheus text exposition, as {'name{labels}': value}."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            series, value = line.rsplit(' ', 1)
+            samples[series] = float(value)
+    return samples
+
+
+class TestSpamMetrics(unittest.TestCase):
+
+    def test_exposition_format(self):
+        metrics = SpamMetrics('abc123')
+        metrics.observe(4, flagged=1, vectorize_seconds=0.0003, predict_seconds=0.002)
+        metrics.observe(1, flagged=1, cache_hits=1)
+        text = metrics.render()
+        samples = _samples(text)
+
+        label = 'model_version="abc123"'
+        self.assertEqual(samples[f'spam_model_info{{{label}}}'], 1)
+        self.assertEqual(samples[f'spam_requests_total{{{label}}}'], 2)
+        self.assertEqual(samples[f'spam_texts_total{{{label}}}'], 5)
+        self.assertEqual(samples[f'spam_flagged_total{{{label}}}'], 2)
+        self.assertAlmostEqual(samples[f'spam_rate{{{label}}}'], 0.4)
+        self.assertAlmostEqual(samples[f'spam_cache_hit_ratio{{{label}}}'], 0.2)
+        self.assertEqual(samples[f'spam_cache_misses_total{{{label}}}'], 4)
+        # Cumulative buckets: the vectorize time falls into le=0.0005 and every larger bucket
+        self.assertEqual(samples[f'spam_vectorize_seconds_bucket{{{label},le="0.00025"}}'], 0)
+        self.assertEqual(samples[f'spam_vectorize_seconds_bucket{{{label},le="0.0005"}}'], 1)
+        self.assertEqual(samples[f'spam_vectorize_seconds_bucket{{{label},le="+Inf"}}'], 1)
+        self.assertEqual(samples[f'spam_vectorize_seconds_count{{{label}}}'], 1) # The cached request scored nothing
+        self.assertEqual(samples[f'spam_batch_size_bucket{{{label},le="1"}}'], 1)
+        self.assertEqual(samples[f'spam_batch_size_bucket{{{label},le="4"}}'], 2)
+        self.assertEqual(samples[f'spam_batch_size_sum{{{label}}}'], 5)
+        self.assertIn("# TYPE spam_predict_seconds histogram", text)
+        self.assertEqual(len([series for series in samples if series.startswith('spam_predict_seconds_bucket')]),
+                         len(LATENCY_BUCKETS) + 1)
+
+    def test_spam_filter_records_batches_and_cache_hits(self):
+        metrics = SpamMetrics()
+        spam_filter = SpamFilter(KeywordModel(), IdentityVectorizer(), metrics=metrics, cache_size=2)
+        self.assertEqual(spam_filter.score(["free money", "Hello"]), [0.9, 0.1])
+        self.assertEqual(spam_filter.score(["Hello", "See you"]), [0.1, 0.1]) # 'Hello' is cached
+        self.assertEqual(spam_filter.score(["free money"]), [0.9]) # Evicted by 'See you'
+
+        self.assertEqual((metrics.requests, metrics.texts, metrics.flagged), (3, 5, 2))
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (1, 4))
+        self.assertEqual(metrics.predict_seconds.count, 3)
+        self.assertEqual(spam_filter.stats()['scored'], 5)
+
+        uncached = SpamFilter(KeywordModel(), IdentityVectorizer(), metrics=SpamMetrics())
+        uncached.score(["Hello", "Hello"])
+        self.assertEqual(uncached.metrics.cache_hits, 0)
+
+    def test_exports(self):
+        metrics = SpamMetrics('v1')
+        metrics.observe(2, flagged=0, vectorize_seconds=0.001, predict_seconds=0.001)
+        server = metrics.serve(port=0)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(url + '/metrics', timeout=10) as response:
+            self.assertEqual(response.headers['Content-Type'], CONTENT_TYPE)
+            self.assertEqual(response.read().decode('utf-8'), metrics.render())
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + '/other', timeout=10)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spam.prom')
+            metrics.write_textfile(path)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), metrics.render())
+            self.assertEqual(os.listdir(directory), ['spam.prom'])
+
+            stop = metrics.write_periodically(os.path.join(directory, 'periodic.prom'), interval=60)
+            stop.set() # Writes once more when stopped
+            for _ in range(100):
+                if os.path.exists(os.path.join(directory, 'periodic.prom')):
+                    break
+                time.sleep(0.05)
+            self.assertTrue(os.path.exists(os.path.join(directory, 'periodic.prom')))
+
+    def test_failed_textfile_writes_are_retried(self):
+        metrics = SpamMetrics('v1')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'later', 'spam.prom') # The directory does not exist yet
+            with self.assertLogs(level='ERROR') as logs:
+                stop = metrics.write_periodically(path, interval=0.01)
+                self.addCleanup(stop.set)
+                time.sleep(0.05)
+            self.assertIn("Cannot write the spam metrics", logs.output[0])
+            os.makedirs(os.path.dirname(path))
+            for _ in range(100):
+                if os.path.exists(path):
+                    break
+                time.sleep(0.05)
+            self.assertTrue(os.path.exists(path))
+            stop.set()
+            time.sleep(0.1) # Let the last write finish before the directory is removed
+
+    def test_exporters_start_once_per_process(self):
+        self.addCleanup(stop_exporters)
+        first, second = SpamMetrics('v1'), SpamMetrics('v2')
+        start_exporters(first, port=0)
+        from src import spam_metrics
+        server = spam_metrics._exported.server
+        start_exporters(second, port=server.server_address[1]) # A rerun: the port is not bound again
+        self.assertIs(spam_metrics._exported.server, server)
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=10) as response:
+            self.assertIn('model_version="v2"', response.read().decode('utf-8'))
+
+    def test_model_version(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, name) for name in ('model.pkl', 'vectorizer.pkl')]
+            for path in paths:
+                with open(path, 'wb') as f:
+                    f.write(b'model bytes')
+            version = model_version(*paths)
+            self.assertEqual(len(version), 12)
+            self.assertEqual(version, model_version(*paths))
+            with open(paths[0], 'ab') as f:
+                f.write(b'retrained')
+            self.assertNotEqual(version, model_version(*paths))
+
+
+if __name__ == '__main__':
+    unittest.main()
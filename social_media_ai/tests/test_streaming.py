@@ -0,0 +1,181 @@
+import unittest
+import os
+import sys
+import json
+import time
+import queue
+import tempfile
+import threading
+from unittest.mock import patch
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.streaming import StreamQueue, StreamProcessor, tail_jsonl, poll_search, format_metrics, _CLOSED
+from src.tweet_record import TweetRecord
+
+
+class TestStreamQueue(unittest.TestCase):
+
+    def test_fifo_and_close(self):
+        stream_queue = StreamQueue(maxsize=3)
+        for item in (1, 2):
+            self.assertTrue(stream_queue.put(item))
+        stream_queue.close()
+        self.assertFalse(stream_queue.put(3))
+        self.assertEqual([stream_queue.get(), stream_queue.get()], [1, 2])
+        self.assertIs(stream_queue.get(), _CLOSED)
+
+    def test_drop_oldest(self):
+        stream_queue = StreamQueue(maxsize=2, policy='drop_oldest')
+        for item in range(5):
+            self.assertTrue(stream_queue.put(item))
+        self.assertEqual([stream_queue.get(), stream_queue.get()], [3, 4])
+        self.assertEqual(stream_queue.stats()['dropped'], 3)
+
+    def test_drop_newest(self):
+        stream_queue = StreamQueue(maxsize=2, policy='drop_newest')
+        results = [stream_queue.put(item) for item in range(4)]
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual([stream_queue.get(), stream_queue.get()], [0, 1])
+
+    def test_block_waits_for_space(self):
+        stream_queue = StreamQueue(maxsize=1, policy='block')
+        stream_queue.put('first')
+        threading.Timer(0.1, stream_queue.get).start()
+        stream_queue.put('second') # Blocks until the timer consumes 'first'
+        stats = stream_queue.stats()
+        self.assertGreater(stats['producer_blocked_seconds'], 0.05)
+        self.assertEqual(stream_queue.get(), 'second')
+        self.assertGreater(stats['queue_lag_max_seconds'], 0.05)
+
+    def test_get_timeout(self):
+        with self.assertRaises(queue.Empty):
+            StreamQueue().get(timeout=0.01)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            StreamQueue(policy='spill')
+        with self.assertRaises(ValueError):
+            StreamQueue(maxsize=0)
+
+
+class TestStreamProcessor(unittest.TestCase):
+
+    def test_processes_every_item_with_block_policy(self):
+        results = []
+        processor = StreamProcessor(lambda item: item * 2, workers=3, queue_size=2, sink=results.append)
+        metrics = processor.run(iter(range(100)))
+
+        self.assertEqual(sorted(results), [i * 2 for i in range(100)])
+        self.assertEqual(metrics['processed'], 100)
+        self.assertEqual(metrics['dropped'], 0)
+        self.assertLessEqual(metrics['max_queue_depth'], 2)
+
+    def test_slow_workers_drop_oldest(self):
+        def slow(item):
+            time.sleep(0.01)
+            return item
+
+        results = []
+        processor = StreamProcessor(slow, workers=1, queue_size=5, policy='drop_oldest', sink=results.append)
+        metrics = processor.run(iter(range(200)))
+
+        self.assertGreater(metrics['dropped'], 0)
+        self.assertEqual(metrics['processed'] + metrics['dropped'], 200)
+        self.assertIn(199, results) # The newest items survive
+        self.assertIn("dropped=", format_metrics(metrics))
+
+    def test_handler_errors_are_counted(self):
+        def handler(item):
+            if item % 2:
+                raise RuntimeError("bad item")
+            return item
+
+        processor = StreamProcessor(handler, workers=2)
+        with self.assertLogs(level='ERROR'):
+            metrics = processor.run(iter(range(10)))
+        self.assertEqual((metrics['processed'], metrics['errors']), (5, 5))
+
+    def test_event_lag(self):
+        processor = StreamProcessor(lambda item: item, workers=1, clock=lambda: 1000.0)
+        metrics = processor.run(iter([TweetRecord(id=1, text="x", created_at=990.0)]))
+        self.assertEqual(metrics['event_lag_last_seconds'], 10.0)
+
+
+class TestProducers(unittest.TestCase):
+
+    def test_tail_jsonl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tweets.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'id': 7, 'text': "hello", 'lang': 'en'}) + '\n')
+                f.write('\n{not json}\n')
+                f.write(json.dumps("bare string") + '\n')
+            with self.assertLogs(level='WARNING'):
+                records = list(tail_jsonl(path))
+
+        self.assertEqual(records[0], TweetRecord(id=7, text="hello", lang='en'))
+        self.assertEqual(records[1].text, "bare string")
+        self.assertEqual(len(records), 2)
+
+    def test_tail_jsonl_follow(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tweets.jsonl')
+            open(path, 'w').close()
+            stop = threading.Event()
+            records = tail_jsonl(path, follow=True, poll_interval=0.01, stop_event=stop)
+
+            def append():
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write('{"text": "late tw')
+                    f.flush()
+                    time.sleep(0.05)
+                    f.write('eet"}\n')
+
+            threading.Timer(0.05, append).start()
+            self.assertEqual(next(records).text, "late tweet")
+            stop.set()
+            self.assertEqual(list(records), [])
+
+    def test_poll_search_only_yields_new_tweets(self):
+        from src.fake_twitter_api import FakeTwitterAPI, FakeTwitterServer
+        from src.twitter_client import TwitterClient
+
+        fake_api = FakeTwitterAPI(tweets_per_query=0, rate_limit=None)
+        fake_api.add_statuses('ai', [{'id': i, 'full_text': f"tweet {i}", 'lang': 'en'} for i in (1, 2)])
+        credentials = dict.fromkeys(['TWITTER_API_KEY', 'TWITTER_API_SECRET_KEY', 'TWITTER_ACCESS_TOKEN',
+                                     'TWITTER_ACCESS_TOKEN_SECRET'], 'fake')
+        with FakeTwitterServer(fake_api) as server, patch.dict(os.environ, credentials):
+            client = TwitterClient(base_url=server.base_url)
+            stop = threading.Event()
+            stream = poll_search(client, 'ai', poll_interval=0.01, stop_event=stop)
+            self.assertEqual([next(stream).id, next(stream).id], [1, 2]) # Oldest first
+            fake_api.add_statuses('ai', [{'id': 3, 'full_text': "tweet 3", 'lang': 'en'}])
+            self.assertEqual(next(stream).id, 3)
+            stop.set()
+            self.assertEqual(list(stream), [])
+
+
+    def test_poll_search_fills_the_gap_of_a_poll_cut_short(self):
+        from src.fake_twitter_api import FakeTwitterAPI, FakeTwitterServer
+        from src.twitter_client import TwitterClient
+
+        fake_api = FakeTwitterAPI(tweets_per_query=0, rate_limit=None)
+        fake_api.add_statuses('ai', [{'id': i, 'full_text': f"tweet {i}", 'lang': 'en'} for i in (1, 2)])
+        credentials = dict.fromkeys(['TWITTER_API_KEY', 'TWITTER_API_SECRET_KEY', 'TWITTER_ACCESS_TOKEN',
+                                     'TWITTER_ACCESS_TOKEN_SECRET'], 'fake')
+        with FakeTwitterServer(fake_api) as server, patch.dict(os.environ, credentials):
+            client = TwitterClient(base_url=server.base_url)
+            stop = threading.Event()
+            stream = poll_search(client, 'ai', poll_interval=0.01, max_per_poll=2, stop_event=stop)
+            self.assertEqual([next(stream).id for _ in range(2)], [1, 2])
+            fake_api.add_statuses('ai', [{'id': i, 'full_text': f"tweet {i}", 'lang': 'en'} for i in (3, 4, 5)])
+            self.assertEqual([next(stream).id for _ in range(3)], [4, 5, 3]) # Tweet 3 comes from the next poll
+            fake_api.add_statuses('ai', [{'id': 6, 'full_text': "tweet 6", 'lang': 'en'}])
+            self.assertEqual(next(stream).id, 6)
+            stop.set()
+            self.assertEqual(list(stream), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+import unittest
+import os
+import sys
+import json
+import random
+import asyncio
+import tempfile
+from collections import Counter
+from unittest.mock import patch, MagicMock
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import trending
+from src.trending import SpaceSaving
+from tests.test_batch import _split_tokenize, _load_components
+
+
+def _zipf_stream(size, vocabulary, seed=3):
+    """`size` terms drawn from `vocabulary` terms with Zipf-like frequencies (term0 most frequent)."""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(vocabulary)]
+    return [f"term{index}" for index in rng.choices(range(vocabulary), weights, k=size)]
+
+
+class TestSpaceSaving(unittest.TestCase):
+
+    def test_exact_below_capacity(self):
+        sketch = SpaceSaving(capacity=10)
+        for term in "a b a c a b".split():
+            sketch.add(term)
+        self.assertEqual([(term['term'], term['count'], term['error']) for term in sketch.top(3)],
+                         [('a', 3, 0), ('b', 2, 0), ('c', 1, 0)])
+        self.assertAlmostEqual(sketch.top(1)[0]['share'], 0.5)
+
+    def test_bounded_memory_and_error_bounds(self):
+        stream = _zipf_stream(50_000, vocabulary=20_000)
+        true_counts = Counter(stream)
+        sketch = SpaceSaving(capacity=100)
+        for term in stream:
+            sketch.add(term)
+
+        self.assertEqual(len(sketch), 100)
+        self.assertEqual(len(sketch._heap), 100)
+        for term in sketch.top(100):
+            self.assertLessEqual(term['count'] - term['error'], true_counts[term['term']])
+            self.assertGreaterEqual(term['count'], true_counts[term['term']])
+        # Every term above total / capacity is monitored, and the heaviest ones rank first
+        monitored = {term['term'] for term in sketch.top(100)}
+        self.assertTrue({term for term, count in true_counts.items() if count > len(stream) / 100} <= monitored)
+        self.assertEqual([term['term'] for term in sketch.top(3)], ['term0', 'term1', 'term2'])
+
+    def test_decay_surfaces_emerging_terms(self):
+        sketch = SpaceSaving(capacity=10, half_life=30)
+        for second in range(600): # 'old' every second for ten minutes
+            sketch.add('old', timestamp=second)
+        for second in range(600, 720, 4): # Then 'new' for two minutes, at a quarter of the rate
+            sketch.add('new', timestamp=second)
+        top = sketch.top(2, now=720)
+        self.assertEqual(top[0]['term'], 'new')
+        self.assertAlmostEqual(top[0]['count'], sum(2 ** ((t - 720) / 30) for t in range(600, 720, 4)))
+        # Without decay the long-running term wins
+        plain = SpaceSaving(capacity=10)
+        for term in ['old'] * 600 + ['new'] * 30:
+            plain.add(term)
+        self.assertEqual(plain.top(1)[0]['term'], 'old')
+
+    def test_landmark_is_rescaled(self):
+        sketch = SpaceSaving(capacity=10, half_life=1)
+        sketch.add('a', timestamp=0)
+        sketch.add('b', timestamp=1000) # 2 ** 1000 would overflow without rescaling
+        sketch.add('b', timestamp=1001)
+        top = sketch.top(2, now=1001)
+        self.assertEqual(sketch.landmark, 1000)
+        self.assertEqual([term['term'] for term in top], ['b', 'a'])
+        self.assertAlmostEqual(top[0]['count'], 1.5)
+
+    def test_merged_sketches_match_one_sketch(self):
+        stream = _zipf_stream(20_000, vocabulary=5_000)
+        true_counts = Counter(stream)
+        single = SpaceSaving(capacity=200)
+        parts = [SpaceSaving(capacity=200) for _ in range(4)]
+        for index, term in enumerate(stream):
+            single.add(term)
+            parts[index % 4].add(term)
+        merged = SpaceSaving(capacity=200)
+        for part in parts:
+            merged.merge(json.loads(json.dumps(part.state()))) # As sent between processes
+
+        self.assertEqual(len(merged), 200)
+        self.assertEqual(merged.total, len(stream))
+        self.assertEqual([term['term'] for term in merged.top(5)], [term['term'] for term in single.top(5)])
+        for term in merged.top(200):
+            self.assertLessEqual(term['count'] - term['error'], true_counts[term['term']])
+            self.assertGreaterEqual(term['count'], true_counts[term['term']])
+
+    def test_merge_decayed_sketches(self):
+        left, right, both = (SpaceSaving(capacity=10, half_life=30) for _ in range(3))
+        for timestamp, term in ((0, 'a'), (10, 'b'), (20, 'a')):
+            left.add(term, timestamp=timestamp)
+            both.add(term, timestamp=timestamp)
+        for timestamp, term in ((100, 'b'), (110, 'c')):
+            right.add(term, timestamp=timestamp)
+            both.add(term, timestamp=timestamp)
+        left.merge(right.state())
+        for merged, expected in zip(left.top(3, now=120), both.top(3, now=120)):
+            self.assertEqual(merged['term'], expected['term'])
+            self.assertAlmostEqual(merged['count'], expected['count'])
+        with self.assertRaises(ValueError):
+            left.merge(SpaceSaving(capacity=10).state())
+
+    def test_invalid_arguments(self):
+        for kwargs in ({'capacity': 0}, {'half_life': 0}):
+            with self.assertRaises(ValueError):
+                SpaceSaving(**kwargs)
+
+
+class TestModuleTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(trending.disable)
+
+    def test_record_drain_and_merge(self):
+        trending.record(['ignored']) # Not enabled: nothing is kept
+        self.assertEqual((trending.top(), trending.drain()), ([], {}))
+
+        trending.enable(capacity=10)
+        trending.record(['camera', 'battery', 'camera'])
+        state = trending.drain() # As a worker process sends its terms back
+        self.assertEqual(trending.top(), [])
+        trending.record(['camera', 'screen'])
+        trending.merge(state)
+        self.assertEqual({term['term']: term['count'] for term in trending.top()}, {'camera': 3, 'battery': 1, 'screen': 1})
+
+    def test_forked_process_starts_empty(self):
+        trending.enable(capacity=10)
+        trending.record(['camera'])
+        with patch('src.trending.os.getpid', return_value=-1): # As in a worker forked from this process
+            self.assertEqual(trending.top(), [])
+            trending.record(['battery'])
+            self.assertEqual(trending.drain()['counters'], [('battery', 1.0, 0.0)])
+
+    def test_report(self):
+        import argparse
+
+        args = trending.add_arguments(argparse.ArgumentParser()).parse_args(['--trending', '2'])
+        self.assertTrue(trending.enable_from_args(args))
+        trending.record(['camera', 'camera', 'battery', 'battery', 'battery', 'screen'])
+        with tempfile.TemporaryDirectory() as directory:
+            args.trending_output = os.path.join(directory, 'trending.json')
+            with patch('sys.stderr') as stderr:
+                trending.report_from_args(args)
+            with open(args.trending_output, encoding='utf-8') as f:
+                report = json.load(f)
+        self.assertIn("camera", ''.join(call.args[0] for call in stderr.write.call_args_list))
+        self.assertEqual([term['term'] for term in report['terms']], ['battery', 'camera'])
+
+
+@patch('src.content_suggestion._ensure_nltk_resources', MagicMock())
+@patch('src.document.word_tokenize', side_effect=_split_tokenize)
+@patch('src.main.load_core_components', side_effect=_load_components)
+class TestKeywordFeeds(unittest.TestCase):
+
+    TEXTS = ["The camera is amazing!", "The battery died again.", "Great camera and screen.", "   "]
+
+    def setUp(self):
+        from src import main
+        main._worker_components.clear()
+        self.addCleanup(main._worker_components.clear)
+        self.addCleanup(trending.disable)
+
+    def _counts(self):
+        return {term['term']: term['count'] for term in trending.top(100)}
+
+    def test_batch_workers_send_their_keywords_back(self, mock_load, mock_tokenize):
+        from src.batch import run_batch
+        from src.tweet_record import TweetRecord
+
+        records = [TweetRecord(id=i, text=self.TEXTS[i % 4]) for i in range(40)]
+        counts = {}
+        for keyword_mode in ('tfidf', 'pos'):
+            for workers in (1, 2):
+                trending.enable(capacity=50)
+                run_batch(records, lambda result: None, batch_size=8, workers=workers, noun_mode='lexicon',
+                          keyword_mode=keyword_mode)
+                counts[keyword_mode, workers] = self._counts()
+            self.assertEqual(counts[keyword_mode, 1], counts[keyword_mode, 2])
+        self.assertEqual(sum(counts['pos', 1].values()), 30) # One keyword per non-empty text
+        self.assertEqual(counts['pos', 1]['camera'], 20)
+
+    def test_service_trending_endpoint(self, mock_load, mock_tokenize):
+        from src.service import AnalysisService
+        from tests.test_service import _request
+
+        async def run(enabled):
+            if enabled:
+                trending.enable(capacity=50)
+            service = AnalysisService(noun_mode='lexicon', keyword_mode='pos', workers=0, trending_top=1)
+            await service.start('127.0.0.1', 0)
+            try:
+                def scenario(url):
+                    _request(url + '/bulk', {'texts': self.TEXTS})
+                    return _request(url + '/trending')
+                return await asyncio.get_running_loop().run_in_executor(None, scenario, service.address)
+            finally:
+                await service.stop()
+
+        self.assertEqual(asyncio.run(run(False))[0], 404)
+        status, body = asyncio.run(run(True))
+        self.assertEqual(status, 200)
+        self.assertEqual([term['term'] for term in body['terms']], ['camera'])
+
+
+if __name__ == '__main__':
+    unittest.main()
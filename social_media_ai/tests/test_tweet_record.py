@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# Adjust sys.path to allow imports from the 'src' directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.tweet_record import TweetRecord, TweetBatch, record_text
+
+
+class TestTweetRecord(unittest.TestCase):
+
+    def test_from_status(self):
+        status = SimpleNamespace(
+            id=42, lang='en', created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            user=SimpleNamespace(id=7), retweeted_status=SimpleNamespace(id=41),
+        )
+        record = TweetRecord.from_status(status, "RT @someone: hello")
+
+        self.assertEqual(record.id, 42)
+        self.assertEqual(record.text, "RT @someone: hello")
+        self.assertEqual(record.created_at, 1704067200.0)
+        self.assertEqual(record.author_id, 7)
+        self.assertEqual(record.retweet_of_id, 41)
+        self.assertEqual(record.lang, 'en')
+        self.assertTrue(record.is_retweet)
+
+    def test_from_status_with_missing_fields(self):
+        record = TweetRecord.from_status(SimpleNamespace(id=1), "hello")
+        self.assertEqual(record, TweetRecord(id=1, text="hello"))
+        self.assertFalse(record.is_retweet)
+
+    def test_dict_round_trip(self):
+        record = TweetRecord(id=3, text="hi", created_at=1.5, author_id=2, retweet_of_id=1, lang='en')
+        self.assertEqual(TweetRecord.from_dict(record.to_dict()), record)
+        self.assertEqual(TweetRecord.from_dict({'text': "only text"}, default_id=9), TweetRecord(id=9, text="only text"))
+
+    def test_has_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            TweetRecord(id=1, text="x").extra = 1
+
+    def test_record_text(self):
+        self.assertEqual(record_text(TweetRecord(id=1, text="hello")), "hello")
+        self.assertEqual(record_text("plain"), "plain")
+
+
+class TestTweetBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [
+            TweetRecord(id=3, text="Ünïcode tweet 🎉", created_at=1700000000.5, author_id=10, lang='en'),
+            TweetRecord(id=2, text="RT: original", created_at=None, author_id=11, retweet_of_id=1, lang='de'),
+            TweetRecord(id=1, text="", lang=None),
+        ]
+        self.batch = TweetBatch.from_records(self.records)
+
+    def test_round_trip(self):
+        self.assertEqual(len(self.batch), 3)
+        self.assertEqual(list(self.batch), self.records)
+        self.assertEqual(self.batch[-1], self.records[-1])
+        self.assertEqual(self.batch.texts(), [r.text for r in self.records])
+        self.assertEqual(self.batch.text(0), "Ünïcode tweet 🎉")
+
+    def test_columns(self):
+        self.assertEqual(list(self.batch.ids), [3, 2, 1])
+        self.assertEqual(list(self.batch.retweet_of_ids), [0, 1, 0])
+        self.assertEqual(self.batch.langs, [None, 'en', 'de'])
+        self.assertEqual(list(self.batch.lang_codes), [1, 2, 0])
+
+    def test_index_out_of_range(self):
+        with self.assertRaises(IndexError):
+            self.batch[3]
+
+    def test_empty_batch(self):
+        batch = TweetBatch.from_records([])
+        self.assertEqual(len(batch), 0)
+        self.assertEqual(batch.texts(), [])
+
+    def test_footprint_is_compact(self):
+        batch = TweetBatch.from_records(
+            TweetRecord(id=i, text=f"tweet number {i}", created_at=float(i), author_id=i, lang='en')
+            for i in range(1, 1001)
+        )
+        text_bytes = sum(len(f"tweet number {i}") for i in range(1, 1001))
+        # 5 eight-byte columns (incl. text offsets) and a two-byte lang code per tweet.
+        self.assertLessEqual(batch.nbytes - text_bytes, 1000 * 42 + 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 import os
 import sys
+import tempfile
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 
 # Adjust sys.path to allow imports from the 'src' directory
@@ -20,7 +22,9 @@ except ImportError:
     sys.modules['tweepy'] = MagicMock()
 
 
-from src.twitter_client import TwitterClient
+from src.twitter_client import TwitterClient, TweetStore
+from src.fetch_scheduler import RateLimitExceeded
+from src.tweet_record import TweetRecord, TweetBatch
 
 
 class TestTwitterClient(unittest.TestCase):
@@ -187,5 +191,273 @@ class TestTwitterClient(unittest.TestCase):
             q="test_query", lang="en", count=10, tweet_mode="extended" # Default values
         )
 
+    def _make_status(self, tweet_id, text):
+        status = MagicMock()
+        status.id = tweet_id
+        status.full_text = text
+        return status
+
+    def _paged_search(self, statuses):
+        """Returns a fake search_tweets that serves `statuses` (newest first) honouring count and max_id."""
+        def search_tweets(q, lang, count, tweet_mode, max_id=None, since_id=None):
+            window = [
+                s for s in statuses
+                if (max_id is None or s.id <= max_id) and (since_id is None or s.id > since_id)
+            ]
+            return window[:count]
+        return search_tweets
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_iter_tweets_paginates_with_max_id(self, MockAPI):
+        """Test that iter_tweets follows max_id pagination across pages up to the limit."""
+        client = TwitterClient()
+        statuses = [self._make_status(tweet_id, f"Tweet {tweet_id}") for tweet_id in range(250, 0, -1)]
+        client.api.search_tweets.side_effect = self._paged_search(statuses)
+
+        for prefetch_pages in (0, 2):
+            client.api.search_tweets.reset_mock()
+            tweets = list(client.iter_tweets("test_query", limit=230, page_size=100, prefetch_pages=prefetch_pages))
+
+            self.assertEqual(len(tweets), 230)
+            self.assertEqual(tweets[0], "Tweet 250")
+            self.assertEqual(tweets[-1], "Tweet 21")
+            calls = client.api.search_tweets.call_args_list
+            self.assertEqual(len(calls), 3)
+            self.assertNotIn('max_id', calls[0].kwargs)
+            self.assertEqual(calls[1].kwargs['max_id'], 150)
+            self.assertEqual(calls[2].kwargs['max_id'], 50)
+            self.assertEqual(calls[2].kwargs['count'], 30)
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_iter_tweets_stops_when_results_run_out(self, MockAPI):
+        client = TwitterClient()
+        statuses = [self._make_status(tweet_id, f"Tweet {tweet_id}") for tweet_id in range(5, 0, -1)]
+        client.api.search_tweets.side_effect = self._paged_search(statuses)
+
+        tweets = list(client.iter_tweets("test_query", page_size=2))
+
+        self.assertEqual(tweets, ["Tweet 5", "Tweet 4", "Tweet 3", "Tweet 2", "Tweet 1"])
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_iter_tweets_is_lazy(self, MockAPI):
+        """Without prefetching, later pages are only requested once earlier ones are consumed."""
+        client = TwitterClient()
+        statuses = [self._make_status(tweet_id, f"Tweet {tweet_id}") for tweet_id in range(10, 0, -1)]
+        client.api.search_tweets.side_effect = self._paged_search(statuses)
+
+        tweets = client.iter_tweets("test_query", page_size=2, prefetch_pages=0)
+        self.assertEqual(next(tweets), "Tweet 10")
+        self.assertEqual(client.api.search_tweets.call_count, 1)
+        tweets.close()
+        self.assertEqual(client.api.search_tweets.call_count, 1)
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_iter_tweets_early_close_with_prefetch(self, MockAPI):
+        client = TwitterClient()
+        statuses = [self._make_status(tweet_id, f"Tweet {tweet_id}") for tweet_id in range(1000, 0, -1)]
+        client.api.search_tweets.side_effect = self._paged_search(statuses)
+
+        tweets = client.iter_tweets("test_query", page_size=10, prefetch_pages=1)
+        self.assertEqual(next(tweets), "Tweet 1000")
+        tweets.close()
+        # The consumer held one page, the queue one more, and the producer at most one in hand.
+        self.assertLessEqual(client.api.search_tweets.call_count, 3)
+
+    @patch('src.twitter_client.tweepy.API')
+    @patch('src.twitter_client.logging')
+    def test_iter_tweets_api_error_ends_iteration(self, mock_logging, MockAPI):
+        client = TwitterClient()
+        first_page = [self._make_status(2, "Tweet 2"), self._make_status(1, "Tweet 1")]
+        client.api.search_tweets.side_effect = [first_page, TweepyException("API Error")]
+
+        tweets = list(client.iter_tweets("test_query", page_size=2))
+
+        self.assertEqual(tweets, ["Tweet 2", "Tweet 1"])
+        mock_logging.error.assert_called()
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_fetch_new_tweets_uses_since_id(self, MockAPI):
+        """Test that a second poll only requests and returns tweets newer than the first."""
+        client = TwitterClient()
+        statuses = [self._make_status(tweet_id, f"Tweet {tweet_id}") for tweet_id in range(5, 0, -1)]
+        client.api.search_tweets.side_effect = self._paged_search(statuses)
+
+        with TweetStore(':memory:') as store:
+            self.assertEqual(client.fetch_new_tweets("test_query", store), [f"Tweet {i}" for i in range(5, 0, -1)])
+            self.assertEqual(store.since_id("test_query"), 5)
+
+            statuses[:0] = [self._make_status(7, "Tweet 7"), self._make_status(6, "Tweet 6")]
+            client.api.search_tweets.reset_mock()
+            self.assertEqual(client.fetch_new_tweets("test_query", store), ["Tweet 7", "Tweet 6"])
+            self.assertEqual(client.api.search_tweets.call_args_list[0].kwargs['since_id'], 5)
+            self.assertEqual(store.since_id("test_query"), 7)
+
+            client.api.search_tweets.reset_mock()
+            self.assertEqual(client.fetch_new_tweets("test_query", store), [])
+            self.assertEqual(client.api.search_tweets.call_args_list[0].kwargs['since_id'], 7)
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_fetch_new_tweets_backfills_a_fetch_cut_short(self, MockAPI):
+        """Test that since_id only advances once a fetch reached it, and the next poll fills the gap."""
+        client = TwitterClient()
+        statuses = [self._make_status(tweet_id, f"Tweet {tweet_id}") for tweet_id in range(6, 0, -1)]
+        search = self._paged_search(statuses)
+        calls = []
+
+        def failing_second_page(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise Exception("connection reset")
+            return search(**kwargs)
+        client.api.search_tweets.side_effect = failing_second_page
+
+        with TweetStore(':memory:') as store:
+            store.add("test_query", "en", [(1, "Tweet 1")]) # An earlier poll
+            self.assertEqual(client.fetch_new_tweets("test_query", store, page_size=2), ["Tweet 6", "Tweet 5"])
+            self.assertEqual(store.since_id("test_query"), 1) # Tweets 4 to 2 are still missing
+            self.assertEqual(store.gap("test_query"), (4, 6))
+
+            statuses.insert(0, self._make_status(7, "Tweet 7")) # Not fetched until the gap is filled
+            self.assertEqual(client.fetch_new_tweets("test_query", store, page_size=2),
+                             ["Tweet 4", "Tweet 3", "Tweet 2"])
+            self.assertEqual((calls[2]['max_id'], calls[2]['since_id']), (4, 1))
+            self.assertEqual(store.since_id("test_query"), 6)
+            self.assertIsNone(store.gap("test_query"))
+            self.assertEqual(client.fetch_new_tweets("test_query", store, page_size=2), ["Tweet 7"])
+            self.assertEqual(store.since_id("test_query"), 7)
+
+        with TweetStore(':memory:') as store: # A limit cuts the fetch short the same way
+            client.api.search_tweets.side_effect = search
+            store.add("test_query", "en", [(1, "Tweet 1")])
+            self.assertEqual(client.fetch_new_tweets("test_query", store, limit=3), ["Tweet 7", "Tweet 6", "Tweet 5"])
+            self.assertEqual(store.since_id("test_query"), 1)
+            self.assertEqual(client.fetch_new_tweets("test_query", store), ["Tweet 4", "Tweet 3", "Tweet 2"])
+            self.assertEqual(store.since_id("test_query"), 7)
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_limited_polls_of_a_new_query_keep_up_with_new_tweets(self, MockAPI):
+        """Test that a first fetch cut short by its limit is not backfilled, so later polls get new tweets."""
+        client = TwitterClient()
+        statuses = [self._make_status(tweet_id, f"t{tweet_id}") for tweet_id in range(1001, 0, -1)]
+        client.api.search_tweets.side_effect = self._paged_search(statuses)
+
+        with TweetStore(':memory:') as store:
+            self.assertEqual(client.fetch_recent_tweets("q", store, count=5), [f"t{i}" for i in range(1001, 996, -1)])
+            self.assertEqual(store.since_id("q"), 1001)
+            self.assertIsNone(store.gap("q"))
+            for newest in range(1002, 1005):
+                statuses.insert(0, self._make_status(newest, f"t{newest}"))
+                self.assertEqual(client.fetch_recent_tweets("q", store, count=5),
+                                 [f"t{i}" for i in range(newest, newest - 5, -1)])
+                self.assertEqual(store.since_id("q"), newest)
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_fetch_recent_tweets_serves_from_store(self, MockAPI):
+        client = TwitterClient()
+        statuses = [self._make_status(tweet_id, f"Tweet {tweet_id}") for tweet_id in range(5, 0, -1)]
+        client.api.search_tweets.side_effect = self._paged_search(statuses)
+
+        with TweetStore(':memory:') as store:
+            self.assertEqual(client.fetch_recent_tweets("test_query", store, count=3), ["Tweet 5", "Tweet 4", "Tweet 3"])
+            client.api.search_tweets.reset_mock()
+            self.assertEqual(client.fetch_recent_tweets("test_query", store, count=2, refresh=False), ["Tweet 5", "Tweet 4"])
+            client.api.search_tweets.assert_not_called()
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_fetch_records_and_batch(self, MockAPI):
+        """Test that records keep the id and metadata, and the batch form matches them."""
+        client = TwitterClient()
+        statuses = [
+            SimpleNamespace(id=tweet_id, full_text=f"Tweet {tweet_id}", lang='en', user=SimpleNamespace(id=9))
+            for tweet_id in range(5, 0, -1)
+        ]
+        client.api.search_tweets.side_effect = self._paged_search(statuses)
+
+        records = client.fetch_records("test_query", count=4, page_size=2)
+        self.assertEqual([r.id for r in records], [5, 4, 3, 2])
+        self.assertEqual(records[0], TweetRecord(id=5, text="Tweet 5", author_id=9, lang='en'))
+
+        batch = client.fetch_batch("test_query", count=4, page_size=2)
+        self.assertIsInstance(batch, TweetBatch)
+        self.assertEqual(list(batch), records)
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_search_page_returns_rate_limit_headers(self, MockAPI):
+        client = TwitterClient()
+        client.api.search_tweets.side_effect = self._paged_search([self._make_status(1, "Tweet 1")])
+        client.api.last_response.headers = {'x-rate-limit-remaining': '179'}
+
+        statuses, headers = client.search_page({'q': "test", 'lang': "en", 'count': 10, 'tweet_mode': "extended"})
+
+        self.assertEqual([s.id for s in statuses], [1])
+        self.assertEqual(headers, {'x-rate-limit-remaining': '179'})
+        MockAPI.assert_called_with(client.auth, wait_on_rate_limit=False)
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_search_page_raises_rate_limit_exceeded(self, MockAPI):
+        client = TwitterClient()
+        response = MagicMock(status_code=429, reason="Too Many Requests", headers={'x-rate-limit-reset': '1700000000'})
+        response.json.return_value = {}
+        client.api.search_tweets.side_effect = tweepy.TooManyRequests(response, reset_time=1700000000)
+
+        with self.assertRaises(RateLimitExceeded) as context:
+            client.search_page({'q': "test"})
+        self.assertEqual(context.exception.reset_time, 1700000000)
+        self.assertEqual(context.exception.headers, {'x-rate-limit-reset': '1700000000'})
+
+    @patch('src.twitter_client.tweepy.API')
+    def test_fetch_many_fetches_every_query(self, MockAPI):
+        client = TwitterClient()
+        statuses = [self._make_status(tweet_id, f"Tweet {tweet_id}") for tweet_id in range(25, 0, -1)]
+        client.api.search_tweets.side_effect = self._paged_search(statuses)
+        client.api.last_response.headers = {}
+
+        results = client.fetch_many(["a", "b"], count=15, page_size=10, max_workers=2)
+
+        self.assertEqual(results, {q: [f"Tweet {i}" for i in range(25, 10, -1)] for q in ("a", "b")})
+        self.assertEqual(client.api.search_tweets.call_count, 4)
+
+
+class TestTweetStore(unittest.TestCase):
+    """
+    Unit tests for the SQLite-backed TweetStore.
+    """
+
+    def setUp(self):
+        self.store = TweetStore(':memory:')
+        self.addCleanup(self.store.close)
+
+    def test_unknown_query_has_no_since_id(self):
+        self.assertIsNone(self.store.since_id("never fetched"))
+        self.assertEqual(self.store.get_tweets("never fetched"), [])
+
+    def test_add_dedupes_by_id(self):
+        self.assertEqual(self.store.add("q", "en", [(2, "b"), (1, "a"), (2, "b")]), [(2, "b"), (1, "a")])
+        self.assertEqual(self.store.add("q", "en", [(3, "c"), (2, "b")]), [(3, "c")])
+        self.assertEqual(self.store.get_tweets("q"), ["c", "b", "a"])
+        self.assertEqual(self.store.get_tweets("q", limit=2), ["c", "b"])
+        self.assertEqual(self.store.since_id("q"), 3)
+
+    def test_since_id_never_moves_backwards(self):
+        self.store.add("q", "en", [(10, "new")])
+        self.store.add("q", "en", [(4, "old")])
+        self.assertEqual(self.store.since_id("q"), 10)
+
+    def test_queries_and_languages_are_tracked_separately(self):
+        self.store.add("q", "en", [(1, "shared")])
+        self.assertEqual(self.store.add("other", "en", [(1, "shared")]), [(1, "shared")])
+        self.assertIsNone(self.store.since_id("q", "fr"))
+        self.assertEqual(self.store.get_tweets("other"), ["shared"])
+
+    def test_persists_to_disk(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'sub', 'tweets.sqlite3')
+            with TweetStore(path) as store:
+                store.add("q", "en", [(1, "a")])
+            with TweetStore(path) as store:
+                self.assertEqual(store.since_id("q"), 1)
+                self.assertEqual(store.get_tweets("q"), ["a"])
+
+
 if __name__ == '__main__':
     unittest.main()